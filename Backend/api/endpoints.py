@@ -1,9 +1,13 @@
 # -*- coding: utf-8 -*-
 from uuid import uuid4
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import FileResponse, Response
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
+from api import exports
+from api.responses import json_response
 from api.schemas import (
     ActiveTasksResponse,
     ScrapeRequest,
@@ -11,25 +15,45 @@ from api.schemas import (
     SUPPORTED_SCRAPING_METHODS,
     TaskStatusResponse,
 )
-from core.config import get_emlakjet_config, get_hepsiemlak_config
+from core.config import get_config, get_emlakjet_config, get_hepsiemlak_config
+from core.count_cache import invalidate_listing_counts
+from core.district_assets import (
+    DETAIL_LEVELS,
+    DISTRICTS_DIR,
+    FULL_DETAIL,
+    detail_filename,
+    detail_for_zoom,
+    etag_matches,
+    get_district_asset_store,
+    select_encoding,
+)
+from core.response_cache import cached_response, get_response_cache, invalidate_response_cache
+from core.single_flight import coalesce, get_single_flight
 from core.task_status import get_task_status_store
 from database.connection import get_db
 from database import crud
-from database.models import FailedPage, Listing, Location, PriceHistory, ScrapeSession
+from database.location_keys import fold_location_name
+from database.models import (
+    ArchivedListing,
+    ArchivedPriceHistory,
+    FailedPage,
+    Listing,
+    Location,
+    PriceHistory,
+    ScrapeSession,
+)
+from database.price_stats import describe_prices
+from database import snapshot
+from tasks.maintenance_tasks import parquet_snapshot_task
 from tasks.scraping_tasks import scrape_emlakjet_task, scrape_hepsiemlak_task
-import io
 import json
 import logging
 import os
-from pathlib import Path
 from typing import Any, Dict, List, Optional
 
-# İlçe verileri dizini
-DISTRICTS_DIR = Path(__file__).parent.parent / "data" / "districts"
-
-# İlçe GeoJSON verileri için bellek içi önbellek
-_districts_cache: Dict[str, Any] = {}
 _districts_index: Optional[Dict[str, Any]] = None
+# il -> {ilce_key: index.json'daki ilçe adı}; choropleth eşleştirmesi için
+_district_name_maps: Dict[str, Dict[str, str]] = {}
 
 router = APIRouter()
 logger = logging.getLogger("api")
@@ -212,10 +236,12 @@ async def get_task_status(task_id: str):
 
 
 @router.get("/analytics/prices")
+@cached_response("analytics_prices")
 async def get_price_analytics(
     platform: str = None,
     category: str = None,
     listing_type: str = None,
+    include_archived: bool = False,
     db: Session = Depends(get_db)
 ):
     """Veritabanından fiyat verilerini çek - grafikler için (filtrelenebilir)"""
@@ -252,33 +278,28 @@ async def get_price_analytics(
         if not db_listing_type:
             db_listing_type = listing_type.lower()
 
-    result = crud.get_price_analytics(
-        db,
-        platform=db_platform,
-        kategori=db_category,
-        ilan_tipi=db_listing_type
+    # Satirlar goruntuleme adlariyla tek geciste olusturulur; ayni filtreli
+    # eszamanli istekler tek sorguyu paylasir
+    filters = dict(
+        platform=db_platform, kategori=db_category, ilan_tipi=db_listing_type, include_archived=include_archived
     )
+    result = await coalesce("price_analytics", filters, lambda: crud.get_price_analytics(
+        db,
+        labels={"platform": platform_map, "category": category_map, "listing_type": listing_type_map},
+        **filters
+    ))
 
-    # Goruntuleme adlarina donustur
-    prices = []
-    for p in result["prices"]:
-        prices.append({
-            "city": p["city"],
-            "platform": platform_map.get(p["platform"], p["platform"]),
-            "category": category_map.get(p["category"], p["category"]),
-            "listing_type": listing_type_map.get(p["listing_type"], p["listing_type"]),
-            "price": p["price"]
-        })
-
-    return {"prices": prices, "summary": result["summary"]}
+    return json_response(result)
 
 @router.get("/analytics/city/{city_name}")
+@cached_response("analytics_city")
 async def get_city_analytics(
     city_name: str,
     platform: str = None,
     category: str = None,
     listing_type: str = None,
     subtype: str = None,
+    include_archived: bool = False,
     db: Session = Depends(get_db)
 ):
     """Veritabanindan belirli bir sehrin ilanlarini ve istatistiklerini dondur."""
@@ -303,145 +324,102 @@ async def get_city_analytics(
         listing_map = {"Satılık": "satilik", "Kiralık": "kiralik"}
         db_listing_type = listing_map.get(listing_type, listing_type.lower())
 
-    return crud.get_city_analytics(
-        db,
-        city_name=city_name,
-        platform=db_platform,
-        kategori=db_category,
-        ilan_tipi=db_listing_type
+    filters = dict(
+        city_name=city_name, platform=db_platform, kategori=db_category, ilan_tipi=db_listing_type,
+        include_archived=include_archived
     )
+    return json_response(await coalesce("city_analytics", filters, lambda: crud.get_city_analytics(db, **filters)))
 
-@router.get("/analytics/stats")
-async def get_listing_statistics(
-    platform: str = None,
-    kategori: str = None,
-    ilan_tipi: str = None,
-    city: str = None,
-    district: str = None,
-    db: Session = Depends(get_db)
-):
-    """Veritabanından detaylı istatistikler - describe + fiyat aralıkları"""
-    import statistics
-
-    # Sorgu olustur
-    query = db.query(Listing.fiyat).filter(Listing.fiyat.isnot(None), Listing.fiyat > 0)
-
-    # Filtreleri uygula
+def _db_filter_values(platform: Optional[str], kategori: Optional[str], ilan_tipi: Optional[str]):
+    """Görüntüleme adlarındaki filtreleri DB değerlerine çevir ("all"/boş -> None)"""
+    db_platform = db_kategori = db_type = None
     if platform and platform != "all":
         platform_map = {"HepsiEmlak": "hepsiemlak", "Emlakjet": "emlakjet"}
         db_platform = platform_map.get(platform, platform.lower())
-        query = query.filter(Listing.platform == db_platform)
 
     if kategori and kategori != "all":
         category_map = {"Konut": "konut", "Arsa": "arsa", "İşyeri": "isyeri", "Devremülk": "devremulk"}
         db_kategori = category_map.get(kategori, kategori.lower())
-        query = query.filter(Listing.kategori == db_kategori)
 
     if ilan_tipi and ilan_tipi != "all":
         type_map = {"Satılık": "satilik", "Kiralık": "kiralik"}
         db_type = type_map.get(ilan_tipi, ilan_tipi.lower())
-        query = query.filter(Listing.ilan_tipi == db_type)
 
-    # Şehir/ilçe filtresi
-    if city or district:
-        location_query = db.query(Location.id)
-        if city and city != "Belirtilmemiş":
-            location_query = location_query.filter(Location.il == city)
-        if district and district != "Belirtilmemiş":
-            location_query = location_query.filter(Location.ilce == district)
-        location_ids = [loc_id for (loc_id,) in location_query.all()]
-        if location_ids:
-            query = query.filter(Listing.location_id.in_(location_ids))
+    return db_platform, db_kategori, db_type
 
-    # Fiyatları al
-    prices = [p[0] for p in query.all()]
 
-    if not prices:
+@router.get("/analytics/stats")
+@cached_response("analytics_stats")
+async def get_listing_statistics(
+    platform: str = None,
+    kategori: str = None,
+    ilan_tipi: str = None,
+    city: str = None,
+    district: str = None,
+    include_archived: bool = False,
+    db: Session = Depends(get_db)
+):
+    """Veritabanından detaylı istatistikler - describe + fiyat aralıkları"""
+    db_platform, db_kategori, db_type = _db_filter_values(platform, kategori, ilan_tipi)
+    price_queries = []
+    for model in (Listing, ArchivedListing) if include_archived else (Listing,):
+        # Sorgu olustur
+        query = select(model.fiyat).where(model.fiyat.isnot(None), model.fiyat > 0)
+
+        # Filtreleri uygula
+        if db_platform:
+            query = query.where(model.platform == db_platform)
+        if db_kategori:
+            query = query.where(model.kategori == db_kategori)
+        if db_type:
+            query = query.where(model.ilan_tipi == db_type)
+
+        # Şehir/ilçe filtresi - aynı sorguda il_key/ilce_key join'i (idx_locations_il_key_ilce_key)
+        if city or district:
+            query = query.join(Location, model.location_id == Location.id)
+            if city and city != "Belirtilmemiş":
+                query = query.where(Location.il_key == fold_location_name(city))
+            if district and district != "Belirtilmemiş":
+                query = query.where(Location.ilce_key == fold_location_name(district))
+
+        price_queries.append(query)
+
+    # Tanımlayıcı istatistikler ve yüzdelik tabanlı fiyat aralıkları
+    # (PostgreSQL'de veritabanında, diğerlerinde NumPy ile)
+    price_stats = describe_prices(db, price_queries)
+    if price_stats is None:
         return {"error": "Fiyat verisi bulunamadı", "stats": None}
 
-    # Yüzdelik hesaplamaları için fiyatları sırala
-    sorted_prices = sorted(prices)
-    n = len(sorted_prices)
-
-    # Yüzdelikleri (çeyreklikleri) hesapla
-    def percentile(data, p):
-        k = (len(data) - 1) * p / 100
-        f = int(k)
-        c = f + 1 if f + 1 < len(data) else f
-        return data[f] + (data[c] - data[f]) * (k - f) if c < len(data) else data[f]
-
-    # Tanımlayıcı istatistikler (pandas describe benzeri)
-    describe_stats = {
-        "count": n,
-        "mean": round(statistics.mean(prices), 2),
-        "std": round(statistics.stdev(prices), 2) if n > 1 else 0,
-        "min": round(min(prices), 2),
-        "q25": round(percentile(sorted_prices, 25), 2),
-        "median": round(statistics.median(prices), 2),
-        "q75": round(percentile(sorted_prices, 75), 2),
-        "max": round(max(prices), 2)
+    return {
+        "stats": price_stats["stats"],
+        "price_ranges": price_stats["price_ranges"],
+        "total_listings": price_stats["stats"]["count"]
     }
 
-    # Yuzdelik tabanli gruplama ile dinamik fiyat araligi dagilimi
-    num_bins = 5
-    bin_edges = [percentile(sorted_prices, i * 100 / num_bins) for i in range(num_bins + 1)]
-
-    # Benzersiz kenarlari sagla
-    unique_edges = []
-    for e in bin_edges:
-        if not unique_edges or e > unique_edges[-1]:
-            unique_edges.append(e)
-
-    # Yeterli benzersiz kenar yoksa esit genislikli gruplara don
-    if len(unique_edges) < 3:
-        min_p, max_p = min(prices), max(prices)
-        bin_width = (max_p - min_p) / num_bins
-        unique_edges = [min_p + i * bin_width for i in range(num_bins + 1)]
-
-    # Her gruptaki ogeleri say
-    price_ranges = []
-    for i in range(len(unique_edges) - 1):
-        low = unique_edges[i]
-        high = unique_edges[i + 1]
-
-        # Aralık etiketini biçimlendir
-        def format_price(p):
-            if p >= 1000000:
-                return f"{p/1000000:.1f}M"
-            elif p >= 1000:
-                return f"{p/1000:.0f}K"
-            else:
-                return f"{p:.0f}"
-
-        label = f"{format_price(low)} - {format_price(high)}"
-
-        # Araliktaki ogeleri say
-        if i == len(unique_edges) - 2:  # Son grup üst sınırı dahil eder
-            count = sum(1 for p in prices if low <= p <= high)
-        else:
-            count = sum(1 for p in prices if low <= p < high)
+def _outputs_dir() -> Optional[str]:
+    """Proje kokundeki outputs (ya da Outputs) klasoru; yoksa None"""
+    import os
 
-        price_ranges.append({
-            "range": label,
-            "count": count,
-            "percentage": round(count / n * 100, 1)
-        })
+    current_file = os.path.abspath(__file__)
+    project_root = os.path.dirname(os.path.dirname(os.path.dirname(current_file)))
+    for name in ("outputs", "Outputs"):
+        output_dir = os.path.join(project_root, name)
+        if os.path.exists(output_dir):
+            return output_dir
+    return None
 
-    return {
-        "stats": describe_stats,
-        "price_ranges": price_ranges,
-        "total_listings": n
-    }
 
 @router.delete("/clear-results")
 async def clear_results(db: Session = Depends(get_db)):
-    """Veritabanindaki tum ilanlari ve outputs klasorundeki dosyalari sil"""
+    """Veritabanindaki tum ilanlari (arsiv dahil) ve outputs klasorundeki dosyalari sil"""
     import os
     import shutil
 
     deleted_failed_pages = 0
     deleted_price_history = 0
     deleted_listings = 0
+    deleted_archived_price_history = 0
+    deleted_archived_listings = 0
     deleted_sessions = 0
     deleted_files = 0
 
@@ -450,7 +428,12 @@ async def clear_results(db: Session = Depends(get_db)):
         deleted_failed_pages = db.query(FailedPage).delete(synchronize_session=False)
         deleted_price_history = db.query(PriceHistory).delete(synchronize_session=False)
         deleted_listings = db.query(Listing).delete(synchronize_session=False)
+        deleted_archived_price_history = db.query(ArchivedPriceHistory).delete(synchronize_session=False)
+        deleted_archived_listings = db.query(ArchivedListing).delete(synchronize_session=False)
         deleted_sessions = db.query(ScrapeSession).delete(synchronize_session=False)
+        crud.refresh_listing_summary(db)
+        invalidate_listing_counts(db)
+        invalidate_response_cache(db)
         db.commit()
     except Exception as e:
         db.rollback()
@@ -460,14 +443,8 @@ async def clear_results(db: Session = Depends(get_db)):
         )
 
     # 2. Outputs klasorundeki dosyalari da sil
-    current_file = os.path.abspath(__file__)
-    project_root = os.path.dirname(os.path.dirname(os.path.dirname(current_file)))
-    output_dir = os.path.join(project_root, "outputs")
-
-    if not os.path.exists(output_dir):
-        output_dir = os.path.join(project_root, "Outputs")
-
-    if os.path.exists(output_dir):
+    output_dir = _outputs_dir()
+    if output_dir:
         try:
             for item in os.listdir(output_dir):
                 item_path = os.path.join(output_dir, item)
@@ -486,21 +463,36 @@ async def clear_results(db: Session = Depends(get_db)):
             f"{deleted_failed_pages} failed page, "
             f"{deleted_price_history} fiyat gecmisi, "
             f"{deleted_listings} ilan, "
+            f"{deleted_archived_listings} arsiv ilan, "
+            f"{deleted_archived_price_history} arsiv fiyat gecmisi, "
             f"{deleted_sessions} oturum ve "
             f"{deleted_files} dosya/klasor silindi"
         ),
         "deleted_failed_pages": deleted_failed_pages,
         "deleted_price_history": deleted_price_history,
         "deleted_listings": deleted_listings,
+        "deleted_archived_listings": deleted_archived_listings,
+        "deleted_archived_price_history": deleted_archived_price_history,
         "deleted_sessions": deleted_sessions,
         "deleted_files": deleted_files,
     }
 
 
 @router.get("/results")
+@cached_response("results")
 async def get_results(db: Session = Depends(get_db)):
     """Veritabanından sonuçları döndür"""
-    return crud.get_results_for_frontend(db)
+    return json_response(crud.get_results_for_frontend(db))
+
+@router.get("/cache/stats")
+async def get_cache_stats():
+    """Analitik yanıt önbelleği ve istek birleştirme sayaçları"""
+    cache = get_response_cache()
+    flight = get_single_flight()
+    stats = {"enabled": True, **cache.stats()} if cache is not None else {"enabled": False}
+    stats["single_flight"] = flight.stats() if flight is not None else None
+    return stats
+
 
 @router.get("/listings/preview")
 async def get_listings_preview(
@@ -513,23 +505,20 @@ async def get_listings_preview(
     db: Session = Depends(get_db)
 ):
     """Veritabanindan filtrelenmis ilanlarin onizlemesini dondur."""
-    listings, total = crud.get_listings(
-        db,
-        platform=platform,
-        kategori=kategori,
-        ilan_tipi=ilan_tipi,
-        city=city,
-        district=district,
-        page=1,
-        limit=limit
-    )
+    filters = dict(platform=platform, kategori=kategori, ilan_tipi=ilan_tipi, city=city, district=district)
+    listings, _ = crud.get_listings(db, page=1, limit=limit, count_total=False, **filters)
+    total, total_exact = crud.count_listings(db, **filters)
 
     data = [l.to_dict() for l in listings]
-    return {"data": data, "total": total, "showing": len(data)}
+    return json_response({"data": data, "total": total, "total_exact": total_exact, "showing": len(data)})
 
 @router.get("/stats")
 async def get_stats(db: Session = Depends(get_db)):
-    """Veritabanından genel istatistikleri döndür"""
+    """Veritabanından genel istatistikleri döndür.
+
+    Önbelleğe alınmaz: oturum sayıları her taramada, ilan sayısı her
+    write-behind commit'inde değişir ve panel bunları canlı gösterir.
+    """
     return crud.get_stats_summary(db)
 
 
@@ -548,11 +537,42 @@ async def get_listings(
     max_price: float = None,
     page: int = 1,
     limit: int = 50,
+    include_archived: bool = False,
+    pagination: str = Query(default="offset", pattern="^(offset|cursor)$"),
+    cursor: str = None,
     db: Session = Depends(get_db)
 ):
-    """Veritabanından ilanları listele (filtre ve pagination destekli)"""
-    listings, total = crud.get_listings(
-        db,
+    """Veritabanından ilanları listele (filtre ve pagination destekli).
+
+    pagination=cursor (ya da cursor verilirse) keyset modunda çalışır: toplam
+    sayı dönmez, bir sonraki sayfa için next_cursor kullanılır.
+    """
+    if pagination == "cursor" or cursor:
+        if include_archived:
+            raise HTTPException(status_code=400, detail="include_archived is not supported in cursor mode")
+        try:
+            listings, next_cursor = crud.get_listings_by_cursor(
+                db,
+                platform=platform,
+                kategori=kategori,
+                ilan_tipi=ilan_tipi,
+                alt_kategori=alt_kategori,
+                city=city,
+                district=district,
+                min_price=min_price,
+                max_price=max_price,
+                cursor=cursor,
+                limit=limit
+            )
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        return json_response({
+            "limit": limit,
+            "next_cursor": next_cursor,
+            "items": [l.to_dict() for l in listings]
+        })
+
+    filters = dict(
         platform=platform,
         kategori=kategori,
         ilan_tipi=ilan_tipi,
@@ -561,17 +581,48 @@ async def get_listings(
         district=district,
         min_price=min_price,
         max_price=max_price,
+        include_archived=include_archived
+    )
+    listings, _ = crud.get_listings(db, page=page, limit=limit, count_total=False, **filters)
+    total, total_exact = crud.count_listings(db, **filters)
+
+    return json_response({
+        "total": total,
+        "total_exact": total_exact,
+        "page": page,
+        "limit": limit,
+        "pages": (total + limit - 1) // limit,
+        "items": [l.to_dict() for l in listings]
+    })
+
+
+@router.get("/listings/unseen")
+async def get_unseen_listings(
+    days: int = Query(default=7, ge=1),
+    platform: str = None,
+    ilan_tipi: str = None,
+    page: int = 1,
+    limit: int = 50,
+    db: Session = Depends(get_db)
+):
+    """Son N gündür hiçbir taramada görülmeyen (yayından kalkmış olabilecek) ilanlar"""
+    listings, total = crud.get_unseen_listings(
+        db,
+        days=days,
+        platform=platform,
+        ilan_tipi=ilan_tipi,
         page=page,
         limit=limit
     )
 
-    return {
+    return json_response({
         "total": total,
+        "days": days,
         "page": page,
         "limit": limit,
         "pages": (total + limit - 1) // limit,
         "items": [l.to_dict() for l in listings]
-    }
+    })
 
 
 @router.get("/listings/{listing_id}")
@@ -589,9 +640,28 @@ async def get_scrape_sessions(
     status: str = None,
     page: int = 1,
     limit: int = 20,
+    pagination: str = Query(default="offset", pattern="^(offset|cursor)$"),
+    cursor: str = None,
     db: Session = Depends(get_db)
 ):
-    """Tarama oturumlarını listele"""
+    """Tarama oturumlarını listele (pagination=cursor ile keyset modu)"""
+    if pagination == "cursor" or cursor:
+        try:
+            sessions, next_cursor = crud.get_scrape_sessions_by_cursor(
+                db,
+                platform=platform,
+                status=status,
+                cursor=cursor,
+                limit=limit
+            )
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        return {
+            "limit": limit,
+            "next_cursor": next_cursor,
+            "items": [s.to_dict() for s in sessions]
+        }
+
     sessions, total = crud.get_scrape_sessions(
         db,
         platform=platform,
@@ -629,69 +699,49 @@ async def export_to_excel(
     ilan_tipi: str = None,
     city: str = None,
     district: str = None,
+    export_format: str = Query(default="xlsx", alias="format", pattern="^(xlsx|csv|ndjson|parquet)$"),
     db: Session = Depends(get_db)
 ):
-    """Filtrelere göre verileri Excel'e aktar ve indir"""
-    import pandas as pd
+    """Filtrelere göre tüm ilanları seçilen formatta akışlı olarak indir"""
     from datetime import datetime as dt
+    from fastapi.responses import StreamingResponse
 
-    # Ilanlari al (disa aktarim icin maks 10000)
-    listings, total = crud.get_listings(
-        db,
-        platform=platform,
-        kategori=kategori,
-        ilan_tipi=ilan_tipi,
-        city=city,
-        district=district,
-        page=1,
-        limit=10000
-    )
+    if export_format == "parquet" and not exports.HAS_PYARROW:
+        raise HTTPException(status_code=400, detail="Parquet dışa aktarımı için pyarrow kurulu değil")
 
-    if not listings:
+    filters = dict(platform=platform, kategori=kategori, ilan_tipi=ilan_tipi, city=city, district=district)
+    if not exports.has_rows(db, filters):
         raise HTTPException(status_code=404, detail="Dışa aktarılacak veri bulunamadı")
 
-    # DataFrame'e donustur
-    data = []
-    for l in listings:
-        row = {
-            "Başlık": l.baslik,
-            "Fiyat": l.fiyat_text or l.fiyat,
-            "Platform": l.platform,
-            "Kategori": l.kategori,
-            "İlan Tipi": l.ilan_tipi,
-            "Alt Kategori": l.alt_kategori,
-            "İl": l.location.il if l.location else "",
-            "İlçe": l.location.ilce if l.location else "",
-            "Mahalle": l.location.mahalle if l.location else "",
-            "İlan URL": l.ilan_url,
-            "Emlak Ofisi": l.emlak_ofisi,
-            "Tarih": l.created_at.strftime("%Y-%m-%d %H:%M") if l.created_at else "",
-        }
-        # Add details
-        if l.details:
-            for k, v in l.details.items():
-                row[k] = v
-        data.append(row)
-
-    df = pd.DataFrame(data)
-
-    # Bellekte olustur, diske yazmadan stream olarak gonder
-    from fastapi.responses import StreamingResponse
-
-    buffer = io.BytesIO()
-    df.to_excel(buffer, index=False, engine='openpyxl')
-    buffer.seek(0)
-
+    media_type, extension = exports.EXPORT_FORMATS[export_format]
     timestamp = dt.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"export_{timestamp}.xlsx"
+    filename = f"export_{timestamp}.{extension}"
 
     return StreamingResponse(
-        buffer,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        # İstek oturumu yanıt gövdesi akarken kapanmış olabilir; akış kendi oturumunu açar
+        exports.stream_export(db.get_bind(), export_format, filters),
+        media_type=media_type,
         headers={"Content-Disposition": f"attachment; filename={filename}"}
     )
 
 
+@router.post("/export/snapshot")
+async def create_parquet_snapshot(incremental: bool = False):
+    """listings/locations/price_history Parquet görüntüsünü arka planda başlat"""
+    if not snapshot.HAS_PYARROW:
+        raise HTTPException(status_code=400, detail="Parquet görüntüsü için pyarrow kurulu değil")
+
+    task_id = uuid4().hex
+    parquet_snapshot_task.apply_async(kwargs={"incremental": incremental}, queue="scraping", task_id=task_id)
+    return {"task_id": task_id, "incremental": incremental}
+
+
+@router.get("/export/snapshots")
+async def list_parquet_snapshots():
+    """Yazılmış Parquet görüntülerinin manifest'leri (en yeni önce)"""
+    return {"snapshots": snapshot.list_snapshots(get_config().snapshot_dir)}
+
+
 @router.delete("/listings/group")
 async def delete_listing_group(
     platform: str = Query(default=None),
@@ -703,15 +753,18 @@ async def delete_listing_group(
     db: Session = Depends(get_db)
 ):
     """Filtrelere göre ilan grubunu sil"""
-    from database.models import Listing, Location
+    from database.models import Listing, Location, PriceHistory
 
     query = db.query(Listing)
+    # listing_summary sadece silinen grubun dilimi için yeniden hesaplanır
+    summary_scope = {}
 
     # Platform filtresi (goruntulenen adi veritabani adina donustur)
     if platform:
         platform_map = {"HepsiEmlak": "hepsiemlak", "Emlakjet": "emlakjet"}
         db_platform = platform_map.get(platform, platform.lower())
         query = query.filter(Listing.platform == db_platform)
+        summary_scope["platform"] = db_platform
 
     # Kategori filtresi
     if kategori:
@@ -719,12 +772,14 @@ async def delete_listing_group(
                        "Devremülk": "devremulk", "Turistik İşletme": "turistik_isletme"}
         db_kategori = category_map.get(kategori, kategori.lower())
         query = query.filter(Listing.kategori == db_kategori)
+        summary_scope["kategori"] = db_kategori
 
     # İlan tipi filtresi
     if ilan_tipi:
         type_map = {"Satılık": "satilik", "Kiralık": "kiralik"}
         db_type = type_map.get(ilan_tipi, ilan_tipi.lower())
         query = query.filter(Listing.ilan_tipi == db_type)
+        summary_scope["ilan_tipi"] = db_type
 
     # Alt kategori filtresi
     if alt_kategori:
@@ -732,25 +787,29 @@ async def delete_listing_group(
         db_alt = alt_kategori.lower().replace(' ', '_')
         query = query.filter(Listing.alt_kategori == db_alt)
 
-    # Şehir/ilçe filtresi - önce lokasyon ID'lerini al
+    # Şehir/ilçe filtresi - ID'ler önceden çekilmez; DELETE join desteklemediği için
+    # il_key/ilce_key alt sorgusu aynı ifadede yarı-join olarak çalışır
     if city or district:
-        location_query = db.query(Location.id)
+        location_query = select(Location.id)
         if city and city != "Belirtilmemiş":
-            location_query = location_query.filter(Location.il == city)
+            location_query = location_query.where(Location.il_key == fold_location_name(city))
         if district and district != "Belirtilmemiş":
-            location_query = location_query.filter(Location.ilce == district)
-        location_ids = [loc_id for (loc_id,) in location_query.all()]
-        if location_ids:
-            query = query.filter(Listing.location_id.in_(location_ids))
-        else:
-            raise HTTPException(status_code=404, detail="Silinecek ilan bulunamadı")
+            location_query = location_query.where(Location.ilce_key == fold_location_name(district))
+        query = query.filter(Listing.location_id.in_(location_query))
 
     # Sayıyı al ve sil
     count = query.count()
     if count == 0:
         raise HTTPException(status_code=404, detail="Silinecek ilan bulunamadı")
 
+    # Fiyat geçmişi önce silinir (bölümlenmiş listings'te FK olmadığı için şart)
+    db.query(PriceHistory).filter(
+        PriceHistory.listing_id.in_(query.with_entities(Listing.id))
+    ).delete(synchronize_session=False)
     query.delete(synchronize_session=False)
+    crud.refresh_listing_summary(db, **summary_scope)
+    invalidate_listing_counts(db)
+    invalidate_response_cache(db)
     db.commit()
 
     return {"status": "success", "message": f"{count} ilan silindi", "deleted_count": count}
@@ -763,7 +822,12 @@ async def delete_listing(listing_id: int, db: Session = Depends(get_db)):
     if not listing:
         raise HTTPException(status_code=404, detail="İlan bulunamadı")
 
+    summary_scope = dict(platform=listing.platform, kategori=listing.kategori, ilan_tipi=listing.ilan_tipi)
     db.delete(listing)
+    db.flush()
+    crud.refresh_listing_summary(db, **summary_scope)
+    invalidate_listing_counts(db)
+    invalidate_response_cache(db)
     db.commit()
 
     return {"status": "success", "message": f"İlan {listing_id} silindi"}
@@ -787,13 +851,8 @@ def _load_districts_index() -> Dict[str, Any]:
     return _districts_index
 
 
-def _load_district_geojson(province_name: str) -> Dict[str, Any]:
-    """Il GeoJSON verisini yukle ve onbellege al."""
-    # Once onbellekte kontrol et
-    if province_name in _districts_cache:
-        return _districts_cache[province_name]
-
-    # Index'ten dosya adını al
+def _district_filename(province_name: str) -> str:
+    """Index'ten ilin GeoJSON dosya adını bul."""
     index = _load_districts_index()
     province_info = index.get(province_name)
 
@@ -804,17 +863,7 @@ def _load_district_geojson(province_name: str) -> Dict[str, Any]:
     if not filename:
         raise HTTPException(status_code=404, detail=f"No file specified for province '{province_name}'")
 
-    filepath = DISTRICTS_DIR / filename
-    if not filepath.exists():
-        raise HTTPException(status_code=404, detail=f"GeoJSON file not found: {filename}")
-
-    with open(filepath, "r", encoding="utf-8") as f:
-        geojson_data = json.load(f)
-
-    # Onbellege al
-    _districts_cache[province_name] = geojson_data
-
-    return geojson_data
+    return filename
 
 
 @router.get("/districts/index")
@@ -824,9 +873,99 @@ async def get_districts_index():
 
 
 @router.get("/districts/{province_name}")
-async def get_district_geojson(province_name: str):
-    """Belirli bir ilin ilçe GeoJSON verisini getir"""
-    return _load_district_geojson(province_name)
+async def get_district_geojson(
+    province_name: str,
+    http_request: Request,
+    detail: Optional[str] = Query(default=None, pattern=f"^({'|'.join(DETAIL_LEVELS)})$"),
+    zoom: Optional[int] = Query(default=None, ge=0, le=22),
+):
+    """Belirli bir ilin ilçe GeoJSON verisini getir.
+
+    detail (low/medium/full) ya da harita zoom seviyesi sadeleştirilmiş
+    geometriyi seçer; ikisi de yoksa tam çözünürlük döner. Seviye dosyası
+    üretilmemişse tam çözünürlüğe düşülür (X-Detail-Level başlığı).
+
+    Dosya ayrıştırılmaz; Accept-Encoding'e uyan gzip/br varyantı (yoksa ham
+    dosya) olduğu gibi akıtılır. ETag içerik hash'idir, If-None-Match
+    eşleşirse 304 döner.
+    """
+    filename = _district_filename(province_name)
+    if detail is None:
+        detail = detail_for_zoom(zoom) if zoom is not None else FULL_DETAIL
+
+    asset = get_district_asset_store().get(detail_filename(filename, detail))
+    if asset is None and detail != FULL_DETAIL:
+        detail = FULL_DETAIL
+        asset = get_district_asset_store().get(filename)
+    if asset is None:
+        raise HTTPException(status_code=404, detail=f"GeoJSON file not found: {filename}")
+
+    encoding = select_encoding(http_request.headers.get("accept-encoding"), asset.variants)
+    headers = {
+        "ETag": asset.etag(encoding),
+        "Cache-Control": f"public, max-age={get_config().district_geojson_max_age}",
+        "Vary": "Accept-Encoding",
+        "X-Detail-Level": detail,
+    }
+    if etag_matches(http_request.headers.get("if-none-match"), asset.digest):
+        return Response(status_code=304, headers=headers)
+
+    if encoding is None:
+        return FileResponse(asset.path, media_type="application/json", headers=headers)
+    headers["Content-Encoding"] = encoding
+    return FileResponse(asset.variants[encoding], media_type="application/json", headers=headers)
+
+
+def _district_name_map(province_name: str) -> Dict[str, str]:
+    """index.json ilçe adlarının katlanmış anahtar (ilce_key) eşlemesi, il başına bir kez hesaplanır."""
+    name_map = _district_name_maps.get(province_name)
+    if name_map is None:
+        province_info = _load_districts_index().get(province_name)
+        if not province_info:
+            raise HTTPException(status_code=404, detail=f"Province '{province_name}' not found in index")
+        name_map = {fold_location_name(name): name for name in province_info.get("districts", [])}
+        _district_name_maps[province_name] = name_map
+    return name_map
+
+
+@router.get("/districts/{province_name}/choropleth")
+@cached_response("district_choropleth")
+async def get_district_choropleth(
+    province_name: str,
+    platform: str = None,
+    kategori: str = None,
+    ilan_tipi: str = None,
+    include_archived: bool = False,
+    db: Session = Depends(get_db)
+):
+    """İlin tüm ilçeleri için ilan sayısı, ortalama ve medyan fiyat.
+
+    Tek gruplu sorgu; sonuç /districts/{il} GeoJSON'undaki (index.json)
+    ilçe adlarıyla anahtarlanır. Veride olup haritada eşi bulunmayan ilçe
+    anahtarları "unmatched" altında döner.
+    """
+    name_map = _district_name_map(province_name)
+    db_platform, db_kategori, db_type = _db_filter_values(platform, kategori, ilan_tipi)
+    summary = crud.get_district_price_summary(
+        db, province_name, platform=db_platform, kategori=db_kategori, ilan_tipi=db_type,
+        include_archived=include_archived,
+    )
+
+    districts = {name: {"count": 0, "mean": None, "median": None} for name in name_map.values()}
+    unmatched = {}
+    for ilce_key, stats in summary.items():
+        name = name_map.get(ilce_key)
+        if name is not None:
+            districts[name] = stats
+        else:
+            unmatched[ilce_key or "Belirtilmemiş"] = stats
+
+    return {
+        "province": province_name,
+        "total_listings": sum(stats["count"] for stats in summary.values()),
+        "districts": districts,
+        "unmatched": unmatched,
+    }
 
 
 @router.get("/districts/info/{province_name}")
@@ -848,10 +987,12 @@ async def get_district_info(province_name: str):
 
 @router.post("/districts/cache/clear")
 async def clear_districts_cache():
-    """Bellek ici ilce onbelleğini temizle."""
-    global _districts_cache, _districts_index
-    cache_size = len(_districts_cache)
-    _districts_cache = {}
+    """Ilce index'ini ve GeoJSON hash/manifest onbellegini temizle."""
+    global _districts_index
+    district_assets = get_district_asset_store()
+    cache_size = len(district_assets.hashed_files)
+    district_assets.clear()
+    _district_name_maps.clear()
     _districts_index = None
     return {"status": "success", "message": f"Cache cleared. {cache_size} provinces removed from cache."}
 
@@ -859,8 +1000,11 @@ async def clear_districts_cache():
 @router.get("/districts/cache/status")
 async def get_cache_status():
     """Onbellek durumunu getir."""
+    district_assets = get_district_asset_store()
+    hashed_files = district_assets.hashed_files
     return {
-        "cached_provinces": list(_districts_cache.keys()),
-        "cache_size": len(_districts_cache),
+        "cached_provinces": hashed_files,
+        "cache_size": len(hashed_files),
+        "precompressed": len(district_assets.manifest),
         "index_loaded": _districts_index is not None
     }
@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+"""/export/excel için akışlı, üst sınırsız dışa aktarım (CSV/NDJSON/XLSX/Parquet).
+
+İlanlar veritabanından yield_per ile batch batch okunur; hiçbir aşamada tüm
+sonuç kümesi ORM nesnesi, DataFrame ya da bellek içi dosya olarak tutulmaz.
+
+    csv / ndjson  batch'ler kodlanıp doğrudan yanıta yazılır
+    xlsx          openpyxl write-only kitabı geçici dosyaya, sonra parça parça
+    parquet       her batch bir row group; geçici dosyadan parça parça
+
+Detay (details JSON) anahtarları kolon olarak açıldığı için CSV/XLSX/Parquet
+başlığı ilk geçişte sadece details kolonu taranarak belirlenir; bu formatlar
+tabloyu iki kez tarar (önce details, sonra satırlar).
+
+Gövde, istek bağımlılıkları (get_db oturumu) kapandıktan sonra da
+üretilebildiği için stream_export kendi oturumunu açar ve bitince kapatır.
+"""
+
+import csv
+import io
+import json
+import tempfile
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+import orjson
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from core.config import get_config
+from database import crud
+from database.models import Listing, Location
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+EXPORT_FORMATS = {
+    "xlsx": ("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "xlsx"),
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+BASE_COLUMNS = [
+    "Başlık", "Fiyat", "Platform", "Kategori", "İlan Tipi", "Alt Kategori",
+    "İl", "İlçe", "Mahalle", "İlan URL", "Emlak Ofisi", "Tarih",
+]
+
+_ROW_COLUMNS = (
+    Listing.baslik, Listing.fiyat, Listing.fiyat_text, Listing.platform, Listing.kategori,
+    Listing.ilan_tipi, Listing.alt_kategori, Location.il, Location.ilce, Location.mahalle,
+    Listing.ilan_url, Listing.emlak_ofisi, Listing.created_at, Listing.details,
+)
+
+_FILE_CHUNK_SIZE = 1024 * 1024
+
+
+def export_row(row) -> Dict[str, Any]:
+    """Sorgu satırını önceki Excel çıktısıyla aynı kolonlara dönüştür"""
+    data = {
+        "Başlık": row.baslik,
+        "Fiyat": row.fiyat_text or row.fiyat,
+        "Platform": row.platform,
+        "Kategori": row.kategori,
+        "İlan Tipi": row.ilan_tipi,
+        "Alt Kategori": row.alt_kategori,
+        "İl": row.il or "",
+        "İlçe": row.ilce or "",
+        "Mahalle": row.mahalle or "",
+        "İlan URL": row.ilan_url,
+        "Emlak Ofisi": row.emlak_ofisi,
+        "Tarih": row.created_at.strftime("%Y-%m-%d %H:%M") if row.created_at else "",
+    }
+    if row.details:
+        data.update(row.details)
+    return data
+
+
+def _cell(value: Any) -> Any:
+    """Liste/sözlük gibi iç içe detayları tek hücreye sığacak metne çevir"""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+
+def _text_cell(value: Any) -> Optional[str]:
+    value = _cell(value)
+    return None if value is None else str(value)
+
+
+def collect_columns(db: Session, filters: Dict[str, Any], batch_size: int) -> List[str]:
+    """Temel kolonlar + detay anahtarları (ilk görülme sırasıyla)"""
+    columns = dict.fromkeys(BASE_COLUMNS)
+    for batch in crud.iter_listing_export_batches(db, (Listing.details,), batch_size, **filters):
+        for (details,) in batch:
+            if details:
+                columns.update(dict.fromkeys(details))
+    return list(columns)
+
+
+def _iter_row_batches(db: Session, filters: Dict[str, Any], batch_size: int) -> Iterator[List[Dict[str, Any]]]:
+    for batch in crud.iter_listing_export_batches(db, _ROW_COLUMNS, batch_size, **filters):
+        yield [export_row(row) for row in batch]
+
+
+def _stream_file(handle) -> Iterator[bytes]:
+    try:
+        handle.seek(0)
+        while True:
+            chunk = handle.read(_FILE_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        handle.close()
+
+
+def stream_csv(db: Session, filters: Dict[str, Any], batch_size: int) -> Iterator[bytes]:
+    columns = collect_columns(db, filters, batch_size)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # BOM: Excel'in Türkçe karakterleri UTF-8 olarak açması için
+    writer.writerow(columns)
+    yield ("\ufeff" + buffer.getvalue()).encode("utf-8")
+
+    for rows in _iter_row_batches(db, filters, batch_size):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([_cell(row.get(column)) for column in columns] for row in rows)
+        yield buffer.getvalue().encode("utf-8")
+
+
+def stream_ndjson(db: Session, filters: Dict[str, Any], batch_size: int) -> Iterator[bytes]:
+    for rows in _iter_row_batches(db, filters, batch_size):
+        yield b"".join(orjson.dumps(row, default=str) + b"\n" for row in rows)
+
+
+def stream_xlsx(db: Session, filters: Dict[str, Any], batch_size: int) -> Iterator[bytes]:
+    from openpyxl import Workbook
+
+    columns = collect_columns(db, filters, batch_size)
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(columns)
+    for rows in _iter_row_batches(db, filters, batch_size):
+        for row in rows:
+            sheet.append([_cell(row.get(column)) for column in columns])
+
+    handle = tempfile.TemporaryFile()
+    workbook.save(handle)
+    yield from _stream_file(handle)
+
+
+def stream_parquet(db: Session, filters: Dict[str, Any], batch_size: int) -> Iterator[bytes]:
+    columns = collect_columns(db, filters, batch_size)
+    # Fiyat metin ya da sayı olabildiği için tüm kolonlar metin olarak yazılır
+    schema = pa.schema([(column, pa.string()) for column in columns])
+
+    handle = tempfile.TemporaryFile()
+    with pq.ParquetWriter(handle, schema) as writer:
+        for rows in _iter_row_batches(db, filters, batch_size):
+            writer.write_table(pa.Table.from_pydict(
+                {column: [_text_cell(row.get(column)) for row in rows] for column in columns},
+                schema=schema,
+            ))
+    yield from _stream_file(handle)
+
+
+_STREAMERS = {
+    "csv": stream_csv,
+    "ndjson": stream_ndjson,
+    "xlsx": stream_xlsx,
+    "parquet": stream_parquet,
+}
+
+
+def has_rows(db: Session, filters: Dict[str, Any]) -> bool:
+    """Filtreye uyan en az bir ilan var mı (yanıt başlamadan 404 için)"""
+    batches = crud.iter_listing_export_batches(db, (Listing.id,), 1, **filters)
+    try:
+        return next(batches, None) is not None
+    finally:
+        batches.close()
+
+
+def stream_export(bind: Union[Engine, Connection], export_format: str, filters: Dict[str, Any]) -> Iterator[bytes]:
+    """Seçilen formatta yanıt gövdesi parçaları (bind üzerinde ayrı bir oturumla)"""
+    db = Session(bind=bind)
+    try:
+        yield from _STREAMERS[export_format](db, filters, get_config().export_batch_size)
+    finally:
+        db.close()
@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+"""Büyük liste döndüren uçlar için hızlı JSON yanıtı.
+
+FastAPI, dict döndüren uçlarda önce jsonable_encoder ile tüm yapıyı tek tek
+dolaşıp kopyalar, sonra stdlib json ile kodlar. 50k satırlık fiyat listesinde
+bu süre yanıtın büyük kısmını oluşturur. json_response() içeriği doğrudan
+orjson ile kodlanan bir Response olarak döndürür; böylece FastAPI'nin
+kodlama adımı tamamen atlanır (datetime/date orjson'da yerel desteklenir).
+"""
+
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+
+from core.config import get_config
+
+_ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+class FastJSONResponse(JSONResponse):
+    """orjson ile kodlanan JSONResponse"""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=_ORJSON_OPTIONS, default=str)
+
+
+def json_response(content: Any) -> Any:
+    """FAST_JSON_RESPONSES açıksa FastJSONResponse, değilse içeriğin kendisi"""
+    if get_config().fast_json_responses:
+        return FastJSONResponse(content)
+    return content
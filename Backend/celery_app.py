@@ -9,7 +9,7 @@ celery_app = Celery(
     "real_estate_scraper",
     broker=REDIS_URL,
     backend=REDIS_URL,
-    include=["tasks.scraping_tasks"]
+    include=["tasks.scraping_tasks", "tasks.maintenance_tasks"]
 )
 
 # Celery yapılandırması
@@ -42,6 +42,15 @@ celery_app.conf.update(
     # Yeniden deneme ayarları
     task_default_retry_delay=60,  # Yeniden denemeler arası 1 dakika gecikme
     task_max_retries=3,
+
+    # Periyodik görevler (celery beat ya da worker -B ile çalışır)
+    beat_schedule={
+        "archive-stale-listings": {
+            "task": "archive_stale_listings",
+            "schedule": 86400,  # Günde bir
+            "options": {"queue": "scraping"},  # Worker sadece bu kuyruğu dinliyor
+        },
+    },
 )
 
 # Loglama için özel görev temel sınıfı
@@ -75,8 +75,56 @@ class ScraperConfig:
         "Chrome/120.0.0.0 Safari/537.36"
     )
 
+    # Arka plan DB yazıcısı (write-behind)
+    db_write_behind: bool = field(default_factory=lambda: get_bool_env('DB_WRITE_BEHIND', True))
+    db_write_queue_pages: int = field(default_factory=lambda: get_int_env('DB_WRITE_QUEUE_PAGES', 8))
+    db_write_batch_pages: int = field(default_factory=lambda: get_int_env('DB_WRITE_BATCH_PAGES', 5))
+    db_write_flush_seconds: float = field(default_factory=lambda: get_float_env('DB_WRITE_FLUSH_SECONDS', 2.0))
+
+    # PostgreSQL COPY ile toplu aktarım - isteğe bağlı (SQLite'ta kullanılmaz;
+    # tests/test_copy_ingest_postgresql.py gerçek PostgreSQL'de doğrular)
+    db_copy_ingest: bool = field(default_factory=lambda: get_bool_env('DB_COPY_INGEST', False))
+    db_copy_ingest_min_rows: int = field(default_factory=lambda: get_int_env('DB_COPY_INGEST_MIN_ROWS', 100))
+    # listings tablosunu platform/ilan_tipi'ye göre LIST bölümle (sadece PostgreSQL, database/partitioning.py)
+    db_partition_listings: bool = field(default_factory=lambda: get_bool_env('DB_PARTITION_LISTINGS', False))
+    # Oturum içi görülen-URL Bloom filtresi (tekrarlı ilanları DB'den önce eler)
+    seen_url_filter: bool = field(default_factory=lambda: get_bool_env('SEEN_URL_FILTER', True))
+    seen_url_filter_capacity: int = field(default_factory=lambda: get_int_env('SEEN_URL_FILTER_CAPACITY', 200000))
+    seen_url_filter_error_rate: float = field(default_factory=lambda: get_float_env('SEEN_URL_FILTER_ERROR_RATE', 0.001))
+    seen_url_filter_redis: bool = field(default_factory=lambda: get_bool_env('SEEN_URL_FILTER_REDIS', False))
+    # N gündür görülmeyen ilanları listings_archive'a taşı (tasks/maintenance_tasks.py, 0 = kapalı)
+    archive_after_days: int = field(default_factory=lambda: get_int_env('ARCHIVE_AFTER_DAYS', 90))
+    archive_batch_size: int = field(default_factory=lambda: get_int_env('ARCHIVE_BATCH_SIZE', 1000))
+    # Filtreli ilan sayıları için önbellek (core/count_cache.py) ve PostgreSQL planlayıcı tahmini
+    listing_count_cache: bool = field(default_factory=lambda: get_bool_env('LISTING_COUNT_CACHE', True))
+    listing_count_cache_redis: bool = field(default_factory=lambda: get_bool_env('LISTING_COUNT_CACHE_REDIS', True))
+    listing_count_cache_ttl: int = field(default_factory=lambda: get_int_env('LISTING_COUNT_CACHE_TTL', 300))
+    # Tahmin bu eşiğin üstündeyse kesin COUNT yerine tahmin döner (0 = her zaman kesin)
+    listing_count_estimate_threshold: int = field(default_factory=lambda: get_int_env('LISTING_COUNT_ESTIMATE_THRESHOLD', 100000))
+    # Analitik uçlarının yanıt önbelleği (core/response_cache.py)
+    response_cache: bool = field(default_factory=lambda: get_bool_env('RESPONSE_CACHE', True))
+    response_cache_redis: bool = field(default_factory=lambda: get_bool_env('RESPONSE_CACHE_REDIS', True))
+    response_cache_ttl: int = field(default_factory=lambda: get_int_env('RESPONSE_CACHE_TTL', 600))
+    # Eşzamanlı aynı analitik sorgularını birleştir (core/single_flight.py)
+    single_flight: bool = field(default_factory=lambda: get_bool_env('SINGLE_FLIGHT', True))
+    single_flight_redis: bool = field(default_factory=lambda: get_bool_env('SINGLE_FLIGHT_REDIS', True))
+    single_flight_lock_ttl: int = field(default_factory=lambda: get_int_env('SINGLE_FLIGHT_LOCK_TTL', 60))
+    # Ağır liste uçlarını orjson ile doğrudan kodla (api/responses.py)
+    fast_json_responses: bool = field(default_factory=lambda: get_bool_env('FAST_JSON_RESPONSES', True))
+    # Akışlı dışa aktarımda veritabanından tek seferde okunan satır sayısı (api/exports.py)
+    export_batch_size: int = field(default_factory=lambda: get_int_env('EXPORT_BATCH_SIZE', 2000))
+    # İlçe GeoJSON yanıtlarının Cache-Control max-age süresi, saniye (core/district_assets.py)
+    district_geojson_max_age: int = field(default_factory=lambda: get_int_env('DISTRICT_GEOJSON_MAX_AGE', 86400))
+    # Açılışta manifest eksik/eskiyse sıkıştırılmış ilçe GeoJSON'larını arka planda üret
+    district_assets_build_on_startup: bool = field(
+        default_factory=lambda: get_bool_env('DISTRICT_ASSETS_BUILD_ON_STARTUP', True)
+    )
+
     # Çıktı ayarları
     output_dir: str = field(default_factory=lambda: os.getenv('OUTPUT_DIR', 'outputs'))
+    # Parquet anlık görüntüleri (database/snapshot.py)
+    snapshot_dir: str = field(default_factory=lambda: os.getenv('SNAPSHOT_DIR', 'outputs/snapshots'))
+    snapshot_batch_size: int = field(default_factory=lambda: get_int_env('SNAPSHOT_BATCH_SIZE', 5000))
 
     # Loglama
     log_level: str = field(default_factory=lambda: os.getenv('LOG_LEVEL', 'INFO'))
@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+"""Filtre başına ilan sayısı önbelleği.
+
+/listings, /listings/preview gibi uçlar her istekte filtreli join üzerinde
+COUNT(*) çalıştırır. Sayılar sadece tarama oturumu bitince ya da silme
+yapılınca değişir; bu yüzden filtre anahtarıyla kısa süreli saklanır.
+
+Geçersiz kılma nesil (generation) sayacıyla yapılır: anahtarlar sayacın o
+anki değerini içerir, invalidate() sayacı artırır ve eski anahtarlar TTL ile
+kendiliğinden düşer. Redis varsa sayaç ve değerler Redis'tedir (Celery
+worker'ın geçersiz kılması API süreçlerine de ulaşır); yoksa süreç içi
+sözlük kullanılır ve diğer süreçlerdeki bayatlık TTL ile sınırlıdır.
+
+Yazan oturum verilirse (invalidate_listing_counts(db)) sayaç, oturumun dış
+transaction'ı bittikten sonra bir kez daha artırılır: commit'ten önce eski
+veriyle hesaplanıp yeni nesle yazılmış sayılar da böylece düşer.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+COUNT_CACHE_KEY_PREFIX = "listing_counts"
+COUNT_CACHE_TTL_SECONDS = 300
+
+
+def build_count_key(filters: Dict[str, Any]) -> str:
+    """Filtre sözlüğünden sıra bağımsız, kısa anahtar üret"""
+    normalized = {key: value for key, value in filters.items() if value not in (None, "", "all", False)}
+    raw = json.dumps(normalized, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=12).hexdigest()
+
+
+class CountCache:
+    """(toplam, kesin_mi) değerlerini filtre anahtarıyla saklayan önbellek"""
+
+    def __init__(
+        self,
+        redis_client=None,
+        ttl_seconds: int = COUNT_CACHE_TTL_SECONDS,
+        key_prefix: str = COUNT_CACHE_KEY_PREFIX,
+    ):
+        self.redis_client = redis_client
+        self.ttl_seconds = ttl_seconds
+        self.key_prefix = key_prefix
+        self._local: Dict[str, Tuple[float, str]] = {}
+        self._local_generation = 0
+        self._lock = threading.Lock()
+
+    @property
+    def shared(self) -> bool:
+        return self.redis_client is not None
+
+    @property
+    def generation_key(self) -> str:
+        return f"{self.key_prefix}:generation"
+
+    def _generation(self) -> int:
+        if self.redis_client is not None:
+            try:
+                return int(self.redis_client.get(self.generation_key) or 0)
+            except Exception as exc:
+                logger.warning(f"Cache {self.key_prefix} generation read failed, using local cache: {exc}")
+        return self._local_generation
+
+    def _entry_key(self, key: str) -> str:
+        return f"{self.key_prefix}:{self._generation()}:{key}"
+
+    def _get_raw(self, key: str) -> Optional[str]:
+        entry_key = self._entry_key(key)
+        if self.redis_client is not None:
+            try:
+                return self.redis_client.get(entry_key)
+            except Exception as exc:
+                logger.warning(f"Cache {self.key_prefix} read failed: {exc}")
+
+        with self._lock:
+            entry = self._local.get(entry_key)
+            if entry is None:
+                return None
+            expires_at, raw = entry
+            if expires_at < time.monotonic():
+                del self._local[entry_key]
+                return None
+            return raw
+
+    def _set_raw(self, key: str, raw: str) -> None:
+        entry_key = self._entry_key(key)
+        if self.redis_client is not None:
+            try:
+                self.redis_client.setex(entry_key, self.ttl_seconds, raw)
+                return
+            except Exception as exc:
+                logger.warning(f"Cache {self.key_prefix} write failed: {exc}")
+
+        with self._lock:
+            self._local[entry_key] = (time.monotonic() + self.ttl_seconds, raw)
+
+    def get(self, key: str) -> Optional[Tuple[int, bool]]:
+        raw = self._get_raw(key)
+        if raw is None:
+            return None
+        total, exact = json.loads(raw)
+        return int(total), bool(exact)
+
+    def set(self, key: str, total: int, exact: bool) -> None:
+        self._set_raw(key, json.dumps([total, exact]))
+
+    def invalidate(self) -> None:
+        """Tüm sayıları geçersiz kıl (nesil sayacını artır)"""
+        if self.redis_client is not None:
+            try:
+                self.redis_client.incr(self.generation_key)
+            except Exception as exc:
+                logger.warning(f"Cache {self.key_prefix} invalidation failed: {exc}")
+        with self._lock:
+            self._local_generation += 1
+            self._local.clear()
+
+
+_count_cache: Optional[CountCache] = None
+_count_cache_lock = threading.Lock()
+
+
+def get_count_cache() -> Optional[CountCache]:
+    """Süreç genelindeki sayı önbelleği; LISTING_COUNT_CACHE kapalıysa None"""
+    global _count_cache
+    from core.config import get_config
+
+    config = get_config()
+    if not config.listing_count_cache:
+        return None
+    if _count_cache is None:
+        with _count_cache_lock:
+            if _count_cache is None:
+                redis_client = None
+                if config.listing_count_cache_redis:
+                    try:
+                        from core.task_status import get_redis_client
+                        redis_client = get_redis_client()
+                    except Exception as exc:
+                        logger.warning(f"Shared count cache unavailable, using in-process cache: {exc}")
+                _count_cache = CountCache(redis_client=redis_client, ttl_seconds=config.listing_count_cache_ttl)
+    return _count_cache
+
+
+_PENDING_INVALIDATIONS = "cache_invalidations_pending"
+
+
+def invalidate_after_transaction(db: Session, invalidate: Callable[[], None]) -> None:
+    """invalidate'i db'nin dış transaction'ı bittiğinde (commit/rollback) tekrar çağır.
+
+    Aynı fonksiyon bir transaction içinde kaç kez kaydedilirse kaydedilsin bir kez çalışır.
+    """
+    db.info.setdefault(_PENDING_INVALIDATIONS, set()).add(invalidate)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _invalidate_after_outer_transaction(session: Session, transaction) -> None:
+    # Savepoint'ler (begin_nested) de bu olayı tetikler; sadece dış transaction sayılır
+    if transaction.parent is not None:
+        return
+    for invalidate in session.info.pop(_PENDING_INVALIDATIONS, ()):
+        try:
+            invalidate()
+        except Exception as exc:
+            logger.warning(f"Deferred cache invalidation failed: {exc}")
+
+
+def _invalidate_counts() -> None:
+    cache = get_count_cache()
+    if cache is not None:
+        cache.invalidate()
+
+
+def invalidate_listing_counts(db: Optional[Session] = None) -> None:
+    """İlan sayısını değiştiren yazımlarda commit'ten önce çağrılır.
+
+    db verilirse sayaç o oturumun dış transaction'ı bittikten sonra bir kez
+    daha artırılır.
+    """
+    _invalidate_counts()
+    if db is not None:
+        invalidate_after_transaction(db, _invalidate_counts)
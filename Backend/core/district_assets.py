@@ -0,0 +1,287 @@
+# -*- coding: utf-8 -*-
+"""İlçe GeoJSON dosyalarının önceden sıkıştırılmış, içerik hash'li sunumu.
+
+data/districts/*.json toplam ~71 MB. Dosyalar hiçbir zaman json.load ile
+ayrıştırılmaz; build_district_assets() her dosya için gzip (ve brotli
+kuruluysa br) varyantlarını _build/ altına yazar ve içerik hash'lerini
+_build/assets.json manifest'ine kaydeder. /districts/{il} ucu Accept-Encoding'e
+uyan hazır baytları dosyadan akıtır; ETag içerik hash'idir, If-None-Match
+eşleşirse 304 döner.
+
+Manifest girdisi boyut ve içerik hash'i kaynak dosyayla eşleşirse kullanılır;
+dosyanın hash'i süreç başına bir kez (boyut/mtime değişene kadar) parça parça
+okunarak hesaplanır. Eşleşmezse (manifest yok ya da dosya build'den sonra
+değişti) ham dosya sıkıştırmasız sunulur.
+
+Build Docker imajında çalışır; kaynak dizin bağlandığında (docker-compose
+./Backend:/app) uygulama açılışında manifest eksik ya da eski ise arka planda
+yeniden üretilir (ensure_built).
+
+Sadeleştirilmiş çözünürlükler low/ ve medium/ alt dizinlerindedir; build
+bunları da aynı adımda tam çözünürlüklü kök dosyalardan üretir
+(core/district_simplify.py). _build/ gibi versiyonlanmazlar.
+
+    python scripts/build_district_assets.py
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import logging
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from core.district_simplify import write_detail_levels
+
+try:
+    import brotli
+    HAS_BROTLI = True
+except ImportError:
+    HAS_BROTLI = False
+
+logger = logging.getLogger(__name__)
+
+DISTRICTS_DIR = Path(__file__).parent.parent / "data" / "districts"
+BUILD_DIR_NAME = "_build"
+MANIFEST_FILE = "assets.json"
+INDEX_FILE = "index.json"
+
+# Kabadan inceye çözünürlük seviyeleri; "full" kök dizindeki dosyadır
+DETAIL_LEVELS = ("low", "medium", "full")
+FULL_DETAIL = "full"
+# Harita zoom seviyesi bu değerlere kadar ilgili çözünürlüğü alır
+_ZOOM_DETAIL_THRESHOLDS = ((7, "low"), (9, "medium"))
+
+# Aynı q değerinde tercih sırası
+ENCODING_PREFERENCE = ("br", "gzip")
+_VARIANT_SUFFIXES = {"br": ".br", "gzip": ".gz"}
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=10).hexdigest()
+
+
+def _file_hash(path: Path) -> str:
+    digest = hashlib.blake2b(digest_size=10)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def detail_for_zoom(zoom: int) -> str:
+    """Web harita zoom seviyesine (0-22) uygun çözünürlük"""
+    for max_zoom, detail in _ZOOM_DETAIL_THRESHOLDS:
+        if zoom <= max_zoom:
+            return detail
+    return FULL_DETAIL
+
+
+def detail_filename(filename: str, detail: str) -> str:
+    """Çözünürlük seviyesine ait dosyanın districts dizinine göre yolu"""
+    return filename if detail == FULL_DETAIL else f"{detail}/{filename}"
+
+
+def _source_files(districts_dir: Path):
+    for detail in DETAIL_LEVELS:
+        level_dir = districts_dir if detail == FULL_DETAIL else districts_dir / detail
+        for source in sorted(level_dir.glob("*.json")):
+            if source.name != INDEX_FILE:
+                yield detail_filename(source.name, detail), source
+
+
+def _compress(encoding: str, data: bytes) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=11, mode=brotli.MODE_TEXT)
+    # mtime=0: aynı girdi her build'de aynı baytları üretir
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def build_district_assets(districts_dir: Path = DISTRICTS_DIR, levels: bool = True) -> Dict[str, Dict]:
+    """Sadeleştirilmiş seviyeleri, her dosyanın sıkıştırılmış varyantlarını ve manifest'i yaz"""
+    if levels:
+        write_detail_levels(districts_dir)
+    build_dir = districts_dir / BUILD_DIR_NAME
+    build_dir.mkdir(parents=True, exist_ok=True)
+    encodings = [encoding for encoding in ENCODING_PREFERENCE if encoding != "br" or HAS_BROTLI]
+
+    manifest: Dict[str, Dict] = {}
+    for name, source in _source_files(districts_dir):
+        stat = source.stat()
+        data = source.read_bytes()
+        entry = {
+            "hash": content_hash(data),
+            "size": stat.st_size,
+            "variants": {},
+        }
+        for encoding in encodings:
+            variant = f"{name}{_VARIANT_SUFFIXES[encoding]}"
+            (build_dir / variant).parent.mkdir(exist_ok=True)
+            (build_dir / variant).write_bytes(_compress(encoding, data))
+            entry["variants"][encoding] = {"file": variant, "size": (build_dir / variant).stat().st_size}
+        manifest[name] = entry
+
+    tmp_path = build_dir / f"{MANIFEST_FILE}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, build_dir / MANIFEST_FILE)
+    return manifest
+
+
+def select_encoding(accept_encoding: Optional[str], available) -> Optional[str]:
+    """Accept-Encoding'e göre mevcut varyantlardan en uygununu seç (yoksa None)"""
+    if not accept_encoding or not available:
+        return None
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        weights[name.strip().lower()] = quality
+
+    candidates = [
+        (weights.get(encoding, weights.get("*", 0.0)), -rank, encoding)
+        for rank, encoding in enumerate(ENCODING_PREFERENCE)
+        if encoding in available
+    ]
+    quality, _, encoding = max(candidates, default=(0.0, 0, None))
+    return encoding if quality > 0 else None
+
+
+def etag_matches(if_none_match: Optional[str], digest: str) -> bool:
+    """If-None-Match listesinde bu içeriğin (herhangi bir kodlamasının) ETag'i var mı"""
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*":
+            return True
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag.strip('"').split("-", 1)[0] == digest:
+            return True
+    return False
+
+
+@dataclass
+class DistrictAsset:
+    path: Path
+    digest: str
+    variants: Dict[str, Path] = field(default_factory=dict)
+
+    def etag(self, encoding: Optional[str]) -> str:
+        return f'"{self.digest}-{encoding}"' if encoding else f'"{self.digest}"'
+
+
+class DistrictAssetStore:
+    """Manifest'i ve (manifest dışı dosyalar için) hesaplanan hash'leri tutar"""
+
+    def __init__(self, districts_dir: Path = DISTRICTS_DIR):
+        self.districts_dir = districts_dir
+        self._manifest: Optional[Dict[str, Dict]] = None
+        self._hashes: Dict[str, Tuple[int, int, str]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def manifest(self) -> Dict[str, Dict]:
+        if self._manifest is None:
+            path = self.districts_dir / BUILD_DIR_NAME / MANIFEST_FILE
+            if path.exists():
+                with open(path, encoding="utf-8") as f:
+                    self._manifest = json.load(f)
+            else:
+                self._manifest = {}
+        return self._manifest
+
+    @property
+    def hashed_files(self):
+        return sorted(set(self.manifest) | set(self._hashes))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._manifest = None
+            self._hashes.clear()
+
+    def needs_build(self) -> bool:
+        """Manifest yok ya da kaynak dosya kümesi/boyutları manifest'ten farklı mı"""
+        manifest_path = self.districts_dir / BUILD_DIR_NAME / MANIFEST_FILE
+        if not manifest_path.exists():
+            return True
+        try:
+            with open(manifest_path, encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return True
+        sources = {name: source.stat().st_size for name, source in _source_files(self.districts_dir)}
+        return sources != {name: entry.get("size") for name, entry in manifest.items()}
+
+    def ensure_built(self) -> Optional[threading.Thread]:
+        """Gerekiyorsa build'i arka plan thread'inde başlat; bitince manifest yeniden okunur"""
+        if not self.districts_dir.is_dir() or not self.needs_build():
+            return None
+
+        def build():
+            try:
+                manifest = build_district_assets(self.districts_dir)
+                logger.info(f"District assets built: {len(manifest)} files")
+            except Exception as exc:
+                logger.warning(f"District asset build failed, serving raw files: {exc}")
+            finally:
+                self.clear()
+
+        thread = threading.Thread(target=build, name="district-assets-build", daemon=True)
+        thread.start()
+        return thread
+
+    def get(self, filename: str) -> Optional[DistrictAsset]:
+        """Dosyanın hash'i ve güncel sıkıştırılmış varyantları; dosya yoksa None"""
+        path = self.districts_dir / filename
+        if not path.is_file():
+            return None
+        digest = self._digest(filename, path)
+
+        entry = self.manifest.get(filename)
+        if entry and entry["size"] == path.stat().st_size and entry["hash"] == digest:
+            build_dir = self.districts_dir / BUILD_DIR_NAME
+            variants = {
+                encoding: build_dir / variant["file"]
+                for encoding, variant in entry["variants"].items()
+                if (build_dir / variant["file"]).is_file()
+            }
+            return DistrictAsset(path=path, digest=digest, variants=variants)
+        return DistrictAsset(path=path, digest=digest)
+
+    def _digest(self, filename: str, path: Path) -> str:
+        """Dosyanın içerik hash'i; boyut/mtime değişmedikçe yeniden okunmaz"""
+        stat = path.stat()
+        with self._lock:
+            cached = self._hashes.get(filename)
+            if cached and cached[:2] == (stat.st_size, stat.st_mtime_ns):
+                return cached[2]
+        digest = _file_hash(path)
+        with self._lock:
+            self._hashes[filename] = (stat.st_size, stat.st_mtime_ns, digest)
+        return digest
+
+
+_district_asset_store: Optional[DistrictAssetStore] = None
+_district_asset_store_lock = threading.Lock()
+
+
+def get_district_asset_store() -> DistrictAssetStore:
+    """Süreç genelindeki DISTRICTS_DIR deposu (API uçları ve açılış build'i paylaşır)"""
+    global _district_asset_store
+    if _district_asset_store is None:
+        with _district_asset_store_lock:
+            if _district_asset_store is None:
+                _district_asset_store = DistrictAssetStore(DISTRICTS_DIR)
+    return _district_asset_store
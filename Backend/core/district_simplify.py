@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+"""İlçe GeoJSON sadeleştirme (low/medium çözünürlük seviyeleri).
+
+Douglas–Peucker ile nokta azaltma + koordinatları sabit ondalığa yuvarlama.
+Seviyeler districts dizinindeki tam çözünürlüklü il dosyalarından
+<dizin>/low/<il>.json ve <dizin>/medium/<il>.json olarak üretilir; çıktılar
+versiyonlanmaz, build_district_assets() her build'de yeniden yazar.
+"""
+
+import json
+import math
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+
+# Sadeleştirme seviyeleri: tolerance derece cinsinden (0.001° ≈ 100 m),
+# precision koordinat ondalık basamağı (3 ≈ 100 m, 4 ≈ 10 m)
+DETAIL_LEVELS = {
+    "low": {"tolerance": 0.002, "precision": 3},      # Ülke / bölge görünümü
+    "medium": {"tolerance": 0.0003, "precision": 4},  # İl görünümü
+}
+
+
+def _segment_distance(point, start, end):
+    """Noktanın [start, end] doğru parçasına uzaklığı (düzlemsel, derece)."""
+    (px, py), (ax, ay), (bx, by) = point, start, end
+    dx, dy = bx - ax, by - ay
+    if dx == 0 and dy == 0:
+        return math.hypot(px - ax, py - ay)
+    t = max(0.0, min(1.0, ((px - ax) * dx + (py - ay) * dy) / (dx * dx + dy * dy)))
+    return math.hypot(px - (ax + t * dx), py - (ay + t * dy))
+
+
+def douglas_peucker(points, tolerance):
+    """Douglas–Peucker nokta azaltma (özyinelemesiz, uzun halkalarda stack taşmaz)."""
+    if len(points) < 3:
+        return list(points)
+
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        max_distance, index = 0.0, None
+        for i in range(first + 1, last):
+            distance = _segment_distance(points[i], points[first], points[last])
+            if distance > max_distance:
+                max_distance, index = distance, i
+        if index is not None and max_distance > tolerance:
+            keep[index] = True
+            stack.append((first, index))
+            stack.append((index, last))
+
+    return [point for point, kept in zip(points, keep) if kept]
+
+
+def _quantize(points, precision):
+    """Koordinatları yuvarla, yuvarlama sonrası art arda tekrar eden noktaları at."""
+    result = []
+    for x, y in points:
+        point = [round(x, precision), round(y, precision)]
+        if not result or result[-1] != point:
+            result.append(point)
+    return result
+
+
+def simplify_ring(ring, tolerance, precision):
+    """Kapalı halkayı sadeleştir; geçerli halka (>= 4 nokta) kalmazsa None."""
+    if len(ring) < 4:
+        return None
+    # Kapalı halkada ilk == son nokta; DP'yi en uzak noktadan ikiye bölerek uygula
+    # ki halka tek bir doğru parçasına çökmesin
+    far = max(range(len(ring)), key=lambda i: (ring[i][0] - ring[0][0]) ** 2 + (ring[i][1] - ring[0][1]) ** 2)
+    simplified = douglas_peucker(ring[:far + 1], tolerance)[:-1] + douglas_peucker(ring[far:], tolerance)
+    simplified = _quantize(simplified, precision)
+    if simplified[0] != simplified[-1]:
+        simplified.append(simplified[0])
+    return simplified if len(simplified) >= 4 else None
+
+
+def _simplify_polygon(polygon, tolerance, precision):
+    exterior = simplify_ring(polygon[0], tolerance, precision)
+    if exterior is None:
+        return None
+    holes = [ring for ring in (simplify_ring(r, tolerance, precision) for r in polygon[1:]) if ring]
+    return [exterior] + holes
+
+
+def simplify_geometry(geometry, tolerance, precision):
+    """Polygon/MultiPolygon geometrisini sadeleştir.
+
+    Sadeleşince kaybolan küçük adalar ve delikler atılır; ilçenin hiç poligonu
+    kalmazsa en büyük poligon sadece yuvarlanarak korunur.
+    """
+    if not geometry:
+        return geometry
+    if geometry["type"] == "Polygon":
+        polygons = [geometry["coordinates"]]
+    elif geometry["type"] == "MultiPolygon":
+        polygons = geometry["coordinates"]
+    else:
+        return geometry
+
+    simplified = [p for p in (_simplify_polygon(p, tolerance, precision) for p in polygons) if p]
+    if not simplified:
+        largest = max(polygons, key=lambda p: len(p[0]))
+        simplified = [[_quantize(largest[0], precision)]]
+
+    if len(simplified) == 1:
+        return {"type": "Polygon", "coordinates": simplified[0]}
+    return {"type": "MultiPolygon", "coordinates": simplified}
+
+
+def write_detail_levels(output_dir, filenames: Optional[Iterable[str]] = None) -> Dict[str, int]:
+    """Kök dizindeki il dosyalarından her seviye için sadeleştirilmiş kopya yaz.
+
+    Seviye başına yazılan toplam bayt sayısını döndürür.
+    """
+    output_path = Path(output_dir)
+    sources = [output_path / name for name in filenames] if filenames else sorted(
+        p for p in output_path.glob("*.json") if p.name != "index.json"
+    )
+    totals = {level: 0 for level in DETAIL_LEVELS}
+
+    for source in sources:
+        with open(source, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+        for level, params in DETAIL_LEVELS.items():
+            level_dir = output_path / level
+            level_dir.mkdir(exist_ok=True)
+            features = [
+                {**feature, "geometry": simplify_geometry(feature.get("geometry"), **params)}
+                for feature in data.get("features", [])
+            ]
+            target = level_dir / source.name
+            with open(target, "w", encoding="utf-8") as f:
+                json.dump({"type": "FeatureCollection", "features": features}, f,
+                          ensure_ascii=False, separators=(",", ":"))
+            totals[level] += target.stat().st_size
+    return totals
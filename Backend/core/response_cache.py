@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+"""Analitik uçları için yanıt önbelleği.
+
+/analytics/* ve /results her panel açılışında baştan hesaplanır;
+veri ise sadece tarama oturumu bitince ya da silme yapılınca değişir.
+@cached_response ile işaretlenen uçların JSON gövdesi, normalize edilmiş
+filtre kümesi (build_count_key) anahtarıyla saklanır.
+
+Geçersiz kılma CountCache ile aynı nesil sayacıyla yapılır (Redis varsa
+REDIS_URL üzerinde, tüm API süreçleri ve Celery worker ortak). İsabet ve
+ıskalama sayaçları uç (namespace) bazında tutulur ve /cache/stats ile
+görülebilir.
+"""
+
+import functools
+import logging
+import threading
+from collections import Counter
+from typing import Any, Callable, Dict, Optional
+
+import orjson
+from fastapi.responses import Response
+from sqlalchemy.orm import Session
+
+from core.count_cache import CountCache, build_count_key, invalidate_after_transaction
+
+logger = logging.getLogger(__name__)
+
+RESPONSE_CACHE_KEY_PREFIX = "response_cache"
+RESPONSE_CACHE_TTL_SECONDS = 600
+
+
+class ResponseCache(CountCache):
+    """JSON yanıt gövdelerini uç + filtre anahtarıyla saklayan önbellek"""
+
+    def __init__(
+        self,
+        redis_client=None,
+        ttl_seconds: int = RESPONSE_CACHE_TTL_SECONDS,
+        key_prefix: str = RESPONSE_CACHE_KEY_PREFIX,
+    ):
+        super().__init__(redis_client=redis_client, ttl_seconds=ttl_seconds, key_prefix=key_prefix)
+        self._local_stats: Counter = Counter()
+
+    @property
+    def stats_key(self) -> str:
+        return f"{self.key_prefix}:stats"
+
+    def get_body(self, namespace: str, key: str) -> Optional[str]:
+        body = self._get_raw(f"{namespace}:{key}")
+        self._record(namespace, "hits" if body is not None else "misses")
+        return body
+
+    def set_body(self, namespace: str, key: str, body: str) -> None:
+        self._set_raw(f"{namespace}:{key}", body)
+
+    def _record(self, namespace: str, outcome: str) -> None:
+        if self.redis_client is not None:
+            try:
+                self.redis_client.hincrby(self.stats_key, f"{namespace}:{outcome}", 1)
+                return
+            except Exception as exc:
+                logger.warning(f"Response cache stats write failed: {exc}")
+        with self._lock:
+            self._local_stats[f"{namespace}:{outcome}"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Toplam ve uç bazında isabet/ıskalama sayıları"""
+        counters = dict(self._local_stats)
+        if self.redis_client is not None:
+            try:
+                counters = {key: int(value) for key, value in (self.redis_client.hgetall(self.stats_key) or {}).items()}
+            except Exception as exc:
+                logger.warning(f"Response cache stats read failed: {exc}")
+
+        routes: Dict[str, Dict[str, int]] = {}
+        for field, value in counters.items():
+            namespace, _, outcome = field.rpartition(":")
+            routes.setdefault(namespace, {"hits": 0, "misses": 0})[outcome] = value
+        hits = sum(route["hits"] for route in routes.values())
+        misses = sum(route["misses"] for route in routes.values())
+        return {
+            "shared": self.shared,
+            "generation": self._generation(),
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": round(hits / (hits + misses), 3) if hits + misses else None,
+            "routes": routes,
+        }
+
+
+_response_cache: Optional[ResponseCache] = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """Süreç genelindeki yanıt önbelleği; RESPONSE_CACHE kapalıysa None"""
+    global _response_cache
+    from core.config import get_config
+
+    config = get_config()
+    if not config.response_cache:
+        return None
+    if _response_cache is None:
+        with _response_cache_lock:
+            if _response_cache is None:
+                redis_client = None
+                if config.response_cache_redis:
+                    try:
+                        from core.task_status import get_redis_client
+                        redis_client = get_redis_client()
+                    except Exception as exc:
+                        logger.warning(f"Shared response cache unavailable, using in-process cache: {exc}")
+                _response_cache = ResponseCache(redis_client=redis_client, ttl_seconds=config.response_cache_ttl)
+    return _response_cache
+
+
+def _invalidate_responses() -> None:
+    cache = get_response_cache()
+    if cache is not None:
+        cache.invalidate()
+
+
+def invalidate_response_cache(db: Optional[Session] = None) -> None:
+    """Önbellekteki yanıtları geçersiz kıl.
+
+    db verilirse sayaç o oturumun dış transaction'ı bittikten sonra bir kez
+    daha artırılır; böylece commit'ten önce hesaplanıp yeni nesle yazılan
+    bayat yanıtlar da düşer.
+    """
+    _invalidate_responses()
+    if db is not None:
+        invalidate_after_transaction(db, _invalidate_responses)
+
+
+def _response_body(result: Any) -> Optional[str]:
+    """Önbelleğe yazılacak JSON gövdesi; başarılı JSON değilse None"""
+    if isinstance(result, Response):
+        if result.status_code == 200 and result.media_type == "application/json":
+            return bytes(result.body).decode("utf-8")
+        return None
+    return orjson.dumps(result, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY, default=str).decode("utf-8")
+
+
+def cached_response(namespace: str) -> Callable:
+    """Async FastAPI ucunun JSON yanıtını filtre argümanlarına göre önbelleğe al"""
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            cache = get_response_cache()
+            if cache is None:
+                return await func(*args, **kwargs)
+
+            key = build_count_key({name: value for name, value in kwargs.items() if not isinstance(value, Session)})
+            body = cache.get_body(namespace, key)
+            if body is not None:
+                return Response(content=body, media_type="application/json", headers={"X-Cache": "HIT"})
+
+            result = await func(*args, **kwargs)
+            body = _response_body(result)
+            if body is not None:
+                cache.set_body(namespace, key, body)
+            return result
+        return wrapper
+    return decorator
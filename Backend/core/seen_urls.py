@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""Tarama oturumu boyunca görülen ilan URL'leri için Bloom filtresi.
+
+Aynı ilan öne çıkan kartlar ve örtüşen il/ilçe taramaları yüzünden birden
+çok sayfada görünür. Filtre bu tekrarları DB'ye gitmeden eler. Yanlış
+pozitif oranı (error_rate) kadar yeni ilan o oturumda atlanabilir; bir
+sonraki taramada yakalanır. İsteğe bağlı olarak aynı scrape_session_id için
+worker'lar arasında Redis bitmap'i üzerinden paylaşılır.
+"""
+
+import hashlib
+import logging
+import math
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SEEN_URLS_KEY_PREFIX = "seen_urls"
+SEEN_URLS_TTL_SECONDS = 86400
+
+
+def build_seen_urls_key(scrape_session_id: Any) -> str:
+    return f"{SEEN_URLS_KEY_PREFIX}:{scrape_session_id}"
+
+
+def bloom_parameters(capacity: int, error_rate: float) -> Tuple[int, int]:
+    """Kapasite ve hata oranı için (bit sayısı, hash sayısı)"""
+    capacity = max(1, capacity)
+    error_rate = min(max(error_rate, 1e-9), 0.5)
+    num_bits = math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))
+    num_hashes = max(1, round(num_bits / capacity * math.log(2)))
+    return num_bits, num_hashes
+
+
+def _default_url_getter(listing: Dict[str, Any]) -> Optional[str]:
+    return listing.get("ilan_linki") or listing.get("ilan_url")
+
+
+class SeenUrlFilter:
+    """Olasılıksal görülen-URL kümesi (yerel bytearray ya da Redis bitmap)"""
+
+    def __init__(
+        self,
+        capacity: int = 200000,
+        error_rate: float = 0.001,
+        redis_client=None,
+        redis_key: Optional[str] = None,
+        ttl_seconds: int = SEEN_URLS_TTL_SECONDS,
+    ):
+        self.num_bits, self.num_hashes = bloom_parameters(capacity, error_rate)
+        self.redis_client = redis_client if redis_key else None
+        self.redis_key = redis_key
+        self.ttl_seconds = ttl_seconds
+        self._bits: Optional[bytearray] = None if self.redis_client else self._new_bits()
+        self._ttl_set = False
+        self.checks = 0
+        self.hits = 0
+
+    @property
+    def shared(self) -> bool:
+        return self.redis_client is not None
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.checks if self.checks else 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "seen_url_checks": self.checks,
+            "seen_url_hits": self.hits,
+            "seen_url_hit_rate": round(self.hit_rate * 100, 2),
+        }
+
+    def _new_bits(self) -> bytearray:
+        return bytearray((self.num_bits + 7) // 8)
+
+    def _positions(self, url: str) -> List[int]:
+        # Çift hash (Kirsch-Mitzenmacher): tek BLAKE2b özetinden k pozisyon
+        digest = hashlib.blake2b(url.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def check_and_add_many(self, urls: List[str]) -> List[bool]:
+        """Her URL için 'muhtemelen görüldü' bilgisini döndür ve kümeye ekle"""
+        if not urls:
+            return []
+        positions = [self._positions(url) for url in urls]
+        if self.redis_client is not None:
+            try:
+                seen = self._check_and_add_redis(positions)
+            except Exception as e:
+                logger.warning(f"Seen-URL Redis filter unavailable, falling back to local: {e}")
+                self.redis_client = None
+                self._bits = self._new_bits()
+                seen = self._check_and_add_local(positions)
+        else:
+            seen = self._check_and_add_local(positions)
+
+        self.checks += len(urls)
+        self.hits += sum(seen)
+        return seen
+
+    def _check_and_add_local(self, positions: List[List[int]]) -> List[bool]:
+        bits = self._bits
+        seen = []
+        for url_positions in positions:
+            all_set = True
+            for pos in url_positions:
+                byte_index, mask = pos >> 3, 1 << (pos & 7)
+                if not bits[byte_index] & mask:
+                    all_set = False
+                    bits[byte_index] |= mask
+            seen.append(all_set)
+        return seen
+
+    def _check_and_add_redis(self, positions: List[List[int]]) -> List[bool]:
+        # SETBIT eski biti döndürür: tek round-trip'te hem kontrol hem ekleme
+        pipe = self.redis_client.pipeline(transaction=False)
+        for url_positions in positions:
+            for pos in url_positions:
+                pipe.setbit(self.redis_key, pos, 1)
+        if not self._ttl_set:
+            pipe.expire(self.redis_key, self.ttl_seconds)
+        results = pipe.execute()
+        self._ttl_set = True
+
+        seen = []
+        offset = 0
+        for url_positions in positions:
+            count = len(url_positions)
+            seen.append(all(results[offset:offset + count]))
+            offset += count
+        return seen
+
+    def filter_new(
+        self,
+        listings: List[Dict[str, Any]],
+        url_getter: Callable[[Dict[str, Any]], Optional[str]] = _default_url_getter,
+    ) -> List[Dict[str, Any]]:
+        """Bu oturumda daha önce görülmüş ilanları ele (URL'siz ilanlar kalır)"""
+        keyed = [(listing, url_getter(listing)) for listing in listings]
+        urls = [url for _, url in keyed if url]
+        seen = iter(self.check_and_add_many(urls))
+        return [listing for listing, url in keyed if not url or not next(seen)]
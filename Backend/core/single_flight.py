@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+"""Pahalı analitik sorguları için istek birleştirme (single-flight).
+
+Tarama bittikten hemen sonra birkaç kullanıcı analiz sayfasını açınca aynı
+get_price_analytics / get_city_analytics sorgusu eşzamanlı çalışıp her biri
+tabloyu baştan tarar. SingleFlight aynı anahtarlı eşzamanlı istekleri tek
+hesaplamada birleştirir:
+
+    süreç içi   ilk istek hesaplamayı bir asyncio.Task olarak başlatır,
+                diğerleri aynı görevi bekler. Görev asyncio.shield ile
+                beklenir; isteği yapan iptal edilse de hesaplama diğer
+                bekleyenler için tamamlanır
+    süreçler    Redis'te SET NX kilidini alan worker hesaplar; kilidi
+    arası       alamayanlar kilitteki jetona ait sonucu bekler. Kilit sahibi
+                düşerse (kilit süresi dolar) bekleyenlerden biri devralır.
+
+Sonuç anahtarı kilit jetonunu içerdiği için önceki turdan kalan bir sonuç
+yeni bir hesaplama yerine kullanılmaz; kalıcı önbellek core/response_cache.py'dedir.
+Redis istemcisi senkron olduğundan tüm çağrıları thread pool'da yapılır,
+event loop bloklanmaz.
+"""
+
+import asyncio
+import functools
+import logging
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Any, Callable, Dict, Optional
+
+import orjson
+from starlette.concurrency import run_in_threadpool
+
+from core.count_cache import build_count_key
+
+logger = logging.getLogger(__name__)
+
+SINGLE_FLIGHT_KEY_PREFIX = "single_flight"
+
+
+class SingleFlight:
+    """Aynı anahtarlı eşzamanlı hesaplamaları tek çalıştırmada birleştirir"""
+
+    def __init__(
+        self,
+        redis_client=None,
+        lock_ttl_seconds: int = 60,
+        wait_timeout_seconds: float = 60,
+        result_ttl_seconds: int = 30,
+        poll_interval_seconds: float = 0.05,
+        key_prefix: str = SINGLE_FLIGHT_KEY_PREFIX,
+    ):
+        self.redis_client = redis_client
+        self.lock_ttl_seconds = lock_ttl_seconds
+        self.wait_timeout_seconds = wait_timeout_seconds
+        self.result_ttl_seconds = result_ttl_seconds
+        self.poll_interval_seconds = poll_interval_seconds
+        self.key_prefix = key_prefix
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._stats: Counter = Counter()
+
+    @property
+    def shared(self) -> bool:
+        return self.redis_client is not None
+
+    def stats(self) -> Dict[str, Any]:
+        """leaders: hesaplayan istek, local/remote: sonucu paylaşan istek sayısı"""
+        return {"shared": self.shared, "in_flight": len(self._inflight), **dict(self._stats)}
+
+    async def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        """fn'i (senkron) çalıştır; aynı anahtar zaten hesaplanıyorsa onun sonucunu bekle"""
+        task = self._inflight.get(key)
+        if task is not None:
+            self._stats["local_waiters"] += 1
+        else:
+            task = asyncio.ensure_future(self._run_shared(key, fn))
+            self._inflight[key] = task
+            task.add_done_callback(functools.partial(self._finish, key))
+        # İptal edilen istek (istemci bağlantıyı kesti) ortak hesaplamayı iptal etmez
+        return await asyncio.shield(task)
+
+    def _finish(self, key: str, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # Bekleyen kalmadıysa "never retrieved" uyarısı çıkmasın
+
+    async def _redis(self, method: str, *args, **kwargs) -> Any:
+        """Senkron Redis çağrısını event loop'u bloklamadan çalıştır"""
+        return await run_in_threadpool(getattr(self.redis_client, method), *args, **kwargs)
+
+    async def _compute(self, fn: Callable[[], Any]) -> Any:
+        self._stats["leaders"] += 1
+        return await run_in_threadpool(fn)
+
+    async def _run_shared(self, key: str, fn: Callable[[], Any]) -> Any:
+        if self.redis_client is None:
+            return await self._compute(fn)
+
+        lock_key = f"{self.key_prefix}:lock:{key}"
+        deadline = time.monotonic() + self.wait_timeout_seconds
+        while True:
+            token = uuid.uuid4().hex
+            try:
+                acquired = await self._redis("set", lock_key, token, nx=True, px=self.lock_ttl_seconds * 1000)
+            except Exception as exc:
+                logger.warning(f"Single-flight lock failed, computing locally: {exc}")
+                return await self._compute(fn)
+
+            if acquired:
+                return await self._lead(lock_key, token, fn)
+
+            found, result = await self._wait_for_leader(lock_key, deadline)
+            if found:
+                self._stats["remote_waiters"] += 1
+                return result
+            if time.monotonic() >= deadline:
+                logger.warning(f"Single-flight wait timed out for {key}, computing locally")
+                return await self._compute(fn)
+            # Kilit sonuç bırakmadan kalktı (sahip hata aldı) - kilidi yeniden dene
+
+    async def _lead(self, lock_key: str, token: str, fn: Callable[[], Any]) -> Any:
+        try:
+            result = await self._compute(fn)
+            try:
+                await self._redis(
+                    "setex",
+                    f"{lock_key}:result:{token}", self.result_ttl_seconds,
+                    orjson.dumps(result, option=orjson.OPT_NON_STR_KEYS, default=str).decode("utf-8"),
+                )
+            except Exception as exc:
+                logger.warning(f"Single-flight result publish failed: {exc}")
+            return result
+        finally:
+            try:
+                # Süresi dolup başkasına geçmiş kilidi silme
+                if await self._redis("get", lock_key) == token:
+                    await self._redis("delete", lock_key)
+            except Exception as exc:
+                logger.warning(f"Single-flight unlock failed: {exc}")
+
+    async def _wait_for_leader(self, lock_key: str, deadline: float):
+        """(bulundu_mu, sonuç); kilit sonuç bırakmadan kalkar ya da süre dolarsa bulunamadı"""
+        token = None
+        while time.monotonic() < deadline:
+            try:
+                # Kilit kalkmış olsa da son görülen sahibin sonucu yayınlanmış olabilir
+                token = await self._redis("get", lock_key) or token
+                if token is None:
+                    return False, None
+                raw = await self._redis("get", f"{lock_key}:result:{token}")
+                if raw is None and await self._redis("get", lock_key) is None:
+                    raw = await self._redis("get", f"{lock_key}:result:{token}")
+                    if raw is None:
+                        return False, None
+            except Exception as exc:
+                logger.warning(f"Single-flight wait failed: {exc}")
+                return False, None
+            if raw is not None:
+                return True, orjson.loads(raw)
+            await asyncio.sleep(self.poll_interval_seconds)
+        return False, None
+
+
+_single_flight: Optional[SingleFlight] = None
+_single_flight_lock = threading.Lock()
+
+
+def get_single_flight() -> Optional[SingleFlight]:
+    """Süreç genelindeki birleştirici; SINGLE_FLIGHT kapalıysa None"""
+    global _single_flight
+    from core.config import get_config
+
+    config = get_config()
+    if not config.single_flight:
+        return None
+    if _single_flight is None:
+        with _single_flight_lock:
+            if _single_flight is None:
+                redis_client = None
+                if config.single_flight_redis:
+                    try:
+                        from core.task_status import get_redis_client
+                        redis_client = get_redis_client()
+                    except Exception as exc:
+                        logger.warning(f"Shared single-flight unavailable, coalescing in-process only: {exc}")
+                _single_flight = SingleFlight(
+                    redis_client=redis_client,
+                    lock_ttl_seconds=config.single_flight_lock_ttl,
+                    wait_timeout_seconds=config.single_flight_lock_ttl,
+                )
+    return _single_flight
+
+
+async def coalesce(namespace: str, filters: Dict[str, Any], fn: Callable[[], Any]) -> Any:
+    """Aynı filtreli eşzamanlı çağrıları birleştir; kapalıysa fn doğrudan çalışır"""
+    flight = get_single_flight()
+    if flight is None:
+        return fn()
+    return await flight.do(f"{namespace}:{build_count_key(filters)}", fn)
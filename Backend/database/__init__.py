@@ -4,7 +4,7 @@ Database module for Real Estate Scraper
 """
 
 from .connection import get_db, engine, SessionLocal
-from .models import Base, Location, Listing, ScrapeSession, FailedPage, PriceHistory
+from .models import Base, Location, Listing, ScrapeSession, FailedPage, PriceHistory, ArchivedListing, ArchivedPriceHistory, ListingSummary
 
 __all__ = [
     'get_db',
@@ -15,5 +15,8 @@ __all__ = [
     'Listing',
     'ScrapeSession',
     'FailedPage',
-    'PriceHistory'
+    'PriceHistory',
+    'ArchivedListing',
+    'ArchivedPriceHistory',
+    'ListingSummary'
 ]
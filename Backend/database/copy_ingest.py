@@ -0,0 +1,399 @@
+# -*- coding: utf-8 -*-
+"""PostgreSQL için COPY tabanlı toplu ilan aktarımı.
+
+Büyük taramalarda çok satırlı INSERT'ler bile yavaş kalır. Bu modül
+ayrıştırılmış ilanları UNLOGGED bir ara tabloya COPY FROM STDIN ile aktarır,
+ardından tek bir küme tabanlı ifadeyle lokasyonları çözer, ilanları
+(platform, external_id) ya da ilan_url üzerinden upsert eder ve fiyat
+değişikliklerini price_history'ye yazar.
+
+İsteğe bağlıdır (DB_COPY_INGEST=true); birleştirme ifadesi
+tests/test_copy_ingest_postgresql.py ile gerçek PostgreSQL'de sınanır.
+"""
+
+import io
+import json
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+from core.config import get_config
+from .hashing import CONTENT_HASH_VERSION, compute_legacy_content_hash
+from .listing_keys import extract_external_id
+from .location_keys import fill_location_keys
+from .location_resolver import LocationResolver, normalize_location_key
+from . import crud
+
+STAGE_TABLE = "listings_ingest_stage"
+
+STAGE_COLUMNS = (
+    "batch_id", "ilan_url", "external_id", "baslik", "fiyat", "fiyat_text", "emlak_ofisi",
+    "resim_url", "details", "content_hash", "legacy_hash", "ilan_tarihi", "il",
+    "ilce", "mahalle",
+)
+
+_CREATE_STAGE_SQL = f"""
+CREATE UNLOGGED TABLE IF NOT EXISTS {STAGE_TABLE} (
+    batch_id TEXT NOT NULL,
+    ilan_url TEXT NOT NULL,
+    external_id TEXT,
+    baslik TEXT,
+    fiyat DOUBLE PRECISION,
+    fiyat_text TEXT,
+    emlak_ofisi TEXT,
+    resim_url TEXT,
+    details TEXT,
+    content_hash TEXT,
+    legacy_hash TEXT,
+    ilan_tarihi DATE,
+    il TEXT NOT NULL,
+    ilce TEXT,
+    mahalle TEXT
+)
+"""
+
+_CREATE_STAGE_INDEX_SQL = f"""
+CREATE INDEX IF NOT EXISTS idx_{STAGE_TABLE}_batch ON {STAGE_TABLE} (batch_id)
+"""
+
+# Daha önce oluşturulmuş ara tablolara sonradan eklenen kolonlar
+_ALTER_STAGE_SQL = f"""
+ALTER TABLE {STAGE_TABLE}
+    ADD COLUMN IF NOT EXISTS legacy_hash TEXT,
+    ADD COLUMN IF NOT EXISTS external_id TEXT
+"""
+
+_COPY_SQL = (
+    f"COPY {STAGE_TABLE} ({', '.join(STAGE_COLUMNS)}) "
+    "FROM STDIN WITH (FORMAT csv)"
+)
+
+# Eksik lokasyonları tek seferde ekle (uq_location NULL'ları ayırt etmediği için NOT EXISTS)
+_INSERT_LOCATIONS_SQL = f"""
+INSERT INTO locations (il, ilce, mahalle)
+SELECT DISTINCT s.il, s.ilce, s.mahalle
+FROM {STAGE_TABLE} s
+WHERE s.batch_id = :batch_id
+  AND NOT EXISTS (
+      SELECT 1 FROM locations l
+      WHERE l.il = s.il
+        AND l.ilce IS NOT DISTINCT FROM s.ilce
+        AND l.mahalle IS NOT DISTINCT FROM s.mahalle
+  )
+ON CONFLICT DO NOTHING
+"""
+
+# upsert_listing kuralları küme tabanlı: birebir aynı URL, yoksa ilan numarası
+# eşleşir; boş gelen alanlar mevcut değeri korur, fiyat değişimi price_history'ye
+# yazılır, değişmeyenler sadece oturuma bağlanır (slug değiştiyse URL'si de)
+_MERGE_SQL = f"""
+WITH staged AS (
+    SELECT s.*,
+           (SELECT min(l.id) FROM locations l
+             WHERE l.il = s.il
+               AND l.ilce IS NOT DISTINCT FROM s.ilce
+               AND l.mahalle IS NOT DISTINCT FROM s.mahalle) AS location_id
+    FROM {STAGE_TABLE} s
+    WHERE s.batch_id = :batch_id
+),
+locked AS (
+    SELECT l.id, l.platform, l.ilan_url, l.external_id, l.fiyat, l.content_hash,
+           l.content_hash_version
+    FROM listings l
+    WHERE l.ilan_url IN (SELECT ilan_url FROM staged)
+       OR (l.platform = :platform
+           AND l.external_id IN (SELECT external_id FROM staged WHERE external_id IS NOT NULL))
+    FOR UPDATE OF l
+),
+current_rows AS (
+    SELECT DISTINCT ON (s.ilan_url)
+           s.ilan_url AS stage_url, k.id, k.fiyat AS old_fiyat, k.content_hash AS old_hash,
+           k.content_hash_version AS old_version,
+           -- Numarası boş eski satıra numara, başka satır tutmuyorsa yazılır
+           COALESCE(k.external_id, CASE WHEN NOT EXISTS (
+               SELECT 1 FROM locked o
+               WHERE o.platform = :platform AND o.external_id = s.external_id
+           ) THEN s.external_id END) AS target_external_id
+    FROM staged s
+    JOIN locked k
+      ON k.ilan_url = s.ilan_url
+      OR (k.platform = :platform AND k.external_id = s.external_id)
+    ORDER BY s.ilan_url, (k.ilan_url = s.ilan_url) DESC
+),
+changed AS (
+    SELECT s.*, c.id AS listing_id, c.old_fiyat, c.target_external_id
+    FROM staged s
+    JOIN current_rows c ON c.stage_url = s.ilan_url
+    WHERE (s.fiyat IS NOT NULL AND c.old_fiyat IS DISTINCT FROM s.fiyat)
+       OR CASE WHEN c.old_version = :hash_version
+               THEN c.old_hash IS DISTINCT FROM s.content_hash
+               ELSE c.old_hash IS DISTINCT FROM s.legacy_hash END
+),
+updated AS (
+    UPDATE listings l SET
+        ilan_url = c.ilan_url,
+        external_id = c.target_external_id,
+        baslik = COALESCE(NULLIF(c.baslik, ''), l.baslik),
+        fiyat = COALESCE(c.fiyat, l.fiyat),
+        fiyat_text = CASE WHEN c.fiyat IS NOT NULL THEN c.fiyat_text ELSE l.fiyat_text END,
+        emlak_ofisi = COALESCE(NULLIF(c.emlak_ofisi, ''), l.emlak_ofisi),
+        resim_url = COALESCE(NULLIF(c.resim_url, ''), l.resim_url),
+        details = CASE
+            WHEN c.details IS NULL THEN l.details
+            ELSE (COALESCE(l.details::jsonb, '{{}}'::jsonb) || c.details::jsonb)::json
+        END,
+        content_hash = c.content_hash,
+        content_hash_version = :hash_version,
+        updated_at = :now,
+        last_seen_at = :now,
+        scrape_session_id = :scrape_session_id
+    FROM changed c
+    WHERE l.id = c.listing_id
+    RETURNING l.id
+),
+touched AS (
+    -- Eski sürüm hash'ler ve değişen URL slug'ları burada sessizce düzeltilir
+    UPDATE listings l SET
+        scrape_session_id = :scrape_session_id,
+        last_seen_at = :now,
+        content_hash = s.content_hash,
+        content_hash_version = :hash_version,
+        ilan_url = s.ilan_url,
+        external_id = c.target_external_id
+    FROM current_rows c
+    JOIN staged s ON s.ilan_url = c.stage_url
+    WHERE l.id = c.id
+      AND c.id NOT IN (SELECT listing_id FROM changed)
+    RETURNING l.id
+),
+price_rows AS (
+    INSERT INTO price_history (listing_id, old_price, new_price, price_change, price_change_percent, changed_at)
+    SELECT c.listing_id, c.old_fiyat, c.fiyat, c.fiyat - c.old_fiyat,
+           CASE WHEN c.old_fiyat > 0
+                THEN round(((c.fiyat - c.old_fiyat) / c.old_fiyat * 100)::numeric, 2)::double precision
+                ELSE 0 END,
+           :now
+    FROM changed c
+    WHERE c.fiyat IS NOT NULL AND c.old_fiyat IS NOT NULL AND c.old_fiyat <> c.fiyat
+    RETURNING 1
+),
+inserted AS (
+    INSERT INTO listings (
+        baslik, fiyat, fiyat_text, platform, kategori, ilan_tipi, alt_kategori,
+        location_id, ilan_url, external_id, ilan_tarihi, emlak_ofisi, resim_url, details,
+        scrape_session_id, content_hash, content_hash_version, created_at, updated_at, last_seen_at
+    )
+    SELECT COALESCE(s.baslik, 'Başlık Yok'), s.fiyat, s.fiyat_text, :platform, :kategori,
+           :ilan_tipi, :alt_kategori, s.location_id, s.ilan_url, s.external_id, s.ilan_tarihi,
+           s.emlak_ofisi, s.resim_url, s.details::json, :scrape_session_id,
+           s.content_hash, :hash_version, :now, :now, :now
+    FROM staged s
+    WHERE NOT EXISTS (SELECT 1 FROM current_rows c WHERE c.stage_url = s.ilan_url)
+    -- Hedefsiz: eşzamanlı eklenen ilan_url ya da (platform, external_id) atlanır
+    ON CONFLICT DO NOTHING
+    RETURNING id
+)
+SELECT
+    (SELECT count(*) FROM inserted) AS new_count,
+    (SELECT count(*) FROM updated) AS updated_count,
+    (SELECT count(*) FROM touched) AS unchanged_count,
+    (SELECT count(*) FROM price_rows) AS price_count
+"""
+
+_DELETE_STAGE_SQL = f"DELETE FROM {STAGE_TABLE} WHERE batch_id = :batch_id"
+
+_stage_ready = False
+
+
+def should_use_copy_ingest(db: Session, record_count: int) -> bool:
+    """COPY yolu sadece PostgreSQL'de ve yeterince büyük batch'lerde kullanılır"""
+    config = get_config()
+    return (
+        config.db_copy_ingest
+        and record_count >= config.db_copy_ingest_min_rows
+        and db.get_bind().dialect.name == "postgresql"
+    )
+
+
+def ensure_stage_table(engine) -> None:
+    """UNLOGGED ara tabloyu (yoksa) oluştur - süreç başına bir kez.
+
+    Çağıranın transaction'ı geri alınsa bile tablo kalsın diye ayrı bir
+    bağlantıda commit edilir.
+    """
+    global _stage_ready
+    if _stage_ready:
+        return
+    try:
+        with engine.begin() as conn:
+            conn.execute(text(_CREATE_STAGE_SQL))
+            conn.execute(text(_CREATE_STAGE_INDEX_SQL))
+            conn.execute(text(_ALTER_STAGE_SQL))
+    except DBAPIError:
+        # Başka bir worker aynı anda oluşturmuş olabilir (IF NOT EXISTS yarışı)
+        with engine.connect() as conn:
+            exists = conn.execute(text("SELECT to_regclass(:name)"), {"name": STAGE_TABLE}).scalar()
+        if not exists:
+            raise
+    _stage_ready = True
+
+
+def legacy_hash_keys(db: Session, platform: str, records: List[Dict[str, Any]]) -> Set[str]:
+    """Hâlâ v1 hash'li satırlarla eşleşen kayıtların URL'leri ve ilan numaraları.
+
+    v1 satır kalmadıysa idx_listings_hash_v1 üzerinden hemen boş döner.
+    """
+    if not db.execute(text(
+        "SELECT EXISTS (SELECT 1 FROM listings WHERE content_hash_version IS NULL)"
+    )).scalar():
+        return set()
+    urls = [url for url in map(crud._extract_listing_url, records) if url]
+    external_ids = [external_id for external_id in (extract_external_id(platform, url) for url in urls) if external_id]
+    rows = db.execute(text(
+        "SELECT ilan_url, external_id FROM listings WHERE content_hash_version IS NULL "
+        "AND (ilan_url = ANY(:urls) OR (platform = :platform AND external_id = ANY(:external_ids)))"
+    ), {"urls": urls, "platform": platform, "external_ids": external_ids}).all()
+    return {key for row in rows for key in (row.ilan_url, row.external_id) if key}
+
+
+def build_stage_rows(
+    records: List[Dict[str, Any]],
+    batch_id: str,
+    platform: Optional[str] = None,
+    legacy_keys: Set[str] = frozenset()
+) -> Tuple[List[Tuple], List[Dict[str, Any]], int]:
+    """Kayıtları ara tablo satırlarına çevir.
+
+    (satirlar, URL'siz kayitlar, batch içi tekrar sayısı) döner. Aynı ilan
+    (ilan numarası, yoksa URL) batch içinde tekrar ederse son görülen kullanılır.
+    v1 hash sadece URL'si ya da numarası legacy_keys'te olan kayıtlar için hesaplanır.
+    """
+    batch: Dict[str, Tuple[str, Optional[str], Dict[str, Any]]] = {}
+    url_less: List[Dict[str, Any]] = []
+    duplicates = 0
+    for data in records:
+        ilan_url = crud._extract_listing_url(data)
+        if not ilan_url:
+            url_less.append(data)
+            continue
+        external_id = extract_external_id(platform, ilan_url)
+        key = external_id or ilan_url
+        if key in batch:
+            duplicates += 1
+        batch[key] = (ilan_url, external_id, data)
+
+    rows = []
+    for ilan_url, external_id, data in batch.values():
+        fiyat_text = data.get('fiyat', '')
+        details = crud._extract_details(data)
+        ilan_tarihi = crud._parse_listing_date(data)
+        il, ilce, mahalle = normalize_location_key(*crud._extract_location_parts(data))
+        rows.append((
+            batch_id,
+            ilan_url,
+            external_id,
+            data.get('baslik'),
+            crud.parse_price(fiyat_text),
+            str(fiyat_text) if fiyat_text else None,
+            data.get('emlak_ofisi'),
+            data.get('resim_url'),
+            json.dumps(details, ensure_ascii=False) if details else None,
+            crud.compute_content_hash(data),
+            # v1 satırla eşleşmeyen kayıtta NULL; eşzamanlı kalan bir v1 satır değişmiş sayılır
+            compute_legacy_content_hash(data) if ilan_url in legacy_keys or external_id in legacy_keys else None,
+            ilan_tarihi.isoformat() if ilan_tarihi else None,
+            il,
+            ilce,
+            mahalle,
+        ))
+    return rows, url_less, duplicates
+
+
+def _copy_field(value: Any) -> str:
+    # COPY CSV: tırnaksız boş alan NULL, tırnaklı "" boş string demektir
+    if value is None:
+        return ""
+    if isinstance(value, (int, float)):
+        return repr(value)
+    return '"' + str(value).replace('"', '""') + '"'
+
+
+def write_copy_buffer(rows: List[Tuple]) -> io.StringIO:
+    """Satırları COPY FROM STDIN (FORMAT csv) girdisine çevir"""
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write(",".join(_copy_field(value) for value in row))
+        buffer.write("\n")
+    buffer.seek(0)
+    return buffer
+
+
+def copy_upsert_listings(
+    db: Session,
+    records: List[Dict[str, Any]],
+    platform: str,
+    kategori: str,
+    ilan_tipi: str,
+    alt_kategori: Optional[str] = None,
+    scrape_session_id: Optional[int] = None,
+    location_resolver: Optional[LocationResolver] = None
+) -> Tuple[int, int, int]:
+    """İlanları COPY + küme tabanlı birleştirme ile upsert et.
+
+    bulk_upsert_listings ile aynı kurallar ve aynı (yeni, guncellenen,
+    degismeyen) dönüşü. Her şey çağıranın transaction'ı içinde çalışır;
+    commit/rollback çağırana aittir.
+    """
+    if not records:
+        return (0, 0, 0)
+
+    batch_id = uuid.uuid4().hex
+    rows, url_less, duplicates = build_stage_rows(
+        records, batch_id, platform, legacy_hash_keys(db, platform, records)
+    )
+    new_count = updated_count = 0
+    unchanged_count = duplicates
+
+    if rows:
+        ensure_stage_table(db.get_bind())
+        # COPY, oturumun kendi bağlantısı (ve transaction'ı) üzerinden yapılır
+        raw_connection = db.connection().connection
+        cursor = raw_connection.cursor()
+        try:
+            cursor.copy_expert(_COPY_SQL, write_copy_buffer(rows))
+        finally:
+            cursor.close()
+
+        db.execute(text(_INSERT_LOCATIONS_SQL), {"batch_id": batch_id})
+        fill_location_keys(db)
+        result = db.execute(text(_MERGE_SQL), {
+            "batch_id": batch_id,
+            "now": datetime.utcnow(),
+            "platform": platform,
+            "kategori": kategori,
+            "ilan_tipi": ilan_tipi,
+            "alt_kategori": alt_kategori,
+            "scrape_session_id": scrape_session_id,
+            "hash_version": CONTENT_HASH_VERSION,
+        }).one()
+        db.execute(text(_DELETE_STAGE_SQL), {"batch_id": batch_id})
+
+        new_count += result.new_count
+        updated_count += result.updated_count
+        unchanged_count += result.unchanged_count
+
+    if url_less:
+        # URL'siz ilanlar birleştirilemez, her zaman yeni satırdır
+        extra = crud.bulk_upsert_listings(
+            db, url_less, platform, kategori, ilan_tipi,
+            alt_kategori=alt_kategori,
+            scrape_session_id=scrape_session_id,
+            location_resolver=location_resolver,
+        )
+        new_count += extra[0]
+
+    return (new_count, updated_count, unchanged_count)
@@ -1,51 +1,37 @@
 # -*- coding: utf-8 -*-
 """Veritabani CRUD islemleri."""
 
-import re
-import hashlib
 import json
-from datetime import datetime
-from typing import Optional, List, Dict, Any, Tuple
-from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, or_
+import re
+from datetime import datetime, timedelta
+from typing import Optional, List, Dict, Any, Iterator, Tuple
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import func, and_, or_, insert, update, select, literal
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.exc import IntegrityError
 
+from core.config import get_config
+from core.count_cache import build_count_key, get_count_cache, invalidate_listing_counts
+from core.response_cache import invalidate_response_cache
 from core.task_status import (
     SCRAPE_SESSION_STATUS_COMPLETED,
     SCRAPE_SESSION_STATUS_RUNNING,
     SCRAPE_SESSION_STATUS_VALUES,
     normalize_scrape_session_status,
 )
-from .models import Location, Listing, ScrapeSession, FailedPage, PriceHistory
-
-
-# ============== Hash Yardımcıları ==============
-
-def compute_content_hash(data: Dict[str, Any]) -> str:
-    """İlan içerik hash'i hesapla (fiyat hariç)"""
-    # Hash'e dahil edilecek alanlar (fiyat hariç)
-    hash_fields = [
-        'baslik',
-        'oda_sayisi', 'metrekare', 'bina_yasi', 'kat',
-        'arsa_metrekare', 'imar_durumu', 'arsa_tipi',
-        'isyeri_tipi', 'tesis_tipi', 'yatak_sayisi',
-        'emlak_ofisi', 'tip'
-    ]
-
-    # Icerik string'ini olustur
-    content_parts = []
-    for field in hash_fields:
-        value = data.get(field)
-        if value is not None:
-            content_parts.append(f"{field}:{value}")
-
-    # Detaylar varsa dahil et
-    details = data.get('details')
-    if details and isinstance(details, dict):
-        content_parts.append(f"details:{json.dumps(details, sort_keys=True)}")
+from utils.logger import get_logger
+from .models import (
+    Location, Listing, ScrapeSession, FailedPage, PriceHistory, ArchivedListing, ArchivedPriceHistory,
+    ListingSummary,
+)
+from .location_keys import fold_location_name
+from .location_resolver import LocationResolver, normalize_location_key
+from .hashing import CONTENT_HASH_VERSION, compute_content_hash, content_hash_matches
+from .listing_keys import extract_external_id
+from .pagination import keyset_page
+from .price_stats import describe_prices, summarize_prices_by_group
 
-    content_str = "|".join(sorted(content_parts))
-    return hashlib.md5(content_str.encode('utf-8')).hexdigest()
+logger = get_logger("database.crud")
 
 
 # ============== Lokasyon CRUD ==============
@@ -75,14 +61,14 @@ def get_or_create_location(
     if location:
         return location
 
-    # Yeni olustur
+    # Yeni olustur - yaris durumunda sadece bu ekleme geri alinsin diye savepoint
     location = Location(il=il, ilce=ilce, mahalle=mahalle)
-    db.add(location)
 
     try:
-        db.flush()  # Commit etmeden ID al
+        with db.begin_nested():
+            db.add(location)
+            db.flush()  # Commit etmeden ID al
     except IntegrityError:
-        db.rollback()
         # Yaris durumu - yeni olusturulani getir
         location = db.query(Location).filter(
             Location.il == il,
@@ -102,7 +88,7 @@ def get_all_cities(db: Session) -> List[str]:
 def get_districts_by_city(db: Session, city: str) -> List[str]:
     """Bir sehrin tum ilcelerini getir."""
     result = db.query(Location.ilce).filter(
-        Location.il == city,
+        Location.il_key == fold_location_name(city),
         Location.ilce.isnot(None)
     ).distinct().order_by(Location.ilce).all()
     return [r[0] for r in result if r[0]]
@@ -110,6 +96,88 @@ def get_districts_by_city(db: Session, city: str) -> List[str]:
 
 # ============== İlan CRUD ==============
 
+# Kategoriye özel detay alanları (details JSON kolonu)
+LISTING_DETAIL_FIELDS = [
+    'oda_sayisi', 'metrekare', 'bina_yasi', 'kat',
+    'arsa_metrekare', 'metrekare_fiyat', 'imar_durumu', 'arsa_tipi',
+    'isyeri_tipi', 'tesis_tipi', 'yatak_sayisi', 'otel_tipi',
+    'tip', 'one_cikan', 'yeni'
+]
+
+# Toplu upsert'te tek INSERT ifadesine girecek maksimum satır sayısı
+BULK_UPSERT_CHUNK_SIZE = 1000
+
+# Değişiklik tespiti için okunan kolonlar - details JSON'u ve ilişkiler yüklenmez
+_CHANGE_DETECTION_COLUMNS = ('id', 'ilan_url', 'external_id', 'content_hash', 'content_hash_version', 'fiyat')
+
+# Sadece değişen ilanlar için okunan tam kolon listesi
+_BULK_LOOKUP_COLUMNS = (
+    'id', 'ilan_url', 'external_id', 'content_hash', 'fiyat', 'fiyat_text', 'baslik',
+    'emlak_ofisi', 'resim_url', 'details', 'platform', 'kategori',
+    'ilan_tipi', 'alt_kategori', 'location_id', 'ilan_tarihi', 'created_at',
+)
+
+# Değişen ilanlarda yazılan kolonlar (URL slug'ı değiştiyse ilan_url dahil)
+_BULK_UPDATE_COLUMNS = (
+    'ilan_url', 'external_id', 'baslik', 'fiyat', 'fiyat_text', 'emlak_ofisi', 'resim_url',
+    'details', 'content_hash', 'content_hash_version', 'updated_at', 'last_seen_at', 'scrape_session_id',
+)
+
+
+def _extract_listing_url(data: Dict[str, Any]) -> Optional[str]:
+    """Tekrar kontrolü için ilan URL'sini al"""
+    return data.get('ilan_linki') or data.get('ilan_url')
+
+
+def _extract_location_parts(data: Dict[str, Any]) -> Tuple[str, Optional[str], Optional[str]]:
+    """İlan verisinden (il, ilce, mahalle) çıkar, gerekirse lokasyon metnine düş"""
+    il = data.get('il')
+    ilce = data.get('ilce')
+    mahalle = data.get('mahalle')
+
+    if not il or il == 'Belirtilmemiş':
+        # Fallback: lokasyon alanından parse et
+        lokasyon = data.get('lokasyon', '')
+        if lokasyon:
+            # EmlakJet formati: "İstanbul / Kadıköy / Caferağa"
+            # HepsiEmlak formatı: "İstanbul, Kadıköy"
+            if '/' in lokasyon:
+                parts = [p.strip() for p in lokasyon.split('/')]
+            else:
+                parts = [p.strip() for p in lokasyon.split(',')]
+            il = parts[0] if len(parts) > 0 else None
+            if not ilce and len(parts) > 1:
+                ilce = parts[1]
+            if not mahalle and len(parts) > 2:
+                mahalle = parts[2]
+    if not il:
+        il = 'Belirtilmemiş'
+
+    return il, ilce, mahalle
+
+
+def _extract_details(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Kategoriye özel detay alanlarını sözlük olarak çıkar"""
+    details = {}
+    for field in LISTING_DETAIL_FIELDS:
+        if field in data and data[field]:
+            details[field] = data[field]
+    return details
+
+
+def _parse_listing_date(data: Dict[str, Any]):
+    """İlan tarihini yaygın formatlarla ayrıştır"""
+    if not data.get('ilan_tarihi'):
+        return None
+
+    date_str = str(data['ilan_tarihi']).strip()
+    for fmt in ['%Y-%m-%d', '%d.%m.%Y', '%d/%m/%Y', '%Y-%m-%d %H:%M:%S']:
+        try:
+            return datetime.strptime(date_str, fmt).date()
+        except ValueError:
+            continue
+    return None
+
 def parse_price(price_str: str) -> Optional[float]:
     """Türkçe fiyat metnini float'a çevir"""
     if not price_str or str(price_str).strip().lower() in ['belirtilmemiş', 'belirtilmemis', '']:
@@ -143,41 +211,22 @@ def create_listing(
     kategori: str,
     ilan_tipi: str,
     alt_kategori: Optional[str] = None,
-    scrape_session_id: Optional[int] = None
+    scrape_session_id: Optional[int] = None,
+    content_hash: Optional[str] = None
 ) -> Tuple[Optional[Listing], bool]:
     """Yeni ilan olustur, (ilan, yeni_mi) dondur."""
-    # Tekrar kontrolü için ilan_url al
-    ilan_url = data.get('ilan_linki') or data.get('ilan_url')
+    # Tekrar kontrolü için ilan_url ve platformun ilan numarası
+    ilan_url = _extract_listing_url(data)
+    external_id = extract_external_id(platform, ilan_url)
 
     # Tekrar kontrolü
     if ilan_url:
-        existing = db.query(Listing).filter(Listing.ilan_url == ilan_url).first()
-        if existing:
+        by_url, by_external_id = _fetch_change_state(db, platform, [(ilan_url, external_id)])
+        if by_url or by_external_id:
             return (None, False)  # Tekrar
 
     # Lokasyon al veya olustur
-    il = data.get('il')
-    ilce = data.get('ilce')
-    mahalle = data.get('mahalle')
-
-    if not il or il == 'Belirtilmemiş':
-        # Fallback: lokasyon alanından parse et
-        lokasyon = data.get('lokasyon', '')
-        if lokasyon:
-            # EmlakJet formati: "İstanbul / Kadıköy / Caferağa"
-            # HepsiEmlak formatı: "İstanbul, Kadıköy"
-            if '/' in lokasyon:
-                parts = [p.strip() for p in lokasyon.split('/')]
-            else:
-                parts = [p.strip() for p in lokasyon.split(',')]
-            il = parts[0] if len(parts) > 0 else None
-            if not ilce and len(parts) > 1:
-                ilce = parts[1]
-            if not mahalle and len(parts) > 2:
-                mahalle = parts[2]
-    if not il:
-        il = 'Belirtilmemiş'
-
+    il, ilce, mahalle = _extract_location_parts(data)
     location = get_or_create_location(db, il, ilce, mahalle)
 
     # Fiyati ayristir
@@ -185,34 +234,14 @@ def create_listing(
     fiyat = parse_price(fiyat_text)
 
     # Kategoriye özel detayları çıkar
-    details = {}
-    detail_fields = [
-        'oda_sayisi', 'metrekare', 'bina_yasi', 'kat',
-        'arsa_metrekare', 'metrekare_fiyat', 'imar_durumu', 'arsa_tipi',
-        'isyeri_tipi', 'tesis_tipi', 'yatak_sayisi', 'otel_tipi',
-        'tip', 'one_cikan', 'yeni'
-    ]
-    for field in detail_fields:
-        if field in data and data[field]:
-            details[field] = data[field]
+    details = _extract_details(data)
 
     # Ilan tarihini ayristir
-    ilan_tarihi = None
-    if data.get('ilan_tarihi'):
-        try:
-            # Yaygın formatları dene
-            date_str = str(data['ilan_tarihi']).strip()
-            for fmt in ['%Y-%m-%d', '%d.%m.%Y', '%d/%m/%Y', '%Y-%m-%d %H:%M:%S']:
-                try:
-                    ilan_tarihi = datetime.strptime(date_str, fmt).date()
-                    break
-                except ValueError:
-                    continue
-        except Exception:
-            pass
-
-    # İçerik hash'i hesapla
-    content_hash = compute_content_hash(data)
+    ilan_tarihi = _parse_listing_date(data)
+
+    # İçerik hash'i (çağıran hesapladıysa tekrar hesaplama)
+    if content_hash is None:
+        content_hash = compute_content_hash(data)
 
     # Ilan olustur
     listing = Listing(
@@ -225,12 +254,15 @@ def create_listing(
         alt_kategori=alt_kategori,
         location_id=location.id,
         ilan_url=ilan_url,
+        external_id=external_id,
         ilan_tarihi=ilan_tarihi,
         emlak_ofisi=data.get('emlak_ofisi'),
         resim_url=data.get('resim_url'),
         details=details if details else None,
         scrape_session_id=scrape_session_id,
-        content_hash=content_hash
+        content_hash=content_hash,
+        content_hash_version=CONTENT_HASH_VERSION,
+        last_seen_at=datetime.utcnow()
     )
 
     db.add(listing)
@@ -252,45 +284,62 @@ def upsert_listing(
     alt_kategori: Optional[str] = None,
     scrape_session_id: Optional[int] = None
 ) -> Tuple[Optional[Listing], str]:
-    """İlan upsert - yeniyse ekle, varsa güncelle"""
+    """İlan upsert - yeniyse ekle, varsa güncelle
+
+    Değişmeyen ilanlarda ORM nesnesi yüklenmez; dönen ilan None olur.
+    """
     # Tekrar kontrolü için ilan_url al
-    ilan_url = data.get('ilan_linki') or data.get('ilan_url')
+    ilan_url = _extract_listing_url(data)
+
+    # İçerik hash'i kayıt başına bir kez hesaplanır
+    new_content_hash = compute_content_hash(data)
 
     if not ilan_url:
         # URL yoksa tekrar kontrolu yapilamaz - dogrudan olustur
-        listing, is_new = create_listing(db, data, platform, kategori, ilan_tipi, alt_kategori, scrape_session_id)
-        if listing:
-            listing.content_hash = compute_content_hash(data)
+        listing, is_new = create_listing(
+            db, data, platform, kategori, ilan_tipi, alt_kategori, scrape_session_id, content_hash=new_content_hash
+        )
         return (listing, 'created' if is_new else 'error')
 
-    # Mevcut ilan kontrolü
-    existing = db.query(Listing).filter(Listing.ilan_url == ilan_url).first()
+    # Mevcut ilan kontrolü - sadece karşılaştırma kolonları okunur
+    external_id = extract_external_id(platform, ilan_url)
+    by_url, by_external_id = _fetch_change_state(db, platform, [(ilan_url, external_id)])
+    state = _match_state(by_url, by_external_id, ilan_url, external_id)
 
-    if not existing:
+    if state is None:
         # Yeni ilan - olustur
-        listing, is_new = create_listing(db, data, platform, kategori, ilan_tipi, alt_kategori, scrape_session_id)
-        if listing:
-            listing.content_hash = compute_content_hash(data)
+        listing, is_new = create_listing(
+            db, data, platform, kategori, ilan_tipi, alt_kategori, scrape_session_id, content_hash=new_content_hash
+        )
         return (listing, 'created' if is_new else 'error')
 
-    # Mevcut ilan bulundu - yeni hash hesapla
-    new_content_hash = compute_content_hash(data)
+    # Mevcut ilan bulundu
     new_fiyat_text = data.get('fiyat', '')
     new_fiyat = parse_price(new_fiyat_text)
 
     # Fiyat degisikligi kontrolu
     price_changed = False
-    old_price = existing.fiyat
-    if new_fiyat is not None and existing.fiyat != new_fiyat:
+    old_price = state.fiyat
+    if new_fiyat is not None and state.fiyat != new_fiyat:
         price_changed = True
 
     # Hash kullanarak icerik degisikligi kontrolu
-    content_changed = (existing.content_hash != new_content_hash)
+    content_changed = not content_hash_matches(state.content_hash, state.content_hash_version, data, new_content_hash)
+
+    new_ilan_url, new_external_id = _resolve_key_changes(state, by_external_id, ilan_url, external_id)
 
-    # Degisiklik yoksa guncellemeyi atla
+    # Degisiklik yoksa ORM nesnesi yüklemeden sadece oturumu işaretle
     if not price_changed and not content_changed:
-        existing.scrape_session_id = scrape_session_id
-        return (existing, 'unchanged')
+        if (state.content_hash_version == CONTENT_HASH_VERSION
+                and (new_ilan_url, new_external_id) == (state.ilan_url, state.external_id)):
+            _mark_listings_seen(db, [state.id], scrape_session_id, datetime.utcnow())
+        else:
+            _silent_update_listings(db, [
+                _silent_update_row(state, new_ilan_url, new_external_id, new_content_hash, scrape_session_id)
+            ])
+        return (None, 'unchanged')
+
+    existing = db.get(Listing, state.id)
 
     # Uygunsa fiyat degisikligini kaydet
     if price_changed and old_price is not None and new_fiyat is not None:
@@ -323,31 +372,363 @@ def upsert_listing(
         existing.resim_url = new_resim_url
 
     # Detaylar varsa güncelle
-    new_details = {}
-    detail_fields = [
-        'oda_sayisi', 'metrekare', 'bina_yasi', 'kat',
-        'arsa_metrekare', 'metrekare_fiyat', 'imar_durumu', 'arsa_tipi',
-        'isyeri_tipi', 'tesis_tipi', 'yatak_sayisi', 'otel_tipi',
-        'tip', 'one_cikan', 'yeni'
-    ]
-    for field in detail_fields:
-        if field in data and data[field]:
-            new_details[field] = data[field]
-
+    new_details = _extract_details(data)
     if new_details:
         existing.details = {**(existing.details or {}), **new_details}
 
+    # Slug'ı değişen ilanın URL'si ve eksik ilan numarası
+    existing.ilan_url = new_ilan_url
+    existing.external_id = new_external_id
+
     # Hash ve meta verileri güncelle
     existing.content_hash = new_content_hash
+    existing.content_hash_version = CONTENT_HASH_VERSION
     existing.updated_at = datetime.utcnow()
+    existing.last_seen_at = existing.updated_at
     existing.scrape_session_id = scrape_session_id
 
     db.flush()
     return (existing, 'updated')
 
 
-def get_listings(
+def _is_postgresql(db: Session) -> bool:
+    """Oturumun bağlı olduğu veritabanı PostgreSQL mi"""
+    return db.get_bind().dialect.name == 'postgresql'
+
+
+def bulk_upsert_listings(
     db: Session,
+    records: List[Dict[str, Any]],
+    platform: str,
+    kategori: str,
+    ilan_tipi: str,
+    alt_kategori: Optional[str] = None,
+    scrape_session_id: Optional[int] = None,
+    location_resolver: Optional[LocationResolver] = None
+) -> Tuple[int, int, int]:
+    """Bir veya birden çok sayfanın ilanlarını toplu upsert et.
+
+    Mevcut ilanlar (platform, external_id) ya da ilan_url üzerinden tek bir
+    sorguyla ve sadece karşılaştırma kolonlarıyla bulunur; değişmeyenler tek
+    bir toplu UPDATE ile oturuma bağlanır, tam satır sadece değişenler için
+    okunur. Yeni satırlar PostgreSQL'de INSERT ... ON CONFLICT DO NOTHING,
+    SQLite'ta executemany ile eklenir; değişenler birincil anahtara göre
+    güncellenir. upsert_listing ile aynı kurallar uygulanır ve (yeni,
+    guncellenen, degismeyen) sayıları döner.
+    Lokasyonlar verilen (oturum boyu) çözümleyici ile toplu çözülür.
+    """
+    if not records:
+        return (0, 0, 0)
+
+    now = datetime.utcnow()
+    new_count = 0
+    updated_count = 0
+    unchanged_count = 0
+
+    # Aynı ilan sayfa/sayfalar arasında (farklı slug'la da) tekrar edebilir -
+    # son görüleni kullan, öncekileri upsert_listing'teki gibi "değişmedi" say
+    batch: Dict[str, Tuple[str, Optional[str], Dict[str, Any]]] = {}
+    url_less: List[Dict[str, Any]] = []
+    for data in records:
+        ilan_url = _extract_listing_url(data)
+        if not ilan_url:
+            url_less.append(data)
+            continue
+        external_id = extract_external_id(platform, ilan_url)
+        key = external_id or ilan_url
+        if key in batch:
+            unchanged_count += 1
+        batch[key] = (ilan_url, external_id, data)
+
+    # Mevcut ilanların sadece karşılaştırma kolonlarını tek sorguda getir
+    by_url, by_external_id = _fetch_change_state(
+        db, platform, [(ilan_url, external_id) for ilan_url, external_id, _ in batch.values()]
+    )
+
+    insert_rows: List[Dict[str, Any]] = []
+    insert_sources: List[Dict[str, Any]] = []
+    update_rows: List[Dict[str, Any]] = []
+    price_rows: List[Dict[str, Any]] = []
+    unchanged_ids: List[int] = []
+    silent_rows: List[Dict[str, Any]] = []
+
+    def _new_row(
+        data: Dict[str, Any], ilan_url: Optional[str], external_id: Optional[str], content_hash: str
+    ) -> Dict[str, Any]:
+        fiyat_text = data.get('fiyat', '')
+        details = _extract_details(data)
+        return {
+            'baslik': data.get('baslik', 'Başlık Yok'),
+            'fiyat': parse_price(fiyat_text),
+            'fiyat_text': str(fiyat_text) if fiyat_text else None,
+            'platform': platform,
+            'kategori': kategori,
+            'ilan_tipi': ilan_tipi,
+            'alt_kategori': alt_kategori,
+            'location_id': None,
+            'ilan_url': ilan_url,
+            'external_id': external_id,
+            'ilan_tarihi': _parse_listing_date(data),
+            'emlak_ofisi': data.get('emlak_ofisi'),
+            'resim_url': data.get('resim_url'),
+            'details': details if details else None,
+            'scrape_session_id': scrape_session_id,
+            'content_hash': content_hash,
+            'content_hash_version': CONTENT_HASH_VERSION,
+            'created_at': now,
+            'updated_at': now,
+            'last_seen_at': now,
+        }
+
+    for data in url_less:
+        insert_rows.append(_new_row(data, None, None, compute_content_hash(data)))
+        insert_sources.append(data)
+
+    changed: List[Tuple[int, Dict[str, Any], str, Optional[float], Any, str, Optional[str]]] = []
+    for ilan_url, external_id, data in batch.values():
+        new_content_hash = compute_content_hash(data)
+        state = _match_state(by_url, by_external_id, ilan_url, external_id)
+        if state is None:
+            insert_rows.append(_new_row(data, ilan_url, external_id, new_content_hash))
+            insert_sources.append(data)
+            continue
+        new_ilan_url, new_external_id = _resolve_key_changes(state, by_external_id, ilan_url, external_id)
+
+        new_fiyat_text = data.get('fiyat', '')
+        new_fiyat = parse_price(new_fiyat_text)
+        old_price = state.fiyat
+        price_changed = new_fiyat is not None and old_price != new_fiyat
+        content_changed = not content_hash_matches(
+            state.content_hash, state.content_hash_version, data, new_content_hash
+        )
+
+        if not price_changed and not content_changed:
+            if (state.content_hash_version == CONTENT_HASH_VERSION
+                    and (new_ilan_url, new_external_id) == (state.ilan_url, state.external_id)):
+                unchanged_ids.append(state.id)
+            else:
+                # İçerik aynı; sadece hash sürümü ya da URL slug'ı değişmiş - güncelleme sayılmaz
+                silent_rows.append(_silent_update_row(
+                    state, new_ilan_url, new_external_id, new_content_hash, scrape_session_id, now
+                ))
+            continue
+
+        if price_changed and old_price is not None:
+            price_change = new_fiyat - old_price
+            price_change_percent = (price_change / old_price) * 100 if old_price > 0 else 0
+            price_rows.append({
+                'listing_id': state.id,
+                'old_price': old_price,
+                'new_price': new_fiyat,
+                'price_change': price_change,
+                'price_change_percent': round(price_change_percent, 2),
+                'changed_at': now,
+            })
+        changed.append((state.id, data, new_content_hash, new_fiyat, new_fiyat_text, new_ilan_url, new_external_id))
+
+    # Tam satırlar (details dahil) sadece değişen ilanlar için okunur
+    full_rows = {}
+    changed_ids = [item[0] for item in changed]
+    for start in range(0, len(changed_ids), BULK_UPSERT_CHUNK_SIZE):
+        chunk = changed_ids[start:start + BULK_UPSERT_CHUNK_SIZE]
+        rows = db.query(
+            *[getattr(Listing, col) for col in _BULK_LOOKUP_COLUMNS]
+        ).filter(Listing.id.in_(chunk)).all()
+        for row in rows:
+            full_rows[row.id] = row
+    # Karşılaştırma ile okuma arasında silinen ilanlar atlanır
+    price_rows = [r for r in price_rows if r['listing_id'] in full_rows]
+
+    for listing_id, data, new_content_hash, new_fiyat, new_fiyat_text, new_ilan_url, new_external_id in changed:
+        existing = full_rows.get(listing_id)
+        if existing is None:
+            continue
+
+        # upsert_listing ile aynı kural: boş gelen alanlar mevcut değeri korur
+        row = dict(existing._mapping)
+        row['ilan_url'] = new_ilan_url
+        row['external_id'] = new_external_id
+        if data.get('baslik'):
+            row['baslik'] = data['baslik']
+        if new_fiyat is not None:
+            row['fiyat'] = new_fiyat
+            row['fiyat_text'] = str(new_fiyat_text) if new_fiyat_text else None
+        if data.get('emlak_ofisi'):
+            row['emlak_ofisi'] = data['emlak_ofisi']
+        if data.get('resim_url'):
+            row['resim_url'] = data['resim_url']
+        new_details = _extract_details(data)
+        if new_details:
+            row['details'] = {**(existing.details or {}), **new_details}
+        row['content_hash'] = new_content_hash
+        row['content_hash_version'] = CONTENT_HASH_VERSION
+        row['updated_at'] = now
+        row['last_seen_at'] = now
+        row['scrape_session_id'] = scrape_session_id
+        update_rows.append(row)
+
+    # Yeni ilanların lokasyonlarını tek seferde çöz
+    if insert_rows:
+        resolver = location_resolver or LocationResolver()
+        location_keys = [
+            normalize_location_key(*_extract_location_parts(data)) for data in insert_sources
+        ]
+        location_ids = resolver.resolve_many(db, location_keys)
+        for row, key in zip(insert_rows, location_keys):
+            row['location_id'] = location_ids[key]
+
+    if insert_rows:
+        if _is_postgresql(db):
+            new_count += _pg_insert_listing_rows(db, insert_rows)
+        else:
+            db.execute(insert(Listing), insert_rows)
+            new_count += len(insert_rows)
+    # Değişenler birincil anahtara göre executemany ile güncellenir
+    if update_rows:
+        db.execute(update(Listing), [
+            {col: row[col] for col in ('id', *_BULK_UPDATE_COLUMNS)} for row in update_rows
+        ])
+
+    if price_rows:
+        db.execute(insert(PriceHistory), price_rows)
+
+    # Değişmeyen ilanlar tek UPDATE ile son görüldükleri oturuma/zamana bağlanır
+    _mark_listings_seen(db, unchanged_ids, scrape_session_id, now)
+    _silent_update_listings(db, silent_rows)
+
+    updated_count += len(update_rows)
+    unchanged_count += len(unchanged_ids) + len(silent_rows)
+    db.flush()
+    return (new_count, updated_count, unchanged_count)
+
+
+def _fetch_change_state(
+    db: Session,
+    platform: str,
+    keys: List[Tuple[str, Optional[str]]]
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """(ilan_url, external_id) çiftleri için karşılaştırma kolonlarını getir.
+
+    (URL'ye göre, ilan numarasına göre) iki sözlük döner.
+    """
+    by_url = {}
+    by_external_id = {}
+    for start in range(0, len(keys), BULK_UPSERT_CHUNK_SIZE):
+        chunk = keys[start:start + BULK_UPSERT_CHUNK_SIZE]
+        urls = [ilan_url for ilan_url, _ in chunk]
+        external_ids = [external_id for _, external_id in chunk if external_id]
+        condition = Listing.ilan_url.in_(urls)
+        if external_ids:
+            condition = or_(
+                condition,
+                and_(Listing.platform == platform, Listing.external_id.in_(external_ids)),
+            )
+        rows = db.query(
+            *[getattr(Listing, col) for col in _CHANGE_DETECTION_COLUMNS]
+        ).filter(condition).all()
+        for row in rows:
+            by_url[row.ilan_url] = row
+            if row.external_id:
+                by_external_id[row.external_id] = row
+    return by_url, by_external_id
+
+
+def _match_state(by_url: Dict[str, Any], by_external_id: Dict[str, Any], ilan_url: str, external_id: Optional[str]):
+    """Birebir aynı URL öncelikli, yoksa ilan numarasıyla eşleşen satır"""
+    state = by_url.get(ilan_url)
+    if state is None and external_id:
+        state = by_external_id.get(external_id)
+    return state
+
+
+def _resolve_key_changes(
+    state,
+    by_external_id: Dict[str, Any],
+    ilan_url: str,
+    external_id: Optional[str]
+) -> Tuple[str, Optional[str]]:
+    """Eşleşen satıra yazılacak (ilan_url, external_id).
+
+    İlan numarasıyla eşleşen satırda URL yeni slug'a çekilir (yeni URL başka
+    satırda yoktur, yoksa URL ile eşleşirdi). Numarası boş eski satırlara
+    numara sadece başka bir satır o numarayı tutmuyorsa yazılır.
+    """
+    new_external_id = state.external_id
+    if new_external_id is None and external_id and external_id not in by_external_id:
+        new_external_id = external_id
+    return ilan_url, new_external_id
+
+
+def _mark_listings_seen(
+    db: Session,
+    listing_ids: List[int],
+    scrape_session_id: Optional[int],
+    seen_at: Optional[datetime] = None
+) -> None:
+    """Değişmeyen ilanları tek UPDATE ... WHERE id IN (...) ile oturuma bağla"""
+    seen_at = seen_at or datetime.utcnow()
+    for start in range(0, len(listing_ids), BULK_UPSERT_CHUNK_SIZE):
+        chunk = listing_ids[start:start + BULK_UPSERT_CHUNK_SIZE]
+        db.execute(
+            update(Listing)
+            .where(Listing.id.in_(chunk))
+            .values(scrape_session_id=scrape_session_id, last_seen_at=seen_at)
+            .execution_options(synchronize_session=False)
+        )
+
+
+def _silent_update_row(
+    state,
+    ilan_url: str,
+    external_id: Optional[str],
+    content_hash: str,
+    scrape_session_id: Optional[int],
+    seen_at: Optional[datetime] = None
+) -> Dict[str, Any]:
+    """İçeriği değişmeyen ilanda hash sürümü / URL anahtarı düzeltmesi"""
+    return {
+        'id': state.id,
+        'ilan_url': ilan_url,
+        'external_id': external_id,
+        'content_hash': content_hash,
+        'content_hash_version': CONTENT_HASH_VERSION,
+        'scrape_session_id': scrape_session_id,
+        'last_seen_at': seen_at or datetime.utcnow(),
+    }
+
+
+def _silent_update_listings(db: Session, rows: List[Dict[str, Any]]) -> None:
+    """Sessiz düzeltmeleri birincil anahtara göre toplu yaz"""
+    if rows:
+        db.execute(update(Listing), rows)
+
+
+def _pg_insert_listing_rows(db: Session, rows: List[Dict[str, Any]]) -> int:
+    """Yeni satırları çok satırlı INSERT ... ON CONFLICT DO NOTHING ile yaz.
+
+    Aynı ilanı eşzamanlı ekleyen başka bir worker varsa (ilan_url ya da
+    (platform, external_id) çakışması) satır atlanır; eklenen sayı döner.
+    """
+    table = Listing.__table__
+    inserted = 0
+    for start in range(0, len(rows), BULK_UPSERT_CHUNK_SIZE):
+        chunk = rows[start:start + BULK_UPSERT_CHUNK_SIZE]
+        stmt = pg_insert(table).values(_align_rows(chunk)).on_conflict_do_nothing()
+        inserted += len(db.execute(stmt.returning(table.c.id)).all())
+    return inserted
+
+
+def _align_rows(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Çok satırlı VALUES için tüm satırları aynı kolon kümesine tamamla"""
+    columns = set()
+    for row in rows:
+        columns.update(row.keys())
+    return [{col: row.get(col) for col in columns} for row in rows]
+
+
+def _filter_listings(
+    query,
+    model,
     platform: Optional[str] = None,
     kategori: Optional[str] = None,
     ilan_tipi: Optional[str] = None,
@@ -355,43 +736,237 @@ def get_listings(
     city: Optional[str] = None,
     district: Optional[str] = None,
     min_price: Optional[float] = None,
-    max_price: Optional[float] = None,
-    page: int = 1,
-    limit: int = 50
-) -> Tuple[List[Listing], int]:
-    """Filtreleme ve sayfalama ile ilanları getir"""
-    query = db.query(Listing)
-
-    # Filtreleri uygula
+    max_price: Optional[float] = None
+):
+    """Listing ya da ArchivedListing sorgusuna ortak filtreleri uygula"""
     if platform and platform != 'all':
-        query = query.filter(Listing.platform == platform)
+        query = query.filter(model.platform == platform)
     if kategori and kategori != 'all':
-        query = query.filter(Listing.kategori == kategori)
+        query = query.filter(model.kategori == kategori)
     if ilan_tipi and ilan_tipi != 'all':
-        query = query.filter(Listing.ilan_tipi == ilan_tipi)
+        query = query.filter(model.ilan_tipi == ilan_tipi)
     if alt_kategori and alt_kategori != 'all':
-        query = query.filter(Listing.alt_kategori == alt_kategori)
+        query = query.filter(model.alt_kategori == alt_kategori)
     if city:
-        query = query.join(Location).filter(Location.il == city)
+        query = query.join(Location, model.location_id == Location.id).filter(
+            Location.il_key == fold_location_name(city)
+        )
     if district:
         if not city:
-            query = query.join(Location)
-        query = query.filter(Location.ilce == district)
+            query = query.join(Location, model.location_id == Location.id)
+        query = query.filter(Location.ilce_key == fold_location_name(district))
     if min_price is not None:
-        query = query.filter(Listing.fiyat >= min_price)
+        query = query.filter(model.fiyat >= min_price)
     if max_price is not None:
-        query = query.filter(Listing.fiyat <= max_price)
+        query = query.filter(model.fiyat <= max_price)
+    return query
 
-    # Toplam sayıyı al
-    total = query.count()
 
-    # Sayfalama
+def get_listings(
+    db: Session,
+    platform: Optional[str] = None,
+    kategori: Optional[str] = None,
+    ilan_tipi: Optional[str] = None,
+    alt_kategori: Optional[str] = None,
+    city: Optional[str] = None,
+    district: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    page: int = 1,
+    limit: int = 50,
+    include_archived: bool = False,
+    count_total: bool = True
+) -> Tuple[List[Listing], Optional[int]]:
+    """Filtreleme ve sayfalama ile ilanları getir.
+
+    include_archived=True ise listings_archive'daki ilanlar da (ArchivedListing
+    olarak) aynı created_at sırasına katılır. count_total=False ise COUNT
+    çalıştırılmaz ve toplam None döner (önbellekli sayı için count_listings).
+    """
+    filters = dict(
+        platform=platform, kategori=kategori, ilan_tipi=ilan_tipi, alt_kategori=alt_kategori,
+        city=city, district=district, min_price=min_price, max_price=max_price,
+    )
+    query = _filter_listings(db.query(Listing), Listing, **filters)
     offset = (page - 1) * limit
-    listings = query.order_by(Listing.created_at.desc()).offset(offset).limit(limit).all()
 
+    if not include_archived:
+        # Toplam sayıyı al
+        total = query.count() if count_total else None
+        listings = (
+            query.options(joinedload(Listing.location))
+            .order_by(Listing.created_at.desc())
+            .offset(offset)
+            .limit(limit)
+            .all()
+        )
+        return (listings, total)
+
+    # Sıcak ve arşiv tablolarını (id, created_at, kaynak) üzerinden birleştir,
+    # sayfadaki satırları kendi tablolarından yükle
+    hot = query.with_entities(
+        Listing.id.label('id'), Listing.created_at.label('created_at'), literal(0).label('archived')
+    )
+    cold = _filter_listings(db.query(ArchivedListing), ArchivedListing, **filters).with_entities(
+        ArchivedListing.id.label('id'), ArchivedListing.created_at.label('created_at'), literal(1).label('archived')
+    )
+    combined = hot.union_all(cold).subquery()
+
+    total = db.query(func.count()).select_from(combined).scalar() if count_total else None
+    page_rows = db.query(combined).order_by(
+        combined.c.created_at.desc(), combined.c.id.desc()
+    ).offset(offset).limit(limit).all()
+
+    hot_ids = [row.id for row in page_rows if not row.archived]
+    cold_ids = [row.id for row in page_rows if row.archived]
+    hot_by_id = {
+        l.id: l for l in db.query(Listing).options(joinedload(Listing.location)).filter(Listing.id.in_(hot_ids))
+    } if hot_ids else {}
+    cold_by_id = {
+        l.id: l for l in db.query(ArchivedListing).options(joinedload(ArchivedListing.location))
+        .filter(ArchivedListing.id.in_(cold_ids))
+    } if cold_ids else {}
+
+    # Bu arada arşive taşınan satır atlanır
+    listings = [
+        (cold_by_id if row.archived else hot_by_id).get(row.id)
+        for row in page_rows
+    ]
+    return ([l for l in listings if l is not None], total)
+
+
+def count_listings(
+    db: Session,
+    platform: Optional[str] = None,
+    kategori: Optional[str] = None,
+    ilan_tipi: Optional[str] = None,
+    alt_kategori: Optional[str] = None,
+    city: Optional[str] = None,
+    district: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    include_archived: bool = False,
+    use_cache: bool = True
+) -> Tuple[int, bool]:
+    """Filtreli ilan sayısı: (toplam, kesin_mi).
+
+    Önce filtre başına önbelleğe bakılır (core/count_cache.py). PostgreSQL'de
+    planlayıcı tahmini LISTING_COUNT_ESTIMATE_THRESHOLD'u aşan geniş
+    filtrelerde COUNT(*) yerine tahmin döner (kesin_mi=False).
+    """
+    filters = dict(
+        platform=platform, kategori=kategori, ilan_tipi=ilan_tipi, alt_kategori=alt_kategori,
+        city=city, district=district, min_price=min_price, max_price=max_price,
+    )
+    cache = get_count_cache() if use_cache else None
+    key = build_count_key({**filters, "include_archived": include_archived})
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+    query = _filter_listings(db.query(Listing.id), Listing, **filters)
+    if include_archived:
+        query = query.union_all(_filter_listings(db.query(ArchivedListing.id), ArchivedListing, **filters))
+
+    total, exact = None, True
+    threshold = get_config().listing_count_estimate_threshold
+    if threshold > 0 and _is_postgresql(db):
+        estimate = _planner_row_estimate(db, query)
+        if estimate is not None and estimate >= threshold:
+            total, exact = estimate, False
+    if total is None:
+        total = query.count()
+
+    if cache is not None:
+        cache.set(key, total, exact)
+    return total, exact
+
+
+def _planner_row_estimate(db: Session, query) -> Optional[int]:
+    """EXPLAIN ile PostgreSQL planlayıcısının satır tahmini (hata olursa None)"""
+    compiled = query.statement.compile(
+        dialect=db.get_bind().dialect, compile_kwargs={"render_postcompile": True}
+    )
+    try:
+        # Hata transaction'ı bozmasın
+        with db.begin_nested():
+            plan = db.connection().exec_driver_sql(
+                f"EXPLAIN (FORMAT JSON) {compiled}", compiled.params
+            ).scalar()
+    except Exception:
+        return None
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def get_listings_by_cursor(
+    db: Session,
+    platform: Optional[str] = None,
+    kategori: Optional[str] = None,
+    ilan_tipi: Optional[str] = None,
+    alt_kategori: Optional[str] = None,
+    city: Optional[str] = None,
+    district: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    cursor: Optional[str] = None,
+    limit: int = 50
+) -> Tuple[List[Listing], Optional[str]]:
+    """get_listings'in keyset karşılığı: (created_at, id) azalan, COUNT yok.
+
+    (ilanlar, next_cursor) döndürür; bozuk cursor için ValueError.
+    """
+    query = _filter_listings(
+        db.query(Listing).options(joinedload(Listing.location)), Listing,
+        platform=platform, kategori=kategori, ilan_tipi=ilan_tipi, alt_kategori=alt_kategori,
+        city=city, district=district, min_price=min_price, max_price=max_price,
+    )
+    return keyset_page(query, Listing.created_at, Listing.id, cursor, limit)
+
+
+def get_unseen_listings(
+    db: Session,
+    days: int,
+    platform: Optional[str] = None,
+    ilan_tipi: Optional[str] = None,
+    page: int = 1,
+    limit: int = 50
+) -> Tuple[List[Listing], int]:
+    """Son `days` gündür hiçbir taramada görülmeyen (muhtemelen kalkmış) ilanlar"""
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    query = db.query(Listing).options(joinedload(Listing.location)).filter(Listing.last_seen_at < cutoff)
+    if platform and platform != 'all':
+        query = query.filter(Listing.platform == platform)
+    if ilan_tipi and ilan_tipi != 'all':
+        query = query.filter(Listing.ilan_tipi == ilan_tipi)
+
+    total = query.count()
+    offset = (page - 1) * limit
+    listings = query.order_by(Listing.last_seen_at.asc(), Listing.id.asc()).offset(offset).limit(limit).all()
     return (listings, total)
 
 
+def iter_listing_export_batches(
+    db: Session,
+    columns: Tuple,
+    batch_size: int = 2000,
+    **filters
+) -> Iterator[List[Any]]:
+    """Filtrelenmiş ilanları id sırasıyla batch batch getir (dışa aktarım).
+
+    columns Listing/Location kolonlarıdır; Location kolonları lokasyonsuz
+    ilanlar için None gelir. Sonuç yield_per ile sunucu tarafı imleçten
+    okunur, tüm satırlar belleğe alınmaz.
+    """
+    query = _filter_listings(db.query(*columns).select_from(Listing), Listing, **filters)
+    if not (filters.get("city") or filters.get("district")):
+        query = query.outerjoin(Location, Listing.location_id == Location.id)
+    statement = query.order_by(Listing.id).statement.execution_options(yield_per=batch_size)
+    yield from db.execute(statement).partitions()
+
+
 def get_listing_by_id(db: Session, listing_id: int) -> Optional[Listing]:
     """ID ile tek bir ilan getir"""
     return db.query(Listing).filter(Listing.id == listing_id).first()
@@ -402,6 +977,56 @@ def get_listings_count(db: Session) -> int:
     return db.query(Listing).count()
 
 
+def archive_stale_listings(db: Session, days: int, batch_size: int = 1000) -> Dict[str, int]:
+    """`days` gündür görülmeyen ilanları fiyat geçmişiyle birlikte arşive taşı.
+
+    id sırasıyla `batch_size`'lık parçalar halinde INSERT ... SELECT + DELETE
+    yapar; her parça ayrı transaction'dır, yarıda kalan iş bir sonraki
+    çalıştırmada kaldığı yerden devam eder. Taşınan satır sayılarını döndürür.
+    """
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    listing_columns = [column.name for column in Listing.__table__.columns]
+    history_columns = [column.name for column in PriceHistory.__table__.columns]
+    moved = {"listings": 0, "price_history": 0}
+
+    while True:
+        ids = db.execute(
+            select(Listing.id)
+            .where(Listing.last_seen_at < cutoff)
+            .order_by(Listing.id)
+            .limit(batch_size)
+        ).scalars().all()
+        if not ids:
+            break
+
+        archived_at = datetime.utcnow()
+        db.execute(insert(ArchivedListing).from_select(
+            listing_columns + ["archived_at"],
+            select(*[Listing.__table__.c[name] for name in listing_columns], literal(archived_at))
+            .where(Listing.id.in_(ids)),
+        ))
+        history = db.execute(insert(ArchivedPriceHistory).from_select(
+            history_columns + ["archived_at"],
+            select(*[PriceHistory.__table__.c[name] for name in history_columns], literal(archived_at))
+            .where(PriceHistory.listing_id.in_(ids)),
+        ))
+        db.query(PriceHistory).filter(PriceHistory.listing_id.in_(ids)).delete(synchronize_session=False)
+        deleted = db.query(Listing).filter(Listing.id.in_(ids)).delete(synchronize_session=False)
+        invalidate_listing_counts(db)
+        invalidate_response_cache(db)
+        db.commit()
+
+        moved["listings"] += deleted
+        moved["price_history"] += max(history.rowcount or 0, 0)
+        if len(ids) < batch_size:
+            break
+
+    if moved["listings"]:
+        refresh_listing_summary(db)
+        db.commit()
+    return moved
+
+
 # ============== Tarama Oturumu CRUD ==============
 
 def create_scrape_session(
@@ -469,6 +1094,17 @@ def complete_scrape_session(
         session.error_message = error_message
 
     db.flush()
+    # Oturumun eklediği ilanlar filtreli sayıları, /results özetini ve analitik yanıtları değiştirir
+    invalidate_listing_counts(db)
+    invalidate_response_cache(db)
+    try:
+        with db.begin_nested():
+            refresh_listing_summary(
+                db, platform=session.platform, kategori=session.kategori, ilan_tipi=session.ilan_tipi
+            )
+    except Exception as exc:
+        # Özet bir sonraki yenilemede düzelir; oturum kaydı engellenmez
+        logger.error(f"Listing summary refresh failed for session {session_id}: {exc}")
     return session
 
 
@@ -509,6 +1145,24 @@ def get_scrape_sessions(
     return (sessions, total)
 
 
+def get_scrape_sessions_by_cursor(
+    db: Session,
+    platform: Optional[str] = None,
+    status: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = 50
+) -> Tuple[List[ScrapeSession], Optional[str]]:
+    """get_scrape_sessions'ın keyset karşılığı: (started_at, id) azalan"""
+    query = db.query(ScrapeSession)
+
+    if platform and platform != 'all':
+        query = query.filter(ScrapeSession.platform == platform)
+    if status and status != 'all':
+        query = query.filter(ScrapeSession.status == status)
+
+    return keyset_page(query, ScrapeSession.started_at, ScrapeSession.id, cursor, limit)
+
+
 # ============== Analitik ==============
 
 def get_price_analytics(
@@ -516,43 +1170,59 @@ def get_price_analytics(
     platform: Optional[str] = None,
     kategori: Optional[str] = None,
     ilan_tipi: Optional[str] = None,
-    city: Optional[str] = None
+    city: Optional[str] = None,
+    include_archived: bool = False,
+    labels: Optional[Dict[str, Dict[str, str]]] = None
 ) -> Dict[str, Any]:
-    """Opsiyonel filtrelerle fiyat analizlerini getir"""
-    query = db.query(
-        Listing.fiyat,
-        Location.il.label('city'),
-        Listing.platform,
-        Listing.kategori,
-        Listing.ilan_tipi
-    ).join(Location).filter(
-        Listing.fiyat.isnot(None),
-        Listing.fiyat > 0
-    )
+    """Opsiyonel filtrelerle fiyat analizlerini getir.
+
+    labels: {"platform"|"category"|"listing_type": {db_degeri: gorunen_ad}};
+    verilirse satırlar görüntüleme adlarıyla tek geçişte oluşturulur.
+    """
+    def build_query(model):
+        query = db.query(
+            model.fiyat.label('fiyat'),
+            Location.il.label('city'),
+            model.platform.label('platform'),
+            model.kategori.label('kategori'),
+            model.ilan_tipi.label('ilan_tipi')
+        ).join(Location, model.location_id == Location.id).filter(
+            model.fiyat.isnot(None),
+            model.fiyat > 0
+        )
 
-    if platform and platform != 'all':
-        query = query.filter(Listing.platform == platform)
-    if kategori and kategori != 'all':
-        query = query.filter(Listing.kategori == kategori)
-    if ilan_tipi and ilan_tipi != 'all':
-        query = query.filter(Listing.ilan_tipi == ilan_tipi)
-    if city:
-        query = query.filter(Location.il == city)
+        if platform and platform != 'all':
+            query = query.filter(model.platform == platform)
+        if kategori and kategori != 'all':
+            query = query.filter(model.kategori == kategori)
+        if ilan_tipi and ilan_tipi != 'all':
+            query = query.filter(model.ilan_tipi == ilan_tipi)
+        if city:
+            query = query.filter(Location.il_key == fold_location_name(city))
+        return query
+
+    query = build_query(Listing)
+    if include_archived:
+        query = query.union_all(build_query(ArchivedListing))
 
     results = query.limit(50000).all()  # Performans için limit
 
+    labels = labels or {}
+    platform_labels = labels.get("platform", {})
+    category_labels = labels.get("category", {})
+    listing_type_labels = labels.get("listing_type", {})
     prices = [
         {
-            "city": r.city,
-            "platform": r.platform,
-            "category": r.kategori,
-            "listing_type": r.ilan_tipi,
-            "price": r.fiyat
+            "city": city_name,
+            "platform": platform_labels.get(platform_value, platform_value),
+            "category": category_labels.get(kategori_value, kategori_value),
+            "listing_type": listing_type_labels.get(ilan_tipi_value, ilan_tipi_value),
+            "price": fiyat
         }
-        for r in results
+        for fiyat, city_name, platform_value, kategori_value, ilan_tipi_value in results
     ]
 
-    price_values = [r.fiyat for r in results]
+    price_values = [row[0] for row in results]
 
     summary = {
         "total_count": len(price_values),
@@ -564,34 +1234,49 @@ def get_price_analytics(
     return {"prices": prices, "summary": summary}
 
 
-def get_city_analytics(
+def get_district_price_summary(
     db: Session,
     city_name: str,
     platform: Optional[str] = None,
     kategori: Optional[str] = None,
-    ilan_tipi: Optional[str] = None
-) -> Dict[str, Any]:
-    """Belirli bir sehrin detayli analizlerini getir."""
-    import statistics
+    ilan_tipi: Optional[str] = None,
+    include_archived: bool = False
+) -> Dict[Optional[str], Dict[str, Any]]:
+    """Bir ilin ilçe bazında ilan sayısı, ortalama ve medyan fiyatı (ilce_key -> özet)."""
+    grouped_queries = []
+    for model in (Listing, ArchivedListing) if include_archived else (Listing,):
+        conditions = [Location.il_key == fold_location_name(city_name)]
+        if platform and platform != 'all':
+            conditions.append(model.platform == platform)
+        if kategori and kategori != 'all':
+            conditions.append(model.kategori == kategori)
+        if ilan_tipi and ilan_tipi != 'all':
+            conditions.append(model.ilan_tipi == ilan_tipi)
+
+        grouped_queries.append(
+            select(Location.ilce_key.label("group_key"), model.fiyat)
+            .join(Location, model.location_id == Location.id)
+            .where(*conditions)
+        )
 
-    # Karsilastirma icin sehir adini normalize et
-    def normalize_turkish(text):
-        replacements = {
-            'ı': 'i', 'İ': 'i', 'ş': 's', 'Ş': 's', 'ğ': 'g', 'Ğ': 'g',
-            'ü': 'u', 'Ü': 'u', 'ö': 'o', 'Ö': 'o', 'ç': 'c', 'Ç': 'c'
-        }
-        for tr_char, ascii_char in replacements.items():
-            text = text.replace(tr_char, ascii_char)
-        return text.lower()
+    return summarize_prices_by_group(db, grouped_queries)
 
-    city_normalized = normalize_turkish(city_name)
 
-    # Eslesen lokasyonu bul
-    locations = db.query(Location).all()
-    matching_location_ids = []
-    for loc in locations:
-        if normalize_turkish(loc.il) == city_normalized:
-            matching_location_ids.append(loc.id)
+def get_city_analytics(
+    db: Session,
+    city_name: str,
+    platform: Optional[str] = None,
+    kategori: Optional[str] = None,
+    ilan_tipi: Optional[str] = None,
+    include_archived: bool = False
+) -> Dict[str, Any]:
+    """Belirli bir sehrin detayli analizlerini getir."""
+    # Eslesen lokasyonlar - katlanmis il_key uzerinden tek indeksli sorgu
+    matching_location_ids = [
+        loc_id for (loc_id,) in db.query(Location.id).filter(
+            Location.il_key == fold_location_name(city_name)
+        )
+    ]
 
     if not matching_location_ids:
         return {
@@ -603,19 +1288,22 @@ def get_city_analytics(
             "price_ranges": []
         }
 
-    # İlanları sorgula
-    query = db.query(Listing).filter(
-        Listing.location_id.in_(matching_location_ids)
-    )
-
-    if platform and platform != 'all':
-        query = query.filter(Listing.platform == platform)
-    if kategori and kategori != 'all':
-        query = query.filter(Listing.kategori == kategori)
-    if ilan_tipi and ilan_tipi != 'all':
-        query = query.filter(Listing.ilan_tipi == ilan_tipi)
-
-    listings = query.all()
+    # İlan sayısı ve fiyat sorguları (istenirse arşivdekiler de)
+    total_listings = 0
+    price_queries = []
+    for model in (Listing, ArchivedListing) if include_archived else (Listing,):
+        conditions = [model.location_id.in_(matching_location_ids)]
+        if platform and platform != 'all':
+            conditions.append(model.platform == platform)
+        if kategori and kategori != 'all':
+            conditions.append(model.kategori == kategori)
+        if ilan_tipi and ilan_tipi != 'all':
+            conditions.append(model.ilan_tipi == ilan_tipi)
+
+        total_listings += db.query(func.count(model.id)).filter(*conditions).scalar()
+        price_queries.append(
+            select(model.fiyat).where(*conditions, model.fiyat.isnot(None), model.fiyat > 0)
+        )
 
     # İlçeleri al
     districts = db.query(Location.ilce).filter(
@@ -624,84 +1312,25 @@ def get_city_analytics(
     ).distinct().all()
     district_names = sorted([d[0] for d in districts if d[0]])
 
-    # Fiyat istatistiklerini hesapla
-    prices = [l.fiyat for l in listings if l.fiyat and l.fiyat > 0]
+    # Fiyat istatistiklerini hesapla (database/price_stats.py)
+    price_stats = describe_prices(db, price_queries)
 
-    if not prices:
+    if price_stats is None:
         return {
             "city": city_name,
-            "total_listings": len(listings),
+            "total_listings": total_listings,
             "districts": district_names,
             "error": "Fiyat verisi bulunamadı",
             "stats": None,
             "price_ranges": []
         }
 
-    sorted_prices = sorted(prices)
-    n = len(sorted_prices)
-
-    def percentile(data, p):
-        k = (len(data) - 1) * p / 100
-        f = int(k)
-        c = f + 1 if f + 1 < len(data) else f
-        return data[f] + (data[c] - data[f]) * (k - f) if c < len(data) else data[f]
-
-    stats = {
-        "count": n,
-        "mean": round(statistics.mean(prices), 2),
-        "std": round(statistics.stdev(prices), 2) if n > 1 else 0,
-        "min": round(min(prices), 2),
-        "q25": round(percentile(sorted_prices, 25), 2),
-        "median": round(statistics.median(prices), 2),
-        "q75": round(percentile(sorted_prices, 75), 2),
-        "max": round(max(prices), 2)
-    }
-
-    # Fiyat araligi dagilimi
-    num_bins = 5
-    bin_edges = [percentile(sorted_prices, i * 100 / num_bins) for i in range(num_bins + 1)]
-
-    unique_edges = []
-    for e in bin_edges:
-        if not unique_edges or e > unique_edges[-1]:
-            unique_edges.append(e)
-
-    if len(unique_edges) < 3:
-        min_p, max_p = min(prices), max(prices)
-        bin_width = (max_p - min_p) / num_bins
-        unique_edges = [min_p + i * bin_width for i in range(num_bins + 1)]
-
-    def format_price(p):
-        if p >= 1000000:
-            return f"{p/1000000:.1f}M"
-        elif p >= 1000:
-            return f"{p/1000:.0f}K"
-        else:
-            return f"{p:.0f}"
-
-    price_ranges = []
-    for i in range(len(unique_edges) - 1):
-        low = unique_edges[i]
-        high = unique_edges[i + 1]
-        label = f"{format_price(low)} - {format_price(high)}"
-
-        if i == len(unique_edges) - 2:
-            count = sum(1 for p in prices if low <= p <= high)
-        else:
-            count = sum(1 for p in prices if low <= p < high)
-
-        price_ranges.append({
-            "range": label,
-            "count": count,
-            "percentage": round(count / n * 100, 1)
-        })
-
     return {
         "city": city_name,
-        "total_listings": len(listings),
+        "total_listings": total_listings,
         "districts": district_names,
-        "stats": stats,
-        "price_ranges": price_ranges
+        "stats": price_stats["stats"],
+        "price_ranges": price_stats["price_ranges"]
     }
 
 
@@ -731,8 +1360,51 @@ def get_stats_summary(db: Session) -> Dict[str, Any]:
     }
 
 
+def refresh_listing_summary(
+    db: Session,
+    platform: Optional[str] = None,
+    kategori: Optional[str] = None,
+    ilan_tipi: Optional[str] = None
+) -> int:
+    """listing_summary'yi listings'ten yeniden hesapla.
+
+    platform/kategori/ilan_tipi verilirse sadece o dilim silinip yeniden
+    yazılır (idx_listings_filter ile); verilmezse tüm tablo. Commit çağırana
+    aittir. Yazılan özet satırı sayısını döndürür.
+    """
+    group_columns = [
+        Location.il, Location.ilce, Listing.platform, Listing.kategori, Listing.ilan_tipi, Listing.alt_kategori
+    ]
+    source = select(
+        *group_columns,
+        func.count(Listing.id),
+        func.sum(Listing.fiyat),
+        func.count(Listing.fiyat),
+        func.max(Listing.created_at),
+        literal(datetime.utcnow()),
+    ).join(Location, Listing.location_id == Location.id).group_by(*group_columns)
+    stale = db.query(ListingSummary)
+
+    for summary_column, listing_column, value in (
+        (ListingSummary.platform, Listing.platform, platform),
+        (ListingSummary.kategori, Listing.kategori, kategori),
+        (ListingSummary.ilan_tipi, Listing.ilan_tipi, ilan_tipi),
+    ):
+        if value:
+            source = source.where(listing_column == value)
+            stale = stale.filter(summary_column == value)
+
+    stale.delete(synchronize_session=False)
+    result = db.execute(insert(ListingSummary).from_select(
+        ["il", "ilce", "platform", "kategori", "ilan_tipi", "alt_kategori",
+         "listing_count", "price_sum", "price_count", "last_date", "refreshed_at"],
+        source,
+    ))
+    return max(result.rowcount or 0, 0)
+
+
 def get_results_for_frontend(db: Session) -> List[Dict[str, Any]]:
-    """Frontend icin sehir bazli gruplanmis sonuclari getir."""
+    """Frontend icin sehir bazli gruplanmis sonuclari getir (listing_summary'den)."""
     # Kategori/ilan tipi goruntuleme eslemeleri
     platform_map = {"hepsiemlak": "HepsiEmlak", "emlakjet": "Emlakjet"}
     category_map = {"konut": "Konut", "arsa": "Arsa", "isyeri": "İşyeri", "devremulk": "Devremülk",
@@ -742,24 +1414,8 @@ def get_results_for_frontend(db: Session) -> List[Dict[str, Any]]:
     # İl + İlçe bazında gruplama (mahalle aggregate ediliyor)
     results = []
 
-    combinations = db.query(
-        Location.il,
-        Location.ilce,
-        Listing.platform,
-        Listing.kategori,
-        Listing.ilan_tipi,
-        Listing.alt_kategori,
-        func.count(Listing.id).label('count'),
-        func.avg(Listing.fiyat).label('avg_price'),
-        func.max(Listing.created_at).label('last_date')
-    ).join(Location).group_by(
-        Location.il,
-        Location.ilce,
-        Listing.platform,
-        Listing.kategori,
-        Listing.ilan_tipi,
-        Listing.alt_kategori
-    ).order_by(func.max(Listing.created_at).desc()).all()
+    # Salt okuma: özet açılışta run_migrations, sonra oturum tamamlama/silme ile güncellenir
+    combinations = db.query(ListingSummary).order_by(ListingSummary.last_date.desc(), ListingSummary.id).all()
 
     def _normalize_display_location(value: Optional[str]) -> Optional[str]:
         if value is None:
@@ -804,6 +1460,7 @@ def get_results_for_frontend(db: Session) -> List[Dict[str, Any]]:
         subtype_display = row.alt_kategori.replace('_', ' ').title() if row.alt_kategori else None
 
         # Tarihi biçimlendir
+        avg_price = row.price_sum / row.price_count if row.price_count else None
         date_str = row.last_date.strftime('%d.%m.%Y %H:%M') if row.last_date else "-"
         date_iso = row.last_date.isoformat() if row.last_date else None
 
@@ -820,8 +1477,8 @@ def get_results_for_frontend(db: Session) -> List[Dict[str, Any]]:
             "district": district,
             "date": date_str,
             "date_iso": date_iso,
-            "count": row.count,
-            "avg_price": round(row.avg_price, 2) if row.avg_price else None,
+            "count": row.listing_count,
+            "avg_price": round(avg_price, 2) if avg_price else None,
             "file_size": 0,
             "file_size_mb": 0,
             "status": "completed",
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""İlan içerik hash'i - orjson ile kanonik kodlama ve BLAKE2b özeti.
+
+v1 hash'leri f-string + json.dumps + MD5 ile üretiliyordu. v2 aynı alanları
+tek bir sözlükte toplayıp orjson ile sıralı anahtarlarla byte'a çevirir ve
+BLAKE2b-128 ile özetler (32 hex karakter - mevcut kolona sığar).
+Eski satırlar content_hash_version ile ayırt edilir; açılıştaki geçiş
+(migrations.backfill_content_hash_versions) v1 hash'i satırın kendi
+kolonlarından doğrulanabilenleri bir kez v2'ye yükseltir. Kalanlar ilk
+görüldüklerinde v1 hash'iyle karşılaştırılıp sessizce yükseltilir.
+"""
+
+import hashlib
+import json
+from typing import Any, Dict, Optional
+
+import orjson
+
+CONTENT_HASH_VERSION = 2
+
+# Hash'e dahil edilecek alanlar (fiyat hariç)
+HASH_FIELDS = (
+    'baslik',
+    'oda_sayisi', 'metrekare', 'bina_yasi', 'kat',
+    'arsa_metrekare', 'imar_durumu', 'arsa_tipi',
+    'isyeri_tipi', 'tesis_tipi', 'yatak_sayisi',
+    'emlak_ofisi', 'tip',
+)
+
+_ORJSON_OPTIONS = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS
+
+# Sözlük zaten sıralı kurulduğunda OPT_SORT_KEYS ile aynı byte'lar çıkar
+_SORTED_HASH_FIELDS = tuple(sorted(HASH_FIELDS))
+
+
+def canonical_content_bytes(data: Dict[str, Any]) -> bytes:
+    """Hash alanlarının kanonik (anahtar sıralı) byte kodlaması"""
+    payload = {field: value for field in _SORTED_HASH_FIELDS if (value := data.get(field)) is not None}
+
+    details = data.get('details')
+    if details and isinstance(details, dict):
+        payload['details'] = details
+        return orjson.dumps(payload, option=_ORJSON_OPTIONS, default=str)
+
+    # Tarayıcı kayıtlarında details yok: düz yol sıralama yapmaz
+    return orjson.dumps(payload, default=str)
+
+
+def compute_content_hash(data: Dict[str, Any]) -> str:
+    """İlan içerik hash'i hesapla (v2, fiyat hariç)"""
+    return hashlib.blake2b(canonical_content_bytes(data), digest_size=16).hexdigest()
+
+
+def compute_legacy_content_hash(data: Dict[str, Any]) -> str:
+    """v1 (MD5) içerik hash'i - sadece eski satırlarla karşılaştırma için"""
+    content_parts = []
+    for field in HASH_FIELDS:
+        value = data.get(field)
+        if value is not None:
+            content_parts.append(f"{field}:{value}")
+
+    details = data.get('details')
+    if details and isinstance(details, dict):
+        content_parts.append(f"details:{json.dumps(details, sort_keys=True)}")
+
+    content_str = "|".join(sorted(content_parts))
+    return hashlib.md5(content_str.encode('utf-8')).hexdigest()
+
+
+def content_hash_matches(
+    stored_hash: Optional[str],
+    stored_version: Optional[int],
+    data: Dict[str, Any],
+    new_hash: str
+) -> bool:
+    """Kayıtlı hash, gelen veriyle aynı içeriği mi gösteriyor.
+
+    Eski sürümle yazılmış satırlarda v1 hash'i sadece gerektiğinde hesaplanır.
+    """
+    if stored_version == CONTENT_HASH_VERSION:
+        return stored_hash == new_hash
+    return stored_hash == compute_legacy_content_hash(data)
@@ -10,6 +10,8 @@ if __name__ == "__main__":
     sys.path.insert(0, backend_dir)
 
 from database.connection import engine, DATABASE_PATH
+from database.migrations import run_migrations
+from database.partitioning import ensure_partitioned_listings
 from database.models import Base
 
 
@@ -17,9 +19,17 @@ def init_database():
     """Tüm tabloları oluştur"""
     print(f"Initializing database at: {DATABASE_PATH}")
 
+    # Bölümleme açıksa (PostgreSQL) listings create_all'dan önce bölümlü oluşturulur
+    if ensure_partitioned_listings(engine):
+        print("  + listings created as partitioned table (platform/ilan_tipi)")
+
     # Tüm tabloları oluştur
     Base.metadata.create_all(bind=engine)
 
+    # Mevcut tablolara sonradan eklenen kolonlar, doldurmalar ve index'ler
+    for step in run_migrations(engine):
+        print(f"  + applied {step}")
+
     print("Database tables created successfully!")
     print("\nTables created:")
     for table_name in Base.metadata.tables.keys():
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""İlan URL'lerinden platforma özgü kısa ilan anahtarı (external_id) çıkarımı.
+
+Tekrar kontrolü uzun ilan_url metni yerine (platform, external_id) üzerinden
+yapılır. Başlık/lokasyon slug'ı değişse de URL sonundaki ilan numarası aynı
+kaldığı için aynı ilan yeni sayılmaz.
+
+    emlakjet:   /ilan/satilik-daire-istanbul-kadikoy-3-1-16234567  -> "16234567"
+    hepsiemlak: /istanbul-kadikoy-satilik/daire/144477-1234         -> "144477-1234"
+"""
+
+import re
+from typing import Optional
+from urllib.parse import urlparse
+
+EXTERNAL_ID_MAX_LENGTH = 32
+
+_PLATFORM_HOSTS = {
+    "emlakjet": "emlakjet.com",
+    "hepsiemlak": "hepsiemlak.com",
+}
+
+# EmlakJet: son path parçasının sonundaki sayı
+_EMLAKJET_ID_RE = re.compile(r"(?:^|-)(\d{5,})$")
+# HepsiEmlak: son path parçası "<ofis>-<ilan>" ya da sadece sayı
+_HEPSIEMLAK_ID_RE = re.compile(r"^(\d+(?:-\d+)?)$")
+
+_PLATFORM_PATTERNS = {
+    "emlakjet": _EMLAKJET_ID_RE,
+    "hepsiemlak": _HEPSIEMLAK_ID_RE,
+}
+
+
+def extract_external_id(platform: Optional[str], listing_url: Optional[str]) -> Optional[str]:
+    """URL'den platformun ilan numarasını çıkar, tanınmazsa None"""
+    pattern = _PLATFORM_PATTERNS.get((platform or "").lower())
+    if pattern is None or not listing_url:
+        return None
+
+    try:
+        parsed = urlparse(listing_url)
+    except ValueError:
+        return None
+
+    host = (parsed.netloc or "").lower()
+    if host and _PLATFORM_HOSTS[platform.lower()] not in host:
+        return None
+
+    parts = [part for part in parsed.path.split("/") if part]
+    if not parts:
+        return None
+
+    match = pattern.search(parts[-1].lower())
+    if not match:
+        return None
+    external_id = match.group(1)
+    return external_id if len(external_id) <= EXTERNAL_ID_MAX_LENGTH else None
+
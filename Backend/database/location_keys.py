@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""İl/ilçe adları için Türkçe karakter katlamalı arama anahtarı (il_key, ilce_key).
+
+Kullanıcıdan gelen "istanbul", "İSTANBUL" ya da "Istanbul" aynı lokasyona
+eşlenmelidir. Anahtar satır eklenirken bir kez hesaplanıp indeksli kolonda
+saklanır; sorgular tüm lokasyonları Python'da normalize etmek yerine tek bir
+eşitlik koşuluyla çalışır.
+
+    "İstanbul" -> "istanbul", "Kadıköy" -> "kadikoy", "ŞIŞLI" -> "sisli"
+"""
+
+from typing import Optional
+
+from sqlalchemy import text
+
+_TURKISH_FOLD = str.maketrans({
+    "ı": "i", "İ": "i", "I": "i",
+    "ş": "s", "Ş": "s",
+    "ğ": "g", "Ğ": "g",
+    "ü": "u", "Ü": "u",
+    "ö": "o", "Ö": "o",
+    "ç": "c", "Ç": "c",
+})
+
+FILL_BATCH_SIZE = 1000
+
+
+def fold_location_name(value: Optional[str]) -> Optional[str]:
+    """Türkçe karakterleri ASCII karşılığına indirip küçük harfe çevir"""
+    if value is None:
+        return None
+    folded = value.strip().translate(_TURKISH_FOLD).lower()
+    return folded or None
+
+
+def fill_location_keys(conn, batch_size: int = FILL_BATCH_SIZE) -> int:
+    """il_key'i boş lokasyonların anahtarlarını doldur.
+
+    ORM/Core insert'leri anahtarı kolon varsayılanıyla yazar; ham SQL ile
+    eklenen (COPY ingest) ve geçiş öncesi satırlar burada tamamlanır.
+    conn bir Connection ya da Session olabilir.
+    """
+    filled = 0
+    last_id = 0
+    while True:
+        rows = conn.execute(text(
+            "SELECT id, il, ilce FROM locations "
+            "WHERE il_key IS NULL AND id > :last_id ORDER BY id LIMIT :limit"
+        ), {"last_id": last_id, "limit": batch_size}).all()
+        if not rows:
+            return filled
+        last_id = rows[-1].id
+        conn.execute(text("UPDATE locations SET il_key = :il_key, ilce_key = :ilce_key WHERE id = :id"), [
+            {"id": row.id, "il_key": fold_location_name(row.il), "ilce_key": fold_location_name(row.ilce)}
+            for row in rows
+        ])
+        filled += len(rows)
@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+"""Tarama oturumu boyunca lokasyon ID'lerini önbellekleyen çözümleyici."""
+
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import and_, event, insert, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from .models import Location
+
+LocationKey = Tuple[str, Optional[str], Optional[str]]
+
+# Tek sorguda aranacak maksimum lokasyon sayısı
+LOOKUP_CHUNK_SIZE = 200
+
+# Commit bekleyen ID'leri olan çözümleyiciler (session.info anahtarı)
+_PENDING_RESOLVERS = "location_resolvers_pending"
+
+
+def normalize_location_key(
+    il: Optional[str],
+    ilce: Optional[str] = None,
+    mahalle: Optional[str] = None
+) -> LocationKey:
+    """get_or_create_location ile aynı kurallarla (il, ilce, mahalle) anahtarı üret"""
+    il = il.strip() if il else None
+    ilce = ilce.strip() if ilce else None
+    mahalle = mahalle.strip() if mahalle else None
+    if not il:
+        il = "Belirtilmemiş"
+    return (il, ilce, mahalle)
+
+
+def _location_filter(key: LocationKey):
+    il, ilce, mahalle = key
+    return and_(
+        Location.il == il,
+        Location.ilce == ilce if ilce else Location.ilce.is_(None),
+        Location.mahalle == mahalle if mahalle else Location.mahalle.is_(None),
+    )
+
+
+class LocationResolver:
+    """(il, ilce, mahalle) -> location_id eşlemesini LRU önbellekte tutar.
+
+    Bir tarama oturumu birkaç yüz farklı lokasyona dokunur; her ilan için
+    ayrı SELECT atmak yerine oturum başında hedef şehirler tek sorguda
+    yüklenir, eksikler sayfa başına toplu aranır ve toplu eklenir.
+
+    Bir transaction içinde öğrenilen ID'ler (yeni eklenenler dahil) önce
+    o oturumun bekleyen eşlemesinde tutulur ve ancak dış transaction commit
+    edilince LRU'ya geçer; geri alınırsa atılır. Böylece rollback ile
+    kaybolan satırların ID'leri sonraki sayfalara FK hatası olarak taşınmaz.
+
+    Görev oturumu (warm) ve write-behind oturumu aynı çözümleyiciyi farklı
+    thread'lerden kullanır: bekleyen eşlemeler oturum başına ayrı tutulur ve
+    tüm durum bir kilitle korunur.
+    """
+
+    def __init__(self, maxsize: int = 50000):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[LocationKey, int]" = OrderedDict()
+        self._pending: Dict[Session, Dict[LocationKey, int]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def get(self, key: LocationKey, db: Optional[Session] = None) -> Optional[int]:
+        """Önbellekteki ID; db verilirse o oturumun commit bekleyen ID'leri de bakılır"""
+        with self._lock:
+            if db is not None:
+                location_id = self._pending.get(db, {}).get(key)
+                if location_id is not None:
+                    return location_id
+            location_id = self._cache.get(key)
+            if location_id is not None:
+                self._cache.move_to_end(key)
+            return location_id
+
+    def _stage(self, db: Session, key: LocationKey, location_id: int) -> None:
+        """Transaction içinde görülen ID'yi commit'e kadar oturumun bekleyen eşlemesine al"""
+        with self._lock:
+            pending = self._pending.setdefault(db, {})
+            current = pending.get(key)
+            if current is None or location_id < current:
+                pending[key] = location_id
+        db.info.setdefault(_PENDING_RESOLVERS, set()).add(self)
+
+    def _promote_pending(self, db: Session) -> None:
+        with self._lock:
+            for key, location_id in self._pending.pop(db, {}).items():
+                self._put(key, location_id)
+
+    def _discard_pending(self, db: Session) -> None:
+        with self._lock:
+            self._pending.pop(db, None)
+
+    def _put(self, key: LocationKey, location_id: int) -> None:
+        # Çağıran self._lock'u tutar
+        # Aynı anahtar için birden fazla satır varsa en küçük ID'yi kullan
+        current = self._cache.get(key)
+        if current is not None and current <= location_id:
+            self._cache.move_to_end(key)
+            return
+        self._cache[key] = location_id
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.maxsize:
+            self._cache.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+            self._pending.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def warm(self, db: Session, cities: Optional[Iterable[str]]) -> int:
+        """Hedef şehirlerin tüm lokasyonlarını tek sorguyla önbelleğe al"""
+        city_names = sorted({c.strip() for c in (cities or []) if c and c.strip()})
+        if not city_names:
+            return 0
+
+        rows = db.query(
+            Location.id, Location.il, Location.ilce, Location.mahalle
+        ).filter(Location.il.in_(city_names)).all()
+        for row in rows:
+            self._stage(db, normalize_location_key(row.il, row.ilce, row.mahalle), row.id)
+        return len(rows)
+
+    def resolve(
+        self,
+        db: Session,
+        il: Optional[str],
+        ilce: Optional[str] = None,
+        mahalle: Optional[str] = None
+    ) -> int:
+        """Tek lokasyonun ID'sini getir, yoksa oluştur"""
+        key = normalize_location_key(il, ilce, mahalle)
+        return self.resolve_many(db, [key])[key]
+
+    def resolve_many(self, db: Session, keys: Iterable[LocationKey]) -> Dict[LocationKey, int]:
+        """Anahtarların ID'lerini getir; önbellekte olmayanları toplu ara ve ekle"""
+        keys = list(dict.fromkeys(keys))
+        resolved: Dict[LocationKey, int] = {}
+        pending: List[LocationKey] = []
+        for key in keys:
+            location_id = self.get(key, db)
+            if location_id is None:
+                pending.append(key)
+            else:
+                resolved[key] = location_id
+        with self._lock:
+            self.hits += len(resolved)
+            self.misses += len(pending)
+
+        if pending:
+            found = self._load(db, pending)
+            missing = [key for key in pending if key not in found]
+            if missing:
+                found.update(self._insert_missing(db, missing))
+            for key in pending:
+                resolved[key] = found[key]
+
+        return resolved
+
+    def _load(self, db: Session, keys: List[LocationKey]) -> Dict[LocationKey, int]:
+        found: Dict[LocationKey, int] = {}
+        for start in range(0, len(keys), LOOKUP_CHUNK_SIZE):
+            chunk = keys[start:start + LOOKUP_CHUNK_SIZE]
+            rows = db.query(
+                Location.id, Location.il, Location.ilce, Location.mahalle
+            ).filter(or_(*[_location_filter(key) for key in chunk])).order_by(Location.id).all()
+            for row in rows:
+                key = normalize_location_key(row.il, row.ilce, row.mahalle)
+                found.setdefault(key, row.id)
+                self._stage(db, key, row.id)
+        return found
+
+    def _insert_missing(self, db: Session, keys: List[LocationKey]) -> Dict[LocationKey, int]:
+        rows = [{"il": il, "ilce": ilce, "mahalle": mahalle} for il, ilce, mahalle in keys]
+        try:
+            with db.begin_nested():
+                db.execute(insert(Location), rows)
+        except IntegrityError:
+            # Yarış durumu - başka bir worker bazılarını eklemiş olabilir,
+            # kalanları tek tek ekle
+            found = self._load(db, keys)
+            for key in keys:
+                if key in found:
+                    continue
+                try:
+                    with db.begin_nested():
+                        db.execute(insert(Location), [dict(zip(("il", "ilce", "mahalle"), key))])
+                except IntegrityError:
+                    pass
+
+        return self._load(db, keys)
+
+
+@event.listens_for(Session, "after_commit")
+def _promote_after_commit(session: Session) -> None:
+    # Savepoint commit'i de bu olayı tetikler; sadece dış transaction kalıcıdır
+    if session.in_nested_transaction():
+        return
+    for resolver in session.info.pop(_PENDING_RESOLVERS, ()):
+        resolver._promote_pending(session)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_after_rollback(session: Session, previous_transaction) -> None:
+    # Savepoint geri alınınca da atılır; gereken ID'ler sonraki çağrıda yeniden aranır
+    for resolver in session.info.pop(_PENDING_RESOLVERS, ()):
+        resolver._discard_pending(session)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _discard_after_close(session: Session, transaction) -> None:
+    # Commit'siz kapanan oturum (close) - bekleyenler kalıcı değil
+    if transaction.parent is None:
+        for resolver in session.info.pop(_PENDING_RESOLVERS, ()):
+            resolver._discard_pending(session)
@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+"""create_all'ın mevcut tablolara eklemediği kolonlar için hafif şema geçişleri.
+
+Özet tablolar (listing_summary) da burada, açılışta bir kez kurulur; okuma
+uçları tabloya yazmaz.
+"""
+
+import json
+from typing import List, Optional
+
+from sqlalchemy import inspect, text
+from sqlalchemy.orm import Session
+
+from .hashing import CONTENT_HASH_VERSION, compute_content_hash, compute_legacy_content_hash
+from .listing_keys import extract_external_id
+from .location_keys import fill_location_keys
+from .models import Listing
+from .partitioning import LISTINGS_TABLE, is_listings_partitioned, listing_index_ddl
+
+# (tablo, kolon, DDL tipi) - sadece eklenen, nullable kolonlar
+ADDED_COLUMNS = [
+    ("listings", "content_hash_version", "SMALLINT"),
+    ("listings", "external_id", "VARCHAR(32)"),
+    ("listings", "last_seen_at", "TIMESTAMP"),
+    ("locations", "il_key", "VARCHAR(100)"),
+    ("locations", "ilce_key", "VARCHAR(100)"),
+]
+
+BACKFILL_BATCH_SIZE = 1000
+
+
+def backfill_listing_external_ids(engine, batch_size: int = BACKFILL_BATCH_SIZE) -> int:
+    """Mevcut ilanların external_id'sini URL'lerinden doldur.
+
+    id sırasıyla ve batch başına ayrı transaction'da ilerler. Slug değişikliği
+    yüzünden aynı ilanın birden çok satırı varsa numara en eski satıra yazılır,
+    diğerleri NULL kalır (unique index'i bozmamak için).
+    """
+    with engine.connect() as conn:
+        taken = {
+            (row.platform, row.external_id)
+            for row in conn.execute(text(
+                "SELECT platform, external_id FROM listings WHERE external_id IS NOT NULL"
+            ))
+        }
+
+    filled = 0
+    last_id = 0
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(text(
+                "SELECT id, platform, ilan_url FROM listings "
+                "WHERE external_id IS NULL AND ilan_url IS NOT NULL AND id > :last_id "
+                "ORDER BY id LIMIT :limit"
+            ), {"last_id": last_id, "limit": batch_size}).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+
+            updates = []
+            for row in rows:
+                external_id = extract_external_id(row.platform, row.ilan_url)
+                if external_id and (row.platform, external_id) not in taken:
+                    taken.add((row.platform, external_id))
+                    updates.append({"id": row.id, "external_id": external_id})
+            if updates:
+                conn.execute(text("UPDATE listings SET external_id = :external_id WHERE id = :id"), updates)
+                filled += len(updates)
+    return filled
+
+
+def backfill_listing_last_seen(engine) -> int:
+    """Eski ilanlarda last_seen_at'ı son güncelleme/oluşturma zamanıyla doldur"""
+    with engine.begin() as conn:
+        return conn.execute(text(
+            "UPDATE listings SET last_seen_at = COALESCE(updated_at, created_at) "
+            "WHERE last_seen_at IS NULL"
+        )).rowcount
+
+
+def backfill_content_hash_versions(engine, batch_size: int = BACKFILL_BATCH_SIZE) -> int:
+    """v1 (MD5) hash'li satırları satırın kendi kolonlarından v2'ye yükselt.
+
+    v1 hash baslik, emlak_ofisi ve details kolonundan yeniden hesaplanır; sadece
+    kayıtlı hash ile eşleşen satırlar yükseltilir. Eşleşmeyenler (birleştirilmiş
+    details, varsayılan başlık vb.) v1 kalır ve ilk görüldüklerinde yükseltilir.
+    """
+    upgraded = 0
+    last_id = 0
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(text(
+                "SELECT id, baslik, emlak_ofisi, details, content_hash FROM listings "
+                "WHERE content_hash_version IS NULL AND content_hash IS NOT NULL AND id > :last_id "
+                "ORDER BY id LIMIT :limit"
+            ), {"last_id": last_id, "limit": batch_size}).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+
+            updates = []
+            for row in rows:
+                details = json.loads(row.details) if isinstance(row.details, str) else row.details
+                data = {**(details or {}), "baslik": row.baslik, "emlak_ofisi": row.emlak_ofisi}
+                if compute_legacy_content_hash(data) == row.content_hash:
+                    updates.append({"id": row.id, "content_hash": compute_content_hash(data)})
+            if updates:
+                conn.execute(text(
+                    "UPDATE listings SET content_hash = :content_hash, "
+                    f"content_hash_version = {CONTENT_HASH_VERSION} WHERE id = :id"
+                ), updates)
+                upgraded += len(updates)
+    return upgraded
+
+
+def backfill_location_keys(engine, batch_size: int = BACKFILL_BATCH_SIZE) -> int:
+    """Mevcut lokasyonların il_key/ilce_key anahtarlarını doldur"""
+    with engine.begin() as conn:
+        return fill_location_keys(conn, batch_size)
+
+
+# (index adı, tablo, kolonlar, unique, doldurma) - index, kolon doldurulduktan sonra kurulur;
+# doldurma yarıda kalsa bile index yokken bir sonraki çalıştırmada tamamlanır
+ADDED_INDEXES = [
+    ("uq_listings_platform_external_id", "listings", ("platform", "external_id"), True,
+     backfill_listing_external_ids),
+    ("idx_listings_last_seen", "listings", ("last_seen_at",), False, backfill_listing_last_seen),
+    ("idx_listings_created_id", "listings", ("created_at", "id"), False, None),
+    ("idx_sessions_started_id", "scrape_sessions", ("started_at", "id"), False, None),
+    ("idx_listings_updated", "listings", ("updated_at",), False, None),
+    ("idx_locations_il_key_ilce_key", "locations", ("il_key", "ilce_key"), False, backfill_location_keys),
+    ("idx_listings_ilan_url", "listings", ("ilan_url",), False, None),
+    ("idx_listings_hash_v1", "listings", ("id",), False, backfill_content_hash_versions),
+    ("uq_listings_url_without_external_id", "listings", ("ilan_url",), True, None),
+]
+
+# (tablo, kolonlar) - modelden kaldırılan unique kısıtlar; yerlerini alan index'ler
+# kurulduktan sonra düşürülür. listings.ilan_url: tekillik artık (platform, external_id)
+# ve numarasız URL'ler için kısmi index'te.
+DROPPED_UNIQUE_CONSTRAINTS = [
+    ("listings", ("ilan_url",)),
+]
+
+
+def _index_ddl(conn, name: str, table: str, columns, unique: bool) -> str:
+    # listings index'leri modelden (USING/WHERE ve bölümleme anahtarlarıyla) üretilir
+    if table == LISTINGS_TABLE:
+        for index in Listing.__table__.indexes:
+            if index.name == name:
+                return listing_index_ddl(index, conn.dialect, is_listings_partitioned(conn))
+    return f"CREATE {'UNIQUE ' if unique else ''}INDEX IF NOT EXISTS {name} ON {table} ({', '.join(columns)})"
+
+
+def drop_unique_constraints(engine) -> List[str]:
+    """DROPPED_UNIQUE_CONSTRAINTS'teki kısıtları ve unique index'leri düşür (PostgreSQL).
+
+    SQLite'ta kolon kısıtı tablo yeniden kurulmadan düşürülemez; geliştirme
+    veritabanında yerinde kalır. Düşürülen adların listesini döndürür.
+    """
+    if engine.dialect.name != "postgresql":
+        return []
+    inspector = inspect(engine)
+    dropped = []
+    with engine.begin() as conn:
+        for table, columns in DROPPED_UNIQUE_CONSTRAINTS:
+            if not inspector.has_table(table):
+                continue
+            model_indexes = {index.name for index in Listing.__table__.indexes} if table == LISTINGS_TABLE else set()
+            for constraint in inspector.get_unique_constraints(table):
+                if tuple(constraint["column_names"][:len(columns)]) == columns:
+                    conn.execute(text(f'ALTER TABLE {table} DROP CONSTRAINT IF EXISTS "{constraint["name"]}"'))
+                    dropped.append(constraint["name"])
+            # Bölümlenmiş tabloda kısıt, bölümleme anahtarlı unique index olarak kurulur
+            for index in inspector.get_indexes(table):
+                if (index["unique"] and index["name"] not in model_indexes and index["name"] not in dropped
+                        and not index.get("duplicates_constraint")
+                        and tuple(index["column_names"][:len(columns)]) == columns):
+                    conn.execute(text(f'DROP INDEX IF EXISTS "{index["name"]}"'))
+                    dropped.append(index["name"])
+    return dropped
+
+
+def run_migrations(engine) -> List[str]:
+    """Eksik kolonları ekle, gerekirse doldur ve index'leri oluştur.
+
+    Uygulanan adımların listesini döndürür.
+    """
+    inspector = inspect(engine)
+    applied = []
+    with engine.begin() as conn:
+        for table, column, ddl_type in ADDED_COLUMNS:
+            if not inspector.has_table(table):
+                continue
+            existing = {col["name"] for col in inspector.get_columns(table)}
+            if column in existing:
+                continue
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl_type}"))
+            applied.append(f"{table}.{column}")
+
+    inspector = inspect(engine)
+    for name, table, columns, unique, backfill in ADDED_INDEXES:
+        if not inspector.has_table(table):
+            continue
+        if name in {index["name"] for index in inspector.get_indexes(table)}:
+            continue
+        if backfill:
+            filled = backfill(engine)
+            applied.append(f"{backfill.__name__} ({filled} rows)")
+        with engine.begin() as conn:
+            conn.execute(text(_index_ddl(conn, name, table, columns, unique)))
+        applied.append(name)
+
+    applied.extend(f"dropped {name}" for name in drop_unique_constraints(engine))
+
+    built = build_listing_summary(engine)
+    if built is not None:
+        applied.append(f"listing_summary ({built} rows)")
+    return applied
+
+
+def build_listing_summary(engine) -> Optional[int]:
+    """listing_summary boşsa ve ilan varsa (mevcut veritabanı) tamamını hesapla.
+
+    Yazılan özet satırı sayısını, bir şey yapılmadıysa None döndürür.
+    """
+    from .crud import refresh_listing_summary
+    from .models import Listing, ListingSummary
+
+    if not inspect(engine).has_table(ListingSummary.__tablename__):
+        return None
+    with Session(bind=engine) as db:
+        if db.query(ListingSummary.id).first() is not None or db.query(Listing.id).first() is None:
+            return None
+        built = refresh_listing_summary(db)
+        db.commit()
+    return built
@@ -4,14 +4,24 @@
 from datetime import datetime
 from typing import Optional, Dict, Any
 from sqlalchemy import (
-    Column, Integer, String, Float, Text, Boolean,
-    ForeignKey, DateTime, Date, JSON, Index, UniqueConstraint
+    Column, Integer, SmallInteger, String, Float, Text, Boolean,
+    ForeignKey, ForeignKeyConstraint, DateTime, Date, JSON, Index, UniqueConstraint, text
 )
 from sqlalchemy.orm import relationship, declarative_base
 
+from .location_keys import fold_location_name
+
 Base = declarative_base()
 
 
+def _il_key_default(context):
+    return fold_location_name(context.get_current_parameters().get("il"))
+
+
+def _ilce_key_default(context):
+    return fold_location_name(context.get_current_parameters().get("ilce"))
+
+
 class Location(Base):
     """Normalize edilmiş il/ilce/mahalle tablosu"""
     __tablename__ = "locations"
@@ -21,12 +31,17 @@ class Location(Base):
     ilce = Column(String(100), index=True)
     mahalle = Column(String(200))
 
+    # Türkçe karakter katlamalı arama anahtarları (database/location_keys.py)
+    il_key = Column(String(100), default=_il_key_default)
+    ilce_key = Column(String(100), default=_ilce_key_default)
+
     # İlişkiler
     listings = relationship("Listing", back_populates="location")
 
     __table_args__ = (
         UniqueConstraint('il', 'ilce', 'mahalle', name='uq_location'),
         Index('idx_locations_il_ilce', 'il', 'ilce'),
+        Index('idx_locations_il_key_ilce_key', 'il_key', 'ilce_key'),
     )
 
     def __repr__(self):
@@ -38,6 +53,15 @@ class Location(Base):
         return f"<Location({', '.join(parts)})>"
 
 
+# PostgreSQL'de isteğe bağlı LIST bölümleme anahtarları ve bilinen değerler
+# (database/partitioning.py). Bilinmeyen değerler DEFAULT bölüme düşer.
+LISTINGS_PARTITION_KEYS = ('platform', 'ilan_tipi')
+LISTINGS_PARTITIONS = {
+    'emlakjet': ('satilik', 'kiralik'),
+    'hepsiemlak': ('satilik', 'kiralik'),
+}
+
+
 class Listing(Base):
     """Ana ilan tablosu"""
     __tablename__ = "listings"
@@ -60,7 +84,8 @@ class Listing(Base):
     location = relationship("Location", back_populates="listings")
 
     # İlan detayları
-    ilan_url = Column(Text, unique=True)  # Tekrar kontrolü için benzersiz kısıtlama
+    ilan_url = Column(Text)  # Tekrar kontrolü: numaralı ilanlarda external_id, numarasızlarda URL
+    external_id = Column(String(32))  # Platformun ilan numarası (database/listing_keys.py)
     ilan_tarihi = Column(Date)
     emlak_ofisi = Column(String(200))
     resim_url = Column(Text)
@@ -69,12 +94,14 @@ class Listing(Base):
     details = Column(JSON)
 
     # Değişiklik tespiti için içerik hash'i (fiyat hariç)
-    content_hash = Column(String(32), index=True)  # MD5 hash
+    content_hash = Column(String(32), index=True)  # v2: BLAKE2b-128, v1: MD5
+    content_hash_version = Column(SmallInteger)  # NULL = v1 (database/hashing.py)
 
     # Meta veriler
     scrape_session_id = Column(Integer, ForeignKey("scrape_sessions.id"))
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    last_seen_at = Column(DateTime)  # Bir taramada en son görüldüğü an (değişmese de)
 
     # İlişkiler
     scrape_session = relationship("ScrapeSession", back_populates="listings")
@@ -84,6 +111,19 @@ class Listing(Base):
         Index('idx_listings_filter', 'platform', 'kategori', 'ilan_tipi', 'location_id'),
         Index('idx_listings_price', 'fiyat'),
         Index('idx_listings_created', 'created_at'),
+        Index('idx_listings_created_id', 'created_at', 'id'),  # Keyset sayfalama (database/pagination.py)
+        Index('idx_listings_last_seen', 'last_seen_at'),
+        Index('idx_listings_updated', 'updated_at'),  # Artımlı Parquet görüntüsü (database/snapshot.py)
+        Index('uq_listings_platform_external_id', 'platform', 'external_id', unique=True),
+        # Hâlâ v1 hash'li satırlar; COPY yolu v1 hash'i sadece bunlar varsa hesaplar
+        Index('idx_listings_hash_v1', 'id',
+              postgresql_where=text('content_hash_version IS NULL'),
+              sqlite_where=text('content_hash_version IS NULL')),
+        # URL aramaları için PostgreSQL'de hash index: uzun metni değil 4 baytlık hash'i saklar
+        Index('idx_listings_ilan_url', 'ilan_url', postgresql_using='hash'),
+        # Numarası çıkarılamayan ilanlar hâlâ URL ile tekil; diğerlerini external_id korur
+        Index('uq_listings_url_without_external_id', 'ilan_url', unique=True,
+              postgresql_where=text('external_id IS NULL'), sqlite_where=text('external_id IS NULL')),
     )
 
     def __repr__(self):
@@ -109,6 +149,7 @@ class Listing(Base):
             "resim_url": self.resim_url,
             "details": self.details,
             "created_at": self.created_at.isoformat() if self.created_at else None,
+            "last_seen_at": self.last_seen_at.isoformat() if self.last_seen_at else None,
         }
 
 
@@ -150,6 +191,7 @@ class ScrapeSession(Base):
 
     __table_args__ = (
         Index('idx_sessions_started', 'started_at'),
+        Index('idx_sessions_started_id', 'started_at', 'id'),
     )
 
     def __repr__(self):
@@ -178,12 +220,18 @@ class ScrapeSession(Base):
         }
 
 
+def _listing_fk_ddl_enabled(ddl, target, bind, dialect=None, **kw) -> bool:
+    """Bölümlenmiş listings'te id tek başına unique olmadığından FK oluşturulmaz"""
+    from .partitioning import partitioning_enabled
+    return not partitioning_enabled(dialect)
+
+
 class PriceHistory(Base):
     """İlan fiyat değişikliği geçmişi"""
     __tablename__ = "price_history"
 
     id = Column(Integer, primary_key=True, autoincrement=True)
-    listing_id = Column(Integer, ForeignKey("listings.id"), nullable=False, index=True)
+    listing_id = Column(Integer, nullable=False, index=True)
 
     old_price = Column(Float, nullable=False)
     new_price = Column(Float, nullable=False)
@@ -196,6 +244,7 @@ class PriceHistory(Base):
     listing = relationship("Listing", back_populates="price_history")
 
     __table_args__ = (
+        ForeignKeyConstraint(['listing_id'], ['listings.id']).ddl_if(callable_=_listing_fk_ddl_enabled),
         Index('idx_price_history_listing', 'listing_id'),
         Index('idx_price_history_changed', 'changed_at'),
     )
@@ -215,6 +264,115 @@ class PriceHistory(Base):
         }
 
 
+class ArchivedListing(Base):
+    """Uzun süredir görülmeyen ilanların soğuk arşivi (crud.archive_stale_listings).
+
+    Kolonlar Listing ile aynıdır, id korunur. Arşivde tekrar kontrolü
+    yapılmadığından ilan_url/external_id unique değildir.
+    """
+    __tablename__ = "listings_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+
+    baslik = Column(Text, nullable=False)
+    fiyat = Column(Float)
+    fiyat_text = Column(String(50))
+
+    platform = Column(String(20), nullable=False)
+    kategori = Column(String(50), nullable=False)
+    ilan_tipi = Column(String(20), nullable=False)
+    alt_kategori = Column(String(50))
+
+    location_id = Column(Integer, ForeignKey("locations.id"))
+    location = relationship("Location")
+
+    ilan_url = Column(Text)
+    external_id = Column(String(32))
+    ilan_tarihi = Column(Date)
+    emlak_ofisi = Column(String(200))
+    resim_url = Column(Text)
+
+    details = Column(JSON)
+
+    content_hash = Column(String(32))
+    content_hash_version = Column(SmallInteger)
+
+    scrape_session_id = Column(Integer)
+    created_at = Column(DateTime)
+    updated_at = Column(DateTime)
+    last_seen_at = Column(DateTime)
+
+    archived_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index('idx_listings_archive_filter', 'platform', 'kategori', 'ilan_tipi', 'location_id'),
+        Index('idx_listings_archive_created', 'created_at'),
+        Index('idx_listings_archive_url', 'ilan_url'),
+    )
+
+    def __repr__(self):
+        return f"<ArchivedListing(id={self.id}, archived_at={self.archived_at})>"
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Listing.to_dict ile aynı alanlar + arşiv bilgisi"""
+        data = Listing.to_dict(self)
+        data["archived"] = True
+        data["archived_at"] = self.archived_at.isoformat() if self.archived_at else None
+        return data
+
+
+class ArchivedPriceHistory(Base):
+    """Arşive taşınan ilanların fiyat geçmişi"""
+    __tablename__ = "price_history_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    listing_id = Column(Integer, nullable=False, index=True)
+
+    old_price = Column(Float, nullable=False)
+    new_price = Column(Float, nullable=False)
+    price_change = Column(Float)
+    price_change_percent = Column(Float)
+
+    changed_at = Column(DateTime)
+    archived_at = Column(DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<ArchivedPriceHistory(listing_id={self.listing_id}, {self.old_price} -> {self.new_price})>"
+
+
+class ListingSummary(Base):
+    """/results için (il, ilçe, platform, kategori, ilan_tipi, alt_kategori) özet tablosu.
+
+    crud.refresh_listing_summary ile oturum bitişinde ilgili
+    platform/kategori/ilan_tipi dilimi için yeniden hesaplanır.
+    """
+    __tablename__ = "listing_summary"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+
+    il = Column(String(100))
+    ilce = Column(String(100))
+    platform = Column(String(20), nullable=False)
+    kategori = Column(String(50), nullable=False)
+    ilan_tipi = Column(String(20), nullable=False)
+    alt_kategori = Column(String(50))
+
+    listing_count = Column(Integer, nullable=False, default=0)
+    price_sum = Column(Float)  # Fiyatı olan ilanların toplamı
+    price_count = Column(Integer, nullable=False, default=0)  # avg = price_sum / price_count
+    last_date = Column(DateTime)  # En yeni ilanın created_at'ı
+
+    refreshed_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index('idx_listing_summary_slice', 'platform', 'kategori', 'ilan_tipi'),
+        Index('idx_listing_summary_last_date', 'last_date'),
+    )
+
+    def __repr__(self):
+        return f"<ListingSummary({self.il}/{self.ilce}, {self.platform}, count={self.listing_count})>"
+
+
 class FailedPage(Base):
     """Başarısız sayfa takibi"""
     __tablename__ = "failed_pages"
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""(zaman damgası, id) üzerinden keyset (cursor) sayfalama.
+
+OFFSET derin sayfalarda atlanan tüm satırları tarar; keyset sorgusu ise
+son görülen (ts, id) çiftinden sonrasını (ts, id) composite index'iyle okur.
+Cursor istemciye opak bir base64url metni olarak verilir.
+"""
+
+import base64
+import binascii
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+
+from sqlalchemy import and_, or_
+
+
+def encode_cursor(timestamp: datetime, row_id: int) -> str:
+    """(timestamp, id) çiftini opak cursor metnine çevir"""
+    raw = f"{timestamp.isoformat()}|{row_id}".encode("ascii")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """encode_cursor'ın tersi; bozuk cursor için ValueError"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("ascii")
+        timestamp, row_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except (binascii.Error, UnicodeError, ValueError) as exc:
+        raise ValueError("Invalid cursor") from exc
+
+
+def keyset_page(query, timestamp_column, id_column, cursor: Optional[str], limit: int) -> Tuple[List[Any], Optional[str]]:
+    """Sorguyu (timestamp, id) azalan sırada cursor'dan itibaren sayfala.
+
+    Bir sonraki sayfanın cursor'ını ya da son sayfadaysa None döndürür.
+    Zaman damgası NULL olan satırlar cursor moduna dahil edilmez.
+    """
+    query = query.filter(timestamp_column.isnot(None))
+    if cursor:
+        after_ts, after_id = decode_cursor(cursor)
+        query = query.filter(or_(
+            timestamp_column < after_ts,
+            and_(timestamp_column == after_ts, id_column < after_id),
+        ))
+
+    # Bir fazla satır çekip sonraki sayfa olup olmadığını anla (COUNT yok)
+    rows = query.order_by(timestamp_column.desc(), id_column.desc()).limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(getattr(last, timestamp_column.key), getattr(last, id_column.key))
@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+"""listings tablosu için isteğe bağlı PostgreSQL LIST bölümleme.
+
+Tablo platform'a, her platform bölümü de ilan_tipi'ye göre bölünür
+(models.LISTINGS_PARTITIONS). Böylece platform/ilan_tipi filtreli okumalar ve
+/listings/group silmeleri sadece ilgili bölümlere dokunur.
+
+PostgreSQL bölümlenmiş tablolarda her unique kısıtın bölümleme anahtarlarını
+içermesini ister: birincil anahtar (id, platform, ilan_tipi) olur, unique
+index'lere de anahtarlar eklenir. ORM tarafında id birincil anahtar olarak
+kalır. price_history -> listings FK'si bu modda oluşturulmaz, fiyat geçmişi
+silmelerde uygulama tarafında temizlenir.
+"""
+
+from typing import List
+
+from sqlalchemy import UniqueConstraint, text
+from sqlalchemy.schema import CreateColumn
+
+from core.config import get_config
+from .models import LISTINGS_PARTITION_KEYS, LISTINGS_PARTITIONS, Listing
+
+LISTINGS_TABLE = "listings"
+UNPARTITIONED_TABLE = "listings_unpartitioned"
+
+
+def partitioning_enabled(dialect) -> bool:
+    """Bölümleme açık mı (DB_PARTITION_LISTINGS ve PostgreSQL)"""
+    return bool(
+        get_config().db_partition_listings
+        and dialect is not None
+        and dialect.name == "postgresql"
+    )
+
+
+def is_listings_partitioned(conn) -> bool:
+    """listings mevcut ve bölümlenmiş (relkind = 'p') mi"""
+    if conn.dialect.name != "postgresql":
+        return False
+    relkind = conn.execute(
+        text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:name)"),
+        {"name": LISTINGS_TABLE},
+    ).scalar()
+    return relkind == "p"
+
+
+def partition_name(platform: str, ilan_tipi: str = None) -> str:
+    parts = [LISTINGS_TABLE, platform]
+    if ilan_tipi:
+        parts.append(ilan_tipi)
+    return "_".join(parts)
+
+
+def _unique_index_ddl(name: str, columns: List[str], where: str = None) -> str:
+    # Unique index'ler bölümleme anahtarlarını içermek zorunda
+    columns = list(columns) + [key for key in LISTINGS_PARTITION_KEYS if key not in columns]
+    ddl = f"CREATE UNIQUE INDEX IF NOT EXISTS {name} ON {LISTINGS_TABLE} ({', '.join(columns)})"
+    return f"{ddl} WHERE {where}" if where else ddl
+
+
+def listing_index_ddl(index, dialect, partitioned: bool = False) -> str:
+    """Listing modelindeki bir index için IF NOT EXISTS DDL'i (USING/WHERE dahil)"""
+    options = index.dialect_options[dialect.name] if dialect.name in ("postgresql", "sqlite") else {}
+    where = options.get("where")
+    where = str(where.compile(dialect=dialect)) if where is not None else None
+    columns = [column.name for column in index.columns]
+    if index.unique and partitioned:
+        return _unique_index_ddl(index.name, columns, where)
+    using = f" USING {options['using']}" if options.get("using") else ""
+    ddl = (
+        f"CREATE {'UNIQUE ' if index.unique else ''}INDEX IF NOT EXISTS {index.name} "
+        f"ON {LISTINGS_TABLE}{using} ({', '.join(columns)})"
+    )
+    return f"{ddl} WHERE {where}" if where else ddl
+
+
+def build_partitioned_listings_ddl(dialect) -> List[str]:
+    """Listing modelinden bölümlenmiş ana tablo, index ve bölüm DDL'i üret"""
+    table = Listing.__table__
+    platform_key = LISTINGS_PARTITION_KEYS[0]
+
+    definitions = [str(CreateColumn(column).compile(dialect=dialect)) for column in table.columns]
+    primary_key = [column.name for column in table.primary_key.columns]
+    definitions.append(f"PRIMARY KEY ({', '.join(primary_key + list(LISTINGS_PARTITION_KEYS))})")
+    for fk in table.foreign_key_constraints:
+        local = ", ".join(column.name for column in fk.columns)
+        remote = ", ".join(element.column.name for element in fk.elements)
+        definitions.append(f"FOREIGN KEY ({local}) REFERENCES {fk.referred_table.name} ({remote})")
+
+    statements = [
+        f"CREATE TABLE {LISTINGS_TABLE} (\n    "
+        + ",\n    ".join(definitions)
+        + f"\n) PARTITION BY LIST ({platform_key})"
+    ]
+
+    for constraint in table.constraints:
+        if isinstance(constraint, UniqueConstraint):
+            columns = [column.name for column in constraint.columns]
+            name = constraint.name if isinstance(constraint.name, str) else f"uq_{LISTINGS_TABLE}_{'_'.join(columns)}"
+            statements.append(_unique_index_ddl(name, columns))
+    for index in sorted(table.indexes, key=lambda idx: idx.name):
+        statements.append(listing_index_ddl(index, dialect, partitioned=True))
+
+    statements.extend(build_partition_ddl())
+    return statements
+
+
+def build_partition_ddl() -> List[str]:
+    """Bilinen platform/ilan_tipi değerleri için bölümler (IF NOT EXISTS)"""
+    type_key = LISTINGS_PARTITION_KEYS[1]
+    statements = []
+    for platform, listing_types in LISTINGS_PARTITIONS.items():
+        parent = partition_name(platform)
+        statements.append(
+            f"CREATE TABLE IF NOT EXISTS {parent} PARTITION OF {LISTINGS_TABLE} "
+            f"FOR VALUES IN ('{platform}') PARTITION BY LIST ({type_key})"
+        )
+        for ilan_tipi in listing_types:
+            statements.append(
+                f"CREATE TABLE IF NOT EXISTS {partition_name(platform, ilan_tipi)} "
+                f"PARTITION OF {parent} FOR VALUES IN ('{ilan_tipi}')"
+            )
+        statements.append(
+            f"CREATE TABLE IF NOT EXISTS {partition_name(platform, 'default')} PARTITION OF {parent} DEFAULT"
+        )
+    statements.append(f"CREATE TABLE IF NOT EXISTS {partition_name('default')} PARTITION OF {LISTINGS_TABLE} DEFAULT")
+    return statements
+
+
+def ensure_partitioned_listings(engine) -> bool:
+    """Bölümleme açıksa listings'i create_all'dan önce bölümlenmiş oluştur.
+
+    Tablo zaten bölümlenmişse eksik bölümler eklenir. Bölümlenmemiş mevcut
+    tablo değiştirilmez (scripts/partition_listings.py). Tablo oluşturulduysa
+    True döner.
+    """
+    if not partitioning_enabled(engine.dialect):
+        return False
+    with engine.begin() as conn:
+        exists = conn.execute(text("SELECT to_regclass(:name)"), {"name": LISTINGS_TABLE}).scalar()
+        if not exists:
+            for statement in build_partitioned_listings_ddl(conn.dialect):
+                conn.execute(text(statement))
+            return True
+        if is_listings_partitioned(conn):
+            for statement in build_partition_ddl():
+                conn.execute(text(statement))
+    return False
+
+
+def migrate_listings_to_partitioned(engine, keep_old: bool = False) -> int:
+    """Mevcut listings tablosunu tek transaction'da bölümlenmiş tabloya taşı.
+
+    Eski tablo yeniden adlandırılır, veriler INSERT ... SELECT ile kopyalanır
+    ve id dizisi devam ettirilir. Kopyalanan satır sayısı döner.
+    """
+    columns = ", ".join(column.name for column in Listing.__table__.columns)
+    with engine.begin() as conn:
+        if conn.dialect.name != "postgresql":
+            raise RuntimeError("Listings partitioning requires PostgreSQL")
+        if is_listings_partitioned(conn):
+            return 0
+
+        conn.execute(text(f"LOCK TABLE {LISTINGS_TABLE} IN ACCESS EXCLUSIVE MODE"))
+
+        # Bölümlenmiş tabloya id tek başına referans verilemez
+        foreign_keys = conn.execute(text(
+            "SELECT conrelid::regclass::text AS table_name, conname FROM pg_constraint "
+            "WHERE contype = 'f' AND confrelid = to_regclass(:name)"
+        ), {"name": LISTINGS_TABLE}).all()
+        for row in foreign_keys:
+            conn.execute(text(f'ALTER TABLE {row.table_name} DROP CONSTRAINT "{row.conname}"'))
+
+        # Index ve dizi adları şema genelinde tekil - eskileri yeniden adlandır
+        conn.execute(text(f"ALTER TABLE {LISTINGS_TABLE} RENAME TO {UNPARTITIONED_TABLE}"))
+        index_names = conn.execute(
+            text("SELECT indexname FROM pg_indexes WHERE tablename = :name"),
+            {"name": UNPARTITIONED_TABLE},
+        ).scalars().all()
+        for index_name in index_names:
+            conn.execute(text(f'ALTER INDEX "{index_name}" RENAME TO "{index_name[:55]}_unpart"'))
+        conn.execute(text(f"ALTER SEQUENCE IF EXISTS {LISTINGS_TABLE}_id_seq RENAME TO {UNPARTITIONED_TABLE}_id_seq"))
+
+        for statement in build_partitioned_listings_ddl(conn.dialect):
+            conn.execute(text(statement))
+
+        copied = conn.execute(text(
+            f"INSERT INTO {LISTINGS_TABLE} ({columns}) SELECT {columns} FROM {UNPARTITIONED_TABLE}"
+        )).rowcount
+        conn.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{LISTINGS_TABLE}', 'id'), "
+            f"COALESCE((SELECT max(id) FROM {LISTINGS_TABLE}), 0) + 1, false)"
+        ))
+
+        if not keep_old:
+            conn.execute(text(f"DROP TABLE {UNPARTITIONED_TABLE}"))
+    return copied
@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+"""Fiyat dağılımı için tanımlayıcı istatistikler ve aralık (bin) sayıları.
+
+/analytics/stats ve /analytics/city aynı çıktıyı üretir: pandas describe
+benzeri stats (count, mean, std, min, q25, median, q75, max) ve yüzdelik
+tabanlı 5 fiyat aralığı. PostgreSQL'de hesap iki sorguyla veritabanında
+yapılır (percentile_cont + width_bucket), fiyatlar API sürecine taşınmaz.
+Diğer veritabanlarında (SQLite) fiyatlar tek seferde NumPy dizisine
+alınıp vektörel hesaplanır. Yüzdelikler iki yolda da doğrusal
+interpolasyonla (k = (n-1)·p) hesaplanır.
+
+summarize_prices_by_group harita (choropleth) için grup başına (ilçe) sadece
+count/mean/median döndürür; PostgreSQL'de tek GROUP BY sorgusudur.
+"""
+
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import Float, case, cast, func, select, union_all
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Session
+
+NUM_BINS = 5
+_DESCRIBE_QUANTILES = (0.25, 0.5, 0.75)
+
+
+def _quantiles(num_bins: int) -> List[float]:
+    """describe çeyreklikleri + aralık kenarları için gereken yüzdelikler"""
+    edges = [i / num_bins for i in range(num_bins + 1)]
+    return sorted(set(edges) | set(_DESCRIBE_QUANTILES))
+
+
+def format_price(price: float) -> str:
+    if price >= 1000000:
+        return f"{price/1000000:.1f}M"
+    elif price >= 1000:
+        return f"{price/1000:.0f}K"
+    else:
+        return f"{price:.0f}"
+
+
+def build_bin_edges(
+    quantile_values: Dict[float, float], min_price: float, max_price: float, num_bins: int = NUM_BINS
+) -> List[float]:
+    """Yüzdelik kenarları; yeterli benzersiz kenar yoksa eşit genişlikli kenarlar"""
+    bin_edges = [quantile_values[i / num_bins] for i in range(num_bins + 1)]
+
+    unique_edges = []
+    for edge in bin_edges:
+        if not unique_edges or edge > unique_edges[-1]:
+            unique_edges.append(edge)
+
+    if len(unique_edges) < 3:
+        bin_width = (max_price - min_price) / num_bins
+        unique_edges = [min_price + i * bin_width for i in range(num_bins + 1)]
+    return unique_edges
+
+
+def _build_result(
+    count: int,
+    mean: float,
+    std: Optional[float],
+    min_price: float,
+    max_price: float,
+    quantile_values: Dict[float, float],
+    edges: List[float],
+    bucket_counts: Sequence[int],
+) -> Dict[str, Any]:
+    stats = {
+        "count": count,
+        "mean": round(mean, 2),
+        "std": round(std, 2) if count > 1 and std is not None else 0,
+        "min": round(min_price, 2),
+        "q25": round(quantile_values[0.25], 2),
+        "median": round(quantile_values[0.5], 2),
+        "q75": round(quantile_values[0.75], 2),
+        "max": round(max_price, 2),
+    }
+    price_ranges = [
+        {
+            "range": f"{format_price(edges[i])} - {format_price(edges[i + 1])}",
+            "count": int(bucket_counts[i]),
+            "percentage": round(int(bucket_counts[i]) / count * 100, 1),
+        }
+        for i in range(len(edges) - 1)
+    ]
+    return {"stats": stats, "price_ranges": price_ranges}
+
+
+def describe_price_array(prices: np.ndarray, num_bins: int = NUM_BINS) -> Optional[Dict[str, Any]]:
+    """NumPy yolu: tek sıralama, vektörel yüzdelik ve searchsorted ile bin sayımı"""
+    if prices.size == 0:
+        return None
+    prices = np.sort(prices.astype(np.float64, copy=False))
+    n = prices.size
+
+    quantiles = np.array(_quantiles(num_bins))
+    positions = (n - 1) * quantiles
+    lower = np.floor(positions).astype(np.int64)
+    upper = np.minimum(lower + 1, n - 1)
+    values = prices[lower] + (prices[upper] - prices[lower]) * (positions - lower)
+    quantile_values = dict(zip(quantiles.tolist(), values.tolist()))
+
+    min_price, max_price = float(prices[0]), float(prices[-1])
+    edges = build_bin_edges(quantile_values, min_price, max_price, num_bins)
+
+    # Kenar sayısı <= fiyat -> 1 tabanlı bin; son bin üst sınırı dahil eder
+    buckets = np.minimum(np.searchsorted(np.array(edges), prices, side="right"), len(edges) - 1)
+    bucket_counts = np.bincount(buckets, minlength=len(edges))[1:]
+
+    std = float(prices.std(ddof=1)) if n > 1 else None
+    return _build_result(n, float(prices.mean()), std, min_price, max_price, quantile_values, edges, bucket_counts)
+
+
+def _describe_postgresql(db: Session, prices_subquery, num_bins: int) -> Optional[Dict[str, Any]]:
+    price = cast(prices_subquery.c.fiyat, Float)
+    quantiles = _quantiles(num_bins)
+
+    row = db.execute(select(
+        func.count(price),
+        func.avg(price),
+        func.stddev_samp(price),
+        func.min(price),
+        func.max(price),
+        func.percentile_cont(cast(postgresql.array(quantiles), postgresql.ARRAY(Float))).within_group(price),
+    ).select_from(prices_subquery)).one()
+    count, mean, std, min_price, max_price, quantile_list = row
+    if not count:
+        return None
+
+    quantile_values = dict(zip(quantiles, quantile_list))
+    edges = build_bin_edges(quantile_values, min_price, max_price, num_bins)
+
+    bucket = func.least(
+        func.width_bucket(price, cast(postgresql.array(edges), postgresql.ARRAY(Float))),
+        len(edges) - 1,
+    )
+    bucket_counts = [0] * (len(edges) - 1)
+    for index, bucket_count in db.execute(
+        select(bucket, func.count()).select_from(prices_subquery).group_by(bucket)
+    ):
+        if 1 <= index <= len(bucket_counts):
+            bucket_counts[index - 1] = bucket_count
+
+    return _build_result(count, float(mean), std, min_price, max_price, quantile_values, edges, bucket_counts)
+
+
+def describe_prices(db: Session, price_queries: Sequence, num_bins: int = NUM_BINS) -> Optional[Dict[str, Any]]:
+    """Fiyat sorgularının (tek kolon: fiyat) birleşimi için stats + price_ranges.
+
+    Fiyat yoksa None döner.
+    """
+    prices_subquery = (
+        price_queries[0] if len(price_queries) == 1 else union_all(*price_queries)
+    ).subquery()
+
+    if db.get_bind().dialect.name == "postgresql":
+        return _describe_postgresql(db, prices_subquery, num_bins)
+
+    prices = np.fromiter(
+        db.execute(select(prices_subquery.c.fiyat)).scalars(), dtype=np.float64
+    )
+    return describe_price_array(prices, num_bins)
+
+
+def _group_summary(count: int, mean: Optional[float], median: Optional[float]) -> Dict[str, Any]:
+    return {
+        "count": int(count),
+        "mean": round(float(mean), 2) if mean is not None else None,
+        "median": round(float(median), 2) if median is not None else None,
+    }
+
+
+def summarize_prices_by_group(db: Session, grouped_queries: Sequence) -> Dict[Any, Dict[str, Any]]:
+    """(group_key, fiyat) sorgularının birleşimi için grup başına count, mean, median.
+
+    count gruptaki tüm satırları sayar; mean ve median sadece pozitif
+    fiyatlardan hesaplanır (fiyatlı satır yoksa None).
+    """
+    grouped = (
+        grouped_queries[0] if len(grouped_queries) == 1 else union_all(*grouped_queries)
+    ).subquery()
+    key = grouped.c.group_key
+
+    if db.get_bind().dialect.name == "postgresql":
+        price = case((grouped.c.fiyat > 0, cast(grouped.c.fiyat, Float)))
+        rows = db.execute(
+            select(key, func.count(), func.avg(price), func.percentile_cont(0.5).within_group(price))
+            .group_by(key)
+        )
+        return {group: _group_summary(count, mean, median) for group, count, mean, median in rows}
+
+    counts: Dict[Any, int] = defaultdict(int)
+    prices: Dict[Any, List[float]] = defaultdict(list)
+    for group, fiyat in db.execute(select(key, grouped.c.fiyat)):
+        counts[group] += 1
+        if fiyat is not None and fiyat > 0:
+            prices[group].append(fiyat)
+
+    summary = {}
+    for group, count in counts.items():
+        values = np.array(prices[group], dtype=np.float64)
+        if values.size:
+            summary[group] = _group_summary(count, values.mean(), np.median(values))
+        else:
+            summary[group] = _group_summary(count, None, None)
+    return summary
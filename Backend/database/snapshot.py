@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+"""listings, locations ve price_history tablolarının Parquet anlık görüntüsü.
+
+Analistler toplu veri için API'yi tekrar tekrar sorgulamak yerine bu
+görüntüleri okur. Her çalıştırma kendi klasörüne yazılır:
+
+    <snapshot_dir>/<snapshot_id>/
+        listings/platform=emlakjet/ilan_tipi=satilik/il=İstanbul/part-0.parquet
+        price_history/platform=.../ilan_tipi=.../il=.../part-0.parquet
+        locations/part-0.parquet
+        manifest.json
+
+Tekrarlayan metin kolonları (kategori, ilçe, emlak ofisi...) Arrow
+dictionary tipiyle yazılır, okuyunca kategorik gelir. Artımlı modda sadece
+son görüntüden sonra güncellenen ilanlar (updated_at), eklenen fiyat
+değişiklikleri (changed_at) ve yeni lokasyonlar (id) yazılır; manifest'teki
+"parent" zinciri tam görüntüye kadar geri gider.
+"""
+
+import json
+import os
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from utils.logger import get_logger
+from .models import Listing, Location, PriceHistory
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+logger = get_logger("database.snapshot")
+
+STATE_FILE = "_state.json"
+MANIFEST_FILE = "manifest.json"
+PARTITION_COLUMNS = ("platform", "ilan_tipi", "il")
+
+# Dictionary olarak kodlanan kategorik kolonlar
+CATEGORICAL_COLUMNS = {"kategori", "alt_kategori", "ilce", "mahalle", "emlak_ofisi", "il_key", "ilce_key"}
+
+_LISTING_COLUMNS = (
+    Listing.id, Listing.baslik, Listing.fiyat, Listing.fiyat_text, Listing.platform, Listing.kategori,
+    Listing.ilan_tipi, Listing.alt_kategori, Listing.location_id, Location.il, Location.ilce, Location.mahalle,
+    Listing.ilan_url, Listing.external_id, Listing.ilan_tarihi, Listing.emlak_ofisi, Listing.resim_url,
+    Listing.details, Listing.created_at, Listing.updated_at, Listing.last_seen_at,
+)
+
+_PRICE_HISTORY_COLUMNS = (
+    PriceHistory.id, PriceHistory.listing_id, PriceHistory.old_price, PriceHistory.new_price,
+    PriceHistory.price_change, PriceHistory.price_change_percent, PriceHistory.changed_at,
+    Listing.platform, Listing.ilan_tipi, Location.il,
+)
+
+_LOCATION_COLUMNS = (
+    Location.id, Location.il, Location.ilce, Location.mahalle, Location.il_key, Location.ilce_key,
+)
+
+
+def _listings_statement(since: Optional[datetime]):
+    statement = select(*_LISTING_COLUMNS).outerjoin(Location, Listing.location_id == Location.id)
+    if since is not None:
+        statement = statement.where(Listing.updated_at > since)
+    return statement.order_by(Listing.id)
+
+
+def _price_history_statement(since: Optional[datetime]):
+    # Arşive taşınmış ilanların geçmişi listings_archive tarafında kalır
+    statement = (
+        select(*_PRICE_HISTORY_COLUMNS)
+        .join(Listing, PriceHistory.listing_id == Listing.id)
+        .outerjoin(Location, Listing.location_id == Location.id)
+    )
+    if since is not None:
+        statement = statement.where(PriceHistory.changed_at > since)
+    return statement.order_by(PriceHistory.id)
+
+
+def _locations_statement(after_id: int, max_id: int):
+    return select(*_LOCATION_COLUMNS).where(Location.id > after_id, Location.id <= max_id).order_by(Location.id)
+
+
+def iter_table_batches(db: Session, statement, batch_size: int) -> Iterator[List[Dict[str, Any]]]:
+    """Sorgu sonucunu yield_per ile batch batch sözlük listesi olarak getir"""
+    result = db.execute(statement.execution_options(yield_per=batch_size))
+    for partition in result.mappings().partitions():
+        rows = [dict(row) for row in partition]
+        for row in rows:
+            if isinstance(row.get("details"), (dict, list)):
+                row["details"] = json.dumps(row["details"], ensure_ascii=False)
+        yield rows
+
+
+def _arrow_schema(statement) -> "pa.Schema":
+    fields = []
+    for column in statement.selected_columns:
+        try:
+            python_type = column.type.python_type
+        except NotImplementedError:
+            python_type = None
+        if column.name in CATEGORICAL_COLUMNS:
+            arrow_type = pa.dictionary(pa.int32(), pa.string())
+        elif python_type is int:
+            arrow_type = pa.int64()
+        elif python_type is float:
+            arrow_type = pa.float64()
+        elif python_type is datetime:
+            arrow_type = pa.timestamp("us")
+        elif column.name == "ilan_tarihi":
+            arrow_type = pa.date32()
+        else:
+            arrow_type = pa.string()
+        fields.append(pa.field(column.name, arrow_type))
+    return pa.schema(fields)
+
+
+def _record_batches(db: Session, statement, schema: "pa.Schema", batch_size: int, counter: Dict[str, int]):
+    for rows in iter_table_batches(db, statement, batch_size):
+        counter["rows"] += len(rows)
+        yield pa.RecordBatch.from_pylist(rows, schema=schema)
+
+
+def _write_partitioned(db: Session, statement, path: str, batch_size: int) -> int:
+    """Batch'leri platform/ilan_tipi/il hive bölümlerine akışlı yaz"""
+    schema = _arrow_schema(statement)
+    counter = {"rows": 0}
+    ds.write_dataset(
+        _record_batches(db, statement, schema, batch_size, counter),
+        path,
+        schema=schema,
+        format="parquet",
+        partitioning=ds.partitioning(
+            pa.schema([schema.field(name) for name in PARTITION_COLUMNS]), flavor="hive"
+        ),
+        basename_template="part-{i}.parquet",
+        existing_data_behavior="error",
+        max_rows_per_group=batch_size,
+    )
+    return counter["rows"]
+
+
+def _write_single(db: Session, statement, path: str, batch_size: int) -> int:
+    schema = _arrow_schema(statement)
+    os.makedirs(path, exist_ok=True)
+    written = 0
+    with pq.ParquetWriter(os.path.join(path, "part-0.parquet"), schema) as writer:
+        for rows in iter_table_batches(db, statement, batch_size):
+            writer.write_batch(pa.RecordBatch.from_pylist(rows, schema=schema))
+            written += len(rows)
+    return written
+
+
+def load_state(snapshot_dir: str) -> Optional[Dict[str, Any]]:
+    """Son başarılı görüntünün durumu (yoksa None)"""
+    path = os.path.join(snapshot_dir, STATE_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def list_snapshots(snapshot_dir: str) -> List[Dict[str, Any]]:
+    """Mevcut görüntülerin manifest'leri, en yeni önce"""
+    if not os.path.isdir(snapshot_dir):
+        return []
+    manifests = []
+    for name in sorted(os.listdir(snapshot_dir), reverse=True):
+        path = os.path.join(snapshot_dir, name, MANIFEST_FILE)
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                manifests.append(json.load(f))
+    return manifests
+
+
+def write_snapshot(
+    db: Session,
+    snapshot_dir: str,
+    incremental: bool = False,
+    batch_size: int = 5000,
+) -> Dict[str, Any]:
+    """Yeni bir Parquet görüntüsü yaz ve manifest'ini döndür.
+
+    incremental=True iken önceki görüntü yoksa tam görüntü alınır.
+    """
+    if not HAS_PYARROW:
+        raise RuntimeError("Parquet görüntüsü için pyarrow kurulu olmalı")
+
+    state = load_state(snapshot_dir) if incremental else None
+    since = datetime.fromisoformat(state["watermark"]) if state else None
+    after_location_id = state["max_location_id"] if state else 0
+
+    # Okuma başlamadan alınır; okuma sırasında güncellenenler sonraki artımlıya kalır
+    started_at = datetime.utcnow()
+    max_location_id = db.execute(select(Location.id).order_by(Location.id.desc()).limit(1)).scalar() or 0
+    snapshot_id = started_at.strftime("%Y%m%dT%H%M%S")
+    path = os.path.join(snapshot_dir, snapshot_id)
+    if os.path.exists(path):
+        raise RuntimeError(f"Görüntü klasörü zaten var: {path}")
+    os.makedirs(path)
+
+    rows = {
+        "listings": _write_partitioned(db, _listings_statement(since), os.path.join(path, "listings"), batch_size),
+        "price_history": _write_partitioned(
+            db, _price_history_statement(since), os.path.join(path, "price_history"), batch_size
+        ),
+        "locations": _write_single(
+            db, _locations_statement(after_location_id, max_location_id), os.path.join(path, "locations"),
+            batch_size
+        ),
+    }
+
+    manifest = {
+        "snapshot_id": snapshot_id,
+        "mode": "incremental" if state else "full",
+        "parent": state["snapshot_id"] if state else None,
+        "since": since.isoformat() if since else None,
+        "watermark": started_at.isoformat(),
+        "partitioning": list(PARTITION_COLUMNS),
+        "rows": rows,
+    }
+    with open(os.path.join(path, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    with open(os.path.join(snapshot_dir, STATE_FILE), "w", encoding="utf-8") as f:
+        json.dump({
+            "snapshot_id": snapshot_id,
+            "watermark": manifest["watermark"],
+            "max_location_id": max(max_location_id, after_location_id),
+        }, f)
+
+    logger.info(f"Parquet snapshot {snapshot_id} ({manifest['mode']}) written: {rows}")
+    return manifest
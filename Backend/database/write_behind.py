@@ -0,0 +1,315 @@
+# -*- coding: utf-8 -*-
+"""Tarama sırasında sayfa ilanlarını arka planda toplu yazan write-behind aşaması."""
+
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from utils.logger import get_logger
+
+logger = get_logger("database.write_behind")
+
+# save_func(db, listings) -> (yeni, guncellenen, degismeyen); hata durumunda exception fırlatmalı
+SaveFunc = Callable[[Any, List[Dict[str, Any]]], Tuple[int, int, int]]
+
+_FLUSH = object()
+_STOP = object()
+
+# Kuyruk doluyken thread'in hâlâ yaşadığı bu aralıkla kontrol edilir (saniye)
+_PUT_POLL_SECONDS = 1.0
+
+
+class ListingWriteBehind:
+    """Sayfaları sınırlı bir kuyruktan arka plan thread'inde yazar.
+
+    Fetcher DB commit'ini beklemez; kuyruk doluysa submit bloklar (geri basınç).
+    Biriken sayfalar batch_pages'e ulaşınca ya da ilk sayfadan flush_interval
+    saniye sonra tek bir toplu upsert + commit ile yazılır. SQLAlchemy oturumu
+    thread'ler arasında paylaşılamadığı için thread kendi oturumunu açar.
+
+    Başarısız bir grup yeni bir oturumla bir kez daha denenir; yine başarısız
+    olursa sayfaları scrape_session_id'ye bağlı FailedPage kayıtları olarak yazılır.
+    Oturum hiç açılamazsa hata saklanır, kuyruk boşaltılmaya devam eder ve
+    submit/flush/close beklemek yerine bu hatayı fırlatır.
+    """
+
+    def __init__(
+        self,
+        save_func: SaveFunc,
+        session_factory: Callable[[], Any],
+        max_pending_pages: int = 8,
+        batch_pages: int = 5,
+        flush_interval: float = 2.0,
+        progress_callback=None,
+        on_saved: Optional[Callable[[int, int, int], None]] = None,
+        scrape_session_id: Optional[int] = None,
+    ):
+        self._save_func = save_func
+        self._session_factory = session_factory
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max(1, max_pending_pages))
+        self.batch_pages = max(1, batch_pages)
+        self.flush_interval = flush_interval
+        self.progress_callback = progress_callback
+        self.on_saved = on_saved
+        self.scrape_session_id = scrape_session_id
+
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self._error: Optional[BaseException] = None
+
+        self.new_count = 0
+        self.updated_count = 0
+        self.unchanged_count = 0
+        self.pages_written = 0
+        self.failed_batches = 0
+        self.failed_pages = 0
+        self.failed_listings = 0
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    @property
+    def error(self) -> Optional[BaseException]:
+        """Yazıcıyı durduran hata (oturum açılamadı vb.)"""
+        return self._error
+
+    @property
+    def totals(self) -> Tuple[int, int, int]:
+        with self._lock:
+            return (self.new_count, self.updated_count, self.unchanged_count)
+
+    def start(self) -> "ListingWriteBehind":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="listing-write-behind", daemon=True)
+            self._thread.start()
+        return self
+
+    def submit(self, listings: List[Dict[str, Any]], page: Optional[Dict[str, Any]] = None) -> None:
+        """Bir sayfanın ilanlarını kuyruğa al (kuyruk doluysa bekler).
+
+        page: yazma başarısız olursa FailedPage'e yazılacak url/page_number/city/district
+        """
+        if not listings:
+            return
+        if self._closed:
+            raise RuntimeError("ListingWriteBehind kapatıldı")
+        self._raise_if_failed()
+        self.start()
+        self._put((list(listings), _page_info(listings, page)))
+
+    def flush(self) -> None:
+        """Kuyruktaki tüm sayfalar yazılıp commit edilene kadar bekle"""
+        if self._thread is None or self._closed:
+            return
+        self._raise_if_failed()
+        self._put(_FLUSH)
+        # queue.join() thread ölürse sonsuza kadar bekler
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks and self.is_alive():
+                self._queue.all_tasks_done.wait(_PUT_POLL_SECONDS)
+        self._raise_if_failed()
+
+    def close(self, timeout: Optional[float] = None) -> bool:
+        """Kalan sayfaları yaz ve thread'i durdur.
+
+        Varsayılan olarak son grup yazılana kadar bekler; timeout verilir ve
+        thread hâlâ çalışıyorsa False döner (yazımlar henüz tamamlanmadı).
+        Yazıcı bir hata yüzünden durduysa o hatayı fırlatır.
+        """
+        if self._closed:
+            return not self.is_alive()
+        self._closed = True
+        if self._thread is None:
+            return True
+        if self.is_alive():
+            self._put(_STOP)
+            self._thread.join(timeout)
+        if self._thread.is_alive():
+            logger.warning(f"Write-behind thread did not finish within {timeout}s")
+            return False
+        self._raise_if_failed()
+        return True
+
+    def is_alive(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _raise_if_failed(self) -> None:
+        if self._error is not None:
+            raise self._error
+        if self._thread is not None and not self._thread.is_alive() and not self._closed:
+            raise RuntimeError("Write-behind thread beklenmedik şekilde durdu")
+
+    def _put(self, item) -> None:
+        """Kuyruğa ekle; kuyruk doluyken tüketici thread ölürse beklemek yerine hata ver"""
+        while True:
+            try:
+                self._queue.put(item, timeout=_PUT_POLL_SECONDS)
+                return
+            except queue.Full:
+                if not self.is_alive():
+                    self._raise_if_failed()
+                    raise RuntimeError("Write-behind thread durdu, kuyruk boşaltılmıyor")
+
+    def _run(self) -> None:
+        db = None
+        pending: List[Dict[str, Any]] = []
+        pending_pages: List[Dict[str, Any]] = []
+        unacked = 0
+        deadline = 0.0
+        try:
+            while True:
+                timeout = max(0.0, deadline - time.monotonic()) if pending else None
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    item = None  # Zaman eşiği doldu
+                else:
+                    unacked += 1
+
+                if isinstance(item, tuple):
+                    if not pending:
+                        deadline = time.monotonic() + self.flush_interval
+                    listings, page = item
+                    pending.extend(listings)
+                    pending_pages.append(page)
+
+                if pending and (not isinstance(item, tuple) or len(pending_pages) >= self.batch_pages):
+                    db = self._write_or_fail(db, pending, pending_pages)
+                    pending = []
+                    pending_pages = []
+
+                # flush() commit'i beklesin diye öğeler yazıldıktan sonra onaylanır
+                if not pending:
+                    for _ in range(unacked):
+                        self._queue.task_done()
+                    unacked = 0
+
+                if item is _STOP:
+                    break
+        except BaseException as e:
+            # Beklenmedik hata: submit/flush/close bekleyenler bunu görür
+            if self._error is None:
+                self._error = e
+            raise
+        finally:
+            if db is not None:
+                try:
+                    db.close()
+                except Exception:
+                    pass
+
+    def _write_or_fail(self, db, listings: List[Dict[str, Any]], pages: List[Dict[str, Any]]):
+        """Grubu yaz; oturum açılamazsa hatayı saklayıp grubu (ve sonrakileri) başarısız say"""
+        if self._error is None:
+            try:
+                if db is None:
+                    db = self._session_factory()
+                return self._write(db, listings, pages)
+            except Exception as e:
+                logger.error(f"Write-behind stopped: could not open a DB session: {e}")
+                self._error = e
+        self._fail_batch(listings, pages, self._error)
+        return None
+
+    def _write(self, db, listings: List[Dict[str, Any]], pages: List[Dict[str, Any]]):
+        """Grubu yaz; kullanılmaya devam edilecek oturumu döndür"""
+        try:
+            result = self._save_func(db, listings)
+        except Exception as e:
+            logger.warning(f"Write-behind batch failed ({len(listings)} listings), retrying with a new session: {e}")
+            db = self._reopen(db)
+            try:
+                result = self._save_func(db, listings)
+            except Exception as retry_err:
+                logger.error(f"Write-behind batch failed again ({len(listings)} listings): {retry_err}")
+                db = self._reopen(db)
+                self._fail_batch(listings, pages, retry_err)
+                return db
+
+        new_count, updated_count, unchanged_count = result
+        with self._lock:
+            self.new_count += new_count
+            self.updated_count += updated_count
+            self.unchanged_count += unchanged_count
+            self.pages_written += len(pages)
+            total_new, total_updated, total_unchanged = self.new_count, self.updated_count, self.unchanged_count
+
+        # Geri çağrım hataları thread'i düşürmemeli, yoksa submit sonsuza kadar bekler
+        try:
+            if self.on_saved:
+                self.on_saved(new_count, updated_count, unchanged_count)
+            if self.progress_callback:
+                self.progress_callback(
+                    f"💾 DB: {total_new} yeni, {total_updated} güncellendi, {total_unchanged} değişmedi",
+                    current=None,
+                    total=None,
+                    progress=None,
+                )
+        except Exception as e:
+            logger.warning(f"Write-behind callback failed: {e}")
+        return db
+
+    def _reopen(self, db):
+        """Hatalı oturumu bırakıp temiz bir oturum aç"""
+        try:
+            db.rollback()
+        except Exception:
+            pass
+        try:
+            db.close()
+        except Exception:
+            pass
+        return self._session_factory()
+
+    def _fail_batch(self, listings: List[Dict[str, Any]], pages: List[Dict[str, Any]], error) -> None:
+        self._record_failed_pages(pages, error)
+        with self._lock:
+            self.failed_batches += 1
+            self.failed_pages += len(pages)
+            self.failed_listings += len(listings)
+
+    def _record_failed_pages(self, pages: List[Dict[str, Any]], error: Exception) -> None:
+        """Yazılamayan sayfaları ayrı bir oturumla FailedPage olarak kaydet"""
+        if self.scrape_session_id is None:
+            return
+        from database import crud
+
+        try:
+            db = self._session_factory()
+        except Exception as e:
+            logger.error(f"Write-behind could not record {len(pages)} failed pages: {e}")
+            return
+        try:
+            for page in pages:
+                crud.create_failed_page(
+                    db,
+                    scrape_session_id=self.scrape_session_id,
+                    url=page["url"],
+                    page_number=page.get("page_number"),
+                    city=page.get("city"),
+                    district=page.get("district"),
+                    error_message=f"DB write failed: {error}"[:1000],
+                )
+            db.commit()
+        except Exception as e:
+            logger.error(f"Write-behind could not record {len(pages)} failed pages: {e}")
+            try:
+                db.rollback()
+            except Exception:
+                pass
+        finally:
+            db.close()
+
+
+def _page_info(listings: List[Dict[str, Any]], page: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Sayfa bilgisini tamamla; verilmeyen alanlar sayfanın ilk ilanından alınır"""
+    first = listings[0]
+    info = dict(page or {})
+    info["url"] = info.get("url") or first.get("ilan_linki") or first.get("ilan_url") or ""
+    info.setdefault("page_number", first.get("page"))
+    info.setdefault("city", first.get("il"))
+    info.setdefault("district", first.get("ilce"))
+    return info
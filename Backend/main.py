@@ -18,7 +18,11 @@ from auth.router import router as auth_router
 # Veritabani baslatma
 from database.connection import DATABASE_URL, SessionLocal, engine
 from database import crud
+from database.migrations import run_migrations
+from database.partitioning import ensure_partitioned_listings
 from database.models import Base
+from core.config import get_config
+from core.district_assets import get_district_asset_store
 
 # Loglama ayarla
 logging.basicConfig(level=logging.INFO)
@@ -28,7 +32,12 @@ def init_database(max_retries=5, retry_delay=3):
     """Veritabani tablolari yoksa olusturur (yeniden deneme destekli)."""
     for attempt in range(1, max_retries + 1):
         try:
+            if ensure_partitioned_listings(engine):
+                logger.info("listings tablosu platform/ilan_tipi bolumlu olusturuldu")
             Base.metadata.create_all(bind=engine)
+            applied = run_migrations(engine)
+            if applied:
+                logger.info("Sema gecisleri uygulandi: %s", ", ".join(applied))
             if DATABASE_URL and DATABASE_URL.startswith('postgresql'):
                 logger.info("PostgreSQL veritabanina baglandi")
             else:
@@ -54,6 +63,9 @@ async def lifespan(app: FastAPI):
             logger.info("Normalized %s legacy scrape session statuses", updated)
     finally:
         db.close()
+    # Kaynak dizin imaja bagli degilse (hot reload mount) build burada tamamlanir
+    if get_config().district_assets_build_on_startup:
+        get_district_asset_store().ensure_built()
     yield
     # Kapatma
 
@@ -5,7 +5,7 @@ import time
 import random
 import re
 import unicodedata
-from typing import Dict, List, Any, Optional, Set
+from typing import Dict, List, Any, Optional, Set, Tuple
 from urllib.parse import urlparse
 
 from selenium.webdriver.common.by import By
@@ -200,18 +200,17 @@ def save_listings_to_db(
     alt_kategori: str = None,
     scrape_session_id: int = None,
     log_db_save: bool = True,
+    location_resolver=None,
+    raise_errors: bool = False,
 ):
     """Save listing rows with URL-level listing_type/category/subtype validation."""
     if not db:
         return 0, 0, 0
 
     try:
-        from database import crud
+        from database import copy_ingest, crud
 
         records_to_save = listings
-        new_count = 0
-        updated_count = 0
-        unchanged_count = 0
 
         if platform == "emlakjet":
             expected_primary_slugs = _get_expected_emlakjet_primary_slugs(ilan_tipi, kategori)
@@ -261,22 +260,21 @@ def save_listings_to_db(
             else:
                 records_to_save = filtered_records
 
-        for data in records_to_save:
-            _, status = crud.upsert_listing(
-                db,
-                data=data,
-                platform=platform,
-                kategori=kategori,
-                ilan_tipi=ilan_tipi,
-                alt_kategori=alt_kategori,
-                scrape_session_id=scrape_session_id,
-            )
-            if status == "created":
-                new_count += 1
-            elif status == "updated":
-                updated_count += 1
-            elif status == "unchanged":
-                unchanged_count += 1
+        # PostgreSQL'de büyük batch'ler COPY + küme tabanlı birleştirme ile yazılır
+        upsert = crud.bulk_upsert_listings
+        if copy_ingest.should_use_copy_ingest(db, len(records_to_save)):
+            upsert = copy_ingest.copy_upsert_listings
+
+        new_count, updated_count, unchanged_count = upsert(
+            db,
+            records=records_to_save,
+            platform=platform,
+            kategori=kategori,
+            ilan_tipi=ilan_tipi,
+            alt_kategori=alt_kategori,
+            scrape_session_id=scrape_session_id,
+            location_resolver=location_resolver,
+        )
 
         db.commit()
         if log_db_save:
@@ -290,6 +288,9 @@ def save_listings_to_db(
     except Exception as exc:
         logger.error(f"DB save error: {exc}")
         db.rollback()
+        if raise_errors:
+            # Write-behind yazıcısı grubu yeniden dener ve sayfaları FailedPage'e yazar
+            raise
         return 0, 0, 0
 
 
@@ -321,6 +322,11 @@ class EmlakJetScraper(BaseScraper):
         self.listing_type = listing_type
         self.subtype_path = subtype_path
         self.total_new_listings = 0  # Global kümülatif yeni ilan sayacı
+        self.location_resolver = None  # Oturum boyu lokasyon önbelleği (task tarafından ayarlanır)
+        self.db_writer = None  # Arka plan DB yazıcısı (task tarafından ayarlanır)
+        self.seen_urls = None  # Oturum içi görülen-URL filtresi (task tarafından ayarlanır)
+        self.duplicate_count = 0  # Filtrenin elediği ve DB'de değişmeyen ilanlar
+        self.metrics: Dict[str, Any] = {}  # Görülen-URL filtresi istatistikleri (scrapling ile aynı anahtarlar)
         # Uygun parser'ı başlat
         parser_class = self.CATEGORY_PARSERS.get(category, KonutParser)
         self.parser = parser_class()
@@ -356,10 +362,50 @@ class EmlakJetScraper(BaseScraper):
     def _log_page_start(self, location_name: str, page_num: int, total_pages: int) -> None:
         task_log.line(f"🔍 [{page_num}/{total_pages}] {location_name} - Sayfa {page_num} taranıyor...")
 
-    def _log_page_result(self, page_num: int, extracted_count: int, new_count: int, updated_count: int, unchanged_count: int) -> None:
+    def _log_page_result(self, page_num: int, extracted_count: int, persist_result: Optional[Tuple[int, int, int]]) -> None:
         task_log.line(f"   ✅ Sayfa {page_num}: {extracted_count} ilan çıkarıldı")
+        if persist_result is None:
+            task_log.line(f"   💾 Sayfa {page_num}: yazma kuyruğuna alındı")
+            return
+        new_count, updated_count, unchanged_count = persist_result
         task_log.line(f"   💾 Sayfa {page_num}: {new_count} yeni, {updated_count} güncellendi, {unchanged_count} değişmedi")
 
+    def _save_listings(self, listings: List[Dict[str, Any]]) -> Optional[Tuple[int, int, int]]:
+        """İlanları kaydet; arka plan yazıcısı varsa kuyruğa alıp None döndür"""
+        if self.seen_urls:
+            # Bu oturumda zaten görülen ilanları DB'ye gitmeden ele
+            skipped = len(listings)
+            listings = self.seen_urls.filter_new(listings)
+            skipped -= len(listings)
+            self.duplicate_count += skipped
+            self.metrics.update(self.seen_urls.stats())
+            if not listings:
+                return 0, 0, skipped
+        else:
+            skipped = 0
+        if self.db_writer:
+            # Yazıcının değişmeyen sayıları on_saved ile duplicate_count'a eklenir
+            self.db_writer.submit(listings)
+            return None
+        new_count, updated_count, unchanged_count = save_listings_to_db(
+            self.db,
+            listings,
+            platform="emlakjet",
+            kategori=self.category,
+            ilan_tipi=self.listing_type,
+            alt_kategori=self.subtype_name,
+            scrape_session_id=self.scrape_session_id,
+            log_db_save=False,
+            location_resolver=self.location_resolver,
+        )
+        self.duplicate_count += unchanged_count
+        return new_count, updated_count, unchanged_count + skipped
+
+    def _record_saved_counts(self, new_count: int, updated_count: int, unchanged_count: int) -> None:
+        # Sadece write-behind yolunda çağrılır; senkron yolda yeni ilanlar lokasyon sonunda sayılır
+        self.total_new_listings += new_count
+        self.duplicate_count += unchanged_count
+
     def _log_location_complete(self, location_name: str, listing_count: int) -> None:
         task_log.line(f"✅ {location_name} tamamlandı - {listing_count} ilan işlendi")
 
@@ -750,19 +796,11 @@ class EmlakJetScraper(BaseScraper):
                     listing['ilce'] = dist_name
 
             if self.db:
-                new_count, updated_count, unchanged_count = save_listings_to_db(
-                    self.db,
-                    page_listings,
-                    platform="emlakjet",
-                    kategori=self.category,
-                    ilan_tipi=self.listing_type,
-                    alt_kategori=self.subtype_name,
-                    scrape_session_id=self.scrape_session_id,
-                    log_db_save=False,
-                )
+                persist_result = self._save_listings(page_listings)
                 page_num_ref[0] += 1
-                new_listings_count_ref[0] += new_count  # Yeni eklenenleri say
-                self._log_page_result(page_num_ref[0], len(page_listings), new_count, updated_count, unchanged_count)
+                if persist_result:
+                    new_listings_count_ref[0] += persist_result[0]  # Yeni eklenenleri say
+                self._log_page_result(page_num_ref[0], len(page_listings), persist_result)
         return _on_page_scraped
 
     def scrape_pages(self, target_url: str, max_pages: int, on_page_scraped=None,
@@ -825,7 +863,7 @@ class EmlakJetScraper(BaseScraper):
                     if on_page_scraped and listings:
                         on_page_scraped(listings)
                     elif listings:
-                        self._log_page_result(current_page, len(listings), 0, 0, 0)
+                        self._log_page_result(current_page, len(listings), (0, 0, 0))
 
                 if current_page == 1:
                     first_page_count = len(listings)
@@ -1197,16 +1235,7 @@ class EmlakJetScraper(BaseScraper):
 
                                     # DB'ye kaydet
                                     if self.db:
-                                        save_listings_to_db(
-                                            self.db,
-                                            listings,
-                                            platform="emlakjet",
-                                            kategori=self.category,
-                                            ilan_tipi=self.listing_type,
-                                            alt_kategori=self.subtype_name,
-                                            scrape_session_id=self.scrape_session_id,
-                                            log_db_save=False,
-                                        )
+                                        self._save_listings(listings)
 
                                     failed_pages_tracker.mark_as_success(
                                         page_info.city, page_info.district, page_info.page_number
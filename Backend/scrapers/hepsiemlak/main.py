@@ -4,7 +4,7 @@
 import time
 import random
 import re
-from typing import Dict, List, Any, Optional, Set
+from typing import Dict, List, Any, Optional, Set, Tuple
 from urllib.parse import urlparse
 
 from selenium.webdriver.common.by import By
@@ -120,16 +120,15 @@ def save_listings_to_db(
     alt_kategori: str = None,
     scrape_session_id: int = None,
     log_db_save: bool = True,
+    location_resolver=None,
+    raise_errors: bool = False,
 ):
     """İlan listesini veritabanına kaydet (upsert mantığı ile)"""
     if not db:
         return 0, 0, 0
 
     try:
-        from database import crud
-        new_count = 0
-        updated_count = 0
-        unchanged_count = 0
+        from database import copy_ingest, crud
         records_to_save = listings
 
         if platform == "hepsiemlak":
@@ -162,22 +161,21 @@ def save_listings_to_db(
 
             records_to_save = filtered_records
 
-        for data in records_to_save:
-            listing, status = crud.upsert_listing(
-                db,
-                data=data,
-                platform=platform,
-                kategori=kategori,
-                ilan_tipi=ilan_tipi,
-                alt_kategori=alt_kategori,
-                scrape_session_id=scrape_session_id
-            )
-            if status == 'created':
-                new_count += 1
-            elif status == 'updated':
-                updated_count += 1
-            elif status == 'unchanged':
-                unchanged_count += 1
+        # PostgreSQL'de büyük batch'ler COPY + küme tabanlı birleştirme ile yazılır
+        upsert = crud.bulk_upsert_listings
+        if copy_ingest.should_use_copy_ingest(db, len(records_to_save)):
+            upsert = copy_ingest.copy_upsert_listings
+
+        new_count, updated_count, unchanged_count = upsert(
+            db,
+            records=records_to_save,
+            platform=platform,
+            kategori=kategori,
+            ilan_tipi=ilan_tipi,
+            alt_kategori=alt_kategori,
+            scrape_session_id=scrape_session_id,
+            location_resolver=location_resolver,
+        )
 
         db.commit()
         if log_db_save:
@@ -186,6 +184,9 @@ def save_listings_to_db(
     except Exception as e:
         logger.error(f"DB save error: {e}")
         db.rollback()
+        if raise_errors:
+            # Write-behind yazıcısı grubu yeniden dener ve sayfaları FailedPage'e yazar
+            raise
         return 0, 0, 0
 
 
@@ -233,9 +234,13 @@ class HepsiemlakScraper(BaseScraper):
         # Veritabanı desteği (endpoints.py tarafından ayarlanır)
         self.db = None
         self.scrape_session_id = None
+        self.location_resolver = None  # Oturum boyu lokasyon önbelleği
+        self.db_writer = None  # Arka plan DB yazıcısı (task tarafından ayarlanır)
+        self.seen_urls = None  # Oturum içi görülen-URL filtresi (task tarafından ayarlanır)
         self.total_scraped_count = 0
         self.new_listings_count = 0
         self.duplicate_count = 0
+        self.metrics: Dict[str, Any] = {}  # Görülen-URL filtresi istatistikleri (scrapling ile aynı anahtarlar)
 
         # Uygun parser'ı başlat
         parser_class = self.CATEGORY_PARSERS.get(category, KonutParser)
@@ -279,10 +284,46 @@ class HepsiemlakScraper(BaseScraper):
     def _log_page_start(self, location_name: str, page_num: int, total_pages: int) -> None:
         task_log.line(f"🔍 [{page_num}/{total_pages}] {location_name} - Sayfa {page_num} taranıyor...")
 
-    def _log_page_result(self, page_num: int, extracted_count: int, new_count: int, updated_count: int, unchanged_count: int) -> None:
+    def _log_page_result(self, page_num: int, extracted_count: int, persist_result: Optional[Tuple[int, int, int]]) -> None:
         task_log.line(f"   ✅ Sayfa {page_num}: {extracted_count} ilan çıkarıldı")
+        if persist_result is None:
+            task_log.line(f"   💾 Sayfa {page_num}: yazma kuyruğuna alındı")
+            return
+        new_count, updated_count, unchanged_count = persist_result
         task_log.line(f"   💾 Sayfa {page_num}: {new_count} yeni, {updated_count} güncellendi, {unchanged_count} değişmedi")
 
+    def _save_listings(
+        self, listings: List[Dict[str, Any]], page: Optional[Dict[str, Any]] = None
+    ) -> Optional[Tuple[int, int, int]]:
+        """İlanları kaydet; arka plan yazıcısı varsa kuyruğa alıp None döndür"""
+        if self.seen_urls:
+            # Bu oturumda zaten görülen ilanları DB'ye gitmeden ele
+            skipped = len(listings)
+            listings = self.seen_urls.filter_new(listings)
+            skipped -= len(listings)
+            self.duplicate_count += skipped
+            self.metrics.update(self.seen_urls.stats())
+            if not listings:
+                return 0, 0, skipped
+        if self.db_writer:
+            self.db_writer.submit(listings, page)
+            return None
+        result = save_listings_to_db(
+            self.db,
+            listings,
+            platform="hepsiemlak",
+            kategori=self.category,
+            ilan_tipi=self.listing_type,
+            alt_kategori=self.subtype_name,
+            scrape_session_id=self.scrape_session_id,
+            location_resolver=self.location_resolver
+        )
+        self._record_saved_counts(*result)
+        return result
+
+    def _record_saved_counts(self, new_count: int, updated_count: int, unchanged_count: int) -> None:
+        self.total_new_listings += new_count
+
     def _log_location_complete(self, location_name: str, listing_count: int) -> None:
         task_log.line(f"✅ {location_name} tamamlandı - {listing_count} ilan işlendi")
 
@@ -950,21 +991,16 @@ class HepsiemlakScraper(BaseScraper):
                 else:
                     city_listings.extend(page_listings)
 
-                    # Her sayfa sonrası DB'ye anında kaydet
-                    new_c = updated_c = unchanged_c = 0
+                    # Her sayfa sonrası DB'ye kaydet (write-behind varsa kuyruğa al)
+                    persist_result = (0, 0, 0)
                     if page_listings and self.db:
-                        new_c, updated_c, unchanged_c = save_listings_to_db(
-                            self.db,
+                        persist_result = self._save_listings(
                             page_listings,
-                            platform="hepsiemlak",
-                            kategori=self.category,
-                            ilan_tipi=self.listing_type,
-                            alt_kategori=self.subtype_name,
-                            scrape_session_id=self.scrape_session_id
+                            page={"url": page_url, "page_number": page, "city": city, "district": None},
                         )
-                        total_new_listings += new_c  # Yeni eklenenleri say
-                        self.total_new_listings += new_c
-                    self._log_page_result(page, len(page_listings), new_c, updated_c, unchanged_c)
+                        if persist_result:
+                            total_new_listings += persist_result[0]  # Yeni eklenenleri say
+                    self._log_page_result(page, len(page_listings), persist_result)
 
                 if page < pages_to_scrape:
                     self.random_medium_wait()  # Gizli mod: sayfalar arası
@@ -1121,21 +1157,16 @@ class HepsiemlakScraper(BaseScraper):
                     else:
                         district_listings.extend(page_listings)
 
-                        # Her sayfa sonrası DB'ye anında kaydet
-                        new_c = updated_c = unchanged_c = 0
+                        # Her sayfa sonrası DB'ye kaydet (write-behind varsa kuyruğa al)
+                        persist_result = (0, 0, 0)
                         if page_listings and self.db:
-                            new_c, updated_c, unchanged_c = save_listings_to_db(
-                                self.db,
+                            persist_result = self._save_listings(
                                 page_listings,
-                                platform="hepsiemlak",
-                                kategori=self.category,
-                                ilan_tipi=self.listing_type,
-                                alt_kategori=self.subtype_name,
-                                scrape_session_id=self.scrape_session_id
+                                page={"url": page_url, "page_number": page, "city": city, "district": district},
                             )
-                            total_new_listings += new_c  # Yeni eklenenleri say
-                            self.total_new_listings += new_c
-                        self._log_page_result(page, len(page_listings), new_c, updated_c, unchanged_c)
+                            if persist_result:
+                                total_new_listings += persist_result[0]  # Yeni eklenenleri say
+                        self._log_page_result(page, len(page_listings), persist_result)
 
                     if page < pages_to_scrape:
                         self.random_medium_wait()
@@ -1372,15 +1403,7 @@ class HepsiemlakScraper(BaseScraper):
                                             self._save_district_data(page_info.city, page_info.district, listings)
                                         else:
                                             if self.db:
-                                                save_listings_to_db(
-                                                    self.db,
-                                                    listings,
-                                                    platform="hepsiemlak",
-                                                    kategori=self.category,
-                                                    ilan_tipi=self.listing_type,
-                                                    alt_kategori=self.subtype_name,
-                                                    scrape_session_id=self.scrape_session_id
-                                                )
+                                                self._save_listings(listings)
                                         
                                         # Başarılı olarak işaretle
                                         failed_pages_tracker.mark_as_success(
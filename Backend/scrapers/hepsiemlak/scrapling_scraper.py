@@ -106,6 +106,9 @@ class HepsiemlakScraplingScraper:
 
         self.db = None
         self.scrape_session_id = None
+        self.location_resolver = None
+        self.db_writer = None
+        self.seen_urls = None
         self.total_scraped_count = 0
         self.new_listings_count = 0
         self.duplicate_count = 0
@@ -118,6 +121,9 @@ class HepsiemlakScraplingScraper:
             "successful_requests": 0,
             "failed_requests": 0,
             "total_duration": 0,
+            "seen_url_checks": 0,
+            "seen_url_hits": 0,
+            "seen_url_hit_rate": 0.0,
         }
 
     @staticmethod
@@ -384,10 +390,25 @@ class HepsiemlakScraplingScraper:
             task_log.line(f"Error extracting listings from page: {exc}", level="error")
         return listings
 
-    def _persist_listings(self, listings: List[Dict[str, Any]]) -> Tuple[int, int, int]:
+    def _persist_listings(
+        self, listings: List[Dict[str, Any]], page: Optional[Dict[str, Any]] = None
+    ) -> Optional[Tuple[int, int, int]]:
         if not listings:
             return 0, 0, 0
         self.total_scraped_count += len(listings)
+        if self.seen_urls:
+            # Öne çıkan kartlar ve örtüşen lokasyonlar aynı ilanı tekrar getirir
+            skipped = len(listings)
+            listings = self.seen_urls.filter_new(listings)
+            skipped -= len(listings)
+            self.duplicate_count += skipped
+            self.metrics.update(self.seen_urls.stats())
+            if not listings:
+                return 0, 0, skipped
+        if self.db_writer:
+            # Arka plan yazıcısı sayıları on_saved ile bildirir
+            self.db_writer.submit(listings, page)
+            return None
         if not self.db:
             return len(listings), 0, 0
         new_count, updated_count, unchanged_count = save_listings_to_db(
@@ -399,22 +420,28 @@ class HepsiemlakScraplingScraper:
             alt_kategori=self.subtype_name,
             scrape_session_id=self.scrape_session_id,
             log_db_save=False,
+            location_resolver=self.location_resolver,
         )
+        self._record_saved_counts(new_count, updated_count, unchanged_count)
+        return new_count, updated_count, unchanged_count
+
+    def _record_saved_counts(self, new_count: int, updated_count: int, unchanged_count: int) -> None:
         self.new_listings_count += new_count
         self.duplicate_count += unchanged_count
         self.total_new_listings += new_count
-        return new_count, updated_count, unchanged_count
 
     def _report_page_persist_result(
         self,
         page_num: int,
         extracted_count: int,
-        new_count: int,
-        updated_count: int,
-        unchanged_count: int,
+        persist_result: Optional[Tuple[int, int, int]],
         location_name: str,
     ) -> None:
         task_log.line(f"   ✅ Sayfa {page_num}: {extracted_count} ilan çıkarıldı")
+        if persist_result is None:
+            task_log.line(f"   💾 Sayfa {page_num}: yazma kuyruğuna alındı")
+            return
+        new_count, updated_count, unchanged_count = persist_result
         task_log.line(f"   💾 Sayfa {page_num}: {new_count} yeni, {updated_count} güncellendi, {unchanged_count} değişmedi")
 
     def _log_location_start(self, location_name: str, location_url: str) -> None:
@@ -556,13 +583,14 @@ class HepsiemlakScraplingScraper:
                 page_url=getattr(selector, "url", current_url),
             )
             listings.extend(page_listings)
-            new_count, updated_count, unchanged_count = self._persist_listings(page_listings)
+            persist_result = self._persist_listings(
+                page_listings,
+                page={"url": current_url, "page_number": page_num, "city": city, "district": district},
+            )
             self._report_page_persist_result(
                 page_num=page_num,
                 extracted_count=len(page_listings),
-                new_count=new_count,
-                updated_count=updated_count,
-                unchanged_count=unchanged_count,
+                persist_result=persist_result,
                 location_name=location_name,
             )
             self.metrics["total_pages"] += 1
@@ -686,13 +714,14 @@ class HepsiemlakScraplingScraper:
                     listing["page"] = current_page
                     listing["scraping_method"] = outer.scraping_method
 
-                new_count, updated_count, unchanged_count = outer._persist_listings(page_listings)
+                persist_result = outer._persist_listings(
+                    page_listings,
+                    page={"url": response.url, "page_number": current_page, "city": city, "district": district},
+                )
                 outer._report_page_persist_result(
                     page_num=current_page,
                     extracted_count=len(page_listings),
-                    new_count=new_count,
-                    updated_count=updated_count,
-                    unchanged_count=unchanged_count,
+                    persist_result=persist_result,
                     location_name=location_name,
                 )
                 processed_pages.add(current_page)
@@ -759,6 +788,9 @@ class HepsiemlakScraplingScraper:
                 "successful_requests": 0,
                 "failed_requests": 0,
                 "total_duration": 0,
+                "seen_url_checks": 0,
+                "seen_url_hits": 0,
+                "seen_url_hit_rate": 0.0,
             }
         )
         self.total_scraped_count = 0
@@ -865,6 +897,7 @@ class HepsiemlakScraplingScraper:
             "success_rate": round(self.metrics["successful_requests"] / max(1, total_requests) * 100, 2),
             "listings_per_second": round(self.metrics["total_listings"] / max(1, self.metrics["total_duration"]), 2),
             "pages_per_second": round(self.metrics["total_pages"] / max(1, self.metrics["total_duration"]), 2),
+            "seen_url_hit_rate": self.metrics["seen_url_hit_rate"],
         }
 
     def print_summary(self):
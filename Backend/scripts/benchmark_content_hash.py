@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Icerik hash'i mikro-benchmark'i - v1 (json + MD5) ve v2 (orjson + BLAKE2b).
+
+Kullanim:
+    python scripts/benchmark_content_hash.py [--records 20000] [--repeat 5]
+"""
+
+import argparse
+import os
+import random
+import sys
+import timeit
+
+# Backend klasorunu path'e ekle
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.hashing import compute_content_hash, compute_legacy_content_hash
+
+
+def make_records(count: int, with_details: bool = False):
+    """Tarayicidan gelen kayitlara benzeyen sentetik ilanlar"""
+    rng = random.Random(42)
+    records = []
+    for i in range(count):
+        records.append({
+            "baslik": f"Merkezi konumda {rng.randint(1, 5)}+1 satilik daire #{i}",
+            "fiyat": f"{rng.randint(500, 20000) * 1000:,} TL".replace(",", "."),
+            "oda_sayisi": f"{rng.randint(1, 5)}+1",
+            "metrekare": f"{rng.randint(50, 300)} m2",
+            "bina_yasi": str(rng.randint(0, 40)),
+            "kat": f"{rng.randint(1, 15)}. Kat",
+            "emlak_ofisi": f"Emlak Ofisi {rng.randint(1, 500)}",
+            "tip": "Daire",
+            "il": "Istanbul",
+            "ilce": "Kadikoy",
+            "ilan_linki": f"https://www.emlakjet.com/ilan/{i}",
+        })
+        if with_details:
+            records[-1]["details"] = {
+                "isitma": "Kombi",
+                "esyali": rng.choice([True, False]),
+                "aidat": rng.randint(0, 5000),
+                "ozellikler": ["Asansor", "Otopark", "Balkon"][: rng.randint(1, 3)],
+            }
+    return records
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Content hash micro-benchmark")
+    parser.add_argument("--records", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    for label, with_details in (("tarayici kaydi - details yok", False), ("details sozluklu", True)):
+        records = make_records(args.records, with_details=with_details)
+
+        def run(func):
+            for record in records:
+                func(record)
+
+        results = {}
+        print(f"[{label}]")
+        for name, func in (("v1 json+md5", compute_legacy_content_hash), ("v2 orjson+blake2b", compute_content_hash)):
+            best = min(timeit.repeat(lambda: run(func), number=1, repeat=args.repeat))
+            results[name] = best
+            print(f"  {name:<20} {best * 1000:8.1f} ms  ({best / args.records * 1e6:.2f} us/kayit)")
+
+        speedup = results["v1 json+md5"] / results["v2 orjson+blake2b"]
+        print(f"  Hizlanma: {speedup:.2f}x ({args.records} kayit, en iyi {args.repeat} tekrar)")
+
+
+if __name__ == "__main__":
+    main()
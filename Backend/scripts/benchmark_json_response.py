@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+/analytics/prices yanit kodlama mikro-benchmark'i - FastAPI varsayilan yolu
+(iki gecisli dict + jsonable_encoder + json) ile tek gecis + orjson.
+
+Kullanim:
+    python scripts/benchmark_json_response.py [--rows 50000] [--repeat 5]
+"""
+
+import argparse
+import os
+import random
+import sys
+import timeit
+
+# Backend klasorunu path'e ekle
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from api.responses import FastJSONResponse
+
+PLATFORM_MAP = {"hepsiemlak": "HepsiEmlak", "emlakjet": "Emlakjet"}
+CATEGORY_MAP = {"konut": "Konut", "arsa": "Arsa", "isyeri": "İşyeri", "devremulk": "Devremülk"}
+LISTING_TYPE_MAP = {"satilik": "Satılık", "kiralik": "Kiralık"}
+
+
+def make_rows(count: int):
+    """get_price_analytics sorgusunun dondurdugu (fiyat, il, platform, kategori, ilan_tipi) satirlari"""
+    rng = random.Random(42)
+    cities = ["İstanbul", "Ankara", "İzmir", "Bursa", "Antalya", "Muğla"]
+    return [
+        (
+            float(rng.randint(500, 20000) * 1000),
+            rng.choice(cities),
+            rng.choice(list(PLATFORM_MAP)),
+            rng.choice(list(CATEGORY_MAP)),
+            rng.choice(list(LISTING_TYPE_MAP)),
+        )
+        for _ in range(count)
+    ]
+
+
+def before(rows):
+    # Eski yol: crud dict listesi, endpoint'te ikinci dict listesi, FastAPI encoder + json
+    prices = [
+        {"city": c, "platform": p, "category": k, "listing_type": t, "price": f}
+        for f, c, p, k, t in rows
+    ]
+    display = [
+        {
+            "city": item["city"],
+            "platform": PLATFORM_MAP.get(item["platform"], item["platform"]),
+            "category": CATEGORY_MAP.get(item["category"], item["category"]),
+            "listing_type": LISTING_TYPE_MAP.get(item["listing_type"], item["listing_type"]),
+            "price": item["price"],
+        }
+        for item in prices
+    ]
+    return JSONResponse(jsonable_encoder({"prices": display, "summary": {}})).body
+
+
+def after(rows):
+    # Yeni yol: goruntuleme adlariyla tek gecis, orjson ile dogrudan kodlama
+    prices = [
+        {
+            "city": c,
+            "platform": PLATFORM_MAP.get(p, p),
+            "category": CATEGORY_MAP.get(k, k),
+            "listing_type": LISTING_TYPE_MAP.get(t, t),
+            "price": f,
+        }
+        for f, c, p, k, t in rows
+    ]
+    return FastJSONResponse({"prices": prices, "summary": {}}).body
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JSON response micro-benchmark")
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    print(f"{args.rows:,} satir, en iyi {args.repeat} calistirma:")
+    results = {}
+    for name, func in (("before jsonable_encoder+json", before), ("after orjson", after)):
+        body = func(rows)
+        best = min(timeit.repeat(lambda: func(rows), number=1, repeat=args.repeat))
+        results[name] = best
+        print(f"  {name:<30} {best * 1000:8.1f} ms  ({len(body) / 1024 / 1024:.1f} MiB)")
+
+    speedup = results["before jsonable_encoder+json"] / results["after orjson"]
+    print(f"  hizlanma: {speedup:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
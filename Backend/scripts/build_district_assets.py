@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Ilce GeoJSON Build Script'i
+data/districts/*.json dosyalarindan sadelestirilmis low/ ve medium/ seviyelerini
+uretir, tum dosyalarin gzip (ve brotli kuruluysa br) varyantlarini ve icerik
+hash'lerini data/districts/_build/ altina yazar
+(core/district_assets.py). Docker imaji olusturulurken calisir; kaynak dizin
+baglandiginda uygulama acilisinda eksik/eski manifest arka planda yeniden uretilir.
+
+Kullanim:
+    docker-compose exec api python scripts/build_district_assets.py [--districts-dir DIR]
+"""
+
+import argparse
+import os
+import sys
+from pathlib import Path
+
+# Backend klasorunu path'e ekle
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.district_assets import DISTRICTS_DIR, HAS_BROTLI, build_district_assets
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ilce GeoJSON dosyalarini onceden sikistir")
+    parser.add_argument("--districts-dir", type=Path, default=DISTRICTS_DIR)
+    parser.add_argument("--skip-levels", action="store_true",
+                        help="low/medium seviyelerini yeniden uretme (mevcut dosyalari kullan)")
+    args = parser.parse_args()
+
+    if not HAS_BROTLI:
+        print("brotli kurulu degil (pip install brotli), sadece gzip uretilecek.")
+
+    manifest = build_district_assets(args.districts_dir, levels=not args.skip_levels)
+
+    raw_total = sum(entry["size"] for entry in manifest.values())
+    print(f"{len(manifest)} il dosyasi -> {args.districts_dir / '_build'}")
+    print(f"  ham: {raw_total / 1024 / 1024:.1f} MB")
+    for encoding in ("gzip", "br"):
+        total = sum(entry["variants"][encoding]["size"] for entry in manifest.values() if encoding in entry["variants"])
+        if total:
+            print(f"  {encoding}: {total / 1024 / 1024:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
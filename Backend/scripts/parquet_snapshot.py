@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Parquet Goruntu Script'i
+listings, locations ve price_history tablolarini platform/ilan_tipi/il
+bolumlu Parquet dosyalarina yazar (database/snapshot.py).
+
+Kullanim:
+    docker-compose exec api python scripts/parquet_snapshot.py [--incremental] [--output-dir DIR]
+
+--incremental: sadece son goruntuden sonra guncellenen satirlar yazilir.
+"""
+
+import argparse
+import os
+import sys
+
+# Backend klasorunu path'e ekle
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.config import get_config
+from database.connection import get_db_session
+from database.snapshot import HAS_PYARROW, write_snapshot
+
+
+def main():
+    config = get_config()
+    parser = argparse.ArgumentParser(description="Veritabanini Parquet goruntusu olarak disa aktar")
+    parser.add_argument("--incremental", action="store_true", help="Son goruntuden sonraki degisiklikler")
+    parser.add_argument("--output-dir", default=config.snapshot_dir, help="Goruntu klasoru (SNAPSHOT_DIR)")
+    parser.add_argument("--batch-size", type=int, default=config.snapshot_batch_size)
+    args = parser.parse_args()
+
+    if not HAS_PYARROW:
+        print("pyarrow kurulu degil (pip install pyarrow).")
+        sys.exit(1)
+
+    db = get_db_session()
+    try:
+        manifest = write_snapshot(db, args.output_dir, incremental=args.incremental, batch_size=args.batch_size)
+    finally:
+        db.close()
+
+    print(f"Goruntu {manifest['snapshot_id']} ({manifest['mode']}) -> {args.output_dir}")
+    for table, count in manifest["rows"].items():
+        print(f"  {table}: {count:,} satir")
+
+
+if __name__ == "__main__":
+    main()
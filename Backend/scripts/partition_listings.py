@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Listings Bolumleme Script'i
+Mevcut (bolumlenmemis) listings tablosunu platform/ilan_tipi LIST bolumlu
+tabloya tasir. Sadece PostgreSQL. Tasima tek transaction'da yapilir ve
+listings tablosunu kilitler; tarama yokken calistirin.
+
+Kullanim:
+    docker-compose exec api python scripts/partition_listings.py [--keep-old]
+
+Sonrasinda DB_PARTITION_LISTINGS=true ayarlanmalidir.
+"""
+
+import argparse
+import os
+import sys
+
+# Backend klasorunu path'e ekle
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.connection import engine
+from database.migrations import run_migrations
+from database.partitioning import UNPARTITIONED_TABLE, migrate_listings_to_partitioned
+
+
+def main():
+    parser = argparse.ArgumentParser(description="listings tablosunu platform/ilan_tipi bolumlu tabloya tasi")
+    parser.add_argument(
+        "--keep-old",
+        action="store_true",
+        help=f"Eski tabloyu {UNPARTITIONED_TABLE} adiyla birak",
+    )
+    args = parser.parse_args()
+
+    if engine.dialect.name != "postgresql":
+        print("Bolumleme sadece PostgreSQL'de desteklenir (DATABASE_URL).")
+        sys.exit(1)
+
+    # Eski tabloda eksik kolon kalmasin
+    for step in run_migrations(engine):
+        print(f"  + applied {step}")
+
+    copied = migrate_listings_to_partitioned(engine, keep_old=args.keep_old)
+    if copied:
+        print(f"{copied:,} ilan bolumlu tabloya tasindi.")
+        if args.keep_old:
+            print(f"Eski tablo {UNPARTITIONED_TABLE} olarak birakildi.")
+    else:
+        print("listings zaten bolumlu ya da bos; bir sey yapilmadi.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""Celery bakim gorevleri - eski ilanlarin arsivlenmesi, Parquet goruntusu."""
+
+from typing import Any, Dict, Optional
+
+from celery_app import celery_app
+from utils.logger import get_logger
+
+logger = get_logger("celery.maintenance")
+
+
+@celery_app.task(bind=True, name="archive_stale_listings")
+def archive_stale_listings_task(self, days: Optional[int] = None, batch_size: Optional[int] = None) -> Dict[str, int]:
+    """ARCHIVE_AFTER_DAYS gundur gorulmeyen ilanlari listings_archive'a tasi."""
+    from core.config import get_config
+    from database.connection import get_db_session
+    from database import crud
+
+    config = get_config()
+    days = days if days is not None else config.archive_after_days
+    batch_size = batch_size or config.archive_batch_size
+    if not days or days <= 0:
+        logger.info(f"[Task {self.request.id}] Archival disabled (ARCHIVE_AFTER_DAYS={days})")
+        return {"listings": 0, "price_history": 0}
+
+    db = get_db_session()
+    try:
+        moved = crud.archive_stale_listings(db, days=days, batch_size=batch_size)
+        logger.info(
+            f"[Task {self.request.id}] Archived {moved['listings']} listings "
+            f"and {moved['price_history']} price history rows (unseen > {days} days)"
+        )
+        return moved
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+@celery_app.task(bind=True, name="parquet_snapshot")
+def parquet_snapshot_task(self, incremental: bool = False) -> Dict[str, Any]:
+    """listings/locations/price_history tablolarinin Parquet goruntusunu SNAPSHOT_DIR'e yaz."""
+    from core.config import get_config
+    from database.connection import get_db_session
+    from database.snapshot import write_snapshot
+
+    config = get_config()
+    db = get_db_session()
+    try:
+        manifest = write_snapshot(
+            db, config.snapshot_dir, incremental=incremental, batch_size=config.snapshot_batch_size
+        )
+        logger.info(f"[Task {self.request.id}] Parquet snapshot {manifest['snapshot_id']} rows={manifest['rows']}")
+        return manifest
+    finally:
+        db.close()
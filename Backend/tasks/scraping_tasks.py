@@ -2,6 +2,7 @@
 """Celery kazima gorevleri - ayri worker konteynerinde calisir."""
 
 import os
+from functools import partial
 from typing import Dict, List, Optional
 from celery import current_task
 from celery.exceptions import SoftTimeLimitExceeded
@@ -28,6 +29,120 @@ def _validate_scraping_method(scraping_method: str) -> Optional[str]:
     return None
 
 
+def _create_location_resolver(db, cities: Optional[List[str]], task_id: str):
+    """Hedef sehirlerle isitilmis, oturum boyu lokasyon onbellegi olustur."""
+    from database.location_resolver import LocationResolver
+
+    resolver = LocationResolver()
+    try:
+        warmed = resolver.warm(db, cities)
+        logger.info(f"[Task {task_id}] Location cache warmed with {warmed} locations")
+    except Exception as exc:
+        logger.warning(f"[Task {task_id}] Location cache warm-up failed: {exc}")
+        db.rollback()
+    return resolver
+
+
+def _create_seen_url_filter(scrape_session_id: int, task_id: str):
+    """Oturum boyu gorulen-URL Bloom filtresi (istege bagli Redis ile paylasimli)."""
+    from core.config import get_config
+    from core.seen_urls import SeenUrlFilter, build_seen_urls_key
+
+    config = get_config()
+    if not config.seen_url_filter:
+        return None
+
+    redis_client = None
+    redis_key = None
+    if config.seen_url_filter_redis:
+        try:
+            from core.task_status import get_redis_client
+
+            redis_client = get_redis_client()
+            redis_key = build_seen_urls_key(scrape_session_id)
+        except Exception as exc:
+            logger.warning(f"[Task {task_id}] Shared seen-URL filter unavailable, using local: {exc}")
+
+    seen_urls = SeenUrlFilter(
+        capacity=config.seen_url_filter_capacity,
+        error_rate=config.seen_url_filter_error_rate,
+        redis_client=redis_client,
+        redis_key=redis_key,
+    )
+    logger.info(
+        f"[Task {task_id}] Seen-URL filter enabled "
+        f"({seen_urls.num_bits} bits, {seen_urls.num_hashes} hashes, shared={seen_urls.shared})"
+    )
+    return seen_urls
+
+
+def _start_db_writer(scraper, save_listings_to_db, platform: str, progress_callback, task_id: str):
+    """Sayfa kayitlarini fetcher'dan ayiran arka plan DB yazicisini baslat."""
+    from core.config import get_config
+    from database.connection import get_db_session
+    from database.write_behind import ListingWriteBehind
+
+    config = get_config()
+    if not config.db_write_behind:
+        return None
+
+    save_func = partial(
+        save_listings_to_db,
+        platform=platform,
+        kategori=scraper.category,
+        ilan_tipi=scraper.listing_type,
+        alt_kategori=scraper.subtype_name,
+        scrape_session_id=scraper.scrape_session_id,
+        log_db_save=False,
+        location_resolver=scraper.location_resolver,
+        raise_errors=True,
+    )
+    writer = ListingWriteBehind(
+        save_func=save_func,
+        session_factory=get_db_session,
+        max_pending_pages=config.db_write_queue_pages,
+        batch_pages=config.db_write_batch_pages,
+        flush_interval=config.db_write_flush_seconds,
+        progress_callback=progress_callback,
+        on_saved=scraper._record_saved_counts,
+        scrape_session_id=scraper.scrape_session_id,
+    )
+    logger.info(
+        f"[Task {task_id}] DB write-behind enabled "
+        f"(queue={config.db_write_queue_pages}, batch={config.db_write_batch_pages} pages)"
+    )
+    return writer.start()
+
+
+def _close_db_writer(writer, task_id: str) -> Optional[str]:
+    """Kuyrukta kalan sayfalari yaz ve yaziciyi kapat.
+
+    Yazilamayan gruplar varsa oturumun error_message'ina yazilacak mesaji dondurur.
+    """
+    if not writer or writer.closed:
+        return None
+    try:
+        # Gorev tamamlandi/basarisiz olarak isaretlendikten sonra durumu
+        # tekrar "running" yapmamasi icin ilerleme bildirimi kapatilir
+        writer.progress_callback = None
+        # Zaman asimi yok: oturum son grup yazilmadan tamamlanmamali
+        writer.close()
+        new_count, updated_count, unchanged_count = writer.totals
+        logger.info(
+            f"[Task {task_id}] DB writer closed: {new_count} new, {updated_count} updated, "
+            f"{unchanged_count} unchanged, {writer.failed_batches} failed batches"
+        )
+    except Exception as writer_err:
+        logger.error(f"[Task {task_id}] DB writer close failed: {writer_err}")
+        return f"DB yazici kapatilamadi: {writer_err}"
+    if writer.failed_batches:
+        return (
+            f"{writer.failed_batches} DB yazma grubu basarisiz: {writer.failed_listings} ilan "
+            f"({writer.failed_pages} sayfa) basarisiz sayfa olarak kaydedildi"
+        )
+    return None
+
+
 class TaskProgressManager:
     """Redis üzerinden görev ilerleme güncellemelerini yönetir"""
 
@@ -59,15 +174,17 @@ class TaskProgressManager:
             platform=platform,
         )
 
-        current_task.update_state(
-            state="PROGRESS",
-            meta={
-                "message": data["message"],
-                "progress": data["progress"],
-                "current": data["current"],
-                "total": data["total"],
-            }
-        )
+        # current_task thread'e ozeldir; arka plan DB yazicisindan cagrildiginda None olur
+        if current_task:
+            current_task.update_state(
+                state="PROGRESS",
+                meta={
+                    "message": data["message"],
+                    "progress": data["progress"],
+                    "current": data["current"],
+                    "total": data["total"],
+                }
+            )
 
     def complete(self, message: str = "Tamamlandı", success: bool = True):
         """Görevi tamamlanmış olarak işaretle."""
@@ -121,6 +238,7 @@ def scrape_hepsiemlak_task(
     manager = None
     driver = None
     db = None
+    db_writer = None
     scrape_session = None
     scraper = None
 
@@ -199,6 +317,12 @@ def scrape_hepsiemlak_task(
         # Veritabanı oturumunu ayarla
         scraper.db = db
         scraper.scrape_session_id = scrape_session.id
+        scraper.location_resolver = _create_location_resolver(db, cities, task_id)
+        scraper.seen_urls = _create_seen_url_filter(scrape_session.id, task_id)
+
+        from scrapers.hepsiemlak.main import save_listings_to_db
+        db_writer = _start_db_writer(scraper, save_listings_to_db, "hepsiemlak", progress_callback, task_id)
+        scraper.db_writer = db_writer
 
         logger.info(
             f"[Task {task_id}] Starting scraping API call with "
@@ -210,6 +334,7 @@ def scrape_hepsiemlak_task(
             max_pages=max_pages,
             progress_callback=progress_callback,
         )
+        _error_msg = _close_db_writer(db_writer, task_id)
 
         _final_status = "completed"
 
@@ -222,7 +347,8 @@ def scrape_hepsiemlak_task(
             "task_id": task_id,
             "total_listings": getattr(scraper, 'total_scraped_count', 0),
             "new_listings": getattr(scraper, 'new_listings_count', 0),
-            "duplicates": getattr(scraper, 'duplicate_count', 0)
+            "duplicates": getattr(scraper, 'duplicate_count', 0),
+            "failed_batches": db_writer.failed_batches if db_writer else 0,
         }
 
     except SoftTimeLimitExceeded:
@@ -241,6 +367,8 @@ def scrape_hepsiemlak_task(
 
     finally:
         # Her durumda (SIGTERM dahil) session'ı kapat ve kaydet
+        # Once kuyrukta kalan sayfalar yazilir ki sayaclar guncel olsun
+        _writer_error = _close_db_writer(db_writer, task_id)
         try:
             if scrape_session and db:
                 total_listings = getattr(scraper, 'total_scraped_count', 0) if scraper else 0
@@ -254,7 +382,7 @@ def scrape_hepsiemlak_task(
                     duplicate_listings=duplicate_listings
                 )
                 status = locals().get('_final_status', 'failed')
-                error_msg = locals().get('_error_msg', None)
+                error_msg = locals().get('_error_msg', None) or _writer_error
                 crud.complete_scrape_session(db, scrape_session.id, status=status, error_message=error_msg)
                 db.commit()
                 logger.info(f"[Task {task_id}] Finally: session closed (status={status}, total={total_listings})")
@@ -306,6 +434,7 @@ def scrape_emlakjet_task(
 
     manager = None
     db = None
+    db_writer = None
     scrape_session = None
     scraper = None
 
@@ -386,6 +515,12 @@ def scrape_emlakjet_task(
         # Veritabanı oturumunu kazıyıcıya ayarla
         scraper.db = db
         scraper.scrape_session_id = scrape_session.id
+        scraper.location_resolver = _create_location_resolver(db, cities, task_id)
+        scraper.seen_urls = _create_seen_url_filter(scrape_session.id, task_id)
+
+        from scrapers.emlakjet.main import save_listings_to_db
+        db_writer = _start_db_writer(scraper, save_listings_to_db, "emlakjet", progress_callback, task_id)
+        scraper.db_writer = db_writer
 
         scraper.start_scraping_api(
             cities=cities,
@@ -394,6 +529,7 @@ def scrape_emlakjet_task(
             max_pages=max_pages,
             progress_callback=progress_callback,
         )
+        _error_msg = _close_db_writer(db_writer, task_id)
 
         _final_status = "completed"
 
@@ -407,6 +543,8 @@ def scrape_emlakjet_task(
             "status": "completed",
             "task_id": task_id,
             "total_listings": total_listings,
+            "duplicates": getattr(scraper, 'duplicate_count', 0),
+            "failed_batches": db_writer.failed_batches if db_writer else 0,
         }
 
     except SoftTimeLimitExceeded:
@@ -426,16 +564,19 @@ def scrape_emlakjet_task(
     finally:
         # Her durumda (SIGTERM dahil) session'ı kapat
         # Listing'ler zaten sayfa bazlı kaydedildi, tekrar kaydetmeye gerek yok
+        _writer_error = _close_db_writer(db_writer, task_id)
         try:
             if scrape_session and db:
                 total_listings = len(getattr(scraper, 'all_listings', [])) if scraper else 0
+                duplicate_listings = getattr(scraper, 'duplicate_count', 0) if scraper else 0
 
                 crud.update_scrape_session(
                     db, scrape_session.id,
                     total_listings=total_listings,
+                    duplicate_listings=duplicate_listings,
                 )
                 status = locals().get('_final_status', 'failed')
-                error_msg = locals().get('_error_msg', None)
+                error_msg = locals().get('_error_msg', None) or _writer_error
                 crud.complete_scrape_session(db, scrape_session.id, status=status, error_message=error_msg)
                 db.commit()
                 logger.info(f"[Task {task_id}] Finally: session closed (status={status}, total={total_listings})")
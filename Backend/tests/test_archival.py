@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""crud.archive_stale_listings ve include_archived okuma testleri."""
+
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from api import endpoints  # noqa: E402
+from database import crud  # noqa: E402
+from database.models import (  # noqa: E402
+    ArchivedListing,
+    ArchivedPriceHistory,
+    Base,
+    Listing,
+    PriceHistory,
+)
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
+
+
+def seed_listings(db, count=5, stale=(0, 1, 2)):
+    """count adet ilan ekle; `stale` indeksleri 120 gün önce görülmüş olsun"""
+    location = crud.get_or_create_location(db, "İstanbul", "Kadıköy")
+    now = datetime.utcnow()
+    listings = []
+    for i in range(count):
+        seen_at = now - timedelta(days=120) if i in stale else now
+        listing = Listing(
+            baslik=f"İlan {i}",
+            fiyat=1_000_000 + i * 100_000,
+            platform="emlakjet",
+            kategori="konut",
+            ilan_tipi="satilik",
+            location_id=location.id,
+            ilan_url=f"https://www.emlakjet.com/ilan/daire-{10000 + i}/",
+            created_at=now - timedelta(days=200 - i),
+            last_seen_at=seen_at,
+        )
+        db.add(listing)
+        listings.append(listing)
+    db.flush()
+    db.add(PriceHistory(listing_id=listings[0].id, old_price=900_000, new_price=1_000_000))
+    db.add(PriceHistory(listing_id=listings[4].id, old_price=1_500_000, new_price=1_400_000))
+    db.commit()
+    return listings
+
+
+def test_archive_table_mirrors_listing_columns():
+    listing_columns = {column.name for column in Listing.__table__.columns}
+    archive_columns = {column.name for column in ArchivedListing.__table__.columns}
+    assert archive_columns == listing_columns | {"archived_at"}
+
+    history_columns = {column.name for column in PriceHistory.__table__.columns}
+    archive_history_columns = {column.name for column in ArchivedPriceHistory.__table__.columns}
+    assert archive_history_columns == history_columns | {"archived_at"}
+
+
+def test_archive_moves_stale_listings_with_price_history_in_batches(db):
+    ids = [listing.id for listing in seed_listings(db)]
+
+    moved = crud.archive_stale_listings(db, days=90, batch_size=2)
+
+    assert moved == {"listings": 3, "price_history": 1}
+    assert {l.id for l in db.query(ArchivedListing)} == set(ids[:3])
+    assert db.query(Listing).count() == 2
+    assert db.query(PriceHistory).one().listing_id == ids[4]
+    archived_history = db.query(ArchivedPriceHistory).one()
+    assert archived_history.listing_id == ids[0]
+    assert archived_history.archived_at is not None
+
+    assert crud.archive_stale_listings(db, days=90) == {"listings": 0, "price_history": 0}
+
+
+def test_get_listings_include_archived_merges_by_created_at(db):
+    seed_listings(db)
+    crud.archive_stale_listings(db, days=90)
+
+    hot, hot_total = crud.get_listings(db)
+    assert hot_total == 2 and len(hot) == 2
+
+    merged, total = crud.get_listings(db, include_archived=True, city="İstanbul", page=1, limit=3)
+    assert total == 5
+    assert [l.baslik for l in merged] == ["İlan 4", "İlan 3", "İlan 2"]
+    assert isinstance(merged[2], ArchivedListing)
+    assert merged[2].to_dict()["archived"] is True
+    assert merged[2].to_dict()["il"] == "İstanbul"
+
+    second_page, _ = crud.get_listings(db, include_archived=True, page=2, limit=3)
+    assert [l.baslik for l in second_page] == ["İlan 1", "İlan 0"]
+
+
+def test_analytics_include_archived(db):
+    seed_listings(db)
+    crud.archive_stale_listings(db, days=90)
+
+    assert crud.get_price_analytics(db)["summary"]["total_count"] == 2
+    summary = crud.get_price_analytics(db, include_archived=True)["summary"]
+    assert summary["total_count"] == 5
+    assert summary["min_price"] == 1_000_000
+
+    assert crud.get_city_analytics(db, "İstanbul")["total_listings"] == 2
+    assert crud.get_city_analytics(db, "istanbul", include_archived=True)["total_listings"] == 5
+
+
+def test_clear_results_deletes_archive_tables(db, tmp_path, monkeypatch):
+    seed_listings(db)
+    crud.archive_stale_listings(db, days=90)
+    (tmp_path / "export.xlsx").write_bytes(b"x")
+    monkeypatch.setattr(endpoints, "_outputs_dir", lambda: str(tmp_path))
+
+    result = asyncio.run(endpoints.clear_results(db=db))
+
+    assert result["deleted_listings"] == 2
+    assert result["deleted_price_history"] == 1
+    assert result["deleted_archived_listings"] == 3
+    assert result["deleted_archived_price_history"] == 1
+    assert result["deleted_files"] == 1
+    assert db.query(ArchivedListing).count() == 0
+    assert db.query(ArchivedPriceHistory).count() == 0
+    assert crud.get_listings(db, include_archived=True)[1] == 0
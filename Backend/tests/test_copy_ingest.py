@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""database/copy_ingest.py testleri (PostgreSQL gerektirmeyen kısımlar)."""
+
+import csv
+import os
+import sys
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from database import copy_ingest  # noqa: E402
+from database.hashing import compute_legacy_content_hash  # noqa: E402
+
+
+def test_build_stage_rows_dedupes_and_normalizes():
+    records = [
+        {"ilan_linki": "https://example.com/1", "baslik": "Eski", "fiyat": "1.000 TL", "il": " İzmir "},
+        {"ilan_linki": "https://example.com/1", "fiyat": "2.000 TL", "il": "İzmir", "oda_sayisi": "2+1"},
+        {"baslik": "URL yok", "fiyat": "3.000 TL"},
+    ]
+
+    rows, url_less, duplicates = copy_ingest.build_stage_rows(records, "batch")
+
+    assert duplicates == 1
+    assert url_less == [records[2]]
+    assert len(rows) == 1
+    row = dict(zip(copy_ingest.STAGE_COLUMNS, rows[0]))
+    assert row["batch_id"] == "batch"
+    # Eksik başlık NULL kalır - güncellemede mevcut başlık korunur
+    assert row["baslik"] is None
+    assert row["fiyat"] == 2000.0
+    assert row["fiyat_text"] == "2.000 TL"
+    assert row["details"] == '{"oda_sayisi": "2+1"}'
+    assert (row["il"], row["ilce"], row["mahalle"]) == ("İzmir", None, None)
+
+
+def test_build_stage_rows_computes_legacy_hash_only_for_v1_matches():
+    records = [
+        {"ilan_linki": "https://example.com/1", "baslik": "A", "il": "İzmir"},
+        {"ilan_linki": "https://example.com/2", "baslik": "B", "il": "İzmir"},
+    ]
+
+    rows, _, _ = copy_ingest.build_stage_rows(records, "batch", legacy_keys={"https://example.com/2"})
+
+    legacy = [dict(zip(copy_ingest.STAGE_COLUMNS, row))["legacy_hash"] for row in rows]
+    assert legacy == [None, compute_legacy_content_hash(records[1])]
+
+
+def test_copy_buffer_distinguishes_null_from_empty_string():
+    rows = [("batch", "https://example.com/1", "", 1500.0, None, 'Ofis "A", Kadıköy')]
+
+    text = copy_ingest.write_copy_buffer(rows).getvalue()
+
+    assert text == '"batch","https://example.com/1","",1500.0,,"Ofis ""A"", Kadıköy"\n'
+    assert next(csv.reader([text]))[5] == 'Ofis "A", Kadıköy'
+
+
+def test_copy_ingest_is_not_used_on_sqlite():
+    engine = create_engine("sqlite:///:memory:")
+    db = sessionmaker(bind=engine)()
+    try:
+        assert copy_ingest.should_use_copy_ingest(db, 10_000) is False
+    finally:
+        db.close()
+        engine.dispose()
@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+"""database/copy_ingest.py COPY + birleştirme ifadesinin PostgreSQL entegrasyon testleri.
+
+PostgreSQL bağlantısı gerekir; TEST_DATABASE_URL (yoksa DATABASE_URL)
+postgresql:// ile başlamıyorsa atlanır. Testler geçici bir şemada çalışır
+ve sonunda şemayı siler.
+"""
+
+import os
+import sys
+import threading
+import time
+import uuid
+
+import pytest
+from sqlalchemy import create_engine, func, select, text
+from sqlalchemy.orm import sessionmaker
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from database import copy_ingest, crud  # noqa: E402
+from database.models import Base, Listing, PriceHistory  # noqa: E402
+
+POSTGRES_URL = os.getenv("TEST_DATABASE_URL") or os.getenv("DATABASE_URL") or ""
+
+pytestmark = pytest.mark.skipif(
+    not POSTGRES_URL.startswith("postgresql"),
+    reason="PostgreSQL TEST_DATABASE_URL/DATABASE_URL tanımlı değil",
+)
+
+BASE_URL = "https://www.emlakjet.com/ilan"
+
+
+def make_record(slug, number, fiyat, **extra):
+    record = {
+        "ilan_linki": f"{BASE_URL}/{slug}-{number}",
+        "baslik": f"İlan {number}",
+        "fiyat": fiyat,
+        "il": "İstanbul",
+        "ilce": "Kadıköy",
+        "mahalle": "Moda",
+        "oda_sayisi": "3+1",
+    }
+    record.update(extra)
+    return record
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    pytest.importorskip("psycopg2")
+    schema = f"test_copy_ingest_{uuid.uuid4().hex[:8]}"
+    admin = create_engine(POSTGRES_URL)
+    with admin.begin() as conn:
+        conn.execute(text(f'CREATE SCHEMA "{schema}"'))
+
+    engine = create_engine(POSTGRES_URL, connect_args={"options": f"-csearch_path={schema}"})
+    Base.metadata.create_all(bind=engine)
+    # Ara tablo her test şemasında yeniden oluşturulmalı
+    monkeypatch.setattr(copy_ingest, "_stage_ready", False)
+    try:
+        yield engine
+    finally:
+        engine.dispose()
+        with admin.begin() as conn:
+            conn.execute(text(f'DROP SCHEMA "{schema}" CASCADE'))
+        admin.dispose()
+
+
+@pytest.fixture
+def session_factory(engine):
+    return sessionmaker(bind=engine)
+
+
+def ingest(db, records, scrape_session_id):
+    result = copy_ingest.copy_upsert_listings(
+        db, records, "emlakjet", "konut", "satilik", scrape_session_id=scrape_session_id
+    )
+    db.commit()
+    return result
+
+
+def new_session_id(db):
+    session_id = crud.create_scrape_session(db, "emlakjet", "konut", "satilik").id
+    db.commit()
+    return session_id
+
+
+def test_ingest_twice_classifies_new_updated_and_unchanged(session_factory):
+    db = session_factory()
+    try:
+        first_session = new_session_id(db)
+        records = [
+            make_record("satilik-daire-kadikoy", 16200001, "5.000.000 TL"),
+            make_record("satilik-daire-moda", 16200002, "7.500.000 TL"),
+            make_record("satilik-daire-fenerbahce", 16200003, "9.000.000 TL"),
+        ]
+
+        assert ingest(db, records, first_session) == (3, 0, 0)
+        first_seen = {
+            listing.external_id: listing.last_seen_at for listing in db.scalars(select(Listing))
+        }
+        assert all(listing.scrape_session_id == first_session for listing in db.scalars(select(Listing)))
+        assert db.scalar(select(func.count()).select_from(PriceHistory)) == 0
+
+        time.sleep(0.01)
+        second_session = new_session_id(db)
+        second = [
+            # Fiyat değişti -> güncellenir, price_history'ye yazılır
+            make_record("satilik-daire-kadikoy", 16200001, "5.500.000 TL"),
+            # Aynı içerik -> değişmedi
+            make_record("satilik-daire-moda", 16200002, "7.500.000 TL"),
+            # Slug değişti, ilan numarası aynı -> aynı satır, URL güncellenir
+            make_record("satilik-firsat-daire-fenerbahce", 16200003, "9.000.000 TL"),
+        ]
+
+        assert ingest(db, second, second_session) == (0, 1, 2)
+
+        db.expire_all()
+        listings = {listing.external_id: listing for listing in db.scalars(select(Listing))}
+        assert len(listings) == 3
+        assert listings["16200001"].fiyat == 5_500_000.0
+        assert listings["16200003"].ilan_url == f"{BASE_URL}/satilik-firsat-daire-fenerbahce-16200003"
+        for external_id, listing in listings.items():
+            assert listing.scrape_session_id == second_session
+            assert listing.last_seen_at > first_seen[external_id]
+
+        history = db.scalars(select(PriceHistory)).all()
+        assert [(h.listing_id, h.old_price, h.new_price) for h in history] == [
+            (listings["16200001"].id, 5_000_000.0, 5_500_000.0)
+        ]
+        assert history[0].price_change == 500_000.0
+        assert history[0].price_change_percent == 10.0
+
+        # Ara tablo temizlenir
+        assert db.execute(text(f"SELECT count(*) FROM {copy_ingest.STAGE_TABLE}")).scalar() == 0
+    finally:
+        db.close()
+
+
+def test_concurrent_insert_of_same_listing_is_skipped(session_factory, engine):
+    db = session_factory()
+    try:
+        session_id = new_session_id(db)
+        records = [
+            make_record("satilik-daire-kadikoy", 16300001, "5.000.000 TL"),
+            make_record("satilik-daire-moda", 16300002, "6.000.000 TL"),
+        ]
+
+        # Başka bir worker aynı ilanı eklemiş ama henüz commit etmemiş
+        racer = engine.connect()
+        racer_tx = racer.begin()
+        racer.execute(Listing.__table__.insert().values(
+            baslik="Yarışan", fiyat=5_000_000.0, platform="emlakjet", kategori="konut",
+            ilan_tipi="satilik", ilan_url=records[0]["ilan_linki"], external_id="16300001",
+        ))
+
+        outcome = {}
+
+        def run_ingest():
+            try:
+                db.execute(text("SET LOCAL lock_timeout = '10s'"))
+                outcome["result"] = ingest(db, records, session_id)
+            except Exception as exc:  # pragma: no cover - başarısızlık assert'te görünür
+                outcome["error"] = exc
+
+        worker = threading.Thread(target=run_ingest)
+        worker.start()
+        # INSERT ... ON CONFLICT DO NOTHING yarışan satırın commit'ini bekler
+        time.sleep(0.5)
+        assert worker.is_alive()
+        racer_tx.commit()
+        racer.close()
+        worker.join(timeout=15)
+
+        assert "error" not in outcome, outcome.get("error")
+        assert outcome["result"] == (1, 0, 0)
+        db.expire_all()
+        rows = db.execute(
+            select(Listing.external_id, Listing.baslik).order_by(Listing.external_id)
+        ).all()
+        assert [tuple(row) for row in rows] == [("16300001", "Yarışan"), ("16300002", "İlan 16300002")]
+    finally:
+        db.close()
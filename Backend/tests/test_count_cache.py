@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""core/count_cache.py ve crud.count_listings testleri."""
+
+import os
+import sys
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from core import count_cache as count_cache_module  # noqa: E402
+from core.config import get_config  # noqa: E402
+from core.count_cache import CountCache, build_count_key  # noqa: E402
+from database import crud  # noqa: E402
+from database.models import Base, Listing  # noqa: E402
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def setex(self, key, ttl, value):
+        self.data[key] = value
+
+    def incr(self, key):
+        self.data[key] = str(int(self.data.get(key, 0)) + 1)
+        return int(self.data[key])
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = CountCache()
+    monkeypatch.setattr(get_config(), "listing_count_cache", True)
+    monkeypatch.setattr(count_cache_module, "_count_cache", cache)
+    return cache
+
+
+def add_listings(db, count, platform="emlakjet"):
+    for i in range(count):
+        db.add(Listing(
+            baslik="İlan",
+            platform=platform,
+            kategori="konut",
+            ilan_tipi="satilik",
+            ilan_url=f"https://example.com/{platform}/{db.query(Listing).count()}-{i}",
+        ))
+    db.commit()
+
+
+def test_count_key_ignores_empty_filters_and_order():
+    assert build_count_key({"platform": "emlakjet", "city": None, "kategori": "all"}) == build_count_key(
+        {"platform": "emlakjet"}
+    )
+    assert build_count_key({"platform": "emlakjet"}) != build_count_key({"platform": "hepsiemlak"})
+
+
+@pytest.mark.parametrize("redis_client", [None, FakeRedis()])
+def test_cache_roundtrip_and_generation_invalidation(redis_client):
+    cache = CountCache(redis_client=redis_client)
+    cache.set("k", 42, True)
+    assert cache.get("k") == (42, True)
+
+    cache.invalidate()
+    assert cache.get("k") is None
+
+
+def test_local_entries_expire():
+    cache = CountCache(ttl_seconds=-1)
+    cache.set("k", 1, True)
+    assert cache.get("k") is None
+
+
+def test_count_listings_is_cached_until_session_completes(db, cache):
+    add_listings(db, 3)
+    assert crud.count_listings(db, platform="emlakjet") == (3, True)
+
+    add_listings(db, 2)
+    assert crud.count_listings(db, platform="emlakjet") == (3, True)
+    assert crud.count_listings(db, platform="emlakjet", use_cache=False) == (5, True)
+
+    session = crud.create_scrape_session(db, "emlakjet", "konut", "satilik")
+    crud.complete_scrape_session(db, session.id)
+    assert crud.count_listings(db, platform="emlakjet") == (5, True)
+
+
+def test_counts_cached_before_commit_are_dropped_after_commit(db, cache):
+    session = crud.create_scrape_session(db, "emlakjet", "konut", "satilik")
+    db.commit()
+    crud.complete_scrape_session(db, session.id)
+
+    # Başka bir istek commit'ten önce eski veriyle yeni nesle yazdı
+    key = build_count_key({"platform": "emlakjet"})
+    cache.set(key, 99, True)
+    generation = cache._generation()
+    db.commit()
+
+    assert cache._generation() == generation + 1
+    assert cache.get(key) is None
+
+
+def test_archival_invalidates_counts_after_commit(db, cache):
+    from datetime import datetime, timedelta
+
+    add_listings(db, 2)
+    db.query(Listing).update({Listing.last_seen_at: datetime.utcnow() - timedelta(days=400)})
+    db.commit()
+    assert crud.count_listings(db, platform="emlakjet") == (2, True)
+
+    generation = cache._generation()
+    crud.archive_stale_listings(db, days=30)
+
+    # Silmeden önce ve commit'ten sonra iki kez artırılır
+    assert cache._generation() >= generation + 2
+    assert crud.count_listings(db, platform="emlakjet") == (0, True)
+
+
+def test_broad_filters_use_planner_estimate_on_postgresql(db, cache, monkeypatch):
+    add_listings(db, 2)
+    monkeypatch.setattr(crud, "_is_postgresql", lambda session: True)
+    monkeypatch.setattr(crud, "_planner_row_estimate", lambda session, query: 250000)
+    monkeypatch.setattr(get_config(), "listing_count_estimate_threshold", 100000)
+
+    assert crud.count_listings(db) == (250000, False)
+
+    monkeypatch.setattr(crud, "_planner_row_estimate", lambda session, query: 10)
+    assert crud.count_listings(db, platform="emlakjet") == (2, True)
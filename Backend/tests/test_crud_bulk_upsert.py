@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+"""database/crud.py toplu upsert testleri."""
+
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from database import crud  # noqa: E402
+from database.models import Base, Listing, PriceHistory  # noqa: E402
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
+
+
+def make_listing(url, fiyat="1.500.000 TL", baslik="3+1 Daire", **extra):
+    data = {
+        "ilan_linki": url,
+        "baslik": baslik,
+        "fiyat": fiyat,
+        "il": "İstanbul",
+        "ilce": "Kadıköy",
+        "oda_sayisi": "3+1",
+    }
+    data.update(extra)
+    return data
+
+
+def bulk_save(db, records, session_id=None):
+    result = crud.bulk_upsert_listings(
+        db,
+        records=records,
+        platform="emlakjet",
+        kategori="konut",
+        ilan_tipi="satilik",
+        scrape_session_id=session_id,
+    )
+    db.commit()
+    return result
+
+
+def test_bulk_upsert_inserts_new_listings(db):
+    records = [make_listing(f"https://www.emlakjet.com/ilan/{i}") for i in range(3)]
+
+    assert bulk_save(db, records) == (3, 0, 0)
+    assert db.query(Listing).count() == 3
+    listing = db.query(Listing).first()
+    assert listing.fiyat == 1500000.0
+    assert listing.details == {"oda_sayisi": "3+1"}
+    assert listing.location.il == "İstanbul"
+
+
+def test_bulk_upsert_counts_match_row_by_row_upsert(db):
+    first_page = [make_listing(f"https://www.emlakjet.com/ilan/{i}") for i in range(4)]
+    bulk_save(db, first_page)
+
+    second_page = [
+        make_listing("https://www.emlakjet.com/ilan/0"),
+        make_listing("https://www.emlakjet.com/ilan/1", fiyat="1.750.000 TL"),
+        make_listing("https://www.emlakjet.com/ilan/2", baslik="Yenilenmiş 3+1 Daire"),
+        make_listing("https://www.emlakjet.com/ilan/9"),
+    ]
+
+    assert bulk_save(db, second_page, session_id=None) == (1, 2, 1)
+    assert db.query(Listing).count() == 5
+
+    history = db.query(PriceHistory).all()
+    assert len(history) == 1
+    assert history[0].old_price == 1500000.0
+    assert history[0].new_price == 1750000.0
+    assert history[0].price_change_percent == pytest.approx(16.67)
+
+    renamed = db.query(Listing).filter(Listing.ilan_url == "https://www.emlakjet.com/ilan/2").one()
+    assert renamed.baslik == "Yenilenmiş 3+1 Daire"
+
+
+def test_bulk_upsert_collapses_duplicate_urls_in_batch(db):
+    records = [
+        make_listing("https://www.emlakjet.com/ilan/1"),
+        make_listing("https://www.emlakjet.com/ilan/1"),
+    ]
+
+    assert bulk_save(db, records) == (1, 0, 1)
+    assert db.query(Listing).count() == 1
+
+
+def test_bulk_upsert_keeps_existing_values_for_empty_fields(db):
+    bulk_save(db, [make_listing("https://www.emlakjet.com/ilan/1", emlak_ofisi="Ofis A", metrekare="120")])
+
+    update = make_listing("https://www.emlakjet.com/ilan/1", baslik="", fiyat="", kat="3")
+    assert bulk_save(db, [update]) == (0, 1, 0)
+
+    listing = db.query(Listing).one()
+    assert listing.baslik == "3+1 Daire"
+    assert listing.fiyat == 1500000.0
+    assert listing.emlak_ofisi == "Ofis A"
+    assert listing.details == {"oda_sayisi": "3+1", "metrekare": "120", "kat": "3"}
+
+
+def test_bulk_upsert_marks_unchanged_rows_with_session(db):
+    bulk_save(db, [make_listing("https://www.emlakjet.com/ilan/1")])
+    session = crud.create_scrape_session(db, platform="emlakjet", kategori="konut", ilan_tipi="satilik")
+    db.commit()
+
+    assert bulk_save(db, [make_listing("https://www.emlakjet.com/ilan/1")], session_id=session.id) == (0, 0, 1)
+    db.expire_all()
+    assert db.query(Listing).one().scrape_session_id == session.id
+
+
+def test_unchanged_recrawl_reads_only_change_detection_columns(db):
+    records = [make_listing(f"https://www.emlakjet.com/ilan/{i}") for i in range(5)]
+    bulk_save(db, records)
+
+    statements = []
+    event.listen(
+        db.get_bind(), "before_cursor_execute",
+        lambda conn, cursor, statement, *args: statements.append(statement),
+    )
+
+    assert bulk_save(db, records) == (0, 0, 5)
+    selects = [s for s in statements if s.lstrip().upper().startswith("SELECT")]
+    updates = [s for s in statements if s.lstrip().upper().startswith("UPDATE")]
+    assert len(selects) == 1
+    assert "details" not in selects[0]
+    assert len(updates) == 1
+
+
+def test_upsert_listing_unchanged_skips_orm_load(db):
+    data = make_listing("https://www.emlakjet.com/ilan/1")
+    listing, status = crud.upsert_listing(db, data, "emlakjet", "konut", "satilik")
+    db.commit()
+    assert status == "created"
+
+    session = crud.create_scrape_session(db, platform="emlakjet", kategori="konut", ilan_tipi="satilik")
+    db.commit()
+    session_id = session.id
+    db.expunge_all()
+
+    listing, status = crud.upsert_listing(db, data, "emlakjet", "konut", "satilik", scrape_session_id=session_id)
+    db.commit()
+    assert (listing, status) == (None, "unchanged")
+    assert db.query(Listing).one().scrape_session_id == session_id
+
+    listing, status = crud.upsert_listing(
+        db, make_listing("https://www.emlakjet.com/ilan/1", fiyat="1.600.000 TL"), "emlakjet", "konut", "satilik"
+    )
+    db.commit()
+    assert status == "updated"
+    assert listing.fiyat == 1600000.0
+    assert db.query(PriceHistory).count() == 1
+
+
+def test_bulk_upsert_empty_batch(db):
+    assert bulk_save(db, []) == (0, 0, 0)
+
+
+def test_recrawl_refreshes_last_seen_at_for_every_seen_listing(db):
+    bulk_save(db, [make_listing(f"https://www.emlakjet.com/ilan/{i}") for i in range(3)])
+    stale = datetime.utcnow() - timedelta(days=10)
+    db.query(Listing).update({Listing.last_seen_at: stale})
+    db.commit()
+
+    second_page = [
+        make_listing("https://www.emlakjet.com/ilan/0"),
+        make_listing("https://www.emlakjet.com/ilan/1", fiyat="1.750.000 TL"),
+    ]
+    assert bulk_save(db, second_page) == (0, 1, 1)
+
+    db.expire_all()
+    seen = {listing.ilan_url: listing.last_seen_at for listing in db.query(Listing)}
+    assert seen["https://www.emlakjet.com/ilan/0"] > stale
+    assert seen["https://www.emlakjet.com/ilan/1"] > stale
+    assert seen["https://www.emlakjet.com/ilan/2"] == stale
+
+
+def test_get_unseen_listings_returns_listings_missing_for_n_days(db):
+    bulk_save(db, [make_listing(f"https://www.emlakjet.com/ilan/{i}") for i in range(3)])
+    db.query(Listing).filter(Listing.ilan_url.in_([
+        "https://www.emlakjet.com/ilan/1", "https://www.emlakjet.com/ilan/2",
+    ])).update({Listing.last_seen_at: datetime.utcnow() - timedelta(days=8)}, synchronize_session=False)
+    db.commit()
+
+    listings, total = crud.get_unseen_listings(db, days=7)
+    assert total == 2
+    assert {listing.ilan_url for listing in listings} == {
+        "https://www.emlakjet.com/ilan/1", "https://www.emlakjet.com/ilan/2",
+    }
+    assert crud.get_unseen_listings(db, days=30)[1] == 0
+    assert crud.get_unseen_listings(db, days=7, platform="hepsiemlak")[1] == 0
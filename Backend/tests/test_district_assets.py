@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+"""core/district_assets.py, /districts/{il} önceden sıkıştırılmış sunum ve choropleth testleri."""
+
+import gzip
+import json
+import os
+import sys
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from api import endpoints  # noqa: E402
+from core import district_assets  # noqa: E402
+from core.config import get_config  # noqa: E402
+from core.district_assets import DistrictAssetStore, build_district_assets, etag_matches, select_encoding  # noqa: E402
+from database import crud  # noqa: E402
+from database.connection import get_db  # noqa: E402
+from database.models import Base, Listing  # noqa: E402
+
+# Kenarları üzerinde ara noktalar olan kare: sadeleştirmede köşeler kalır
+SQUARE = [[29.0 + i * 0.0001, 40.0] for i in range(100)] + [[29.01, 40.01], [29.0, 40.01], [29.0, 40.0]]
+GEOJSON = {
+    "type": "FeatureCollection",
+    "features": [{
+        "type": "Feature",
+        "properties": {"name": "Kadıköy"},
+        "geometry": {"type": "Polygon", "coordinates": [SQUARE]},
+    }],
+}
+
+
+@pytest.fixture
+def districts_dir(tmp_path):
+    (tmp_path / "index.json").write_text(json.dumps({"İstanbul": {"file": "istanbul.json", "count": 1}}))
+    (tmp_path / "istanbul.json").write_text(json.dumps(GEOJSON, ensure_ascii=False), encoding="utf-8")
+    return tmp_path
+
+
+@pytest.fixture
+def client(districts_dir, monkeypatch):
+    monkeypatch.setattr(endpoints, "DISTRICTS_DIR", districts_dir)
+    monkeypatch.setattr(district_assets, "_district_asset_store", DistrictAssetStore(districts_dir))
+    monkeypatch.setattr(endpoints, "_districts_index", None)
+    app = FastAPI()
+    app.include_router(endpoints.router, prefix="/api/v1")
+    return TestClient(app)
+
+
+def test_build_writes_deterministic_gzip_and_manifest(districts_dir, monkeypatch):
+    monkeypatch.setattr(district_assets, "HAS_BROTLI", False)
+    manifest = build_district_assets(districts_dir)
+
+    assert sorted(manifest) == ["istanbul.json", "low/istanbul.json", "medium/istanbul.json"]
+    assert (districts_dir / "low" / "istanbul.json").is_file()
+    entry = manifest["istanbul.json"]
+    assert entry["hash"] == district_assets.content_hash((districts_dir / "istanbul.json").read_bytes())
+    variant = districts_dir / "_build" / entry["variants"]["gzip"]["file"]
+    assert gzip.decompress(variant.read_bytes()) == (districts_dir / "istanbul.json").read_bytes()
+
+    first = variant.read_bytes()
+    build_district_assets(districts_dir)
+    assert variant.read_bytes() == first
+
+
+def test_select_encoding_honors_quality_and_preference():
+    available = {"gzip": None, "br": None}
+    assert select_encoding("gzip, deflate, br", available) == "br"
+    assert select_encoding("gzip, br;q=0.5", available) == "gzip"
+    assert select_encoding("br;q=0, gzip;q=0", available) is None
+    assert select_encoding("*", {"gzip": None}) == "gzip"
+    assert select_encoding("identity", available) is None
+    assert select_encoding(None, available) is None
+
+
+def test_etag_matches_any_encoding_of_same_content():
+    assert etag_matches('"abc-gzip"', "abc")
+    assert etag_matches('W/"abc", "zzz"', "abc")
+    assert etag_matches("*", "abc")
+    assert not etag_matches('"abd"', "abc")
+
+
+def test_endpoint_serves_precompressed_variant(client, districts_dir, monkeypatch):
+    monkeypatch.setattr(district_assets, "HAS_BROTLI", False)
+    digest = build_district_assets(districts_dir)["istanbul.json"]["hash"]
+
+    response = client.get("/api/v1/districts/İstanbul", headers={"Accept-Encoding": "gzip"})
+
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["etag"] == f'"{digest}-gzip"'
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert "max-age=" in response.headers["cache-control"]
+    assert response.json() == GEOJSON
+
+
+def test_endpoint_answers_if_none_match_with_304(client, districts_dir):
+    build_district_assets(districts_dir)
+    etag = client.get("/api/v1/districts/İstanbul", headers={"Accept-Encoding": "identity"}).headers["etag"]
+
+    response = client.get("/api/v1/districts/İstanbul", headers={"If-None-Match": etag, "Accept-Encoding": "gzip"})
+
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"].startswith(etag.rstrip('"'))
+
+
+def test_stale_manifest_falls_back_to_raw_file(client, districts_dir):
+    build_district_assets(districts_dir)
+    changed = dict(GEOJSON, name="yeni")
+    (districts_dir / "istanbul.json").write_text(json.dumps(changed), encoding="utf-8")
+
+    response = client.get("/api/v1/districts/İstanbul", headers={"Accept-Encoding": "gzip"})
+
+    assert "content-encoding" not in response.headers
+    assert response.headers["etag"] == f'"{district_assets.content_hash((districts_dir / "istanbul.json").read_bytes())}"'
+    assert response.json() == changed
+
+
+def test_manifest_entry_is_checked_against_content_hash_not_mtime(client, districts_dir):
+    build_district_assets(districts_dir)
+    source = districts_dir / "istanbul.json"
+    stat = source.stat()
+    # Aynı boyut ve mtime, farklı içerik
+    source.write_bytes(source.read_bytes().replace(b"Feature", b"Featurf", 1))
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+    response = client.get("/api/v1/districts/İstanbul", headers={"Accept-Encoding": "gzip"})
+
+    assert "content-encoding" not in response.headers
+    assert response.headers["etag"] == f'"{district_assets.content_hash(source.read_bytes())}"'
+
+
+def test_ensure_built_builds_missing_manifest_in_background(districts_dir, monkeypatch):
+    monkeypatch.setattr(district_assets, "HAS_BROTLI", False)
+    store = DistrictAssetStore(districts_dir)
+    assert store.needs_build()
+    assert store.get("istanbul.json").variants == {}
+
+    store.ensure_built().join(10)
+
+    assert not store.needs_build()
+    assert store.ensure_built() is None
+    assert set(store.get("istanbul.json").variants) == {"gzip"}
+
+
+def test_unknown_province_is_404(client):
+    assert client.get("/api/v1/districts/Atlantis").status_code == 404
+
+
+def test_detail_for_zoom_maps_country_province_and_street_views():
+    assert district_assets.detail_for_zoom(6) == "low"
+    assert district_assets.detail_for_zoom(9) == "medium"
+    assert district_assets.detail_for_zoom(13) == "full"
+
+
+def test_endpoint_serves_requested_detail_level(client, districts_dir):
+    build_district_assets(districts_dir)
+    low = json.loads((districts_dir / "low" / "istanbul.json").read_text(encoding="utf-8"))
+    assert low["features"][0]["geometry"]["coordinates"] == [[[29.0, 40.0], [29.01, 40.0], [29.01, 40.01], [29.0, 40.01], [29.0, 40.0]]]
+
+    by_detail = client.get("/api/v1/districts/İstanbul", params={"detail": "low"})
+    by_zoom = client.get("/api/v1/districts/İstanbul", params={"zoom": 5})
+
+    assert by_detail.json() == by_zoom.json() == low
+    assert by_detail.headers["x-detail-level"] == "low"
+    assert by_detail.headers["etag"] != client.get("/api/v1/districts/İstanbul").headers["etag"]
+
+
+def test_missing_detail_level_falls_back_to_full(client):
+    response = client.get("/api/v1/districts/İstanbul", params={"detail": "medium"})
+
+    assert response.headers["x-detail-level"] == "full"
+    assert response.json() == GEOJSON
+    assert client.get("/api/v1/districts/İstanbul", params={"detail": "tiny"}).status_code == 422
+
+
+def test_choropleth_keys_stats_by_index_district_names(districts_dir, monkeypatch):
+    (districts_dir / "index.json").write_text(json.dumps(
+        {"İstanbul": {"file": "istanbul.json", "count": 2, "districts": ["Kadıköy", "Şişli"]}}
+    ), encoding="utf-8")
+    monkeypatch.setattr(get_config(), "response_cache", False)
+    monkeypatch.setattr(endpoints, "DISTRICTS_DIR", districts_dir)
+    monkeypatch.setattr(endpoints, "_districts_index", None)
+    monkeypatch.setattr(endpoints, "_district_name_maps", {})
+
+    engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(bind=engine)
+    db = session_factory()
+    kadikoy = crud.get_or_create_location(db, "istanbul", "KADIKÖY")
+    besiktas = crud.get_or_create_location(db, "İstanbul", "Beşiktaş")
+    for i, (location, fiyat, ilan_tipi) in enumerate([
+        (kadikoy, 3_000_000.0, "satilik"), (kadikoy, 5_000_000.0, "satilik"),
+        (kadikoy, 40_000.0, "kiralik"), (besiktas, 8_000_000.0, "satilik"),
+    ]):
+        db.add(Listing(baslik="Ev", fiyat=fiyat, platform="emlakjet", kategori="konut", ilan_tipi=ilan_tipi,
+                       location_id=location.id, ilan_url=f"https://example.com/{i}"))
+    db.commit()
+    db.close()
+
+    def override_get_db():
+        session = session_factory()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    app = FastAPI()
+    app.include_router(endpoints.router, prefix="/api/v1")
+    app.dependency_overrides[get_db] = override_get_db
+    response = TestClient(app).get("/api/v1/districts/İstanbul/choropleth", params={"ilan_tipi": "Satılık"})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["districts"] == {
+        "Kadıköy": {"count": 2, "mean": 4_000_000.0, "median": 4_000_000.0},
+        "Şişli": {"count": 0, "mean": None, "median": None},
+    }
+    assert body["unmatched"] == {"besiktas": {"count": 1, "mean": 8_000_000.0, "median": 8_000_000.0}}
+    assert body["total_listings"] == 3
+    engine.dispose()
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""/export/excel akışlı dışa aktarım testleri (api/exports.py)."""
+
+import csv
+import io
+import json
+import os
+import sys
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from openpyxl import load_workbook
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from api import endpoints, exports  # noqa: E402
+from core.config import get_config  # noqa: E402
+from database import crud  # noqa: E402
+from database.connection import get_db  # noqa: E402
+from database.models import Base, Listing  # noqa: E402
+
+LISTING_COUNT = 7
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    location = crud.get_or_create_location(session, "İzmir", "Karşıyaka", "Bostanlı")
+    for i in range(LISTING_COUNT):
+        details = {"oda_sayisi": f"{i}+1"} if i % 2 else {"metrekare": 100 + i, "ozellikler": ["asansör"]}
+        session.add(Listing(
+            baslik=f"İlan {i}", fiyat=1_000_000.0 + i, fiyat_text=f"{1_000_000 + i} TL", platform="emlakjet",
+            kategori="konut", ilan_tipi="satilik", location_id=location.id if i else None,
+            ilan_url=f"https://example.com/{i}", details=details,
+        ))
+    session.commit()
+    session.close()
+    try:
+        yield engine
+    finally:
+        engine.dispose()
+
+
+@pytest.fixture
+def client(engine, monkeypatch):
+    monkeypatch.setattr(get_config(), "export_batch_size", 3)
+    session_factory = sessionmaker(bind=engine)
+    app = FastAPI()
+    app.include_router(endpoints.router, prefix="/api/v1")
+
+    def override_get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    return TestClient(app)
+
+
+def test_csv_export_has_all_rows_and_detail_columns(client):
+    response = client.post("/api/v1/export/excel", params={"format": "csv"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(response.content.decode("utf-8-sig"))))
+    assert len(rows) == LISTING_COUNT
+    assert list(rows[0])[:len(exports.BASE_COLUMNS)] == exports.BASE_COLUMNS
+    assert list(rows[0])[len(exports.BASE_COLUMNS):] == ["metrekare", "ozellikler", "oda_sayisi"]
+    assert rows[0]["İl"] == "" and rows[1]["İlçe"] == "Karşıyaka"
+    assert rows[0]["ozellikler"] == '["asansör"]'
+    assert rows[1]["oda_sayisi"] == "1+1" and rows[1]["metrekare"] == ""
+
+
+def test_ndjson_export_streams_one_object_per_line(client):
+    response = client.post("/api/v1/export/excel", params={"format": "ndjson", "city": "izmir"})
+
+    lines = [json.loads(line) for line in response.content.splitlines()]
+    assert len(lines) == LISTING_COUNT - 1
+    assert lines[0]["Mahalle"] == "Bostanlı"
+    assert lines[0]["Fiyat"] == "1000001 TL"
+
+
+def test_xlsx_export_is_the_default(client):
+    response = client.post("/api/v1/export/excel")
+
+    assert response.status_code == 200
+    assert response.headers["content-disposition"].endswith(".xlsx")
+    sheet = load_workbook(io.BytesIO(response.content), read_only=True).active
+    rows = list(sheet.iter_rows(values_only=True))
+    assert rows[0][:2] == ("Başlık", "Fiyat")
+    assert len(rows) == LISTING_COUNT + 1
+
+
+def test_export_reads_in_yield_per_batches(engine):
+    db = sessionmaker(bind=engine)()
+    fetches = []
+    event.listen(engine, "before_cursor_execute", lambda *args: fetches.append(args[2]))
+
+    batches = list(crud.iter_listing_export_batches(db, (Listing.id,), batch_size=3))
+
+    assert [len(batch) for batch in batches] == [3, 3, 1]
+    assert len(fetches) == 1
+    db.close()
+
+
+def test_empty_export_returns_404(client):
+    response = client.post("/api/v1/export/excel", params={"platform": "hepsiemlak"})
+    assert response.status_code == 404
+
+
+def test_unknown_format_is_rejected(client):
+    assert client.post("/api/v1/export/excel", params={"format": "xml"}).status_code == 422
+
+
+def test_parquet_export_writes_row_groups(client):
+    pq = pytest.importorskip("pyarrow.parquet")
+
+    response = client.post("/api/v1/export/excel", params={"format": "parquet"})
+
+    parquet_file = pq.ParquetFile(io.BytesIO(response.content))
+    assert parquet_file.metadata.num_rows == LISTING_COUNT
+    assert parquet_file.metadata.num_row_groups == 3
+
+
+def test_parquet_without_pyarrow_is_rejected(client, monkeypatch):
+    monkeypatch.setattr(exports, "HAS_PYARROW", False)
+    assert client.post("/api/v1/export/excel", params={"format": "parquet"}).status_code == 400
+
+
+def test_stream_export_uses_and_closes_its_own_session(engine, monkeypatch):
+    sessions = []
+
+    class TrackedSession(exports.Session):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.closed = False
+            sessions.append(self)
+
+        def close(self):
+            self.closed = True
+            super().close()
+
+    monkeypatch.setattr(exports, "Session", TrackedSession)
+    chunks = exports.stream_export(engine, "ndjson", {})
+    assert sessions == []
+
+    lines = b"".join(chunks).splitlines()
+
+    assert len(lines) == LISTING_COUNT
+    assert len(sessions) == 1 and sessions[0].closed
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""database/hashing.py ve hash sürüm geçişi testleri."""
+
+import os
+import sys
+
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.orm import sessionmaker
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from database import crud  # noqa: E402
+from database.hashing import (  # noqa: E402
+    CONTENT_HASH_VERSION,
+    compute_content_hash,
+    compute_legacy_content_hash,
+    content_hash_matches,
+)
+from database.migrations import backfill_content_hash_versions, run_migrations  # noqa: E402
+from database.models import Base, Listing  # noqa: E402
+
+
+def test_content_hash_is_canonical_and_ignores_price():
+    a = {"baslik": "3+1", "kat": 2, "details": {"b": 1, "a": [1, 2]}, "fiyat": "1 TL"}
+    b = {"details": {"a": [1, 2], "b": 1}, "kat": 2, "baslik": "3+1", "fiyat": "2 TL"}
+
+    assert compute_content_hash(a) == compute_content_hash(b)
+    assert len(compute_content_hash(a)) == 32
+    assert compute_content_hash(a) != compute_content_hash({**a, "baslik": "2+1"})
+
+
+def test_content_hash_matches_uses_legacy_hash_for_old_rows():
+    data = {"baslik": "Daire", "oda_sayisi": "2+1"}
+    new_hash = compute_content_hash(data)
+
+    assert content_hash_matches(new_hash, CONTENT_HASH_VERSION, data, new_hash)
+    assert content_hash_matches(compute_legacy_content_hash(data), None, data, new_hash)
+    assert not content_hash_matches(new_hash, None, data, new_hash)
+
+
+def test_bulk_upsert_upgrades_legacy_hash_without_counting_update():
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    data = {"ilan_linki": "https://example.com/1", "baslik": "Daire", "fiyat": "1.000 TL", "il": "Ankara"}
+    try:
+        crud.bulk_upsert_listings(db, [data], "emlakjet", "konut", "satilik")
+        db.query(Listing).update({
+            Listing.content_hash: compute_legacy_content_hash(data),
+            Listing.content_hash_version: None,
+        })
+        db.commit()
+
+        assert crud.bulk_upsert_listings(db, [data], "emlakjet", "konut", "satilik") == (0, 0, 1)
+        db.commit()
+
+        listing = db.query(Listing).one()
+        assert listing.content_hash == compute_content_hash(data)
+        assert listing.content_hash_version == CONTENT_HASH_VERSION
+    finally:
+        db.close()
+        engine.dispose()
+
+
+def test_run_migrations_adds_missing_columns_once():
+    engine = create_engine("sqlite:///:memory:")
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE listings (id INTEGER PRIMARY KEY, platform VARCHAR(20), baslik TEXT, "
+            "emlak_ofisi VARCHAR(200), details JSON, "
+            "ilan_url TEXT, content_hash VARCHAR(32), created_at TIMESTAMP, updated_at TIMESTAMP)"
+        ))
+
+    assert "listings.content_hash_version" in run_migrations(engine)
+    assert run_migrations(engine) == []
+    columns = {col["name"] for col in inspect(engine).get_columns("listings")}
+    assert "content_hash_version" in columns
+    engine.dispose()
+
+
+def test_backfill_upgrades_only_verifiable_legacy_hashes():
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    data = {"baslik": "Daire", "emlak_ofisi": "Ofis", "oda_sayisi": "2+1", "kat": "3"}
+    try:
+        for i, (content_hash, details) in enumerate([
+            (compute_legacy_content_hash(data), {"oda_sayisi": "2+1", "kat": "3"}),
+            # details sonradan birleştirilmiş: kayıtlı hash doğrulanamaz
+            (compute_legacy_content_hash(data), {"oda_sayisi": "2+1", "kat": "4"}),
+        ]):
+            db.add(Listing(baslik="Daire", emlak_ofisi="Ofis", details=details, platform="emlakjet",
+                           kategori="konut", ilan_tipi="satilik", ilan_url=f"https://example.com/{i}",
+                           content_hash=content_hash))
+        db.commit()
+
+        assert backfill_content_hash_versions(engine, batch_size=1) == 1
+
+        upgraded, kept = db.query(Listing).order_by(Listing.id).all()
+        assert (upgraded.content_hash, upgraded.content_hash_version) == (compute_content_hash(data), CONTENT_HASH_VERSION)
+        assert (kept.content_hash, kept.content_hash_version) == (compute_legacy_content_hash(data), None)
+    finally:
+        db.close()
+        engine.dispose()
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""api/responses.py ve orjson yanıtlı uçların testleri."""
+
+import os
+import sys
+from datetime import date, datetime
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from api import endpoints  # noqa: E402
+from api.responses import FastJSONResponse, json_response  # noqa: E402
+from core.config import get_config  # noqa: E402
+from database import crud  # noqa: E402
+from database.connection import get_db  # noqa: E402
+from database.models import Base, Listing  # noqa: E402
+
+
+@pytest.fixture
+def client(monkeypatch):
+    # Her iki kodlama modu da gerçekten hesaplansın
+    monkeypatch.setattr(get_config(), "response_cache", False)
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(bind=engine)
+    session = session_factory()
+    location = crud.get_or_create_location(session, "İzmir", "Karşıyaka")
+    for i, (platform, kategori) in enumerate([("emlakjet", "konut"), ("hepsiemlak", "isyeri")]):
+        session.add(Listing(
+            baslik=f"İlan {i}", fiyat=1_000_000.0 * (i + 1), platform=platform, kategori=kategori,
+            ilan_tipi="satilik", location_id=location.id, ilan_url=f"https://example.com/{i}",
+        ))
+    session.commit()
+    session.close()
+
+    app = FastAPI()
+    app.include_router(endpoints.router, prefix="/api/v1")
+
+    def override_get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    try:
+        yield TestClient(app)
+    finally:
+        engine.dispose()
+
+
+def test_fast_json_response_encodes_dates_and_unicode():
+    response = FastJSONResponse({"il": "İzmir", "at": datetime(2026, 1, 2, 3, 4, 5), "day": date(2026, 1, 2), 1: "x"})
+    assert response.body == b'{"il":"\xc4\xb0zmir","at":"2026-01-02T03:04:05","day":"2026-01-02","1":"x"}'
+    assert response.media_type == "application/json"
+
+
+def test_json_response_can_be_disabled(monkeypatch):
+    monkeypatch.setattr(get_config(), "fast_json_responses", False)
+    payload = {"a": 1}
+    assert json_response(payload) is payload
+
+
+@pytest.mark.parametrize("fast", [True, False])
+def test_price_analytics_payload_is_identical_in_both_modes(client, monkeypatch, fast):
+    monkeypatch.setattr(get_config(), "fast_json_responses", fast)
+
+    payload = client.get("/api/v1/analytics/prices").json()
+
+    assert sorted(payload["prices"], key=lambda row: row["price"]) == [
+        {"city": "İzmir", "platform": "Emlakjet", "category": "Konut", "listing_type": "Satılık", "price": 1_000_000.0},
+        {"city": "İzmir", "platform": "HepsiEmlak", "category": "İşyeri", "listing_type": "Satılık", "price": 2_000_000.0},
+    ]
+    assert payload["summary"]["total_count"] == 2
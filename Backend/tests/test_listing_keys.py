@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""database/listing_keys.py ve (platform, external_id) tekrar kontrolü testleri."""
+
+import os
+import sys
+
+import pytest
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import sessionmaker
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from database import crud  # noqa: E402
+from database.listing_keys import extract_external_id  # noqa: E402
+from database.migrations import run_migrations  # noqa: E402
+from database.models import Base, Listing, PriceHistory  # noqa: E402
+
+EMLAKJET_URL = "https://www.emlakjet.com/ilan/kadikoy-caferaga-satilik-3-1-daire-15834520/"
+EMLAKJET_RENAMED_URL = "https://www.emlakjet.com/ilan/kadikoy-moda-satilik-3-1-daire-15834520/"
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
+
+
+def make_listing(url, fiyat="1.500.000 TL", baslik="3+1 Daire"):
+    return {"ilan_linki": url, "baslik": baslik, "fiyat": fiyat, "il": "İstanbul", "ilce": "Kadıköy"}
+
+
+def bulk_save(db, records, platform="emlakjet"):
+    result = crud.bulk_upsert_listings(db, records, platform=platform, kategori="konut", ilan_tipi="satilik")
+    db.commit()
+    return result
+
+
+@pytest.mark.parametrize("platform, url, expected", [
+    ("emlakjet", EMLAKJET_URL, "15834520"),
+    ("emlakjet", "https://www.emlakjet.com/satilik-daire/istanbul-kadikoy", None),
+    ("emlakjet", "https://www.hepsiemlak.com/istanbul-satilik/daire/144477-1234", None),
+    ("hepsiemlak", "https://www.hepsiemlak.com/istanbul-kadikoy-satilik/daire/144477-1234", "144477-1234"),
+    ("hepsiemlak", "https://www.hepsiemlak.com/istanbul-kadikoy-satilik/144477-1234", "144477-1234"),
+    ("hepsiemlak", "https://www.hepsiemlak.com/istanbul-kadikoy-satilik/daire", None),
+    ("hepsiemlak", "Belirtilmemiş", None),
+    ("sahibinden", EMLAKJET_URL, None),
+])
+def test_extract_external_id(platform, url, expected):
+    assert extract_external_id(platform, url) == expected
+
+
+def test_slug_change_updates_url_instead_of_creating_new_listing(db):
+    assert bulk_save(db, [make_listing(EMLAKJET_URL)]) == (1, 0, 0)
+
+    assert bulk_save(db, [make_listing(EMLAKJET_RENAMED_URL)]) == (0, 0, 1)
+    listing = db.query(Listing).one()
+    assert listing.ilan_url == EMLAKJET_RENAMED_URL
+    assert listing.external_id == "15834520"
+
+    assert bulk_save(db, [make_listing(EMLAKJET_URL, fiyat="1.400.000 TL")]) == (0, 1, 0)
+    listing = db.query(Listing).one()
+    assert listing.ilan_url == EMLAKJET_URL
+    assert db.query(PriceHistory).count() == 1
+
+
+def test_batch_dedupes_same_listing_under_different_slugs(db):
+    assert bulk_save(db, [make_listing(EMLAKJET_URL), make_listing(EMLAKJET_RENAMED_URL)]) == (1, 0, 1)
+    assert db.query(Listing).one().ilan_url == EMLAKJET_RENAMED_URL
+
+
+def test_upsert_listing_matches_by_external_id(db):
+    crud.upsert_listing(db, make_listing(EMLAKJET_URL), "emlakjet", "konut", "satilik")
+    db.commit()
+
+    listing, status = crud.upsert_listing(
+        db, make_listing(EMLAKJET_RENAMED_URL, baslik="Yenilenmiş Daire"), "emlakjet", "konut", "satilik"
+    )
+    db.commit()
+
+    assert status == "updated"
+    assert listing.ilan_url == EMLAKJET_RENAMED_URL
+    assert db.query(Listing).count() == 1
+
+
+def test_url_is_unique_only_for_listings_without_external_id(db):
+    def add(url, external_id):
+        db.add(Listing(baslik="Ev", platform="emlakjet", kategori="konut", ilan_tipi="satilik",
+                       ilan_url=url, external_id=external_id))
+        db.flush()
+
+    add("https://example.com/ilan", None)
+    with pytest.raises(IntegrityError):
+        add("https://example.com/ilan", None)
+    db.rollback()
+
+    add(EMLAKJET_URL, "15834520")
+    add(EMLAKJET_URL, None)  # Eski slug kopyası: external_id NULL
+    assert db.query(Listing).filter(Listing.ilan_url == EMLAKJET_URL).count() == 2
+
+
+def test_backfill_migration_keeps_oldest_duplicate_and_builds_unique_index():
+    engine = create_engine("sqlite:///:memory:")
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE listings (id INTEGER PRIMARY KEY, platform VARCHAR(20), baslik TEXT, "
+            "emlak_ofisi VARCHAR(200), details JSON, "
+            "ilan_url TEXT UNIQUE, content_hash VARCHAR(32), created_at TIMESTAMP, updated_at TIMESTAMP)"
+        ))
+        conn.execute(text("INSERT INTO listings (id, platform, ilan_url) VALUES (:id, :platform, :url)"), [
+            {"id": 1, "platform": "emlakjet", "url": EMLAKJET_URL},
+            {"id": 2, "platform": "emlakjet", "url": EMLAKJET_RENAMED_URL},
+            {"id": 3, "platform": "hepsiemlak", "url": "https://www.hepsiemlak.com/ankara-satilik/daire/1-2"},
+            {"id": 4, "platform": "hepsiemlak", "url": "https://www.hepsiemlak.com/ankara-satilik/daire"},
+        ])
+
+    applied = run_migrations(engine)
+
+    assert "listings.external_id" in applied
+    assert "backfill_listing_external_ids (2 rows)" in applied
+    assert "uq_listings_platform_external_id" in applied
+    with engine.connect() as conn:
+        rows = dict(conn.execute(text("SELECT id, external_id FROM listings")).all())
+    assert rows == {1: "15834520", 2: None, 3: "1-2", 4: None}
+    indexes = {index["name"]: index for index in inspect(engine).get_indexes("listings")}
+    assert indexes["uq_listings_platform_external_id"]["unique"]
+    assert {"idx_listings_ilan_url", "uq_listings_url_without_external_id"} <= set(applied)
+    assert not indexes["idx_listings_ilan_url"]["unique"]
+    assert run_migrations(engine) == []
+    engine.dispose()
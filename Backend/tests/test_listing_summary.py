@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""listing_summary özet tablosu ve /results okuma testleri."""
+
+import asyncio
+import os
+import sys
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from api import endpoints  # noqa: E402
+from database import crud  # noqa: E402
+from database.migrations import run_migrations  # noqa: E402
+from database.models import Base, ListingSummary  # noqa: E402
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
+
+
+def save(db, platform, ilan_tipi, rows):
+    records = [
+        {"ilan_linki": f"https://example.com/{platform}/{ilan_tipi}/{i}", "baslik": "Daire", "fiyat": fiyat,
+         "il": il, "ilce": ilce}
+        for i, (il, ilce, fiyat) in enumerate(rows)
+    ]
+    crud.bulk_upsert_listings(db, records, platform=platform, kategori="konut", ilan_tipi=ilan_tipi)
+    db.commit()
+
+
+def results_by_key(db):
+    return {(r["platform"], r["listing_type"], r["city"], r["district"]): r for r in crud.get_results_for_frontend(db)}
+
+
+def test_summary_is_built_at_startup_and_results_read_only(db):
+    save(db, "emlakjet", "satilik", [
+        ("İstanbul", "Kadıköy", "1.000.000 TL"),
+        ("İstanbul", "Kadıköy", "3.000.000 TL"),
+        ("İstanbul", "Kadıköy", "Fiyat sorunuz"),
+        ("Ankara", "Çankaya", "2.000.000 TL"),
+    ])
+    assert db.query(ListingSummary).count() == 0
+    # Okuma ucu özeti kurmaz
+    assert crud.get_results_for_frontend(db) == []
+    assert db.query(ListingSummary).count() == 0
+
+    assert "listing_summary (2 rows)" in run_migrations(db.get_bind())
+    assert "listing_summary (2 rows)" not in run_migrations(db.get_bind())
+    results = results_by_key(db)
+
+    kadikoy = results[("Emlakjet", "Satılık", "İstanbul", "Kadıköy")]
+    assert kadikoy["count"] == 3
+    assert kadikoy["avg_price"] == 2_000_000
+    assert results[("Emlakjet", "Satılık", "Ankara", "Çankaya")]["count"] == 1
+    assert db.query(ListingSummary).count() == 2
+
+
+def test_session_completion_refreshes_only_its_slice(db):
+    save(db, "emlakjet", "satilik", [("İstanbul", "Kadıköy", "1.000.000 TL")])
+    save(db, "hepsiemlak", "kiralik", [("İzmir", "Bornova", "20.000 TL")])
+    crud.refresh_listing_summary(db)
+    db.commit()
+    hepsiemlak_row_id = db.query(ListingSummary).filter_by(platform="hepsiemlak").one().id
+
+    save(db, "emlakjet", "satilik", [
+        ("İstanbul", "Kadıköy", "1.000.000 TL"),
+        ("İstanbul", "Kadıköy", "2.000.000 TL"),
+    ])
+    session = crud.create_scrape_session(db, "emlakjet", "konut", "satilik")
+    db.commit()
+    crud.complete_scrape_session(db, session.id)
+    db.commit()
+
+    results = results_by_key(db)
+    assert results[("Emlakjet", "Satılık", "İstanbul", "Kadıköy")]["count"] == 2
+    assert results[("HepsiEmlak", "Kiralık", "İzmir", "Bornova")]["count"] == 1
+    assert db.query(ListingSummary).filter_by(platform="hepsiemlak").one().id == hepsiemlak_row_id
+
+
+def test_full_refresh_drops_groups_without_listings(db):
+    save(db, "emlakjet", "satilik", [("İstanbul", "Kadıköy", "1.000.000 TL")])
+    assert crud.refresh_listing_summary(db) == 1
+    db.commit()
+
+    crud.archive_stale_listings(db, days=-1)
+
+    assert crud.get_results_for_frontend(db) == []
+
+
+def test_group_delete_refreshes_only_its_slice(db):
+    save(db, "emlakjet", "satilik", [("İstanbul", "Kadıköy", "1.000.000 TL")])
+    save(db, "hepsiemlak", "kiralik", [("İzmir", "Bornova", "20.000 TL")])
+    crud.refresh_listing_summary(db)
+    db.commit()
+    hepsiemlak_row_id = db.query(ListingSummary).filter_by(platform="hepsiemlak").one().id
+
+    response = asyncio.run(endpoints.delete_listing_group(
+        platform="Emlakjet", kategori=None, ilan_tipi="Satılık", city=None, district=None, alt_kategori=None, db=db
+    ))
+
+    assert response["deleted_count"] == 1
+    assert db.query(ListingSummary).filter_by(platform="emlakjet").count() == 0
+    assert db.query(ListingSummary).filter_by(platform="hepsiemlak").one().id == hepsiemlak_row_id
@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+"""il_key/ilce_key katlamalı lokasyon anahtarı testleri."""
+
+import asyncio
+import os
+import sys
+
+import pytest
+from sqlalchemy import create_engine, event, insert, inspect, text
+from sqlalchemy.orm import sessionmaker
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from api import endpoints  # noqa: E402
+from core.config import get_config  # noqa: E402
+from database import crud  # noqa: E402
+from database.location_keys import fold_location_name  # noqa: E402
+from database.location_resolver import LocationResolver  # noqa: E402
+from database.migrations import run_migrations  # noqa: E402
+from database.models import Base, Listing, Location  # noqa: E402
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("İstanbul", "istanbul"),
+    ("ISTANBUL", "istanbul"),
+    (" Kadıköy ", "kadikoy"),
+    ("ŞİŞLİ", "sisli"),
+    ("Muğla", "mugla"),
+    ("Çanakkale", "canakkale"),
+    ("", None),
+    (None, None),
+])
+def test_fold_location_name(value, expected):
+    assert fold_location_name(value) == expected
+
+
+def test_keys_are_written_by_orm_and_core_inserts(db):
+    crud.get_or_create_location(db, "İzmir", "Karşıyaka")
+    LocationResolver().resolve_many(db, [("Ağrı", "Doğubayazıt", None), ("Ağrı", None, None)])
+    db.execute(insert(Location), [{"il": "Çorum", "ilce": "Osmancık"}])
+    db.commit()
+
+    keys = {(row.il, row.ilce): (row.il_key, row.ilce_key) for row in db.query(Location)}
+    assert keys == {
+        ("İzmir", "Karşıyaka"): ("izmir", "karsiyaka"),
+        ("Ağrı", "Doğubayazıt"): ("agri", "dogubayazit"),
+        ("Ağrı", None): ("agri", None),
+        ("Çorum", "Osmancık"): ("corum", "osmancik"),
+    }
+
+
+def test_city_and_district_filters_use_folded_keys(db):
+    location = crud.get_or_create_location(db, "İstanbul", "Kadıköy")
+    other = crud.get_or_create_location(db, "Ankara", "Çankaya")
+    for i, location_id in enumerate([location.id, location.id, other.id]):
+        db.add(Listing(baslik="Daire", fiyat=1_000_000.0 * (i + 1), platform="emlakjet", kategori="konut",
+                       ilan_tipi="satilik", location_id=location_id, ilan_url=f"https://example.com/{i}"))
+    db.commit()
+
+    assert crud.get_districts_by_city(db, "istanbul") == ["Kadıköy"]
+    assert len(crud.get_listings(db, city="ISTANBUL", district="kadikoy")) == 2
+    assert crud.get_city_analytics(db, "Istanbul")["total_listings"] == 2
+    assert crud.get_price_analytics(db, city="ankara")["summary"]["total_count"] == 1
+
+
+def test_city_lookup_is_a_single_equality_query(db):
+    for i in range(5):
+        crud.get_or_create_location(db, f"Şehir {i}", "Merkez")
+    db.commit()
+
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)  # noqa: E731
+    event.listen(db.get_bind(), "before_cursor_execute", listener)
+    try:
+        crud.get_city_analytics(db, "sehir 3")
+    finally:
+        event.remove(db.get_bind(), "before_cursor_execute", listener)
+
+    location_lookups = [s for s in statements if "FROM locations" in s and "listings" not in s]
+    assert len(location_lookups) == 2  # eşleşen ID'ler + ilçe adları
+    assert "locations.il_key = ?" in location_lookups[0]
+
+
+def test_stats_and_group_delete_join_locations_in_the_same_query(db, monkeypatch):
+    monkeypatch.setattr(get_config(), "response_cache", False)
+    kadikoy = crud.get_or_create_location(db, "İstanbul", "Kadıköy")
+    cankaya = crud.get_or_create_location(db, "Ankara", "Çankaya")
+    for i, location_id in enumerate([kadikoy.id, kadikoy.id, cankaya.id]):
+        db.add(Listing(baslik="Daire", fiyat=1_000_000.0 * (i + 1), platform="emlakjet", kategori="konut",
+                       ilan_tipi="satilik", location_id=location_id, ilan_url=f"https://example.com/{i}"))
+    db.commit()
+
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)  # noqa: E731
+    event.listen(db.get_bind(), "before_cursor_execute", listener)
+    try:
+        stats = asyncio.run(endpoints.get_listing_statistics(city="ISTANBUL", district="kadikoy", db=db))
+        missing = asyncio.run(endpoints.get_listing_statistics(city="Atlantis", db=db))
+        deleted = asyncio.run(endpoints.delete_listing_group(
+            platform=None, kategori=None, ilan_tipi=None, city="istanbul", district=None, alt_kategori=None, db=db
+        ))
+    finally:
+        event.remove(db.get_bind(), "before_cursor_execute", listener)
+
+    assert stats["total_listings"] == 2
+    assert missing["stats"] is None
+    assert deleted["deleted_count"] == 2
+    assert db.query(Listing).one().location_id == cankaya.id
+    assert not [s for s in statements if "FROM locations" in s and "listings" not in s]
+
+
+def test_migration_adds_and_backfills_key_columns():
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(text("DROP INDEX idx_locations_il_key_ilce_key"))
+        conn.execute(text("ALTER TABLE locations DROP COLUMN il_key"))
+        conn.execute(text("ALTER TABLE locations DROP COLUMN ilce_key"))
+        conn.execute(text("INSERT INTO locations (il, ilce) VALUES ('Gümüşhane', 'Kelkit'), ('Iğdır', NULL)"))
+
+    applied = run_migrations(engine)
+
+    assert "locations.il_key" in applied and "idx_locations_il_key_ilce_key" in applied
+    assert "backfill_location_keys (2 rows)" in applied
+    with engine.connect() as conn:
+        rows = conn.execute(text("SELECT il_key, ilce_key FROM locations ORDER BY id")).all()
+    assert [tuple(row) for row in rows] == [("gumushane", "kelkit"), ("igdir", None)]
+    assert "idx_locations_il_key_ilce_key" in {i["name"] for i in inspect(engine).get_indexes("locations")}
+    engine.dispose()
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+"""database/location_resolver.py testleri."""
+
+import os
+import sys
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from database.location_resolver import LocationResolver, normalize_location_key  # noqa: E402
+from database.models import Base, Location  # noqa: E402
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db(engine):
+    session = sessionmaker(bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def count_selects(engine):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    return statements
+
+
+def test_normalize_location_key_matches_get_or_create_rules():
+    assert normalize_location_key(" İstanbul ", " Kadıköy ", "") == ("İstanbul", "Kadıköy", None)
+    assert normalize_location_key(None) == ("Belirtilmemiş", None, None)
+
+
+def test_warm_loads_target_cities_in_one_query(engine, db):
+    db.add_all([
+        Location(il="İstanbul", ilce="Kadıköy", mahalle="Caferağa"),
+        Location(il="İstanbul", ilce="Beşiktaş"),
+        Location(il="Ankara", ilce="Çankaya"),
+    ])
+    db.commit()
+
+    resolver = LocationResolver()
+    selects = count_selects(engine)
+    assert resolver.warm(db, ["İstanbul"]) == 2
+    assert len(selects) == 1
+
+    resolved = resolver.resolve_many(db, [("İstanbul", "Beşiktaş", None)])
+    assert len(selects) == 1
+    assert resolver.hits == 1
+    assert resolved[("İstanbul", "Beşiktaş", None)] == db.query(Location.id).filter(Location.ilce == "Beşiktaş").scalar()
+
+
+def test_resolve_many_inserts_misses_in_bulk(db):
+    resolver = LocationResolver()
+    keys = [
+        ("İzmir", "Konak", "Alsancak"),
+        ("İzmir", "Karşıyaka", None),
+        ("İzmir", "Konak", "Alsancak"),
+    ]
+
+    resolved = resolver.resolve_many(db, keys)
+    db.commit()
+
+    assert db.query(Location).count() == 2
+    assert set(resolved) == {("İzmir", "Konak", "Alsancak"), ("İzmir", "Karşıyaka", None)}
+    assert resolver.resolve(db, "İzmir", "Karşıyaka") == resolved[("İzmir", "Karşıyaka", None)]
+
+
+def test_insert_race_falls_back_without_losing_transaction(db):
+    db.add(Location(il="Bursa", ilce="Nilüfer", mahalle="Görükle"))
+    db.commit()
+
+    resolver = LocationResolver()
+    resolved = resolver._insert_missing(db, [("Bursa", "Nilüfer", "Görükle"), ("Bursa", "Osmangazi", "Hamitler")])
+    db.commit()
+
+    assert len(resolved) == 2
+    assert db.query(Location).count() == 2
+
+
+def test_lru_evicts_oldest_entries():
+    resolver = LocationResolver(maxsize=2)
+    resolver._put(("A", None, None), 1)
+    resolver._put(("B", None, None), 2)
+    resolver.get(("A", None, None))
+    resolver._put(("C", None, None), 3)
+
+    assert resolver.get(("B", None, None)) is None
+    assert resolver.get(("A", None, None)) == 1
+    assert len(resolver) == 2
+
+
+def test_ids_are_cached_only_after_outer_commit(db):
+    resolver = LocationResolver()
+    with db.begin_nested():
+        location_id = resolver.resolve(db, "Antalya", "Muratpaşa")
+
+    # Savepoint commit'i yetmez, transaction içinde oturumun bekleyen eşlemesinden okunur
+    assert len(resolver) == 0
+    assert resolver.get(("Antalya", "Muratpaşa", None), db) == location_id
+    assert resolver.get(("Antalya", "Muratpaşa", None)) is None
+
+    db.commit()
+    assert len(resolver) == 1
+    assert resolver.get(("Antalya", "Muratpaşa", None)) == location_id
+
+
+def test_rolled_back_inserts_are_not_cached(db):
+    resolver = LocationResolver()
+    resolver.resolve(db, "Antalya", "Kepez")
+    db.rollback()
+
+    assert resolver.get(("Antalya", "Kepez", None)) is None
+
+    location_id = resolver.resolve(db, "Antalya", "Kepez")
+    db.commit()
+    assert db.get(Location, location_id).ilce == "Kepez"
+
+
+def test_pending_ids_are_dropped_when_session_closes_without_commit(engine):
+    resolver = LocationResolver()
+    session = sessionmaker(bind=engine)()
+    resolver.resolve(session, "Antalya", "Alanya")
+    session.close()
+
+    assert resolver.get(("Antalya", "Alanya", None)) is None
+
+
+def test_pending_ids_are_kept_per_session(engine):
+    # Görev oturumu warm eder, write-behind oturumu kendi transaction'ında çözer
+    resolver = LocationResolver()
+    task_db = sessionmaker(bind=engine)()
+    writer_db = sessionmaker(bind=engine)()
+    try:
+        izmir_id = resolver.resolve(task_db, "İzmir", "Konak")
+        task_db.commit()
+        bursa_id = resolver.resolve(writer_db, "Bursa", "Nilüfer")
+        task_db.commit()
+
+        # Diğer oturumun commit'i ve savepoint rollback'i bekleyenlere dokunmaz
+        assert resolver.get(("Bursa", "Nilüfer", None)) is None
+        with pytest.raises(RuntimeError):
+            with task_db.begin_nested():
+                resolver.resolve(task_db, "Ankara")
+                raise RuntimeError("savepoint")
+        assert resolver.get(("Bursa", "Nilüfer", None), writer_db) == bursa_id
+        assert resolver.get(("Bursa", "Nilüfer", None), task_db) is None
+
+        writer_db.commit()
+        assert resolver.get(("Bursa", "Nilüfer", None)) == bursa_id
+        assert resolver.get(("İzmir", "Konak", None)) == izmir_id
+    finally:
+        task_db.close()
+        writer_db.close()
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""database/pagination.py ve cursor modlu /listings, /sessions testleri."""
+
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from api import endpoints  # noqa: E402
+from core.config import get_config  # noqa: E402
+from database import crud  # noqa: E402
+from database.connection import get_db  # noqa: E402
+from database.models import Base, Listing, ScrapeSession  # noqa: E402
+from database.pagination import decode_cursor, encode_cursor  # noqa: E402
+
+BASE_TIME = datetime(2026, 1, 1, 12, 0, 0, 123456)
+
+
+@pytest.fixture
+def session_factory():
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    try:
+        yield sessionmaker(bind=engine)
+    finally:
+        engine.dispose()
+
+
+@pytest.fixture
+def db(session_factory):
+    session = session_factory()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def seed(db, count=7):
+    # Her iki satır aynı created_at'ı paylaşır - eşitlikte id sırası belirleyici
+    for i in range(count):
+        created_at = BASE_TIME + timedelta(minutes=i // 2)
+        db.add(Listing(
+            baslik=f"İlan {i}",
+            platform="emlakjet" if i % 3 else "hepsiemlak",
+            kategori="konut",
+            ilan_tipi="satilik",
+            ilan_url=f"https://example.com/{i}",
+            created_at=created_at,
+        ))
+        db.add(ScrapeSession(platform="emlakjet", kategori="konut", ilan_tipi="satilik", started_at=created_at))
+    db.commit()
+
+
+def expected_order(db, model, column):
+    return [row.id for row in db.query(model).order_by(column.desc(), model.id.desc())]
+
+
+def walk(fetch, limit):
+    ids, cursor, pages = [], None, 0
+    while True:
+        items, cursor = fetch(cursor=cursor, limit=limit)
+        ids.extend(item.id for item in items)
+        pages += 1
+        if cursor is None:
+            return ids, pages
+
+
+def test_cursor_roundtrip_and_invalid_cursor():
+    cursor = encode_cursor(BASE_TIME, 42)
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == (BASE_TIME, 42)
+    for bad in ("not-a-cursor", "", encode_cursor(BASE_TIME, 1)[:-3]):
+        with pytest.raises(ValueError):
+            decode_cursor(bad)
+
+
+def test_listing_cursor_walk_matches_offset_order(db):
+    seed(db)
+
+    ids, pages = walk(lambda **kw: crud.get_listings_by_cursor(db, **kw), limit=3)
+
+    assert ids == expected_order(db, Listing, Listing.created_at)
+    assert pages == 3
+
+    emlakjet_ids, _ = walk(lambda **kw: crud.get_listings_by_cursor(db, platform="emlakjet", **kw), limit=2)
+    assert emlakjet_ids == [i for i in ids if db.get(Listing, i).platform == "emlakjet"]
+
+
+def test_session_cursor_walk(db):
+    seed(db, count=5)
+
+    ids, pages = walk(lambda **kw: crud.get_scrape_sessions_by_cursor(db, **kw), limit=5)
+
+    assert ids == expected_order(db, ScrapeSession, ScrapeSession.started_at)
+    assert pages == 1
+
+
+def test_endpoints_cursor_mode_and_offset_fallback(session_factory, db, monkeypatch):
+    seed(db)
+    monkeypatch.setattr(get_config(), "listing_count_cache", False)
+    app = FastAPI()
+    app.include_router(endpoints.router, prefix="/api/v1")
+
+    def override_get_db():
+        session = session_factory()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    client = TestClient(app)
+
+    first = client.get("/api/v1/listings", params={"pagination": "cursor", "limit": 4}).json()
+    assert "total" not in first
+    assert len(first["items"]) == 4
+    second = client.get("/api/v1/listings", params={"cursor": first["next_cursor"], "limit": 4}).json()
+    assert len(second["items"]) == 3
+    assert second["next_cursor"] is None
+
+    offset = client.get("/api/v1/listings", params={"page": 2, "limit": 4}).json()
+    assert offset["total"] == 7 and offset["total_exact"] is True
+    assert len(offset["items"]) == 3
+
+    sessions = client.get("/api/v1/sessions", params={"pagination": "cursor", "limit": 10}).json()
+    assert len(sessions["items"]) == 7 and sessions["next_cursor"] is None
+
+    assert client.get("/api/v1/sessions", params={"cursor": "bogus"}).status_code == 400
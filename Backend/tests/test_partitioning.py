@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""database/partitioning.py testleri (PostgreSQL gerektirmeyen kısımlar)."""
+
+import os
+import sys
+
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateTable
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from core.config import get_config  # noqa: E402
+from database import partitioning  # noqa: E402
+from database.models import Base, PriceHistory  # noqa: E402
+
+
+def test_partitioned_ddl_includes_partition_keys_in_unique_constraints():
+    statements = partitioning.build_partitioned_listings_ddl(postgresql.dialect())
+    create_table = statements[0]
+
+    assert "PRIMARY KEY (id, platform, ilan_tipi)" in create_table
+    assert create_table.endswith("PARTITION BY LIST (platform)")
+    assert "REFERENCES locations (id)" in create_table
+    assert (
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_listings_url_without_external_id "
+        "ON listings (ilan_url, platform, ilan_tipi) WHERE external_id IS NULL" in statements
+    )
+    assert "CREATE INDEX IF NOT EXISTS idx_listings_ilan_url ON listings USING hash (ilan_url)" in statements
+    assert not any("uq_listings_ilan_url" in statement for statement in statements)
+    assert (
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_listings_platform_external_id "
+        "ON listings (platform, external_id, ilan_tipi)" in statements
+    )
+
+
+def test_partition_ddl_covers_known_values_and_defaults():
+    statements = partitioning.build_partition_ddl()
+
+    assert (
+        "CREATE TABLE IF NOT EXISTS listings_emlakjet PARTITION OF listings "
+        "FOR VALUES IN ('emlakjet') PARTITION BY LIST (ilan_tipi)" in statements
+    )
+    assert (
+        "CREATE TABLE IF NOT EXISTS listings_hepsiemlak_kiralik "
+        "PARTITION OF listings_hepsiemlak FOR VALUES IN ('kiralik')" in statements
+    )
+    assert "CREATE TABLE IF NOT EXISTS listings_emlakjet_default PARTITION OF listings_emlakjet DEFAULT" in statements
+    assert statements[-1] == "CREATE TABLE IF NOT EXISTS listings_default PARTITION OF listings DEFAULT"
+
+
+def test_price_history_fk_is_skipped_only_when_partitioning(monkeypatch):
+    dialect = postgresql.dialect()
+    assert "REFERENCES listings" in str(CreateTable(PriceHistory.__table__).compile(dialect=dialect))
+
+    monkeypatch.setattr(get_config(), "db_partition_listings", True)
+    assert "REFERENCES listings" not in str(CreateTable(PriceHistory.__table__).compile(dialect=dialect))
+
+
+def test_partitioning_is_ignored_on_sqlite(monkeypatch):
+    monkeypatch.setattr(get_config(), "db_partition_listings", True)
+    engine = create_engine("sqlite:///:memory:")
+
+    assert partitioning.ensure_partitioned_listings(engine) is False
+    Base.metadata.create_all(bind=engine)
+    assert inspect(engine).get_foreign_keys("price_history")[0]["referred_table"] == "listings"
+    engine.dispose()
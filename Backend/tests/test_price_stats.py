@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+"""database/price_stats.py testleri - önceki saf Python hesabıyla aynı çıktı."""
+
+import os
+import random
+import statistics
+import sys
+
+import numpy as np
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import sessionmaker
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from database import crud, price_stats  # noqa: E402
+from database.models import Base, Listing  # noqa: E402
+
+
+def legacy_describe(prices):
+    """/analytics/stats'ın önceki (sıralama + generator) hesabı - referans"""
+    sorted_prices = sorted(prices)
+    n = len(sorted_prices)
+
+    def percentile(data, p):
+        k = (len(data) - 1) * p / 100
+        f = int(k)
+        c = f + 1 if f + 1 < len(data) else f
+        return data[f] + (data[c] - data[f]) * (k - f) if c < len(data) else data[f]
+
+    stats = {
+        "count": n,
+        "mean": round(statistics.mean(prices), 2),
+        "std": round(statistics.stdev(prices), 2) if n > 1 else 0,
+        "min": round(min(prices), 2),
+        "q25": round(percentile(sorted_prices, 25), 2),
+        "median": round(statistics.median(prices), 2),
+        "q75": round(percentile(sorted_prices, 75), 2),
+        "max": round(max(prices), 2),
+    }
+    num_bins = 5
+    bin_edges = [percentile(sorted_prices, i * 100 / num_bins) for i in range(num_bins + 1)]
+    unique_edges = []
+    for e in bin_edges:
+        if not unique_edges or e > unique_edges[-1]:
+            unique_edges.append(e)
+    if len(unique_edges) < 3:
+        min_p, max_p = min(prices), max(prices)
+        bin_width = (max_p - min_p) / num_bins
+        unique_edges = [min_p + i * bin_width for i in range(num_bins + 1)]
+
+    price_ranges = []
+    for i in range(len(unique_edges) - 1):
+        low, high = unique_edges[i], unique_edges[i + 1]
+        if i == len(unique_edges) - 2:
+            count = sum(1 for p in prices if low <= p <= high)
+        else:
+            count = sum(1 for p in prices if low <= p < high)
+        label = f"{price_stats.format_price(low)} - {price_stats.format_price(high)}"
+        price_ranges.append({"range": label, "count": count, "percentage": round(count / n * 100, 1)})
+    return {"stats": stats, "price_ranges": price_ranges}
+
+
+def make_prices(kind, seed=7):
+    rng = random.Random(seed)
+    if kind == "single":
+        return [1_250_000.0]
+    if kind == "constant":
+        return [2_000_000.0] * 9
+    if kind == "skewed":
+        # Çoğu aynı fiyat - yüzdelik kenarları çakışır
+        return [1_000_000.0] * 40 + [rng.uniform(1e6, 9e6) for _ in range(5)]
+    return [float(rng.randint(300, 25_000) * 1000) for _ in range(2_000)]
+
+
+@pytest.mark.parametrize("kind", ["single", "constant", "skewed", "random"])
+def test_numpy_path_matches_legacy_output(kind):
+    prices = make_prices(kind)
+    assert price_stats.describe_price_array(np.array(prices)) == legacy_describe(prices)
+
+
+def test_empty_prices_return_none():
+    assert price_stats.describe_price_array(np.array([])) is None
+
+
+def test_describe_prices_on_sqlite_unions_queries():
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    prices = make_prices("random")[:50]
+    for i, fiyat in enumerate(prices + [None, 0.0]):
+        db.add(Listing(baslik="İlan", fiyat=fiyat, platform="emlakjet" if i % 2 else "hepsiemlak",
+                       kategori="konut", ilan_tipi="satilik", ilan_url=f"https://example.com/{i}"))
+    db.commit()
+
+    queries = [
+        select(Listing.fiyat).where(Listing.fiyat > 0, Listing.platform == platform)
+        for platform in ("emlakjet", "hepsiemlak")
+    ]
+    assert price_stats.describe_prices(db, queries) == legacy_describe(prices)
+    db.close()
+    engine.dispose()
+
+
+def test_city_analytics_counts_unpriced_listings():
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    location = crud.get_or_create_location(db, "Muğla", "Bodrum")
+    for i, fiyat in enumerate([5_000_000.0, 7_000_000.0, None]):
+        db.add(Listing(baslik="Villa", fiyat=fiyat, platform="emlakjet", kategori="konut", ilan_tipi="satilik",
+                       location_id=location.id, ilan_url=f"https://example.com/{i}"))
+    db.commit()
+
+    result = crud.get_city_analytics(db, "mugla")
+
+    assert result["total_listings"] == 3
+    assert result["districts"] == ["Bodrum"]
+    assert result["stats"] == legacy_describe([5_000_000.0, 7_000_000.0])["stats"]
+    db.close()
+    engine.dispose()
+
+
+def test_postgresql_queries_use_percentile_cont_and_width_bucket():
+    executed = []
+
+    class FakeResult:
+        def __init__(self, rows):
+            self.rows = rows
+
+        def one(self):
+            return self.rows[0]
+
+        def __iter__(self):
+            return iter(self.rows)
+
+    class FakeSession:
+        def get_bind(self):
+            return type("Bind", (), {"dialect": postgresql.dialect()})()
+
+        def execute(self, statement):
+            executed.append(str(statement.compile(dialect=postgresql.dialect())))
+            if len(executed) == 1:
+                quantiles = [1.0, 1.8, 2.0, 2.6, 3.0, 3.4, 4.0, 4.2, 5.0]
+                return FakeResult([(5, 3.0, 1.58, 1.0, 5.0, quantiles)])
+            return FakeResult([(1, 1), (2, 1), (3, 1), (4, 1), (5, 1)])
+
+    result = price_stats.describe_prices(FakeSession(), [select(Listing.fiyat).where(Listing.fiyat > 0)])
+
+    assert "percentile_cont(CAST(ARRAY[" in executed[0]
+    assert "WITHIN GROUP (ORDER BY" in executed[0]
+    assert "least(width_bucket(" in executed[1]
+    assert "GROUP BY" in executed[1]
+    assert result["stats"]["median"] == 3.0
+    assert [r["count"] for r in result["price_ranges"]] == [1, 1, 1, 1, 1]
+
+
+def test_summarize_prices_by_group_on_sqlite():
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    bodrum = crud.get_or_create_location(db, "Muğla", "Bodrum")
+    fethiye = crud.get_or_create_location(db, "Muğla", "Fethiye")
+    rows = [(bodrum, 1_000_000.0), (bodrum, 2_000_000.0), (bodrum, 6_000_000.0), (bodrum, None), (fethiye, 0.0)]
+    for i, (location, fiyat) in enumerate(rows):
+        db.add(Listing(baslik="Ev", fiyat=fiyat, platform="emlakjet", kategori="konut", ilan_tipi="satilik",
+                       location_id=location.id, ilan_url=f"https://example.com/{i}"))
+    db.commit()
+
+    summary = crud.get_district_price_summary(db, "Mugla")
+
+    assert summary == {
+        "bodrum": {"count": 4, "mean": 3_000_000.0, "median": 2_000_000.0},
+        "fethiye": {"count": 1, "mean": None, "median": None},
+    }
+    db.close()
+    engine.dispose()
+
+
+def test_postgresql_group_summary_is_one_grouped_query():
+    executed = []
+
+    class FakeSession:
+        def get_bind(self):
+            return type("Bind", (), {"dialect": postgresql.dialect()})()
+
+        def execute(self, statement):
+            executed.append(str(statement.compile(dialect=postgresql.dialect())))
+            return iter([("bodrum", 3, 2.5, 2.0)])
+
+    query = select(Listing.platform.label("group_key"), Listing.fiyat)
+    summary = price_stats.summarize_prices_by_group(FakeSession(), [query])
+
+    assert len(executed) == 1
+    assert "percentile_cont(" in executed[0]
+    assert "WITHIN GROUP (ORDER BY CASE WHEN" in executed[0]
+    assert "GROUP BY" in executed[0]
+    assert summary == {"bodrum": {"count": 3, "mean": 2.5, "median": 2.0}}
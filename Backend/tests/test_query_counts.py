@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""İlan listeleme/dışa aktarma uçlarının sorgu sayısı (N+1) regresyon testleri."""
+
+import os
+import sys
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from api import endpoints  # noqa: E402
+from core.config import get_config  # noqa: E402
+from database import crud  # noqa: E402
+from database.connection import get_db  # noqa: E402
+from database.models import Base, Listing  # noqa: E402
+
+LISTING_COUNT = 40
+
+
+class QueryCounter:
+    def __init__(self, engine):
+        self.statements = []
+        event.listen(engine, "before_cursor_execute", self._record)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def reset(self):
+        self.statements.clear()
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    # Her ilan farklı lokasyonda - lazy load olursa her satır ayrı sorgu üretir
+    for i in range(LISTING_COUNT):
+        location = crud.get_or_create_location(session, "İstanbul", f"İlçe {i}")
+        session.add(Listing(
+            baslik=f"İlan {i}",
+            platform="emlakjet",
+            kategori="konut",
+            ilan_tipi="satilik",
+            location_id=location.id,
+            ilan_url=f"https://example.com/{i}",
+        ))
+    session.commit()
+    session.close()
+    try:
+        yield engine
+    finally:
+        engine.dispose()
+
+
+@pytest.fixture
+def client(engine, monkeypatch):
+    monkeypatch.setattr(get_config(), "listing_count_cache", False)
+    session_factory = sessionmaker(bind=engine)
+    app = FastAPI()
+    app.include_router(endpoints.router, prefix="/api/v1")
+
+    def override_get_db():
+        session = session_factory()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    return TestClient(app)
+
+
+def test_listings_page_uses_constant_queries(engine, client):
+    counter = QueryCounter(engine)
+
+    response = client.get("/api/v1/listings", params={"limit": LISTING_COUNT})
+
+    assert response.status_code == 200
+    items = response.json()["items"]
+    assert len(items) == LISTING_COUNT and all(item["ilce"] for item in items)
+    # Sayfa + toplam sayı
+    assert counter.count == 2
+
+
+def test_cursor_and_preview_use_single_query(engine, client):
+    counter = QueryCounter(engine)
+
+    client.get("/api/v1/listings", params={"pagination": "cursor", "limit": LISTING_COUNT})
+    assert counter.count == 1
+
+    counter.reset()
+    client.get("/api/v1/listings/preview", params={"limit": LISTING_COUNT})
+    assert counter.count == 2
+
+
+def test_export_does_not_lazy_load_locations(engine, client):
+    counter = QueryCounter(engine)
+
+    response = client.post("/api/v1/export/excel")
+
+    assert response.status_code == 200
+    # Varlık kontrolü + detay kolonları + satırlar; ilan sayısından bağımsız
+    assert counter.count == 3
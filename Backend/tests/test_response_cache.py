@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+"""core/response_cache.py ve önbellekli analitik uçlarının testleri."""
+
+import os
+import sys
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from api import endpoints  # noqa: E402
+from core import response_cache as response_cache_module  # noqa: E402
+from core.config import get_config  # noqa: E402
+from core.response_cache import ResponseCache  # noqa: E402
+from database import crud  # noqa: E402
+from database.connection import get_db  # noqa: E402
+from database.models import Base, Listing  # noqa: E402
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+        self.hashes = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def setex(self, key, ttl, value):
+        self.data[key] = value
+
+    def incr(self, key):
+        self.data[key] = str(int(self.data.get(key, 0)) + 1)
+        return int(self.data[key])
+
+    def hincrby(self, key, field, amount):
+        values = self.hashes.setdefault(key, {})
+        values[field] = str(int(values.get(field, 0)) + amount)
+
+    def hgetall(self, key):
+        return dict(self.hashes.get(key, {}))
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = ResponseCache()
+    monkeypatch.setattr(get_config(), "response_cache", True)
+    monkeypatch.setattr(response_cache_module, "_response_cache", cache)
+    return cache
+
+
+@pytest.fixture
+def session_factory():
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    try:
+        yield sessionmaker(bind=engine)
+    finally:
+        engine.dispose()
+
+
+@pytest.fixture
+def client(session_factory, cache):
+    app = FastAPI()
+    app.include_router(endpoints.router, prefix="/api/v1")
+
+    def override_get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    return TestClient(app)
+
+
+def add_listing(session_factory, i, platform="emlakjet"):
+    db = session_factory()
+    location = crud.get_or_create_location(db, "İzmir", "Bornova")
+    db.add(Listing(baslik=f"İlan {i}", fiyat=1_000_000.0 * (i + 1), platform=platform, kategori="konut",
+                   ilan_tipi="satilik", location_id=location.id, ilan_url=f"https://example.com/{i}"))
+    db.commit()
+    listing_id = db.query(Listing.id).filter(Listing.ilan_url == f"https://example.com/{i}").scalar()
+    db.close()
+    return listing_id
+
+
+def test_repeated_requests_are_served_from_cache(client, session_factory, cache):
+    add_listing(session_factory, 0)
+
+    first = client.get("/api/v1/analytics/prices", params={"platform": "Emlakjet"})
+    add_listing(session_factory, 1)  # Oturum bitmeden görünmez
+    second = client.get("/api/v1/analytics/prices", params={"platform": "Emlakjet"})
+
+    assert "x-cache" not in first.headers
+    assert second.headers["x-cache"] == "HIT"
+    assert second.json() == first.json()
+    assert second.json()["summary"]["total_count"] == 1
+    assert cache.stats()["routes"]["analytics_prices"] == {"hits": 1, "misses": 1}
+
+
+def test_filters_are_normalized_into_the_key(client, session_factory):
+    add_listing(session_factory, 0)
+
+    client.get("/api/v1/analytics/stats", params={"city": "İzmir", "platform": "all"})
+    response = client.get("/api/v1/analytics/stats", params={"city": "İzmir", "include_archived": "false"})
+    other = client.get("/api/v1/analytics/stats", params={"city": "Ankara"})
+
+    assert response.headers["x-cache"] == "HIT"
+    assert "x-cache" not in other.headers
+
+
+def test_session_completion_bumps_generation_after_commit(client, session_factory, cache):
+    add_listing(session_factory, 0)
+    assert client.get("/api/v1/stats").json()["total_listings"] == 1
+
+    db = session_factory()
+    session = crud.create_scrape_session(db, "emlakjet", "konut", "satilik")
+    db.commit()
+    add_listing(session_factory, 1)
+    crud.complete_scrape_session(db, session.id)
+    generation = cache.stats()["generation"]
+    db.commit()
+    db.close()
+
+    assert cache.stats()["generation"] == generation + 1
+    assert client.get("/api/v1/stats").json()["total_listings"] == 2
+
+
+def test_stats_reflect_running_scrape_without_waiting_for_ttl(client, session_factory):
+    assert client.get("/api/v1/stats").json()["total_scrapes"] == 0
+
+    db = session_factory()
+    crud.create_scrape_session(db, "emlakjet", "konut", "satilik")
+    db.commit()
+    db.close()
+    add_listing(session_factory, 0)
+
+    response = client.get("/api/v1/stats")
+    assert "x-cache" not in response.headers
+    assert (response.json()["total_scrapes"], response.json()["total_listings"]) == (1, 1)
+
+
+def test_delete_endpoint_invalidates_cached_results(client, session_factory):
+    listing_id = add_listing(session_factory, 0)
+    add_listing(session_factory, 1)
+    assert client.get("/api/v1/analytics/city/izmir").json()["total_listings"] == 2
+
+    assert client.delete(f"/api/v1/listings/{listing_id}").status_code == 200
+
+    response = client.get("/api/v1/analytics/city/izmir")
+    assert "x-cache" not in response.headers
+    assert response.json()["total_listings"] == 1
+
+
+def test_errors_are_not_cached(client):
+    assert client.get("/api/v1/analytics/stats").json() == {"error": "Fiyat verisi bulunamadı", "stats": None}
+    assert client.delete("/api/v1/listings/999").status_code == 404
+    assert client.get("/api/v1/cache/stats").json()["routes"]["analytics_stats"]["misses"] == 1
+
+
+def test_cache_stats_endpoint(client, session_factory):
+    add_listing(session_factory, 0)
+    client.get("/api/v1/results")
+    client.get("/api/v1/results")
+
+    stats = client.get("/api/v1/cache/stats").json()
+
+    assert stats["enabled"] is True
+    assert (stats["hits"], stats["misses"], stats["hit_ratio"]) == (1, 1, 0.5)
+
+
+def test_disabled_cache_always_recomputes(client, session_factory, monkeypatch):
+    monkeypatch.setattr(get_config(), "response_cache", False)
+    add_listing(session_factory, 0)
+
+    client.get("/api/v1/results")
+    response = client.get("/api/v1/results")
+
+    assert "x-cache" not in response.headers
+    assert client.get("/api/v1/cache/stats").json()["enabled"] is False
+
+
+def test_shared_cache_keeps_bodies_and_counters_in_redis():
+    redis_client = FakeRedis()
+    api_cache = ResponseCache(redis_client=redis_client)
+    worker_cache = ResponseCache(redis_client=redis_client)
+
+    api_cache.set_body("results", "key", '{"a":1}')
+    assert api_cache.get_body("results", "key") == '{"a":1}'
+
+    worker_cache.invalidate()
+
+    assert api_cache.get_body("results", "key") is None
+    assert worker_cache.stats()["routes"] == {"results": {"hits": 1, "misses": 1}}
+    assert worker_cache.stats()["generation"] == 1
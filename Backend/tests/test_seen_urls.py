@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""core/seen_urls.py testleri."""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from core.seen_urls import SeenUrlFilter, bloom_parameters, build_seen_urls_key  # noqa: E402
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def setbit(self, key, offset, value):
+        self.commands.append(("setbit", key, offset, value))
+
+    def expire(self, key, ttl):
+        self.commands.append(("expire", key, ttl))
+
+    def execute(self):
+        if self.redis.fail:
+            raise ConnectionError("redis down")
+        results = []
+        for command in self.commands:
+            if command[0] == "setbit":
+                _, key, offset, value = command
+                bits = self.redis.bits.setdefault(key, set())
+                results.append(1 if offset in bits else 0)
+                bits.add(offset)
+            else:
+                self.redis.ttls[command[1]] = command[2]
+                results.append(True)
+        self.redis.round_trips += 1
+        return results
+
+
+class FakeRedis:
+    def __init__(self):
+        self.bits = {}
+        self.ttls = {}
+        self.round_trips = 0
+        self.fail = False
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+def test_bloom_parameters_scale_with_capacity_and_error_rate():
+    bits, hashes = bloom_parameters(100000, 0.001)
+    assert 1_400_000 < bits < 1_500_000
+    assert hashes == 10
+    assert bloom_parameters(100000, 0.01)[0] < bits
+
+
+def test_filter_new_drops_repeats_and_keeps_url_less_listings():
+    seen_urls = SeenUrlFilter(capacity=1000)
+    page = [
+        {"ilan_linki": "https://example.com/1"},
+        {"ilan_url": "https://example.com/2"},
+        {"baslik": "URL yok"},
+        {"ilan_linki": "https://example.com/1"},
+    ]
+
+    assert seen_urls.filter_new(page) == page[:3]
+    assert seen_urls.filter_new([{"ilan_linki": "https://example.com/2"}, {"baslik": "URL yok"}]) == [{"baslik": "URL yok"}]
+    assert seen_urls.checks == 4
+    assert seen_urls.hits == 2
+    assert seen_urls.stats()["seen_url_hit_rate"] == 50.0
+
+
+def test_false_positive_rate_stays_near_target():
+    seen_urls = SeenUrlFilter(capacity=5000, error_rate=0.01)
+    seen_urls.check_and_add_many([f"https://example.com/ilan/{i}" for i in range(5000)])
+
+    # Yoklamalar da filtreye eklendiği için kapasiteyi az aşan bir örnek yeterli
+    false_positives = sum(seen_urls.check_and_add_many([f"https://example.com/diger/{i}" for i in range(1000)]))
+    assert false_positives < 1000 * 0.03
+
+
+def test_shared_filter_is_visible_across_workers_with_one_round_trip_per_page():
+    redis = FakeRedis()
+    key = build_seen_urls_key(42)
+    worker_a = SeenUrlFilter(capacity=1000, redis_client=redis, redis_key=key)
+    worker_b = SeenUrlFilter(capacity=1000, redis_client=redis, redis_key=key)
+
+    assert worker_a.check_and_add_many(["https://example.com/1", "https://example.com/2"]) == [False, False]
+    assert worker_b.check_and_add_many(["https://example.com/2", "https://example.com/3"]) == [True, False]
+    assert redis.round_trips == 2
+    assert redis.ttls[key] > 0
+    assert worker_b.shared
+
+
+def test_shared_filter_falls_back_to_local_bits_when_redis_fails():
+    redis = FakeRedis()
+    redis.fail = True
+    seen_urls = SeenUrlFilter(capacity=1000, redis_client=redis, redis_key=build_seen_urls_key(7))
+
+    assert seen_urls.check_and_add_many(["https://example.com/1"]) == [False]
+    assert seen_urls.check_and_add_many(["https://example.com/1"]) == [True]
+    assert not seen_urls.shared
+
+
+def test_selenium_hepsiemlak_reports_seen_url_hits():
+    pytest.importorskip("selenium")
+    from scrapers.hepsiemlak.main import HepsiemlakScraper
+
+    scraper = HepsiemlakScraper(driver=None, listing_type="satilik", category="konut")
+    scraper.seen_urls = SeenUrlFilter(capacity=1000)
+    page = [{"ilan_linki": f"https://www.hepsiemlak.com/ilan/{i}"} for i in range(3)]
+
+    scraper.seen_urls.filter_new(page[:2])
+    assert scraper._save_listings(page[:2]) == (0, 0, 2)
+
+    assert scraper.duplicate_count == 2
+    assert scraper.metrics["seen_url_hits"] == 2
+
+
+def test_selenium_emlakjet_counts_partially_filtered_pages(monkeypatch):
+    pytest.importorskip("selenium")
+    from scrapers.emlakjet import main as emlakjet_main
+
+    scraper = emlakjet_main.EmlakJetScraper(driver=None, listing_type="satilik", category="konut")
+    scraper.seen_urls = SeenUrlFilter(capacity=1000)
+    monkeypatch.setattr(emlakjet_main, "save_listings_to_db", lambda db, listings, **kwargs: (len(listings), 0, 0))
+    page = [{"ilan_linki": f"https://www.emlakjet.com/ilan/{i}"} for i in range(3)]
+
+    scraper.seen_urls.filter_new(page[:2])
+    assert scraper._save_listings(page) == (1, 0, 2)
+
+    assert scraper.duplicate_count == 2
+    assert scraper.metrics["seen_url_hits"] == 2
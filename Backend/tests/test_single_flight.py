@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+"""core/single_flight.py istek birleştirme testleri."""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from core import single_flight as single_flight_module  # noqa: E402
+from core.config import get_config  # noqa: E402
+from core.single_flight import SingleFlight, coalesce  # noqa: E402
+
+
+class FakeRedis:
+    """SET NX PX / GET / SETEX / DELETE alt kümesi (thread güvenli)"""
+
+    def __init__(self):
+        self.data = {}
+        self.lock = threading.Lock()
+        self.threads = set()
+
+    def set(self, key, value, nx=False, px=None):
+        self.threads.add(threading.get_ident())
+        with self.lock:
+            if nx and key in self.data:
+                return None
+            self.data[key] = value
+            return True
+
+    def get(self, key):
+        self.threads.add(threading.get_ident())
+        return self.data.get(key)
+
+    def setex(self, key, ttl, value):
+        self.data[key] = value
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+
+def slow_counter(result, delay=0.1):
+    calls = []
+
+    def compute():
+        calls.append(threading.get_ident())
+        time.sleep(delay)
+        return result
+
+    return compute, calls
+
+
+def test_concurrent_calls_share_one_computation():
+    flight = SingleFlight()
+    compute, calls = slow_counter({"summary": {"total_count": 3}})
+
+    async def scenario():
+        return await asyncio.gather(*[flight.do("prices:abc", compute) for _ in range(5)])
+
+    results = asyncio.run(scenario())
+
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+    assert flight.stats()["leaders"] == 1 and flight.stats()["local_waiters"] == 4
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_different_keys_and_sequential_calls_are_not_shared():
+    flight = SingleFlight()
+    compute, calls = slow_counter(1, delay=0.01)
+
+    async def scenario():
+        await asyncio.gather(flight.do("a", compute), flight.do("b", compute))
+        await flight.do("a", compute)
+
+    asyncio.run(scenario())
+    assert len(calls) == 3
+
+
+def test_leader_error_is_raised_to_waiters():
+    flight = SingleFlight()
+
+    def fail():
+        time.sleep(0.05)
+        raise RuntimeError("db down")
+
+    async def scenario():
+        return await asyncio.gather(flight.do("k", fail), flight.do("k", fail), return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert [str(r) for r in results] == ["db down", "db down"]
+
+
+def test_cancelled_leader_does_not_break_local_waiters():
+    flight = SingleFlight()
+    compute, calls = slow_counter("shared", delay=0.1)
+
+    async def scenario():
+        leader = asyncio.create_task(flight.do("k", compute))
+        await asyncio.sleep(0.01)
+        waiter = asyncio.create_task(flight.do("k", compute))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await waiter
+
+    assert asyncio.run(scenario()) == "shared"
+    assert len(calls) == 1
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_redis_calls_run_off_the_event_loop_thread():
+    redis_client = FakeRedis()
+    flight = SingleFlight(redis_client=redis_client)
+
+    async def scenario():
+        return threading.get_ident(), await flight.do("k", lambda: "ok")
+
+    loop_thread, result = asyncio.run(scenario())
+    assert result == "ok"
+    assert redis_client.threads and loop_thread not in redis_client.threads
+
+
+def test_workers_coalesce_through_redis_lock():
+    redis_client = FakeRedis()
+    workers = [SingleFlight(redis_client=redis_client, poll_interval_seconds=0.01) for _ in range(3)]
+    compute, calls = slow_counter({"city": "İzmir", "total_listings": 2})
+
+    async def scenario():
+        return await asyncio.gather(*[worker.do("city:izmir", compute) for worker in workers])
+
+    results = asyncio.run(scenario())
+
+    assert len(calls) == 1
+    assert results == [{"city": "İzmir", "total_listings": 2}] * 3
+    assert sum(worker.stats().get("remote_waiters", 0) for worker in workers) == 2
+    assert not any(key.startswith("single_flight:lock:city:izmir") and ":result:" not in key
+                   for key in redis_client.data)
+
+
+def test_waiter_takes_over_when_leader_fails():
+    redis_client = FakeRedis()
+    leader = SingleFlight(redis_client=redis_client, poll_interval_seconds=0.01)
+    follower = SingleFlight(redis_client=redis_client, poll_interval_seconds=0.01)
+    follower_compute, follower_calls = slow_counter("fresh", delay=0)
+
+    def fail():
+        time.sleep(0.05)
+        raise RuntimeError("timeout")
+
+    async def scenario():
+        leader_task = asyncio.create_task(leader.do("k", fail))
+        await asyncio.sleep(0.01)
+        result = await follower.do("k", follower_compute)
+        with pytest.raises(RuntimeError):
+            await leader_task
+        return result
+
+    assert asyncio.run(scenario()) == "fresh"
+    assert len(follower_calls) == 1
+
+
+def test_stale_result_from_previous_round_is_not_reused():
+    redis_client = FakeRedis()
+    flight = SingleFlight(redis_client=redis_client)
+
+    asyncio.run(flight.do("k", lambda: "old"))
+    assert asyncio.run(flight.do("k", lambda: "new")) == "new"
+
+
+def test_coalesce_runs_directly_when_disabled(monkeypatch):
+    monkeypatch.setattr(get_config(), "single_flight", False)
+    assert asyncio.run(coalesce("prices", {"platform": "emlakjet"}, lambda: 42)) == 42
+
+
+def test_coalesce_keys_on_normalized_filters(monkeypatch):
+    flight = SingleFlight()
+    monkeypatch.setattr(get_config(), "single_flight", True)
+    monkeypatch.setattr(single_flight_module, "_single_flight", flight)
+    compute, calls = slow_counter("ok")
+
+    async def scenario():
+        await asyncio.gather(
+            coalesce("prices", {"platform": "emlakjet", "kategori": None}, compute),
+            coalesce("prices", {"platform": "emlakjet", "include_archived": False}, compute),
+        )
+
+    asyncio.run(scenario())
+    assert len(calls) == 1
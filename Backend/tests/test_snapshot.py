@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""database/snapshot.py Parquet anlık görüntü testleri."""
+
+import json
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from database import crud, snapshot  # noqa: E402
+from database.models import Base, Listing, PriceHistory  # noqa: E402
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    kadikoy = crud.get_or_create_location(session, "İstanbul", "Kadıköy")
+    cankaya = crud.get_or_create_location(session, "Ankara", "Çankaya")
+    old = datetime.utcnow() - timedelta(days=3)
+    for i, (platform, location) in enumerate([("emlakjet", kadikoy), ("hepsiemlak", cankaya), ("emlakjet", None)]):
+        session.add(Listing(
+            baslik=f"İlan {i}", fiyat=1_000_000.0 * (i + 1), platform=platform, kategori="konut",
+            ilan_tipi="satilik", location_id=location.id if location else None,
+            ilan_url=f"https://example.com/{i}", details={"oda_sayisi": "3+1"},
+            created_at=old, updated_at=old,
+        ))
+    session.flush()
+    session.add(PriceHistory(listing_id=1, old_price=900_000.0, new_price=1_000_000.0, changed_at=old))
+    session.commit()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
+
+
+def test_batches_join_location_and_encode_details(db):
+    batches = list(snapshot.iter_table_batches(db, snapshot._listings_statement(None), batch_size=2))
+
+    assert [len(batch) for batch in batches] == [2, 1]
+    first = batches[0][0]
+    assert (first["platform"], first["ilan_tipi"], first["il"], first["ilce"]) == ("emlakjet", "satilik", "İstanbul", "Kadıköy")
+    assert json.loads(first["details"]) == {"oda_sayisi": "3+1"}
+    assert batches[1][0]["il"] is None
+
+
+def test_incremental_statements_only_select_changed_rows(db):
+    since = datetime.utcnow() - timedelta(days=1)
+    db.query(Listing).filter(Listing.id == 2).update({"updated_at": datetime.utcnow()})
+    db.add(PriceHistory(listing_id=2, old_price=2_000_000.0, new_price=2_100_000.0, changed_at=datetime.utcnow()))
+    db.commit()
+
+    listings = [row for batch in snapshot.iter_table_batches(db, snapshot._listings_statement(since), 100)
+                for row in batch]
+    history = [row for batch in snapshot.iter_table_batches(db, snapshot._price_history_statement(since), 100)
+               for row in batch]
+    locations = [row for batch in snapshot.iter_table_batches(db, snapshot._locations_statement(1, 10), 100)
+                 for row in batch]
+
+    assert [row["id"] for row in listings] == [2]
+    assert [(row["listing_id"], row["platform"], row["il"]) for row in history] == [(2, "hepsiemlak", "Ankara")]
+    assert [(row["il"], row["il_key"]) for row in locations] == [("Ankara", "ankara")]
+
+
+def test_list_snapshots_reads_manifests_newest_first(tmp_path):
+    for snapshot_id in ("20260101T000000", "20260201T000000"):
+        (tmp_path / snapshot_id).mkdir()
+        (tmp_path / snapshot_id / snapshot.MANIFEST_FILE).write_text(json.dumps({"snapshot_id": snapshot_id}))
+    (tmp_path / "partial").mkdir()
+
+    assert [m["snapshot_id"] for m in snapshot.list_snapshots(str(tmp_path))] == ["20260201T000000", "20260101T000000"]
+    assert snapshot.list_snapshots(str(tmp_path / "missing")) == []
+
+
+def test_write_snapshot_requires_pyarrow(db, tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshot, "HAS_PYARROW", False)
+    with pytest.raises(RuntimeError):
+        snapshot.write_snapshot(db, str(tmp_path))
+
+
+def test_full_then_incremental_snapshot(db, tmp_path):
+    ds = pytest.importorskip("pyarrow.dataset")
+
+    full = snapshot.write_snapshot(db, str(tmp_path))
+    assert full["mode"] == "full"
+    assert full["rows"] == {"listings": 3, "price_history": 1, "locations": 2}
+    listings_dir = tmp_path / full["snapshot_id"] / "listings"
+    assert (listings_dir / "platform=emlakjet" / "ilan_tipi=satilik").is_dir()
+    table = ds.dataset(str(listings_dir), format="parquet", partitioning="hive").to_table()
+    assert table.num_rows == 3
+    assert str(table.schema.field("kategori").type).startswith("dictionary")
+
+    db.query(Listing).filter(Listing.id == 2).update({"updated_at": datetime.utcnow() + timedelta(seconds=5)})
+    db.commit()
+    os.rename(tmp_path / full["snapshot_id"], tmp_path / "20000101T000000")
+
+    incremental = snapshot.write_snapshot(db, str(tmp_path), incremental=True)
+    assert incremental["mode"] == "incremental"
+    assert incremental["rows"] == {"listings": 1, "price_history": 0, "locations": 0}
@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+"""database/write_behind.py testleri."""
+
+import os
+import sys
+import threading
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from database import crud  # noqa: E402
+from database.models import Base, FailedPage, Listing  # noqa: E402
+from database.write_behind import ListingWriteBehind  # noqa: E402
+
+
+class FakeSession:
+    def __init__(self):
+        self.closed = False
+        self.rolled_back = 0
+
+    def rollback(self):
+        self.rolled_back += 1
+
+    def close(self):
+        self.closed = True
+
+
+class RecordingSave:
+    def __init__(self, fail=False, fail_times=0):
+        self.batches = []
+        self.fail = fail
+        self.fail_times = fail_times
+        self.sessions = []
+        self.threads = set()
+
+    def __call__(self, db, listings):
+        self.threads.add(threading.current_thread().name)
+        self.sessions.append(db)
+        if self.fail or self.fail_times:
+            self.fail_times = max(0, self.fail_times - 1)
+            raise RuntimeError("db down")
+        self.batches.append(list(listings))
+        return len(listings), 0, 0
+
+
+def page(start, size=2):
+    return [{"ilan_linki": f"https://example.com/{i}"} for i in range(start, start + size)]
+
+
+def test_writer_batches_pages_and_reports_counts():
+    save = RecordingSave()
+    saved = []
+    messages = []
+    writer = ListingWriteBehind(
+        save_func=save,
+        session_factory=FakeSession,
+        batch_pages=2,
+        flush_interval=60,
+        progress_callback=lambda msg, **kwargs: messages.append((msg, kwargs)),
+        on_saved=lambda *counts: saved.append(counts),
+    ).start()
+
+    for start in (0, 2, 4):
+        writer.submit(page(start))
+    writer.close()
+
+    assert [len(batch) for batch in save.batches] == [4, 2]
+    assert save.threads == {"listing-write-behind"}
+    assert saved == [(4, 0, 0), (2, 0, 0)]
+    assert writer.totals == (6, 0, 0)
+    assert writer.pages_written == 3
+    assert messages[-1][1] == {"current": None, "total": None, "progress": None}
+
+
+def test_flush_waits_for_commit_before_batch_is_full():
+    save = RecordingSave()
+    writer = ListingWriteBehind(save_func=save, session_factory=FakeSession, batch_pages=10, flush_interval=60)
+
+    writer.submit(page(0))
+    writer.flush()
+
+    assert save.batches == [page(0)]
+    writer.close()
+    assert writer.closed
+
+
+def test_failed_batch_is_counted_and_writer_keeps_running():
+    save = RecordingSave(fail=True)
+    writer = ListingWriteBehind(save_func=save, session_factory=FakeSession, batch_pages=1)
+
+    writer.submit(page(0))
+    writer.flush()
+    save.fail = False
+    writer.submit(page(2))
+    writer.close()
+
+    assert writer.failed_batches == 1
+    assert writer.failed_pages == 1
+    assert writer.failed_listings == 2
+    assert writer.totals == (2, 0, 0)
+
+
+def test_failed_batch_is_retried_once_with_a_fresh_session():
+    save = RecordingSave(fail_times=1)
+    writer = ListingWriteBehind(save_func=save, session_factory=FakeSession, batch_pages=1)
+
+    writer.submit(page(0))
+    writer.close()
+
+    first, retry = save.sessions
+    assert first is not retry
+    assert first.rolled_back == 1 and first.closed
+    assert retry.closed
+    assert writer.failed_batches == 0
+    assert writer.totals == (2, 0, 0)
+
+
+def test_close_waits_for_the_batch_in_flight():
+    release = threading.Event()
+    save = RecordingSave()
+
+    def slow_save(db, listings):
+        release.wait(5)
+        return save(db, listings)
+
+    writer = ListingWriteBehind(save_func=slow_save, session_factory=FakeSession, batch_pages=1)
+    writer.submit(page(0))
+    threading.Timer(0.2, release.set).start()
+
+    assert writer.close() is True
+    assert not writer.is_alive()
+    assert writer.totals == (2, 0, 0)
+
+
+def test_writer_persists_with_its_own_session():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    SessionLocal = sessionmaker(bind=engine)
+
+    def save(db, listings):
+        result = crud.bulk_upsert_listings(db, listings, platform="emlakjet", kategori="konut", ilan_tipi="satilik")
+        db.commit()
+        return result
+
+    writer = ListingWriteBehind(save_func=save, session_factory=SessionLocal, batch_pages=2)
+    writer.submit([{"ilan_linki": "https://www.emlakjet.com/ilan/1", "baslik": "A", "fiyat": "1.000 TL", "il": "Ankara"}])
+    writer.submit([{"ilan_linki": "https://www.emlakjet.com/ilan/1", "baslik": "A", "fiyat": "1.000 TL", "il": "Ankara"}])
+    writer.close()
+
+    db = SessionLocal()
+    try:
+        assert db.query(Listing).count() == 1
+    finally:
+        db.close()
+    assert writer.totals == (1, 0, 1)
+    engine.dispose()
+
+
+def test_batch_failing_twice_is_recorded_as_failed_pages():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    SessionLocal = sessionmaker(bind=engine)
+    db = SessionLocal()
+    session_id = crud.create_scrape_session(db, "emlakjet", "konut", "satilik").id
+    db.commit()
+
+    writer = ListingWriteBehind(
+        save_func=RecordingSave(fail=True),
+        session_factory=SessionLocal,
+        batch_pages=2,
+        scrape_session_id=session_id,
+    )
+    writer.submit(page(0), page={"url": "https://example.com/liste?sayfa=3", "page_number": 3, "city": "Ankara"})
+    writer.submit([{"ilan_linki": "https://example.com/9", "il": "İzmir", "ilce": "Konak", "page": 4}])
+    writer.close()
+
+    try:
+        failed = db.query(FailedPage).order_by(FailedPage.id).all()
+        assert [(f.url, f.page_number, f.city, f.district) for f in failed] == [
+            ("https://example.com/liste?sayfa=3", 3, "Ankara", None),
+            ("https://example.com/9", 4, "İzmir", "Konak"),
+        ]
+        assert all(f.scrape_session_id == session_id and "db down" in f.error_message for f in failed)
+    finally:
+        db.close()
+    assert (writer.failed_batches, writer.failed_pages, writer.failed_listings) == (1, 2, 3)
+    engine.dispose()
+
+
+def test_session_factory_failure_is_raised_instead_of_blocking():
+    def broken_session():
+        raise RuntimeError("no connection")
+
+    writer = ListingWriteBehind(
+        save_func=RecordingSave(), session_factory=broken_session, max_pending_pages=1, batch_pages=1
+    )
+    writer.submit(page(0))
+
+    with pytest.raises(RuntimeError, match="no connection"):
+        for start in range(2, 20, 2):
+            writer.submit(page(start))
+    with pytest.raises(RuntimeError, match="no connection"):
+        writer.flush()
+    with pytest.raises(RuntimeError, match="no connection"):
+        writer.close()
+
+    assert not writer.is_alive()
+    assert writer.totals == (0, 0, 0)
+    assert writer.failed_batches >= 1 and writer.failed_listings == 2 * writer.failed_batches
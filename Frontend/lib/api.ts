@@ -211,8 +211,13 @@ export async function getDistrictsIndex(): Promise<DistrictIndex> {
     return response.json();
 }
 
-export async function getDistrictGeoJSON(provinceName: string): Promise<GeoJSON.FeatureCollection> {
-    const response = await fetch(`${API_BASE_URL}/districts/${encodeURIComponent(provinceName)}`, {
+export type DistrictDetail = 'low' | 'medium' | 'full';
+
+export async function getDistrictGeoJSON(
+    provinceName: string,
+    detail: DistrictDetail = 'full'
+): Promise<GeoJSON.FeatureCollection> {
+    const response = await fetch(`${API_BASE_URL}/districts/${encodeURIComponent(provinceName)}?detail=${detail}`, {
         credentials: 'include',
     });
     if (!response.ok) {
@@ -221,6 +226,37 @@ export async function getDistrictGeoJSON(provinceName: string): Promise<GeoJSON.
     return response.json();
 }
 
+export interface DistrictPriceSummary {
+    count: number;
+    mean: number | null;
+    median: number | null;
+}
+
+export interface DistrictChoropleth {
+    province: string;
+    total_listings: number;
+    districts: { [district: string]: DistrictPriceSummary };
+    unmatched: { [districtKey: string]: DistrictPriceSummary };
+}
+
+export async function getDistrictChoropleth(
+    provinceName: string,
+    params: { platform?: string; kategori?: string; ilan_tipi?: string } = {}
+): Promise<DistrictChoropleth> {
+    const searchParams = new URLSearchParams();
+    if (params.platform) searchParams.set('platform', params.platform);
+    if (params.kategori) searchParams.set('kategori', params.kategori);
+    if (params.ilan_tipi) searchParams.set('ilan_tipi', params.ilan_tipi);
+
+    const response = await fetch(`${API_BASE_URL}/districts/${encodeURIComponent(provinceName)}/choropleth?${searchParams}`, {
+        credentials: 'include',
+    });
+    if (!response.ok) {
+        throw new Error(`${provinceName} ilçe istatistikleri alınamadı`);
+    }
+    return response.json();
+}
+
 // ==================== Görev Durumu API (Celery Entegrasyonu) ====================
 
 export interface TaskStatus {
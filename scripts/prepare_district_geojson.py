@@ -2,12 +2,31 @@
 Türkiye İlçe GeoJSON Hazırlama Scripti
 Resmi ilçe sınırları GeoJSON dosyasını okuyup il bazında 81 dosyaya böler.
 Kaynak: Çevre, Şehircilik ve İklim Değişikliği Bakanlığı
+
+Her il için ayrıca sadeleştirilmiş çözünürlük seviyeleri üretir
+(<çıktı>/low/<il>.json, <çıktı>/medium/<il>.json): Douglas–Peucker ile nokta
+azaltma + koordinatları sabit ondalığa yuvarlama. Tam çözünürlük kök
+dizindeki dosyadır. Backend /districts/{il}?detail=low|medium|full ile sunar.
+Seviyeler versiyonlanmaz: Backend'in build adımı (Backend/scripts/
+build_district_assets.py, Docker imajı ve uygulama açılışı) onları da üretir;
+--levels-only aynı işi elle yapar.
+
+Kullanım:
+    python scripts/prepare_district_geojson.py
+    python scripts/prepare_district_geojson.py --levels-only Backend/data/districts
 """
 
+import argparse
 import json
+import sys
 from pathlib import Path
 from collections import defaultdict
 
+# Sadeleştirme Backend ile ortak (Backend/core/district_simplify.py)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "Backend"))
+
+from core.district_simplify import write_detail_levels as _write_detail_levels  # noqa: E402
+
 # İl adı -> dosya adı eşleştirmesi
 PROVINCE_TO_FILENAME = {
     "Adana": "adana", "Adıyaman": "adiyaman", "Afyonkarahisar": "afyonkarahisar",
@@ -35,6 +54,23 @@ PROVINCE_TO_FILENAME = {
 }
 
 
+def write_detail_levels(output_dir, filenames=None):
+    """Kök dizindeki il dosyalarından her seviye için sadeleştirilmiş kopya yaz."""
+    output_path = Path(output_dir)
+    names = list(filenames) if filenames else None
+    totals = _write_detail_levels(output_path, names)
+    sources = [output_path / name for name in names] if names else [
+        p for p in output_path.glob("*.json") if p.name != "index.json"
+    ]
+    full_total = sum(source.stat().st_size for source in sources)
+
+    print(f"\n🔻 Sadeleştirilmiş seviyeler ({len(sources)} il, tam: {full_total / 1024 / 1024:.1f} MB)")
+    for level, size in totals.items():
+        ratio = full_total / size if size else 0
+        print(f"  {level}: {size / 1024 / 1024:.1f} MB ({ratio:.1f}x küçük)")
+    return totals
+
+
 def split_geojson_by_province(input_file, output_dir):
     """
     GeoJSON'u il bazında dosyalara böl.
@@ -144,6 +180,15 @@ def split_geojson_by_province(input_file, output_dir):
 
 
 def main():
+    parser = argparse.ArgumentParser(description="İlçe GeoJSON dosyalarını il bazında böl ve sadeleştir")
+    parser.add_argument("--levels-only", metavar="DIR",
+                        help="Bölme yapmadan DIR içindeki il dosyalarından sadeleştirilmiş seviyeleri üret")
+    args = parser.parse_args()
+
+    if args.levels_only:
+        write_detail_levels(args.levels_only)
+        return
+
     script_dir = Path(__file__).parent
     project_root = script_dir.parent
     
@@ -167,6 +212,7 @@ def main():
     
     print(f"\n📁 Çıktı dizini: {output_dir}")
     index_data = split_geojson_by_province(input_file, output_dir)
+    write_detail_levels(output_dir, [entry["file"] for entry in index_data.values()])
     
     print("\n" + "=" * 60)
     print(f"✅ Toplam {len(index_data)} il işlendi")